@@ -12,7 +12,8 @@ from typing import Dict
 from fyers_apiv3 import fyersModel
 from dotenv import load_dotenv
 import uvicorn
-from datetime import datetime
+import json
+from datetime import datetime, date, time, timedelta, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
 
 load_dotenv()
@@ -45,20 +46,211 @@ db = None
 snapshot_counter = 0
 SNAPSHOT_INTERVAL = 60  # Store a snapshot every 60 fetches (= 60 seconds)
 
+# Market calendar (same file format as quant-engine app/data/nse_calendar.json)
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_START_TIME = os.getenv('MARKET_START_TIME', '09:15')
+MARKET_END_TIME = os.getenv('MARKET_END_TIME', '15:30')
+MARKET_CALENDAR_FILE = os.getenv('MARKET_CALENDAR_FILE')
+PRE_OPEN_WARMUP_MINUTES = int(os.getenv('PRE_OPEN_WARMUP_MINUTES', '15'))
+CLOSED_POLL_INTERVAL = 60  # Max seconds to sleep between calendar checks while closed
+
+# Constituent quotes for breadth (same file format as quant-engine app/data/index_constituents.json)
+BREADTH_CONSTITUENTS_FILE = os.getenv('BREADTH_CONSTITUENTS_FILE')
+QUOTES_BATCH_SIZE = 50  # FYERS quotes API accepts up to 50 symbols per request
+
+# Near-month index futures: LTP with every fetch, OI with every stored snapshot
+FUTURES_ENABLED = os.getenv('FUTURES_ENABLED', 'true').lower() == 'true'
+FUTURES_EXPIRY_WEEKDAY = int(os.getenv('FUTURES_EXPIRY_WEEKDAY', '1'))  # Monthly expiry: last Tuesday
+
+# Recorded-quote replay / recording (replay replaces the live broker)
+QUOTE_REPLAY_FILE = os.getenv('QUOTE_REPLAY_FILE')
+QUOTE_RECORD_FILE = os.getenv('QUOTE_RECORD_FILE')
+FETCH_INTERVAL = float(os.getenv('FETCH_INTERVAL_SECONDS', '1'))
+
+
+def _parse_hhmm(value: str) -> time:
+    hours, minutes = value.split(':')
+    return time(int(hours), int(minutes))
+
+
+def load_market_calendar():
+    """Load holidays and special sessions; weekdays only if no file is configured"""
+    holidays, special_sessions = set(), {}
+    if MARKET_CALENDAR_FILE:
+        try:
+            with open(MARKET_CALENDAR_FILE) as f:
+                data = json.load(f)
+            holidays = {date.fromisoformat(d) for d in data.get('holidays', {})}
+            special_sessions = {
+                date.fromisoformat(d): (_parse_hhmm(s['open']), _parse_hhmm(s['close']))
+                for d, s in data.get('special_sessions', {}).items()
+            }
+        except Exception as e:
+            print(f"⚠️ Could not load market calendar {MARKET_CALENDAR_FILE}: {e}")
+    return holidays, special_sessions
+
+
+MARKET_HOLIDAYS, SPECIAL_SESSIONS = load_market_calendar()
+
+
+def load_constituent_tickers() -> Dict[str, str]:
+    """Constituent symbol -> FYERS ticker for every configured index (empty if disabled)"""
+    if not BREADTH_CONSTITUENTS_FILE:
+        return {}
+    try:
+        with open(BREADTH_CONSTITUENTS_FILE) as f:
+            data = json.load(f)
+        ticker_format = data.get('exchange_symbol_format', 'NSE:{symbol}-EQ')
+        return {
+            symbol: ticker_format.format(symbol=symbol)
+            for members in data['indices'].values()
+            for symbol in members
+        }
+    except Exception as e:
+        print(f"⚠️ Could not load index constituents {BREADTH_CONSTITUENTS_FILE}: {e}")
+        return {}
+
+
+CONSTITUENT_TICKERS = load_constituent_tickers()
+
+
+def seconds_until_market_active(now: datetime = None) -> float:
+    """Seconds until the session (incl. pre-open warm-up) is active, 0 if active now"""
+    now = now or datetime.now(IST)
+    warmup = timedelta(minutes=PRE_OPEN_WARMUP_MINUTES)
+    for offset in range(30):
+        day = now.date() + timedelta(days=offset)
+        if day in SPECIAL_SESSIONS:
+            open_time, close_time = SPECIAL_SESSIONS[day]
+        elif day.weekday() >= 5 or day in MARKET_HOLIDAYS:
+            continue
+        else:
+            open_time, close_time = _parse_hhmm(MARKET_START_TIME), _parse_hhmm(MARKET_END_TIME)
+        session_open = datetime.combine(day, open_time, tzinfo=IST)
+        session_close = datetime.combine(day, close_time, tzinfo=IST)
+        if now < session_close:
+            return max(0.0, (session_open - warmup - now).total_seconds())
+    return float('inf')
+
+
+class RecordedQuoteClient:
+    """
+    Stand-in for FyersModel that serves recorded broker responses
+    
+    The replay file is JSONL with one {"method": "quotes"|"depth",
+    "request": {...}, "response": {...}} object per call, as written by
+    QUOTE_RECORD_FILE. Responses are served per method in recorded order.
+    """
+    
+    def __init__(self, path: str):
+        self.responses = {'quotes': [], 'depth': []}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses.setdefault(record['method'], []).append(record['response'])
+        self.positions = {method: 0 for method in self.responses}
+        print(f"▶️ Replaying {sum(len(r) for r in self.responses.values())} recorded responses from {path}")
+    
+    def _next(self, method: str) -> dict:
+        position = self.positions.get(method, 0)
+        recorded = self.responses.get(method, [])
+        if position >= len(recorded):
+            return {'s': 'error', 'message': 'replay exhausted'}
+        self.positions[method] = position + 1
+        return recorded[position]
+    
+    def quotes(self, data: dict) -> dict:
+        return self._next('quotes')
+    
+    def depth(self, data: dict) -> dict:
+        return self._next('depth')
+
+
+class RecordingClient:
+    """Wraps a live client and appends every quotes/depth call to QUOTE_RECORD_FILE"""
+    
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+    
+    def _record(self, method: str, data: dict, response: dict) -> dict:
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'method': method, 'request': data, 'response': response}) + "\n")
+        except Exception as e:
+            print(f"⚠️ Could not record {method} response: {e}")
+        return response
+    
+    def quotes(self, data: dict) -> dict:
+        return self._record('quotes', data, self.client.quotes(data))
+    
+    def depth(self, data: dict) -> dict:
+        return self._record('depth', data, self.client.depth(data))
+
+
+replay_client = RecordedQuoteClient(QUOTE_REPLAY_FILE) if QUOTE_REPLAY_FILE else None
+
+
 def get_fyers_client():
-    return fyersModel.FyersModel(
+    if replay_client is not None:
+        return replay_client
+    client = fyersModel.FyersModel(
         client_id=APP_ID,
         token=ACCESS_TOKEN,
         is_async=False,
         log_path=""
     )
+    return RecordingClient(client, QUOTE_RECORD_FILE) if QUOTE_RECORD_FILE else client
 
 SYMBOL_MAP = {
     "NIFTY": "NSE:NIFTY50-INDEX",
     "BANKNIFTY": "NSE:NIFTYBANK-INDEX"
 }
 
-async def store_market_snapshot(symbol: str, price_data: dict):
+# Cache for the near-month futures of each index
+futures_cache: Dict[str, dict] = {}
+
+
+def is_trading_day(day: date) -> bool:
+    return day in SPECIAL_SESSIONS or (day.weekday() < 5 and day not in MARKET_HOLIDAYS)
+
+
+def monthly_expiry(year: int, month: int) -> date:
+    """Last FUTURES_EXPIRY_WEEKDAY of the month, moved back to a trading day"""
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    day = next_month - timedelta(days=1)
+    day -= timedelta(days=(day.weekday() - FUTURES_EXPIRY_WEEKDAY) % 7)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def near_month_future(symbol: str, today: date = None):
+    """FYERS ticker (e.g. NSE:NIFTY25OCTFUT) and expiry of the nearest monthly contract"""
+    today = today or datetime.now(IST).date()
+    expiry = monthly_expiry(today.year, today.month)
+    if today > expiry:
+        expiry = monthly_expiry(today.year + today.month // 12, today.month % 12 + 1)
+    return f"NSE:{symbol}{expiry:%y}{expiry.strftime('%b').upper()}FUT", expiry
+
+
+def fetch_futures_oi(fyers):
+    """Refresh open interest of the cached futures from the market depth endpoint"""
+    for symbol, future in futures_cache.items():
+        try:
+            response = fyers.depth({"symbol": future['ticker'], "ohlcv_flag": "1"})
+            if response.get('s') != 'ok':
+                print(f"⚠️ Depth request failed for {future['ticker']}: {response.get('message', response)}")
+                continue
+            depth = response.get('d', {}).get(future['ticker'], {})
+            if depth.get('oi') is not None:
+                future['oi'] = depth.get('oi')
+                future['prevOi'] = depth.get('pdoi')
+        except Exception as e:
+            print(f"❌ Error fetching OI for {future['ticker']}: {e}")
+
+async def store_market_snapshot(symbol: str, price_data: dict, future: dict = None):
     """Store a market snapshot in MongoDB for the quant engine to use"""
     global db
     if db is None:
@@ -81,6 +273,15 @@ async def store_market_snapshot(symbol: str, price_data: dict):
                 'volume': price_data.get('volume', 0)
             }
         }
+        if future and future.get('oi') is not None:
+            snapshot['futures'] = {
+                'ticker': future['ticker'],
+                'expiry': future['expiry'],
+                'ltp': future.get('ltp', 0),
+                'oi': future['oi'],
+                'prevOi': future.get('prevOi'),
+                'volume': future.get('volume', 0)
+            }
         
         await db.market_snapshots.insert_one(snapshot)
         print(f"📝 Stored snapshot for {symbol}: ₹{price_data.get('ltp', 0)}")
@@ -89,6 +290,45 @@ async def store_market_snapshot(symbol: str, price_data: dict):
         print(f"❌ Error storing snapshot for {symbol}: {e}")
 
 
+async def store_constituent_snapshot(fyers):
+    """Fetch all constituent quotes in batches and store them as one breadth snapshot"""
+    if db is None or not CONSTITUENT_TICKERS:
+        return
+    
+    try:
+        symbol_of = {ticker: symbol for symbol, ticker in CONSTITUENT_TICKERS.items()}
+        tickers = list(symbol_of)
+        quotes = {}
+        for start in range(0, len(tickers), QUOTES_BATCH_SIZE):
+            batch = tickers[start:start + QUOTES_BATCH_SIZE]
+            response = fyers.quotes({"symbols": ",".join(batch)})
+            if response.get('s') != 'ok':
+                print(f"⚠️ Constituent quotes failed: {response.get('message', response)}")
+                continue
+            for item in response.get('d', []):
+                symbol = symbol_of.get(item.get('n', ''))
+                v = item.get('v', {})
+                if symbol is None or not v.get('lp'):
+                    continue
+                quotes[symbol] = {
+                    'ltp': v.get('lp'),
+                    'prev_close': v.get('prev_close_price'),
+                    'vwap': v.get('atp'),  # Average traded price for the session
+                    'volume': v.get('volume', 0)
+                }
+        
+        if quotes:
+            await db.constituent_snapshots.insert_one({
+                'timestamp': datetime.utcnow(),
+                'quotes': quotes,
+                'source': 'FYERS_LIVE'
+            })
+            print(f"📝 Stored constituent snapshot: {len(quotes)}/{len(tickers)} quotes")
+        
+    except Exception as e:
+        print(f"❌ Error storing constituent snapshot: {e}")
+
+
 async def fetch_live_prices():
     """Background task to continuously fetch FYERS data"""
     global is_running, price_cache, snapshot_counter
@@ -97,17 +337,41 @@ async def fetch_live_prices():
     print("🚀 Starting real-time market data fetcher...")
     
     while is_running:
+        # Idle outside trading sessions - no broker polling while closed
+        wait = 0 if replay_client is not None else seconds_until_market_active()
+        if wait > 0:
+            await asyncio.sleep(min(wait, CLOSED_POLL_INTERVAL))
+            continue
+        
         try:
             fyers = get_fyers_client()
             
-            # Fetch both symbols
-            symbols = "NSE:NIFTY50-INDEX,NSE:NIFTYBANK-INDEX"
-            response = fyers.quotes({"symbols": symbols})
+            # Fetch both indices and their near-month futures in one request
+            tickers = {ticker: (name, None) for name, ticker in SYMBOL_MAP.items()}
+            if FUTURES_ENABLED:
+                for name in SYMBOL_MAP:
+                    ticker, expiry = near_month_future(name)
+                    tickers[ticker] = (name, expiry)
+            response = fyers.quotes({"symbols": ",".join(tickers)})
             
             if response.get('s') == 'ok':
                 for item in response.get('d', []):
                     v = item.get('v', {})
-                    symbol_name = "NIFTY" if "NIFTY50" in item.get('n', '') else "BANKNIFTY"
+                    symbol_name, expiry = tickers.get(item.get('n', ''), (None, None))
+                    if symbol_name is None:
+                        continue
+                    
+                    if expiry is not None:
+                        future = futures_cache.get(symbol_name)
+                        if future is None or future['ticker'] != item['n']:
+                            # New contract (start-up or rollover) - OI starts over
+                            future = futures_cache[symbol_name] = {'ticker': item['n'], 'expiry': expiry.isoformat()}
+                        future.update({
+                            'ltp': v.get('lp', 0),
+                            'volume': v.get('volume', 0),
+                            'timestamp': datetime.now().isoformat()
+                        })
+                        continue
                     
                     price_cache[symbol_name] = {
                         'symbol': symbol_name,
@@ -129,14 +393,16 @@ async def fetch_live_prices():
                 snapshot_counter += 1
                 if snapshot_counter >= SNAPSHOT_INTERVAL:
                     snapshot_counter = 0
+                    fetch_futures_oi(fyers)
                     for sym, data in price_cache.items():
-                        await store_market_snapshot(sym, data)
+                        await store_market_snapshot(sym, data, futures_cache.get(sym))
+                    await store_constituent_snapshot(fyers)
             
         except Exception as e:
             print(f"❌ Error fetching prices: {e}")
         
-        # Wait 1 second before next fetch (1 request per second)
-        await asyncio.sleep(1)
+        # Wait before next fetch (1 request per second by default)
+        await asyncio.sleep(FETCH_INTERVAL)
 
 @app.on_event("startup")
 async def startup_event():
@@ -152,6 +418,7 @@ async def startup_event():
             ("symbol", 1), 
             ("timestamp", -1)
         ])
+        await db.constituent_snapshots.create_index([("timestamp", 1)])
         print(f"✅ Connected to MongoDB at {MONGODB_URI}")
     except Exception as e:
         print(f"⚠️ MongoDB connection failed: {e} - continuing without snapshot storage")
@@ -174,10 +441,13 @@ def root():
         "status": "running",
         "cached_symbols": list(price_cache.keys()),
         "mongodb_connected": db is not None,
+        "constituents_tracked": len(CONSTITUENT_TICKERS),
+        "replay_file": QUOTE_REPLAY_FILE,
         "endpoints": {
             "live": "/live/{symbol}",
             "quotes": "/quotes/{symbols}",
-            "all": "/all"
+            "all": "/all",
+            "futures": "/futures"
         }
     }
 
@@ -204,6 +474,15 @@ def get_all_prices():
         'count': len(price_cache)
     }
 
+@app.get("/futures")
+def get_futures():
+    """Get cached near-month futures LTP and OI"""
+    return {
+        'status': 'success',
+        'data': list(futures_cache.values()),
+        'count': len(futures_cache)
+    }
+
 if __name__ == "__main__":
     print("🚀 Starting Market Data Real-time Service on port 8006")
     print("📊 Fetching live FYERS data every 1 second")
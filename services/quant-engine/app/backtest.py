@@ -0,0 +1,715 @@
+"""
+Event-driven Backtester
+Replays archived 1-minute bars (and optional recorded OI snapshots) through
+the real SetupScorer, NoTradeScorer and TradingGate, simulating entries and
+exits independently for each RiskMode. Runs fully offline from a local data
+directory.
+
+Data layout:
+    <data_dir>/<SYMBOL>/<YYYY-MM-DD>.csv       timestamp,open,high,low,close,volume (IST)
+    <data_dir>/<SYMBOL>/<YYYY-MM-DD>.oi.json   optional list of OI analyses,
+                                               each with an IST 'timestamp'
+
+Usage (from services/quant-engine):
+    python -m app.backtest run --symbol NIFTY --from 2025-01-01 --to 2025-03-31
+    python -m app.backtest export --symbol NIFTY --days 30   (needs MongoDB)
+"""
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import asyncio
+import bisect
+import csv
+import json
+import logging
+import os
+import time
+
+import pandas as pd
+
+from app.config import settings
+from app.scoring import SetupScorer, atr_metrics
+from app.no_trade_scoring import NoTradeScorer
+from app.chop_state import RollingChopState
+from app.levels import SessionLevels
+from app.range_index import RangeIndex
+from app.session_profile import SessionVolumeProfile
+from app.composite_profile import CompositeProfile, DailyProfile, DailyProfileStore
+from app.volume_profile import VolumeProfileCalculator, FakeBreakoutDetector
+from app.trading_gate import TradingGate, RiskMode
+from app.service import IndicatorService
+from app.market_calendar import IST
+
+logger = logging.getLogger(__name__)
+
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class BarArchive:
+    """Local archive of 1-minute session bars and recorded OI snapshots"""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+
+    def _path(self, symbol: str, day: date, suffix: str) -> str:
+        return os.path.join(self.data_dir, symbol, f"{day.isoformat()}{suffix}")
+
+    def sessions(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> List[date]:
+        """Archived session dates for a symbol, in order"""
+        folder = os.path.join(self.data_dir, symbol)
+        if not os.path.isdir(folder):
+            return []
+        days = []
+        for name in os.listdir(folder):
+            if not name.endswith('.csv'):
+                continue
+            try:
+                day = date.fromisoformat(name[:-len('.csv')])
+            except ValueError:
+                continue
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+        return sorted(days)
+
+    def load_bars(self, symbol: str, day: date) -> pd.DataFrame:
+        """1-minute bars for one session, indexed by bar open time (naive IST)"""
+        df = pd.read_csv(self._path(symbol, day, '.csv'), parse_dates=['timestamp'])
+        df = df.set_index('timestamp').sort_index()
+        return df[BAR_COLUMNS].astype(float)
+
+    def load_oi_snapshots(self, symbol: str, day: date) -> List[Tuple[datetime, Dict]]:
+        """Recorded (timestamp, oi_analysis) pairs for a session, if any"""
+        path = self._path(symbol, day, '.oi.json')
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            records = json.load(f)
+        snapshots = [(pd.Timestamp(r['timestamp']).to_pydatetime(), r) for r in records]
+        return sorted(snapshots, key=lambda item: item[0])
+
+    def save_bars(self, symbol: str, day: date, bars: pd.DataFrame) -> str:
+        """Write one session of 1-minute bars"""
+        path = self._path(symbol, day, '.csv')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        bars[BAR_COLUMNS].to_csv(path, index_label='timestamp')
+        return path
+
+
+class ModeBook:
+    """Position, pending orders and closed trades for one risk mode"""
+
+    def __init__(self, mode: RiskMode):
+        self.mode = mode
+        self.gate = TradingGate(risk_mode=mode)
+        self.position: Optional[Dict] = None
+        self.pending: Optional[Dict] = None
+        self.trades: List[Dict] = []
+        self.consecutive_losses = 0
+        self.signals = 0
+        self.blocked = 0
+
+    def close(self, timestamp: datetime, price: float, reason: str, cost_points: float) -> None:
+        position = self.position
+        pnl = (price - position['entry_price']) * position['direction'] - cost_points
+        self.trades.append({
+            'risk_mode': self.mode.value,
+            'symbol': position['symbol'],
+            'side': 'LONG' if position['direction'] > 0 else 'SHORT',
+            'entry_time': position['entry_time'],
+            'entry_price': round(position['entry_price'], 2),
+            'exit_time': timestamp,
+            'exit_price': round(price, 2),
+            'exit_reason': reason,
+            'setup_score': position['setup_score'],
+            'no_trade_score': position['no_trade_score'],
+            'pnl_points': round(pnl, 2),
+            'r_multiple': round(pnl / position['risk_points'], 3) if position['risk_points'] > 0 else 0.0
+        })
+        self.consecutive_losses = self.consecutive_losses + 1 if pnl < 0 else 0
+        self.position = None
+
+
+class BacktestEngine:
+    """
+    Event-driven backtest over archived 1-minute bars
+
+    Bars are streamed one at a time. Completed decision-timeframe bars are
+    scored and gated; orders fill at the next 1-minute open, and stops,
+    targets, time stops and session-end square-off are checked on every
+    1-minute bar (stop first when both are touched in one bar).
+    """
+
+    def __init__(
+        self,
+        timeframe: str = "5m",
+        higher_timeframe: Optional[str] = None,
+        risk_modes: Optional[List[RiskMode]] = None,
+        warmup_bars: int = 50,
+        lookback_bars: int = 60,
+        stop_atr_multiple: float = 1.0,
+        target_r_multiple: float = 2.0,
+        max_hold_minutes: int = 60,
+        exit_on_bias_flip: bool = True,
+        cost_points: float = 0.0,
+        use_volume_profile: bool = True
+    ):
+        """
+        Args:
+            timeframe: Decision timeframe the scorers run on
+            higher_timeframe: Optional timeframe for ema_15m trend context
+                (None matches the scheduler, which scores without it)
+            risk_modes: Modes to simulate (all by default)
+            warmup_bars: Decision bars required before the first evaluation
+            lookback_bars: Decision bars passed to the scorers
+            stop_atr_multiple: Stop distance in ATRs of the decision timeframe
+            target_r_multiple: Target distance as a multiple of the stop
+            max_hold_minutes: Time stop
+            exit_on_bias_flip: Exit when market_bias turns against the position
+            cost_points: Round-trip cost/slippage per trade, in points
+            use_volume_profile: Feed volume profile into fake breakout detection
+        """
+        self.timeframe = timeframe
+        self.bar_minutes = int(timeframe.rstrip('m'))
+        self.higher_timeframe = higher_timeframe
+        # Keep enough decision bars for a 50-period EMA on the higher timeframe
+        higher_minutes = int(higher_timeframe.rstrip('m')) if higher_timeframe else self.bar_minutes
+        self.history_bars = max(lookback_bars, warmup_bars, 50 * higher_minutes // self.bar_minutes)
+        self.risk_modes = risk_modes or list(RiskMode)
+        self.warmup_bars = warmup_bars
+        self.lookback_bars = max(lookback_bars, warmup_bars)
+        self.stop_atr_multiple = stop_atr_multiple
+        self.target_r_multiple = target_r_multiple
+        self.max_hold = timedelta(minutes=max_hold_minutes)
+        self.exit_on_bias_flip = exit_on_bias_flip
+        self.cost_points = cost_points
+        self.use_volume_profile = use_volume_profile
+
+        self.indicator_service = IndicatorService()
+        self.setup_scorer = SetupScorer()
+        self.no_trade_scorer = NoTradeScorer()
+        self.volume_calculator = VolumeProfileCalculator()
+        self.fake_breakout_detector = FakeBreakoutDetector()
+
+    # ------------------------------------------------------------------
+    # Event loop
+    # ------------------------------------------------------------------
+
+    def run(
+        self,
+        symbol: str,
+        sessions: Iterator[Tuple[pd.DataFrame, List[Tuple[datetime, Dict]]]]
+    ) -> Dict:
+        """
+        Backtest a symbol over a sequence of sessions
+
+        Args:
+            symbol: Symbol being replayed
+            sessions: (1m bars, OI snapshots) per session, in date order
+
+        Returns:
+            Report with per-mode statistics, trades and throughput
+        """
+        books = {mode: ModeBook(mode) for mode in self.risk_modes}
+        history = deque(maxlen=self.history_bars)
+        self.chop_state = RollingChopState()
+        self.levels = SessionLevels(
+            tick_size=settings.levels_tick_size,
+            merge_ticks=settings.levels_merge_ticks,
+            pivot_bars=settings.levels_pivot_bars,
+            opening_range_minutes=settings.levels_opening_range_minutes
+        )
+        self.ranges = RangeIndex()
+        self.session_profile = SessionVolumeProfile(
+            tick_size=settings.volume_profile_tick_size,
+            bin_ticks=settings.volume_profile_bin_ticks,
+            value_area_percent=settings.volume_profile_value_area_percent
+        )
+        # Finished sessions, for the multi-session composite profile
+        self.daily_profiles = DailyProfileStore(
+            cache_size=settings.composite_profile_cache_size,
+            value_area_percent=settings.volume_profile_value_area_percent
+        )
+        self.profile_days: List[date] = []
+        minute_bars = 0
+        decisions = 0
+        session_count = 0
+        start = time.perf_counter()
+
+        for bars, oi_snapshots in sessions:
+            if bars.empty:
+                continue
+            session_count += 1
+            snap_times = [t for t, _ in oi_snapshots]
+            forming: Optional[Dict] = None
+
+            for ts, o, h, l, c, v in bars[BAR_COLUMNS].itertuples(name=None):
+                ts = ts.to_pydatetime()
+                minute_bars += 1
+                group = ts - timedelta(
+                    minutes=ts.minute % self.bar_minutes, seconds=ts.second, microseconds=ts.microsecond
+                )
+
+                # A gap can leave the previous decision bar open - close it now
+                if forming is not None and forming['timestamp'] != group:
+                    decisions += self._on_decision_bar(symbol, forming, history, books, oi_snapshots, snap_times)
+                    forming = None
+
+                self.session_profile.add_bar(ts, h, l, v)
+                for book in books.values():
+                    self._fill_pending(book, symbol, ts, o)
+                    self._check_exits(book, ts, h, l)
+
+                if forming is None:
+                    forming = {'timestamp': group, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+                else:
+                    forming['high'] = max(forming['high'], h)
+                    forming['low'] = min(forming['low'], l)
+                    forming['close'] = c
+                    forming['volume'] += v
+
+                if ts + timedelta(minutes=1) >= group + timedelta(minutes=self.bar_minutes):
+                    decisions += self._on_decision_bar(symbol, forming, history, books, oi_snapshots, snap_times)
+                    forming = None
+
+            # Square off at the session close; unfilled orders expire
+            last_ts = bars.index[-1].to_pydatetime() + timedelta(minutes=1)
+            last_close = float(bars['close'].iloc[-1])
+            for book in books.values():
+                book.pending = None
+                if book.position is not None:
+                    book.close(last_ts, last_close, 'SESSION_END', self.cost_points)
+
+            daily = DailyProfile.from_session(symbol, self.session_profile)
+            if daily is not None:
+                self.daily_profiles.add(daily)
+                self.profile_days.append(daily.day)
+
+        elapsed = time.perf_counter() - start
+        return self._report(symbol, books, session_count, minute_bars, decisions, elapsed)
+
+    def _fill_pending(self, book: ModeBook, symbol: str, ts: datetime, open_price: float) -> None:
+        order = book.pending
+        if order is None:
+            return
+        book.pending = None
+
+        if order['type'] == 'EXIT':
+            if book.position is not None:
+                book.close(ts, open_price, order['reason'], self.cost_points)
+            return
+
+        if book.position is not None:
+            return
+        risk = order['risk_points']
+        direction = order['direction']
+        book.position = {
+            'symbol': symbol,
+            'direction': direction,
+            'entry_time': ts,
+            'entry_price': open_price,
+            'stop': open_price - direction * risk,
+            'target': open_price + direction * risk * self.target_r_multiple,
+            'risk_points': risk,
+            'setup_score': order['setup_score'],
+            'no_trade_score': order['no_trade_score']
+        }
+
+    def _check_exits(self, book: ModeBook, ts: datetime, high: float, low: float) -> None:
+        position = book.position
+        if position is None:
+            return
+        bar_close = ts + timedelta(minutes=1)
+        if position['direction'] > 0:
+            if low <= position['stop']:
+                book.close(bar_close, position['stop'], 'STOP', self.cost_points)
+            elif high >= position['target']:
+                book.close(bar_close, position['target'], 'TARGET', self.cost_points)
+        else:
+            if high >= position['stop']:
+                book.close(bar_close, position['stop'], 'STOP', self.cost_points)
+            elif low <= position['target']:
+                book.close(bar_close, position['target'], 'TARGET', self.cost_points)
+
+    # ------------------------------------------------------------------
+    # Decision stack
+    # ------------------------------------------------------------------
+
+    def _on_decision_bar(
+        self,
+        symbol: str,
+        bar: Dict,
+        history: deque,
+        books: Dict[RiskMode, ModeBook],
+        oi_snapshots: List[Tuple[datetime, Dict]],
+        snap_times: List[datetime]
+    ) -> int:
+        """Score a completed decision bar and queue orders; returns 1 if evaluated"""
+        history.append(bar)
+        self.chop_state.push(bar['high'], bar['low'], bar['close'], bar['volume'])
+        self.levels.push(bar['timestamp'], bar['high'], bar['low'], bar['close'])
+        self.ranges.append(bar['high'], bar['low'])
+        if len(history) < self.warmup_bars:
+            return 0
+
+        bar_close = bar['timestamp'] + timedelta(minutes=self.bar_minutes)
+        pos = bisect.bisect_right(snap_times, bar_close) - 1
+        oi_analysis = oi_snapshots[pos][1] if pos >= 0 else None
+
+        full = pd.DataFrame(list(history)).set_index('timestamp')
+        evaluation = self.evaluate(
+            symbol, full.iloc[-self.lookback_bars:], bar_close, oi_analysis, books, full, self.chop_state,
+            self.levels, self.ranges, self.session_profile,
+            self.daily_profiles.composite(symbol, self.profile_days[-settings.composite_profile_sessions:])
+        )
+
+        for mode, book in books.items():
+            self._decide(book, evaluation, evaluation['decisions'][mode], bar_close)
+        return 1
+
+    def evaluate(
+        self,
+        symbol: str,
+        df: pd.DataFrame,
+        bar_close: datetime,
+        oi_analysis: Optional[Dict],
+        books: Dict[RiskMode, ModeBook],
+        history: Optional[pd.DataFrame] = None,
+        chop_state: Optional[RollingChopState] = None,
+        levels: Optional[SessionLevels] = None,
+        ranges: Optional[RangeIndex] = None,
+        session_profile: Optional[SessionVolumeProfile] = None,
+        composite: Optional[CompositeProfile] = None
+    ) -> Dict:
+        """
+        Run SetupScorer, NoTradeScorer and each mode's TradingGate on one bar
+
+        Args:
+            symbol: Symbol being evaluated
+            df: Decision bars passed to the scorers (lookback window)
+            bar_close: Close time of the latest bar (naive IST)
+            oi_analysis: Latest recorded OI analysis, if any
+            books: Per-mode state (consecutive losses, gate)
+            history: Longer bar history for the higher-timeframe context
+            chop_state: Incremental chop statistics up to this bar (the chop
+                detector re-reads `df` without it)
+            levels: Session support/resistance levels up to this bar (the
+                20-bar high/low is used without them)
+            ranges: Range index ending at this bar (built from `df` without it)
+            session_profile: Session volume profile up to this bar (`df` is
+                profiled without it)
+            composite: Composite profile of the preceding sessions
+        """
+        indicators = self.indicator_service.compute_indicators(df) or {}
+        ema_15m = None
+        if self.higher_timeframe:
+            higher = self.indicator_service.calculator.resample_to_timeframe(
+                (df if history is None else history).reset_index().to_dict('records'),
+                self.higher_timeframe.replace('m', 'min')
+            )
+            ema_15m = (self.indicator_service.compute_indicators(higher) or {}).get('ema')
+
+        price = float(df['close'].iloc[-1])
+        closes = df['close'].tolist()
+        highs = df['high'].tolist()
+        lows = df['low'].tolist()
+
+        volume_profile = None
+        if self.use_volume_profile:
+            if session_profile is not None:
+                volume_profile = session_profile.snapshot(price)
+            else:
+                volume_profile = self.volume_calculator.calculate(df)
+        composite_profile = (
+            composite.snapshot(price, distribution=False) if composite is not None and self.use_volume_profile else None
+        )
+        if levels is not None:
+            levels.set_profile(volume_profile)
+        level_index = levels.index if levels is not None else None
+
+        setup = self.setup_scorer.calculate_setup_score(
+            symbol=symbol,
+            price=price,
+            ema_5m=indicators.get('ema'),
+            ema_15m=ema_15m,
+            vwap=indicators.get('vwap'),
+            price_history=closes,
+            high_history=highs,
+            low_history=lows,
+            df_ohlc=df,
+            oi_analysis=oi_analysis,
+            levels=level_index,
+            ranges=ranges
+        )
+        volatility_details = setup['components'].get('volatility', {}).get('details', {})
+
+        fake_breakout = self.fake_breakout_detector.detect(
+            df, oi_analysis, volume_profile, ranges, composite_profile
+        )
+
+        decisions = {}
+        for mode, book in books.items():
+            no_trade = self.no_trade_scorer.calculate_no_trade_score(
+                symbol=symbol,
+                current_price=price,
+                price_history=closes,
+                high_history=highs,
+                low_history=lows,
+                volatility_details=volatility_details,
+                timestamp=IST.localize(bar_close),
+                consecutive_losses=book.consecutive_losses,
+                volume_history=df['volume'].tolist(),
+                chop_state=chop_state,
+                risk_mode=mode.value,
+                levels=level_index,
+                ranges=ranges
+            )
+            time_details = no_trade['components'].get('time_risk', {}).get('details', {})
+            decision = book.gate.evaluate_trade_decision(
+                setup_score=setup['setup_score'],
+                no_trade_score=no_trade['no_trade_score'],
+                volatility_regime=volatility_details.get('regime'),
+                time_category=time_details.get('category'),
+                fake_breakout_risk=fake_breakout.get('is_fake_breakout', False),
+                oi_analysis=oi_analysis
+            )
+            decision['no_trade_score'] = no_trade['no_trade_score']
+            decisions[mode] = decision
+
+        atr = atr_metrics(df)
+        return {
+            'setup_score': setup['setup_score'],
+            'market_bias': setup['market_bias'],
+            'atr': atr[0] if atr else None,
+            'price': price,
+            'decisions': decisions
+        }
+
+    def _decide(self, book: ModeBook, evaluation: Dict, decision: Dict, bar_close: datetime) -> None:
+        bias = evaluation['market_bias']
+        direction = 1 if bias == 'BULLISH' else -1 if bias == 'BEARISH' else 0
+
+        if book.position is not None:
+            # Time stop and bias flip exit at the next open
+            if bar_close - book.position['entry_time'] >= self.max_hold:
+                book.pending = {'type': 'EXIT', 'reason': 'TIME'}
+            elif self.exit_on_bias_flip and direction == -book.position['direction']:
+                book.pending = {'type': 'EXIT', 'reason': 'BIAS_FLIP'}
+            return
+
+        if direction == 0:
+            return
+        book.signals += 1
+        if not decision['trade_allowed']:
+            book.blocked += 1
+            return
+
+        atr = evaluation['atr']
+        risk = atr * self.stop_atr_multiple if atr else evaluation['price'] * 0.002
+        book.pending = {
+            'type': 'ENTRY',
+            'direction': direction,
+            'risk_points': risk,
+            'setup_score': evaluation['setup_score'],
+            'no_trade_score': decision['no_trade_score']
+        }
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def summarize(trades: List[Dict]) -> Dict:
+        """Hit rate, expectancy, drawdown and exit breakdown for a trade list"""
+        pnls = [t['pnl_points'] for t in trades]
+        wins = [p for p in pnls if p > 0]
+        losses = [p for p in pnls if p <= 0]
+
+        equity = peak = max_drawdown = 0.0
+        for pnl in pnls:
+            equity += pnl
+            peak = max(peak, equity)
+            max_drawdown = max(max_drawdown, peak - equity)
+
+        exit_reasons: Dict[str, int] = {}
+        for t in trades:
+            exit_reasons[t['exit_reason']] = exit_reasons.get(t['exit_reason'], 0) + 1
+
+        count = len(pnls)
+        return {
+            'trades': count,
+            'wins': len(wins),
+            'losses': len(losses),
+            'hit_rate': round(len(wins) / count, 4) if count else None,
+            'avg_win_points': round(sum(wins) / len(wins), 2) if wins else None,
+            'avg_loss_points': round(sum(losses) / len(losses), 2) if losses else None,
+            'expectancy_points': round(sum(pnls) / count, 2) if count else None,
+            'expectancy_r': round(sum(t['r_multiple'] for t in trades) / count, 3) if count else None,
+            'profit_factor': round(sum(wins) / -sum(losses), 2) if losses and sum(losses) < 0 else None,
+            'total_points': round(sum(pnls), 2),
+            'max_drawdown_points': round(max_drawdown, 2),
+            'exit_reasons': exit_reasons
+        }
+
+    def _report(
+        self,
+        symbol: str,
+        books: Dict[RiskMode, ModeBook],
+        sessions: int,
+        minute_bars: int,
+        decisions: int,
+        elapsed: float
+    ) -> Dict:
+        modes = {}
+        trades = []
+        for mode, book in books.items():
+            summary = self.summarize(book.trades)
+            summary['signals'] = book.signals
+            summary['blocked_by_gate'] = book.blocked
+            modes[mode.value] = summary
+            trades.extend(book.trades)
+
+        return {
+            'symbol': symbol,
+            'timeframe': self.timeframe,
+            'higher_timeframe': self.higher_timeframe,
+            'sessions': sessions,
+            'modes': modes,
+            'trades': trades,
+            'throughput': {
+                'minute_bars': minute_bars,
+                'decision_bars': decisions,
+                'elapsed_seconds': round(elapsed, 3),
+                'bars_per_second': round(minute_bars / elapsed, 1) if elapsed > 0 else None,
+                'decisions_per_second': round(decisions / elapsed, 1) if elapsed > 0 else None
+            }
+        }
+
+
+def iter_sessions(archive: BarArchive, symbol: str, days: List[date]):
+    """Lazily load (bars, oi_snapshots) for each archived session"""
+    for day in days:
+        try:
+            yield archive.load_bars(symbol, day), archive.load_oi_snapshots(symbol, day)
+        except Exception as e:
+            logger.error(f"Skipping {symbol} {day}: {e}")
+
+
+async def export_sessions(archive: BarArchive, symbol: str, days: int) -> List[str]:
+    """
+    Archive stored market snapshots as 1-minute session files
+
+    Args:
+        archive: Destination archive
+        symbol: Symbol to export
+        days: Calendar days to look back
+
+    Returns:
+        Paths written
+    """
+    service = IndicatorService()
+    await service.connect_db()
+    try:
+        snapshots = await service.get_market_snapshots(symbol, hours=days * 24)
+        data = [{
+            # Snapshots are stored in naive UTC; the archive is IST
+            'timestamp': pd.Timestamp(snap['timestamp']).tz_localize('UTC').tz_convert(IST).tz_localize(None),
+            'open': float(snap['ohlc1m'].get('open', 0)),
+            'high': float(snap['ohlc1m'].get('high', 0)),
+            'low': float(snap['ohlc1m'].get('low', 0)),
+            'close': float(snap['ohlc1m'].get('close', 0)),
+            'volume': int(snap['ohlc1m'].get('volume', 0))
+        } for snap in snapshots if snap.get('ohlc1m')]
+        if not data:
+            return []
+
+        bars = service.calculator.resample_to_timeframe(data, '1min')
+        paths = []
+        for day, session in bars.groupby(bars.index.date):
+            paths.append(archive.save_bars(symbol, day, session))
+        return paths
+    finally:
+        await service.close_db()
+
+
+def _print_report(report: Dict) -> None:
+    print(f"{report['symbol']} {report['timeframe']} - {report['sessions']} sessions")
+    for mode, stats in report['modes'].items():
+        print(
+            f"  {mode:<12} trades={stats['trades']:<4} hit_rate={stats['hit_rate']} "
+            f"expectancy={stats['expectancy_points']} pts ({stats['expectancy_r']} R) "
+            f"total={stats['total_points']} max_dd={stats['max_drawdown_points']} "
+            f"blocked={stats['blocked_by_gate']}/{stats['signals']}"
+        )
+    throughput = report['throughput']
+    print(
+        f"  {throughput['minute_bars']} bars in {throughput['elapsed_seconds']}s "
+        f"({throughput['bars_per_second']} bars/s, {throughput['decisions_per_second']} decisions/s)"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backtest the scoring and gating stack")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="Backtest archived sessions")
+    run.add_argument('--data-dir', default=settings.backtest_data_dir)
+    run.add_argument('--symbol', default='NIFTY')
+    run.add_argument('--from', dest='start', type=date.fromisoformat)
+    run.add_argument('--to', dest='end', type=date.fromisoformat)
+    run.add_argument('--timeframe', default='5m')
+    run.add_argument('--higher-timeframe', default=None)
+    run.add_argument('--modes', nargs='+', choices=[m.value for m in RiskMode])
+    run.add_argument('--stop-atr', type=float, default=1.0)
+    run.add_argument('--target-r', type=float, default=2.0)
+    run.add_argument('--max-hold', type=int, default=60, help="Time stop in minutes")
+    run.add_argument('--cost', type=float, default=0.0, help="Round-trip cost in points")
+    run.add_argument('--no-volume-profile', action='store_true')
+    run.add_argument('--trades-csv', help="Write closed trades to this file")
+    run.add_argument('--json', action='store_true', help="Print the full report as JSON")
+
+    export = sub.add_parser('export', help="Archive stored snapshots from MongoDB")
+    export.add_argument('--data-dir', default=settings.backtest_data_dir)
+    export.add_argument('--symbol', default='NIFTY')
+    export.add_argument('--days', type=int, default=30)
+
+    args = parser.parse_args(argv)
+    # Scorers log a warning per bar when optional inputs are missing
+    logging.basicConfig(level=logging.ERROR)
+    archive = BarArchive(args.data_dir)
+
+    if args.command == 'export':
+        paths = asyncio.run(export_sessions(archive, args.symbol, args.days))
+        print(f"Archived {len(paths)} sessions to {args.data_dir}")
+        return
+
+    days = archive.sessions(args.symbol, args.start, args.end)
+    if not days:
+        parser.error(f"No archived sessions for {args.symbol} in {args.data_dir}")
+
+    engine = BacktestEngine(
+        timeframe=args.timeframe,
+        higher_timeframe=args.higher_timeframe,
+        risk_modes=[RiskMode[m] for m in args.modes] if args.modes else None,
+        stop_atr_multiple=args.stop_atr,
+        target_r_multiple=args.target_r,
+        max_hold_minutes=args.max_hold,
+        cost_points=args.cost,
+        use_volume_profile=not args.no_volume_profile
+    )
+    report = engine.run(args.symbol, iter_sessions(archive, args.symbol, days))
+
+    if args.trades_csv and report['trades']:
+        with open(args.trades_csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(report['trades'][0].keys()))
+            writer.writeheader()
+            writer.writerows(report['trades'])
+
+    if args.json:
+        print(json.dumps(report, default=str, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Shared Bar Buffers
+Latest resampled OHLC bars per (symbol, timeframe), refreshed whenever the
+service fetches them, so cross-symbol consumers (index internals) can read
+another symbol's bars without querying MongoDB again.
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class BarBuffer:
+    """
+    In-memory store of the most recent bars for each symbol/timeframe
+
+    The last row of a buffered frame may be a bar that is still forming;
+    consumers that need final values should stop one bar short.
+    """
+
+    def __init__(self, max_bars: int = 500):
+        """
+        Args:
+            max_bars: Bars kept per symbol/timeframe
+        """
+        self.max_bars = max_bars
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._updated_at: Dict[Tuple[str, str], datetime] = {}
+
+    def update(self, symbol: str, timeframe: str, bars: pd.DataFrame) -> None:
+        """Replace the buffered bars with a freshly fetched frame"""
+        if bars is None or len(bars) == 0:
+            return
+        self._frames[(symbol, timeframe)] = bars.iloc[-self.max_bars:]
+        self._updated_at[(symbol, timeframe)] = datetime.utcnow()
+
+    def get(self, symbol: str, timeframe: str) -> Optional[pd.DataFrame]:
+        return self._frames.get((symbol, timeframe))
+
+    def last_bar_time(self, symbol: str, timeframe: str) -> Optional[datetime]:
+        """Open time of the newest buffered bar"""
+        bars = self._frames.get((symbol, timeframe))
+        if bars is None or len(bars) == 0:
+            return None
+        return bars.index[-1].to_pydatetime()
+
+    def get_status(self) -> Dict:
+        return {
+            f"{symbol}:{timeframe}": {
+                'bars': len(bars),
+                'last_bar': bars.index[-1].isoformat(),
+                'updated_at': self._updated_at[(symbol, timeframe)].isoformat()
+            }
+            for (symbol, timeframe), bars in self._frames.items()
+        }
+
+
+# Global bar buffer
+bar_buffer = BarBuffer()
@@ -0,0 +1,588 @@
+"""
+Vectorized Batch Setup Scorer
+Scores many symbol/timeframe rows at once with NumPy array operations.
+Produces exactly the same component scores, weighted total and market
+bias as SetupScorer.calculate_setup_score, without building detail dicts.
+Details can be rebuilt later from a stored feature row with explain().
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Union
+import logging
+
+from app.levels import LevelIndex, sr_bounds
+from app.range_index import RECENT_WINDOW, RangeIndex
+from app.scoring import SetupScorer, latest_rsi, atr_metrics
+from app.scoring_rules import scoring_rules
+
+logger = logging.getLogger(__name__)
+
+
+# Feature matrix columns (one row per symbol/timeframe)
+FEATURE_COLUMNS = (
+    'has_trend',         # 1 if both 5m and 15m EMA data are present
+    'align_5m',          # EMA alignment code: 1 bullish, -1 bearish, 0 mixed
+    'align_15m',
+    'slope_5m',          # EMA slope code: 1 bullish, -1 bearish, 0 neutral
+    'slope_15m',
+    'ema9_5m',
+    'price',
+    'has_vwap',          # 1 if VWAP data is present
+    'vwap_value',
+    'vwap_position',     # 1 above, -1 below, 0 at
+    'n_bars',            # Length of price history
+    'last_close',
+    'higher_highs',      # HH count over the last 5 highs
+    'lower_lows',        # LL count over the last 5 lows
+    'recent_high',       # Nearest resistance level (20-bar high without one)
+    'recent_low',        # Nearest support level (20-bar low without one)
+    'rsi',
+    'roc',               # 5-bar rate of change (%)
+    'has_futures_oi',
+    'has_index_prices',
+    'atr_expansion',     # NaN when volatility cannot be scored
+    'range_ratio',
+    'has_oi',            # 1 if OI analysis is present
+    'pcr',
+    'oi_trend',          # 1 BULLISH, -1 BEARISH, 0 NEUTRAL, 2 any other trend
+    'oi_bullish_score',
+    'oi_bearish_score',
+    'has_internals',     # 1 if cross-index internals are available
+    'index_correlation', # Best of lag-0 and lead/lag correlation with the peer index
+    'lead_code',         # 1 leading the peer index, -1 lagging, 0 in sync
+    'breadth_participation',  # Share of index weight moving with the index (NaN if unknown)
+    'futures_quadrant',  # 2 long/short buildup, 1 neutral, 0 covering/unwinding, NaN if not tracked
+)
+
+COL = {name: idx for idx, name in enumerate(FEATURE_COLUMNS)}
+
+COMPONENTS = ('trend', 'vwap', 'structure', 'momentum', 'internals', 'oi', 'volatility')
+
+BIAS_LABELS = np.array(['BEARISH', 'NEUTRAL', 'BULLISH'])
+
+_DIRECTION_CODES = {'bullish': 1, 'bearish': -1, 'above': 1, 'below': -1}
+_OI_TREND_CODES = {'BULLISH': 1, 'BEARISH': -1, 'NEUTRAL': 0}
+
+_ALIGNMENT_LABELS = {1: 'bullish', -1: 'bearish', 0: 'mixed'}
+_SLOPE_LABELS = {1: 'bullish', -1: 'bearish', 0: 'neutral'}
+_POSITION_LABELS = {1: 'above', -1: 'below', 0: 'at'}
+_OI_TREND_LABELS = {1: 'BULLISH', -1: 'BEARISH', 0: 'NEUTRAL', 2: 'OTHER'}
+_LEADERSHIP_CODES = {'leading': 1, 'in_sync': 0, 'lagging': -1}
+_LEADERSHIP_LABELS = {1: 'leading', 0: 'in_sync', -1: 'lagging'}
+_QUADRANT_CODES = {
+    'long_buildup': 2, 'short_buildup': 2, 'neutral': 1, 'short_covering': 0, 'long_unwinding': 0
+}
+_QUADRANT_LABELS = {2: 'buildup', 1: 'neutral', 0: 'covering_or_unwinding'}
+
+
+def _py_round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    Round like Python's round() (np.round can differ on ties)
+    Component scores take few distinct values, so rounding the uniques
+    is exact and cheap.
+    """
+    uniques, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(float(u), ndigits) for u in uniques])
+    return rounded[inverse].reshape(values.shape)
+
+
+def _select(conditions: List[np.ndarray], choices: List[float], default: float) -> np.ndarray:
+    return np.select(conditions, choices, default=default)
+
+
+class BatchSetupScorer:
+    """
+    Vectorized SetupScorer over a (rows x FEATURE_COLUMNS) feature matrix
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            weights: Component weights (defaults to SetupScorer's)
+        """
+        self.weights = dict(weights or SetupScorer().weights)
+
+    # ------------------------------------------------------------------
+    # Feature extraction (same inputs as SetupScorer.calculate_setup_score)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_feature_row(
+        price: float,
+        ema_5m: Optional[Dict],
+        ema_15m: Optional[Dict],
+        vwap: Optional[Dict],
+        price_history: List[float],
+        high_history: List[float],
+        low_history: List[float],
+        df_ohlc: Optional[pd.DataFrame] = None,
+        futures_oi: Optional[Union[float, Dict]] = None,
+        nifty_price: Optional[float] = None,
+        banknifty_price: Optional[float] = None,
+        oi_analysis: Optional[Dict] = None,
+        internals: Optional[Dict] = None,
+        breadth: Optional[Dict] = None,
+        levels: Optional[LevelIndex] = None,
+        ranges: Optional[RangeIndex] = None
+    ) -> np.ndarray:
+        """
+        Extract one feature row from the scalar scorer's inputs
+
+        Returns:
+            1-D float array ordered as FEATURE_COLUMNS
+        """
+        row = np.full(len(FEATURE_COLUMNS), np.nan)
+        row[COL['price']] = price
+
+        has_trend = bool(ema_5m) and bool(ema_15m)
+        row[COL['has_trend']] = float(has_trend)
+        if has_trend:
+            row[COL['align_5m']] = _DIRECTION_CODES.get(ema_5m.get('alignment', 'mixed'), 0)
+            row[COL['align_15m']] = _DIRECTION_CODES.get(ema_15m.get('alignment', 'mixed'), 0)
+            row[COL['slope_5m']] = _DIRECTION_CODES.get(ema_5m.get('slope', 'neutral'), 0)
+            row[COL['slope_15m']] = _DIRECTION_CODES.get(ema_15m.get('slope', 'neutral'), 0)
+            ema9 = ema_5m.get('ema9', price)
+            row[COL['ema9_5m']] = np.nan if ema9 is None else float(ema9)
+
+        has_vwap = bool(vwap) and 'value' in vwap and vwap.get('value') is not None
+        row[COL['has_vwap']] = float(has_vwap)
+        if has_vwap:
+            row[COL['vwap_value']] = float(vwap['value'])
+            row[COL['vwap_position']] = _DIRECTION_CODES.get(vwap.get('position', 'at'), 0)
+
+        n_bars = len(price_history)
+        row[COL['n_bars']] = n_bars
+        if n_bars >= 10:
+            recent_highs = high_history[-RECENT_WINDOW:]
+            recent_lows = low_history[-RECENT_WINDOW:]
+            row[COL['higher_highs']] = sum(
+                1 for i in range(1, len(recent_highs)) if recent_highs[i] > recent_highs[i-1]
+            )
+            row[COL['lower_lows']] = sum(
+                1 for i in range(1, len(recent_lows)) if recent_lows[i] < recent_lows[i-1]
+            )
+            row[COL['last_close']] = price_history[-1]
+            row[COL['recent_high']], row[COL['recent_low']], _, _ = sr_bounds(
+                price_history[-1], high_history, low_history, levels, ranges
+            )
+
+        if n_bars >= 14:
+            row[COL['rsi']] = latest_rsi(price_history)
+            current_price = price_history[-1]
+            price_5_ago = price_history[-6] if n_bars >= 6 else price_history[0]
+            row[COL['roc']] = ((current_price - price_5_ago) / price_5_ago * 100) if price_5_ago > 0 else 0
+
+        row[COL['has_futures_oi']] = float(futures_oi is not None)
+        if isinstance(futures_oi, dict):
+            row[COL['futures_quadrant']] = _QUADRANT_CODES.get(futures_oi.get('quadrant', 'neutral'), 1)
+        row[COL['has_index_prices']] = float(nifty_price is not None and banknifty_price is not None)
+        row[COL['has_internals']] = float(internals is not None)
+        if internals is not None:
+            row[COL['index_correlation']] = internals.get('lead_correlation', internals['correlation'])
+            row[COL['lead_code']] = _LEADERSHIP_CODES.get(internals.get('leadership'), -1)
+        if breadth is not None and breadth.get('participation') is not None:
+            row[COL['breadth_participation']] = breadth['participation']
+
+        if df_ohlc is not None and len(df_ohlc) >= 14 + 20:
+            metrics = atr_metrics(df_ohlc)
+            if metrics is not None:
+                current_atr, avg_atr, range_ratio = metrics
+                row[COL['atr_expansion']] = ((current_atr - avg_atr) / avg_atr) * 100
+                row[COL['range_ratio']] = range_ratio
+
+        row[COL['has_oi']] = float(bool(oi_analysis))
+        if oi_analysis:
+            row[COL['pcr']] = oi_analysis.get('pcr', 1.0)
+            trend = oi_analysis.get('oiTrend', 'NEUTRAL')
+            row[COL['oi_trend']] = _OI_TREND_CODES.get(trend, 2)
+            row[COL['oi_bullish_score']] = oi_analysis.get('bullishScore', 0)
+            row[COL['oi_bearish_score']] = oi_analysis.get('bearishScore', 0)
+
+        return row
+
+    # ------------------------------------------------------------------
+    # Component scores
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def trend_scores(f: np.ndarray) -> np.ndarray:
+        a5, a15 = f[:, COL['align_5m']], f[:, COL['align_15m']]
+        s5, s15 = f[:, COL['slope_5m']], f[:, COL['slope_15m']]
+        price, ema9 = f[:, COL['price']], f[:, COL['ema9_5m']]
+
+        score = np.where(a5 != 0, 3.0, 1.0) + np.where(a15 != 0, 3.0, 1.0)
+        score += _select([(s5 == s15) & (s5 != 0), (s5 != 0) | (s15 != 0)], [2.0, 1.0], 0.0)
+        score += np.where(price != ema9, 2.0, 1.0)
+        score = np.clip(score, 0.0, 10.0)
+
+        # Missing EMA data (or unusable ema9) scores 0 like the scalar path
+        valid = (f[:, COL['has_trend']] == 1) & ~np.isnan(ema9)
+        return np.where(valid, score, 0.0)
+
+    @staticmethod
+    def vwap_scores(f: np.ndarray) -> np.ndarray:
+        price, value = f[:, COL['price']], f[:, COL['vwap_value']]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            distance_pct = np.where(value > 0, np.abs((price - value) / value * 100), 0.0)
+
+        score = scoring_rules.table('vwap.distance_pct').lookup(distance_pct)
+        score += np.where(f[:, COL['vwap_position']] != 0, 5.0, 3.0)
+        score = np.clip(score, 0.0, 10.0)
+        return np.where(f[:, COL['has_vwap']] == 1, score, 0.0)
+
+    @staticmethod
+    def structure_scores(f: np.ndarray) -> np.ndarray:
+        hh, ll = f[:, COL['higher_highs']], f[:, COL['lower_lows']]
+        close = f[:, COL['last_close']]
+        high, low = f[:, COL['recent_high']], f[:, COL['recent_low']]
+
+        score = _select([hh >= 3, ll >= 3, (hh >= 2) | (ll >= 2)], [5.0, 5.0, 3.0], 2.0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dist_high = np.where(high > 0, (high - close) / high * 100, 0.0)
+            dist_low = np.where(low > 0, (close - low) / low * 100, 0.0)
+        score += _select(
+            [(dist_high > 2.0) & (dist_low > 2.0), (dist_high > 1.0) & (dist_low > 1.0)],
+            [5.0, 3.0], 1.0
+        )
+        score = np.clip(score, 0.0, 10.0)
+        return np.where(f[:, COL['n_bars']] >= 10, score, 5.0)
+
+    @staticmethod
+    def momentum_scores(f: np.ndarray) -> np.ndarray:
+        rsi, roc = f[:, COL['rsi']], np.abs(f[:, COL['roc']])
+
+        score = scoring_rules.table('momentum.rsi').lookup(rsi)
+        score += scoring_rules.table('momentum.abs_roc').lookup(roc)
+        score = np.clip(score, 0.0, 10.0)
+        return np.where(f[:, COL['n_bars']] >= 14, score, 5.0)
+
+    @staticmethod
+    def internals_scores(f: np.ndarray) -> np.ndarray:
+        has_internals = f[:, COL['has_internals']] == 1
+        quadrant = f[:, COL['futures_quadrant']]
+        futures_score = _select([quadrant == 2, quadrant == 0], [3.0, 2.0], 2.5)
+        score = np.where(has_internals, 0.0, 5.0) + np.where(f[:, COL['has_futures_oi']] == 1, futures_score, 2.0)
+
+        lead = f[:, COL['lead_code']]
+        index_score = scoring_rules.table('internals.correlation').lookup(f[:, COL['index_correlation']])
+        index_score += _select([lead == 1, lead == 0], [3.0, 2.0], 1.0)
+        score += np.where(
+            has_internals, index_score, np.where(f[:, COL['has_index_prices']] == 1, 2.5, 2.0)
+        )
+        participation = f[:, COL['breadth_participation']]
+        score += np.where(
+            np.isnan(participation),
+            0.0,
+            scoring_rules.table('internals.breadth_participation').lookup(participation)
+        )
+        return np.clip(score, 0.0, 10.0)
+
+    @staticmethod
+    def volatility_scores(f: np.ndarray) -> np.ndarray:
+        expansion, range_ratio = f[:, COL['atr_expansion']], f[:, COL['range_ratio']]
+
+        score = scoring_rules.table('volatility.atr_expansion_pct').lookup(expansion)
+        score += scoring_rules.table('volatility.range_ratio').lookup(range_ratio)
+        score = np.clip(score, 0.0, 10.0)
+        return np.where(np.isnan(expansion), 5.0, score)
+
+    @staticmethod
+    def oi_scores(f: np.ndarray, bias_codes: np.ndarray) -> np.ndarray:
+        pcr, trend = f[:, COL['pcr']], f[:, COL['oi_trend']]
+        pattern = np.maximum(f[:, COL['oi_bullish_score']], f[:, COL['oi_bearish_score']])
+
+        score = scoring_rules.table('oi.pcr').lookup(pcr)
+        score += _select([(trend == bias_codes) & (bias_codes != 0), trend != 0], [3.0, 2.0], 1.0)
+        score += scoring_rules.table('oi.pattern_strength').lookup(pattern)
+        score = np.clip(score, 0.0, 10.0)
+        return np.where(f[:, COL['has_oi']] == 1, score, 5.0)
+
+    @staticmethod
+    def bias_codes(f: np.ndarray) -> np.ndarray:
+        """Market bias per row: 1 BULLISH, -1 BEARISH, 0 NEUTRAL"""
+        n = len(f)
+        has_trend = f[:, COL['has_trend']] == 1
+        a5, a15 = f[:, COL['align_5m']], f[:, COL['align_15m']]
+        # A failing trend scorer (unusable ema9) reports no alignment
+        trend_ok = has_trend & ~np.isnan(f[:, COL['ema9_5m']])
+
+        bull = np.zeros(n)
+        bear = np.zeros(n)
+        bull += np.where(trend_ok & (a5 == 1), 2, 0) + np.where(trend_ok & (a15 == 1), 1, 0)
+        bear += np.where(trend_ok & (a5 == -1), 2, 0) + np.where(trend_ok & (a15 == -1), 1, 0)
+
+        has_vwap = f[:, COL['has_vwap']] == 1
+        position = f[:, COL['vwap_position']]
+        bull += np.where(has_vwap & (position == 1), 1, 0)
+        bear += np.where(has_vwap & (position == -1), 1, 0)
+
+        # Structure: 'bullish_hh' and 'trending' both count as bullish
+        has_structure = f[:, COL['n_bars']] >= 10
+        hh, ll = f[:, COL['higher_highs']], f[:, COL['lower_lows']]
+        bullish_structure = (hh >= 3) | ((hh < 3) & (ll < 3) & ((hh >= 2) | (ll >= 2)))
+        bearish_structure = (hh < 3) & (ll >= 3)
+        bull += np.where(has_structure & bullish_structure, 1, 0)
+        bear += np.where(has_structure & bearish_structure, 1, 0)
+
+        # Momentum uses the RSI as rounded into the scalar details
+        rsi = f[:, COL['rsi']]
+        has_rsi = f[:, COL['n_bars']] >= 14
+        rounded = rsi.copy()
+        near = has_rsi & ((np.abs(rsi - 55) < 0.01) | (np.abs(rsi - 45) < 0.01))
+        if near.any():
+            rounded[near] = [round(float(v), 2) for v in rsi[near]]
+        bull += np.where(has_rsi & (rounded > 55), 1, 0)
+        bear += np.where(has_rsi & (rounded < 45), 1, 0)
+
+        return _select([bull > bear + 1, bear > bull + 1], [1, -1], 0).astype(np.int8)
+
+    # ------------------------------------------------------------------
+    # Aggregate
+    # ------------------------------------------------------------------
+
+    def score(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score every row of a feature matrix
+
+        Args:
+            features: Array of shape (rows, len(FEATURE_COLUMNS))
+
+        Returns:
+            Dictionary of arrays: setup_score, market_bias (labels),
+            bias_code, and '<component>_score' / '<component>_weighted',
+            plus the rules_version the thresholds came from
+        """
+        f = np.asarray(features, dtype=np.float64)
+        if f.ndim != 2 or f.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected feature matrix with {len(FEATURE_COLUMNS)} columns, got {f.shape}")
+        scoring_rules.refresh()
+        rules_version = scoring_rules.version
+
+        bias = self.bias_codes(f)
+        raw = {
+            'trend': self.trend_scores(f),
+            'vwap': self.vwap_scores(f),
+            'structure': self.structure_scores(f),
+            'momentum': self.momentum_scores(f),
+            'internals': self.internals_scores(f),
+            'oi': self.oi_scores(f, bias),
+            'volatility': self.volatility_scores(f),
+        }
+
+        result = {}
+        total = np.zeros(len(f))
+        for name in COMPONENTS:
+            weighted = _py_round(raw[name] * self.weights[name], 4)
+            result[f'{name}_score'] = _py_round(raw[name], 2)
+            result[f'{name}_weighted'] = weighted
+            # Same summation order as SetupScorer so totals match bit for bit
+            total = total + weighted
+
+        result['setup_score'] = _py_round(total, 2)
+        result['bias_code'] = bias
+        result['market_bias'] = BIAS_LABELS[bias + 1]
+        result['rules_version'] = rules_version
+        return result
+
+    def score_rows(self, features: np.ndarray, keys: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Score a feature matrix and return one compact dict per row
+        (component scores only - no detail dicts)
+        """
+        result = self.score(features)
+        rows = []
+        for i in range(len(result['setup_score'])):
+            row = {
+                'setup_score': float(result['setup_score'][i]),
+                'market_bias': str(result['market_bias'][i]),
+                'rules_version': result['rules_version'],
+                'components': {
+                    name: {
+                        'score': float(result[f'{name}_score'][i]),
+                        'weight': self.weights[name],
+                        'weighted': float(result[f'{name}_weighted'][i])
+                    }
+                    for name in COMPONENTS
+                }
+            }
+            if keys is not None:
+                row['key'] = keys[i]
+            rows.append(row)
+        return rows
+
+    # ------------------------------------------------------------------
+    # Lazy details
+    # ------------------------------------------------------------------
+
+    def explain(self, features, components: Optional[Dict] = None) -> Dict[str, Dict]:
+        """
+        Rebuild SetupScorer-style components (with details) from one feature row
+
+        Trend, VWAP and OI details come from the scalar scorers fed with the
+        recorded inputs. Structure, momentum and volatility details are derived
+        from the recorded features, so raw values the row does not carry
+        (ATR levels, internals prices) are omitted.
+
+        Args:
+            features: Feature row ordered as FEATURE_COLUMNS (list or array)
+            components: Stored lean components; scores are recomputed if missing
+
+        Returns:
+            Components dict keyed like SetupScorer's output
+        """
+        row = np.full(len(FEATURE_COLUMNS), np.nan)
+        # Rows stored before newer columns existed are shorter
+        values = list(features)[:len(FEATURE_COLUMNS)]
+        row[:len(values)] = [np.nan if v is None else v for v in values]
+        if components is None:
+            components = self.score_rows(row[None, :])[0]['components']
+
+        scorer = SetupScorer()
+        price = float(row[COL['price']])
+        bias = BIAS_LABELS[int(self.bias_codes(row[None, :])[0]) + 1]
+
+        details = {
+            'trend': self._trend_details(scorer, row, price),
+            'vwap': self._vwap_details(scorer, row, price),
+            'structure': self._structure_details(row, components['structure']['score']),
+            'momentum': self._momentum_details(row, components['momentum']['score']),
+            'internals': self._internals_details(row, components['internals']['score']),
+            'oi': self._oi_details(scorer, row, str(bias)),
+            'volatility': self._volatility_details(row, components['volatility']['score']),
+        }
+        return {
+            name: {**{k: v for k, v in components[name].items() if k != 'details'}, 'details': details[name]}
+            for name in COMPONENTS
+        }
+
+    @staticmethod
+    def _trend_details(scorer: SetupScorer, row: np.ndarray, price: float) -> Dict:
+        if row[COL['has_trend']] != 1:
+            return {"error": "Missing EMA data"}
+        ema9 = row[COL['ema9_5m']]
+        ema_5m = {
+            'alignment': _ALIGNMENT_LABELS[int(row[COL['align_5m']])],
+            'slope': _SLOPE_LABELS[int(row[COL['slope_5m']])],
+            'ema9': None if np.isnan(ema9) else float(ema9)
+        }
+        ema_15m = {
+            'alignment': _ALIGNMENT_LABELS[int(row[COL['align_15m']])],
+            'slope': _SLOPE_LABELS[int(row[COL['slope_15m']])]
+        }
+        return scorer.trend_scorer.score(ema_5m, ema_15m, price)[1]
+
+    @staticmethod
+    def _vwap_details(scorer: SetupScorer, row: np.ndarray, price: float) -> Dict:
+        if row[COL['has_vwap']] != 1:
+            return {"error": "Missing VWAP data"}
+        vwap = {
+            'value': float(row[COL['vwap_value']]),
+            'position': _POSITION_LABELS[int(row[COL['vwap_position']])]
+        }
+        return scorer.vwap_scorer.score(price, vwap)[1]
+
+    @staticmethod
+    def _structure_details(row: np.ndarray, score: float) -> Dict:
+        if row[COL['n_bars']] < 10:
+            return {"error": "Insufficient data", "default": True}
+        hh, ll = int(row[COL['higher_highs']]), int(row[COL['lower_lows']])
+        close = row[COL['last_close']]
+        high, low = row[COL['recent_high']], row[COL['recent_low']]
+        dist_from_high = ((high - close) / high * 100) if high > 0 else 0
+        dist_from_low = ((close - low) / low * 100) if low > 0 else 0
+
+        if hh >= 3:
+            structure = 'bullish_hh'
+        elif ll >= 3:
+            structure = 'bearish_ll'
+        elif hh >= 2 or ll >= 2:
+            structure = 'trending'
+        else:
+            structure = 'choppy'
+
+        if dist_from_high > 2.0 and dist_from_low > 2.0:
+            sr_status = 'clear'
+        elif dist_from_high > 1.0 and dist_from_low > 1.0:
+            sr_status = 'moderate'
+        else:
+            sr_status = 'near_sr'
+
+        return {
+            'structure': structure,
+            'sr_status': sr_status,
+            'higher_highs': hh,
+            'lower_lows': ll,
+            'dist_from_high': round(float(dist_from_high), 2),
+            'dist_from_low': round(float(dist_from_low), 2),
+            'normalized_score': score
+        }
+
+    @staticmethod
+    def _momentum_details(row: np.ndarray, score: float) -> Dict:
+        if row[COL['n_bars']] < 14:
+            return {"error": "Insufficient data", "default": True}
+        rsi, roc = float(row[COL['rsi']]), float(row[COL['roc']])
+        return {
+            'rsi_zone': scoring_rules.table('momentum.rsi').bin(rsi)['label'],
+            'roc_strength': scoring_rules.table('momentum.abs_roc').bin(abs(roc))['label'],
+            'rsi': None if np.isnan(rsi) else round(rsi, 2),
+            'roc': round(roc, 4),
+            'normalized_score': score
+        }
+
+    @staticmethod
+    def _internals_details(row: np.ndarray, score: float) -> Dict:
+        details = {
+            'status': 'basic_internals',
+            'oi_status': 'available' if row[COL['has_futures_oi']] == 1 else 'unavailable',
+            'index_correlation': 'both_active' if row[COL['has_index_prices']] == 1 else 'partial',
+            'normalized_score': score
+        }
+        quadrant = row[COL['futures_quadrant']]
+        if not np.isnan(quadrant):
+            details['oi_status'] = 'tracked'
+            details['futures_quadrant'] = _QUADRANT_LABELS[int(quadrant)]
+        if row[COL['has_internals']] == 1:
+            coupling = float(row[COL['index_correlation']])
+            details['status'] = 'index_internals'
+            details['index_correlation'] = scoring_rules.table('internals.correlation').bin(coupling)['label']
+            details['lead_correlation'] = coupling
+            details['leadership'] = _LEADERSHIP_LABELS.get(int(row[COL['lead_code']]), 'lagging')
+        participation = float(row[COL['breadth_participation']])
+        if not np.isnan(participation):
+            details['breadth'] = scoring_rules.table('internals.breadth_participation').bin(participation)['label']
+            details['participation'] = participation
+        return details
+
+    @staticmethod
+    def _oi_details(scorer: SetupScorer, row: np.ndarray, market_bias: str) -> Dict:
+        if row[COL['has_oi']] != 1:
+            return scorer.oi_scorer.score(None, market_bias)[1]
+        oi_analysis = {
+            'pcr': float(row[COL['pcr']]),
+            'oiTrend': _OI_TREND_LABELS[int(row[COL['oi_trend']])],
+            'bullishScore': float(row[COL['oi_bullish_score']]),
+            'bearishScore': float(row[COL['oi_bearish_score']])
+        }
+        return scorer.oi_scorer.score(oi_analysis, market_bias)[1]
+
+    @staticmethod
+    def _volatility_details(row: np.ndarray, score: float) -> Dict:
+        expansion, range_ratio = row[COL['atr_expansion']], row[COL['range_ratio']]
+        if np.isnan(expansion):
+            return {"error": "Insufficient data", "regime": "UNKNOWN"}
+
+        regime_bin = scoring_rules.table('volatility.atr_expansion_pct').bin(expansion)
+        interpretation = regime_bin['interpretation']
+        range_label = scoring_rules.table('volatility.range_ratio').bin(range_ratio)['label']
+        if range_label:
+            interpretation += f" | {range_label}"
+
+        return {
+            'regime': regime_bin['label'],
+            'interpretation': interpretation,
+            'atr_expansion_pct': round(float(expansion), 2),
+            'range_ratio': round(float(range_ratio), 2),
+            'normalized_score': score
+        }
@@ -0,0 +1,268 @@
+"""
+Constituent Breadth Engine
+Advance/decline, % above VWAP, EMA alignment and weighted contribution to
+the index move for the NIFTY 50 and BANKNIFTY constituents. State is one
+symbols x features matrix; each minute's quotes update it, and every
+index's statistics are recomputed with a single pass of array operations
+(membership and weight matrices over the whole universe).
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONSTITUENTS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'index_constituents.json')
+
+# Columns of the constituent feature matrix
+FEATURES = ('ltp', 'prev_close', 'vwap', 'ema_fast', 'ema_mid', 'ema_slow')
+F = {name: i for i, name in enumerate(FEATURES)}
+_EMA_COLS = [F['ema_fast'], F['ema_mid'], F['ema_slow']]
+
+
+class BreadthEngine:
+    """
+    Breadth statistics for every configured index, updated once per minute
+
+    Quotes are dicts keyed by constituent symbol with 'ltp', 'prev_close'
+    and 'vwap' (the exchange's average traded price). Missing quotes keep
+    the previous values. EMAs run on the minute LTPs and reset with the
+    session.
+    """
+
+    def __init__(
+        self,
+        constituents_file: Optional[str] = None,
+        ema_periods: tuple = (9, 21, 50),
+        min_coverage: float = 0.5
+    ):
+        """
+        Args:
+            constituents_file: JSON constituents/weights file
+                (defaults to app/data/index_constituents.json)
+            ema_periods: Fast, mid and slow EMA periods in minutes
+            min_coverage: Share of index weight that must be quoted before
+                contribution and participation are reported
+        """
+        self.constituents_file = constituents_file or DEFAULT_CONSTITUENTS_FILE
+        self.ema_periods = tuple(ema_periods)
+        self.alphas = np.array([2.0 / (p + 1) for p in self.ema_periods])
+        self.min_coverage = min_coverage
+
+        self.indices: List[str] = []
+        self.universe: List[str] = []
+        self.members = np.zeros((0, 0), dtype=bool)   # indices x universe
+        self.weights = np.zeros((0, 0))               # indices x universe, rows sum to 1
+        self.as_of: Optional[str] = None
+        self._load()
+        self.reset()
+
+    def _load(self) -> None:
+        try:
+            with open(self.constituents_file) as f:
+                data = json.load(f)
+            indices = data['indices']
+        except Exception as e:
+            logger.error(f"Error loading index constituents {self.constituents_file}: {e}")
+            return
+
+        self.indices = list(indices)
+        self.universe = sorted({symbol for members in indices.values() for symbol in members})
+        position = {symbol: i for i, symbol in enumerate(self.universe)}
+
+        self.members = np.zeros((len(self.indices), len(self.universe)), dtype=bool)
+        self.weights = np.zeros((len(self.indices), len(self.universe)))
+        for row, index in enumerate(self.indices):
+            for symbol, weight in indices[index].items():
+                self.members[row, position[symbol]] = True
+                self.weights[row, position[symbol]] = float(weight)
+            total = self.weights[row].sum()
+            if total > 0:
+                self.weights[row] /= total
+
+        self.as_of = data.get('as_of')
+        logger.info(
+            f"Loaded {len(self.universe)} constituents for {', '.join(self.indices)} "
+            f"(weights as of {self.as_of})"
+        )
+
+    def reset(self) -> None:
+        """Clear all state (start of a new session)"""
+        self.matrix = np.full((len(self.universe), len(FEATURES)), np.nan)
+        self.minutes = np.zeros(len(self.universe), dtype=np.int64)
+        self.last_time: Optional[datetime] = None
+        self.updates = 0
+        self._stats: Optional[Dict[str, np.ndarray]] = None
+
+    def tracks(self, index: str) -> bool:
+        return index in self.indices
+
+    def update(self, timestamp: datetime, quotes: Dict[str, Dict]) -> bool:
+        """
+        Ingest one minute of constituent quotes
+
+        Args:
+            timestamp: Snapshot time (naive UTC)
+            quotes: {symbol: {'ltp': .., 'prev_close': .., 'vwap': ..}}
+
+        Returns:
+            False if the snapshot is not newer than the last one ingested
+        """
+        if self.last_time is not None:
+            if timestamp <= self.last_time:
+                return False
+            if timestamp.date() != self.last_time.date():
+                self.reset()
+        self.last_time = timestamp
+
+        empty = {}
+        raw = np.array(
+            [
+                [
+                    (quotes.get(symbol) or empty).get(key)
+                    for key in ('ltp', 'prev_close', 'vwap')
+                ]
+                for symbol in self.universe
+            ],
+            dtype=np.float64
+        ).reshape(len(self.universe), 3)
+        raw[raw <= 0] = np.nan
+
+        m = self.matrix
+        m[:, :3] = np.where(np.isnan(raw), m[:, :3], raw)
+
+        price = raw[:, :1]
+        quoted = ~np.isnan(price)
+        ema = m[:, _EMA_COLS]
+        m[:, _EMA_COLS] = np.where(
+            quoted,
+            np.where(np.isnan(ema), price, ema + self.alphas * (price - ema)),
+            ema
+        )
+        self.minutes += quoted[:, 0]
+
+        self.updates += 1
+        self._stats = self._compute()
+        return True
+
+    def _compute(self) -> Dict[str, np.ndarray]:
+        """Per-index statistics for the whole matrix in one pass"""
+        m = self.matrix
+        ltp, prev_close, vwap = m[:, F['ltp']], m[:, F['prev_close']], m[:, F['vwap']]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change_pct = (ltp / prev_close - 1) * 100
+        quoted = ~np.isnan(change_pct)
+        change = np.where(quoted, change_pct, 0.0)
+
+        members = self.members.astype(np.float64)
+        advances = members @ (change > 0)
+        declines = members @ (quoted & (change < 0))
+        unchanged = members @ (quoted & (change == 0))
+
+        has_vwap = quoted & ~np.isnan(vwap)
+        above_vwap = members @ (has_vwap & (ltp > vwap))
+
+        fast, mid, slow = m[:, F['ema_fast']], m[:, F['ema_mid']], m[:, F['ema_slow']]
+        warm = self.minutes >= self.ema_periods[-1]
+        bullish = members @ (warm & (fast > mid) & (mid > slow))
+        bearish = members @ (warm & (fast < mid) & (mid < slow))
+
+        # Weighted contribution of each constituent to the index move (pct points)
+        contribution = self.weights * change
+        index_move = contribution.sum(axis=1)
+        coverage = self.weights @ quoted
+
+        # Share of quoted weight moving with the index
+        direction = np.sign(index_move)[:, None]
+        agreeing = (self.weights * (quoted & (np.sign(change) == direction))).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            participation = np.where(
+                (coverage >= self.min_coverage) & (direction[:, 0] != 0),
+                agreeing / coverage,
+                np.nan
+            )
+
+        return {
+            'quoted': members @ quoted,
+            'advances': advances,
+            'declines': declines,
+            'unchanged': unchanged,
+            'has_vwap': members @ has_vwap,
+            'above_vwap': above_vwap,
+            'warm': members @ warm,
+            'bullish': bullish,
+            'bearish': bearish,
+            'contribution': contribution,
+            'index_move': index_move,
+            'coverage': coverage,
+            'participation': participation
+        }
+
+    def snapshot(self, index: str, top: int = 3) -> Optional[Dict]:
+        """
+        Breadth statistics for one index
+
+        Returns:
+            Dict with advances/declines, pct_above_vwap, pct_bullish_alignment,
+            weighted index move and top contributors, or None before the
+            first update
+        """
+        if self._stats is None or index not in self.indices:
+            return None
+        row = self.indices.index(index)
+        s = self._stats
+
+        def pct(count: float, total: float) -> Optional[float]:
+            return round(float(count) / float(total) * 100, 2) if total else None
+
+        covered = s['coverage'][row] >= self.min_coverage
+        contribution = s['contribution'][row]
+        order = np.argsort(contribution)
+        leaders = [
+            {'symbol': self.universe[i], 'contribution_pct': round(float(contribution[i]), 4)}
+            for i in order[::-1][:top] if contribution[i] > 0
+        ]
+        laggards = [
+            {'symbol': self.universe[i], 'contribution_pct': round(float(contribution[i]), 4)}
+            for i in order[:top] if contribution[i] < 0
+        ]
+        participation = s['participation'][row]
+        advances, declines = int(s['advances'][row]), int(s['declines'][row])
+
+        return {
+            'index': index,
+            'constituents': int(self.members[row].sum()),
+            'quoted': int(s['quoted'][row]),
+            'advances': advances,
+            'declines': declines,
+            'unchanged': int(s['unchanged'][row]),
+            'advance_decline_ratio': round(advances / declines, 3) if declines else None,
+            'pct_above_vwap': pct(s['above_vwap'][row], s['has_vwap'][row]),
+            'pct_bullish_alignment': pct(s['bullish'][row], s['warm'][row]),
+            'pct_bearish_alignment': pct(s['bearish'][row], s['warm'][row]),
+            'weighted_move_pct': round(float(s['index_move'][row]), 4) if covered else None,
+            'weight_coverage': round(float(s['coverage'][row]), 4),
+            'participation': None if np.isnan(participation) else round(float(participation), 4),
+            'top_contributors': leaders,
+            'top_detractors': laggards,
+            'as_of': self.last_time.isoformat() if self.last_time else None
+        }
+
+    def get_status(self) -> Dict:
+        return {
+            'constituents_file': self.constituents_file,
+            'weights_as_of': self.as_of,
+            'universe': len(self.universe),
+            'updates': self.updates,
+            'last_update': self.last_time.isoformat() if self.last_time else None
+        }
+
+
+# Global breadth engine
+breadth_engine = BreadthEngine(constituents_file=settings.breadth_constituents_file)
@@ -0,0 +1,272 @@
+"""
+Rolling Chop State
+Incremental versions of the ChopDetector statistics (range compression,
+direction-change oscillation, coefficient of variation) plus the
+choppiness index and Kaufman efficiency ratio. Window extremes come from
+monotonic deques and sums are kept as running totals, so each new bar
+costs O(1) amortized; chop_series() runs the state over a whole bar
+series for backtests.
+"""
+from collections import deque
+from typing import Dict, Optional
+import math
+
+import numpy as np
+
+
+class MonotonicWindow:
+    """Maximum (or minimum) of the last `size` values via a monotonic deque"""
+
+    def __init__(self, size: int, mode: str = 'max'):
+        self.size = size
+        self.is_max = mode == 'max'
+        self.items = deque()  # (position, value), values monotonic from the front
+        self.position = 0
+
+    def push(self, value: float) -> None:
+        if self.is_max:
+            while self.items and self.items[-1][1] <= value:
+                self.items.pop()
+        else:
+            while self.items and self.items[-1][1] >= value:
+                self.items.pop()
+        self.items.append((self.position, value))
+        if self.items[0][0] <= self.position - self.size:
+            self.items.popleft()
+        self.position += 1
+
+    @property
+    def value(self) -> float:
+        return self.items[0][1]
+
+
+class WindowSum:
+    """
+    Sum of the last `size` values
+
+    Rebuilt from the window every `size` pushes to stop floating-point drift.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self._pushes = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def push(self, value: float) -> None:
+        if len(self.values) == self.size:
+            self.total -= self.values.popleft()
+        self.values.append(value)
+        self.total += value
+        self._pushes += 1
+        if self._pushes >= self.size:
+            self._pushes = 0
+            self.total = math.fsum(self.values)
+
+
+class RollingMoments:
+    """
+    Mean and population variance of the last `size` values
+
+    Sums are taken around a shift (the window mean at the last rebuild) so
+    large price levels do not cancel the variance out.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.shift = None
+        self.s1 = self.s2 = 0.0
+        self._pushes = 0
+
+    def push(self, value: float) -> None:
+        if self.shift is None:
+            self.shift = value
+        if len(self.values) == self.size:
+            old = self.values.popleft() - self.shift
+            self.s1 -= old
+            self.s2 -= old * old
+        self.values.append(value)
+        x = value - self.shift
+        self.s1 += x
+        self.s2 += x * x
+        self._pushes += 1
+        if self._pushes >= self.size:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._pushes = 0
+        n = len(self.values)
+        self.shift = math.fsum(self.values) / n
+        shifted = [v - self.shift for v in self.values]
+        self.s1 = math.fsum(shifted)
+        self.s2 = math.fsum(x * x for x in shifted)
+
+    @property
+    def mean(self) -> float:
+        return self.shift + self.s1 / len(self.values)
+
+    @property
+    def variance(self) -> float:
+        n = len(self.values)
+        return max(0.0, self.s2 / n - (self.s1 / n) ** 2)
+
+
+class RollingChopState:
+    """
+    Chop statistics over the last `window` bars, updated one bar at a time
+
+    The range ratio, oscillation ratio and coefficient of variation match
+    ChopDetector's definitions over its 20-bar window.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        recent: int = 5,
+        efficiency_period: int = 10,
+        choppiness_period: int = 14
+    ):
+        """
+        Args:
+            window: Bars in the chop window
+            recent: Bars in the recent range compared with the window range
+            efficiency_period: Kaufman efficiency ratio lookback
+            choppiness_period: Choppiness index lookback
+        """
+        self.window = window
+        self.recent = recent
+        self.efficiency_period = efficiency_period
+        self.choppiness_period = choppiness_period
+        self.reset()
+
+    def reset(self) -> None:
+        self.bars = 0
+        self.window_high = MonotonicWindow(self.window, 'max')
+        self.window_low = MonotonicWindow(self.window, 'min')
+        self.recent_high = MonotonicWindow(self.recent, 'max')
+        self.recent_low = MonotonicWindow(self.recent, 'min')
+        self.chop_high = MonotonicWindow(self.choppiness_period, 'max')
+        self.chop_low = MonotonicWindow(self.choppiness_period, 'min')
+        self.closes = RollingMoments(self.window)
+        # One flag per pair of consecutive close changes inside the window
+        self.direction_flips = WindowSum(self.window - 2)
+        self.abs_changes = WindowSum(self.efficiency_period)
+        self.true_ranges = WindowSum(self.choppiness_period)
+        self.volumes = WindowSum(self.window)
+        self.recent_volumes = WindowSum(self.recent)
+        self._close_history = deque(maxlen=self.efficiency_period + 1)
+        self._last_sign: Optional[float] = None
+        self._has_volume = False
+
+    def push(self, high: float, low: float, close: float, volume: Optional[float] = None) -> None:
+        """Ingest one completed bar"""
+        high, low, close = float(high), float(low), float(close)
+        previous_close = self._close_history[-1] if self._close_history else None
+
+        self.window_high.push(high)
+        self.window_low.push(low)
+        self.recent_high.push(high)
+        self.recent_low.push(low)
+        self.chop_high.push(high)
+        self.chop_low.push(low)
+        self.closes.push(close)
+        self._close_history.append(close)
+
+        if previous_close is None:
+            self.true_ranges.push(high - low)
+        else:
+            change = close - previous_close
+            sign = (change > 0) - (change < 0)
+            if self._last_sign is not None:
+                self.direction_flips.push(float(sign != self._last_sign))
+            self._last_sign = sign
+            self.abs_changes.push(abs(change))
+            self.true_ranges.push(max(high - low, abs(high - previous_close), abs(low - previous_close)))
+
+        if volume is not None:
+            self._has_volume = True
+        self.volumes.push(float(volume or 0.0))
+        self.recent_volumes.push(float(volume or 0.0))
+        self.bars += 1
+
+    @property
+    def ready(self) -> bool:
+        return self.bars >= self.window
+
+    def metrics(self) -> Optional[Dict]:
+        """
+        Current statistics, or None until `window` bars have been seen
+
+        Returns:
+            Dict with range_ratio (None for a flat window), oscillation_ratio,
+            coefficient_variation, choppiness_index, efficiency_ratio and
+            volume_ratio (None without volumes)
+        """
+        if not self.ready:
+            return None
+
+        overall_range = self.window_high.value - self.window_low.value
+        recent_range = self.recent_high.value - self.recent_low.value
+
+        mean = self.closes.mean
+        cv = math.sqrt(self.closes.variance) / mean * 100 if mean > 0 else 0.0
+
+        efficiency_ratio = None
+        if len(self._close_history) > self.efficiency_period:
+            path = self.abs_changes.total
+            net = abs(self._close_history[-1] - self._close_history[0])
+            efficiency_ratio = net / path if path > 0 else 0.0
+
+        choppiness_index = None
+        chop_range = self.chop_high.value - self.chop_low.value
+        if self.bars >= self.choppiness_period and chop_range > 0 and self.true_ranges.total > 0:
+            choppiness_index = (
+                100 * math.log10(self.true_ranges.total / chop_range) / math.log10(self.choppiness_period)
+            )
+
+        volume_ratio = None
+        if self._has_volume and self.volumes.total > 0:
+            volume_ratio = (self.recent_volumes.total / self.recent) / (self.volumes.total / self.window)
+
+        return {
+            'range_ratio': recent_range / overall_range if overall_range > 0 else None,
+            'oscillation_ratio': self.direction_flips.total / (self.window - 1),
+            'coefficient_variation': cv,
+            'choppiness_index': choppiness_index,
+            'efficiency_ratio': efficiency_ratio,
+            'volume_ratio': volume_ratio
+        }
+
+
+def chop_series(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: Optional[np.ndarray] = None,
+    **state_kwargs
+) -> Dict[str, np.ndarray]:
+    """
+    Chop statistics after every bar of a series (NaN while warming up)
+
+    Returns:
+        Dict of arrays keyed like RollingChopState.metrics()
+    """
+    state = RollingChopState(**state_kwargs)
+    n = len(close)
+    keys = ('range_ratio', 'oscillation_ratio', 'coefficient_variation',
+            'choppiness_index', 'efficiency_ratio', 'volume_ratio')
+    out = {key: np.full(n, np.nan) for key in keys}
+
+    for i in range(n):
+        state.push(high[i], low[i], close[i], None if volume is None else volume[i])
+        metrics = state.metrics()
+        if metrics is None:
+            continue
+        for key in keys:
+            if metrics[key] is not None:
+                out[key][i] = metrics[key]
+    return out
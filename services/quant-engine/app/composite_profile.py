@@ -0,0 +1,239 @@
+"""
+Composite Volume Profiles
+Finished sessions are kept as compact daily profiles (the touched run of
+fixed-grid bins as one float64 array plus the absolute number of its first
+bin). Any range of sessions merges into a composite profile by adding the
+arrays on the shared grid, with recent merges kept in an LRU cache, so
+prior-day and multi-day value areas never touch raw bars again.
+"""
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from app.config import settings
+from app.session_profile import SessionVolumeProfile, describe_profile
+from app.volume_profile import value_area
+
+logger = logging.getLogger(__name__)
+
+
+class DailyProfile:
+    """Volume per fixed-grid bin of one finished session"""
+
+    def __init__(
+        self,
+        symbol: str,
+        day: date,
+        bin_size: float,
+        base: int,
+        volumes: np.ndarray,
+        bars: int = 0
+    ):
+        """
+        Args:
+            symbol: Symbol profiled
+            day: Session date
+            bin_size: Grid spacing the bins were built on
+            base: Absolute bin number of volumes[0]
+            volumes: Volume per bin from `base` upwards
+            bars: 1-minute bars absorbed
+        """
+        self.symbol = symbol
+        self.day = day
+        self.bin_size = bin_size
+        self.base = int(base)
+        self.volumes = np.asarray(volumes, dtype=np.float64)
+        self.bars = bars
+
+    @classmethod
+    def from_session(cls, symbol: str, profile: SessionVolumeProfile) -> Optional['DailyProfile']:
+        """Trim a session profile to its touched bins (None if it has none)"""
+        if profile.poc is None:
+            return None
+        return cls(
+            symbol, profile.session_day, profile.bin_size, profile.base + profile.lowest,
+            profile.volumes[profile.lowest:profile.highest + 1].copy(), profile.bars
+        )
+
+    def to_document(self) -> Dict:
+        return {
+            'symbol': self.symbol,
+            'date': self.day.isoformat(),
+            'bin_size': self.bin_size,
+            'base': self.base,
+            'volumes': self.volumes.tobytes(),
+            'bars': self.bars,
+            'total_volume': float(self.volumes.sum()),
+            'stored_at': datetime.utcnow()
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict) -> 'DailyProfile':
+        return cls(
+            document['symbol'],
+            date.fromisoformat(document['date']),
+            float(document['bin_size']),
+            document['base'],
+            np.frombuffer(document['volumes'], dtype=np.float64),
+            document.get('bars', 0)
+        )
+
+
+def merge_profiles(profiles: List[DailyProfile]) -> Optional[Tuple[int, np.ndarray]]:
+    """
+    Add daily bin arrays on their shared grid
+
+    Returns:
+        Tuple of (absolute bin of the first element, summed volumes), or None
+        when there is nothing to merge
+    """
+    if not profiles:
+        return None
+    base = min(profile.base for profile in profiles)
+    end = max(profile.base + len(profile.volumes) for profile in profiles)
+    volumes = np.zeros(end - base, dtype=np.float64)
+    for profile in profiles:
+        start = profile.base - base
+        volumes[start:start + len(profile.volumes)] += profile.volumes
+    return base, volumes
+
+
+class CompositeProfile:
+    """POC and value area of several sessions' merged bins"""
+
+    def __init__(
+        self,
+        symbol: str,
+        days: List[date],
+        bin_size: float,
+        base: int,
+        volumes: np.ndarray,
+        value_area_percent: float = 0.70
+    ):
+        self.symbol = symbol
+        self.days = days
+        self.bin_size = bin_size
+        self.base = base
+        self.volumes = volumes
+        self.total_volume = float(volumes.sum())
+        self.poc = int(np.argmax(volumes))
+        self.va_lower, self.va_upper, self.va_volume = value_area(
+            volumes, self.poc, self.total_volume * value_area_percent
+        )
+        self._distribution: Optional[Dict[str, float]] = None
+
+    def _price(self, index: int) -> float:
+        return round((self.base + index + 0.5) * self.bin_size, 2)
+
+    def distribution(self) -> Dict[str, float]:
+        if self._distribution is None:
+            self._distribution = {
+                f"{self._price(i):.2f}": round(float(self.volumes[i]), 2)
+                for i in np.flatnonzero(self.volumes > 0).tolist()
+            }
+        return self._distribution
+
+    def snapshot(self, current_price: Optional[float] = None, distribution: bool = True) -> Dict:
+        """
+        Composite levels positioned against a price (see describe_profile)
+
+        Args:
+            current_price: Price to position (defaults to the POC)
+            distribution: Include the per-bin volumes
+        """
+        snapshot = describe_profile(
+            self._price(self.poc), self._price(self.va_upper), self._price(self.va_lower),
+            float(self.volumes[self.poc]), self.va_volume, self.total_volume,
+            self.distribution() if distribution else {}, current_price
+        )
+        snapshot.update({
+            'symbol': self.symbol,
+            'sessions': [day.isoformat() for day in self.days],
+            'bin_size': round(self.bin_size, 4)
+        })
+        return snapshot
+
+
+class DailyProfileStore:
+    """Daily profiles in memory, with an LRU cache of composites built from them"""
+
+    def __init__(self, cache_size: int = 32, max_days: int = 120, value_area_percent: float = 0.70):
+        """
+        Args:
+            cache_size: Composites kept (least recently used are dropped)
+            max_days: Daily profiles kept per symbol (oldest are dropped)
+            value_area_percent: Share of composite volume inside the value area
+        """
+        self.cache_size = cache_size
+        self.max_days = max_days
+        self.value_area_percent = value_area_percent
+        self._daily: Dict[str, Dict[date, DailyProfile]] = {}
+        self._composites: 'OrderedDict[Tuple[str, Tuple[date, ...]], CompositeProfile]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, profile: DailyProfile) -> None:
+        """Keep a daily profile (replacing that day's) and drop composites that used it"""
+        days = self._daily.setdefault(profile.symbol, {})
+        days[profile.day] = profile
+        for key in [key for key in self._composites if key[0] == profile.symbol and profile.day in key[1]]:
+            del self._composites[key]
+        while len(days) > self.max_days:
+            del days[min(days)]
+
+    def get(self, symbol: str, day: date) -> Optional[DailyProfile]:
+        return self._daily.get(symbol, {}).get(day)
+
+    def missing(self, symbol: str, days: Iterable[date]) -> List[date]:
+        held = self._daily.get(symbol, {})
+        return [day for day in days if day not in held]
+
+    def composite(self, symbol: str, days: Iterable[date]) -> Optional[CompositeProfile]:
+        """
+        Composite of the held daily profiles among `days` (cached per day set)
+
+        Profiles on a different grid from the latest one (the bin size was
+        reconfigured) are left out.
+        """
+        held = self._daily.get(symbol, {})
+        days = tuple(sorted(day for day in set(days) if day in held))
+        if not days:
+            return None
+        key = (symbol, days)
+        composite = self._composites.get(key)
+        if composite is not None:
+            self._composites.move_to_end(key)
+            self.hits += 1
+            return composite
+
+        self.misses += 1
+        bin_size = held[days[-1]].bin_size
+        profiles = [held[day] for day in days if held[day].bin_size == bin_size]
+        base, volumes = merge_profiles(profiles)
+        composite = CompositeProfile(
+            symbol, [profile.day for profile in profiles], bin_size, base, volumes, self.value_area_percent
+        )
+        self._composites[key] = composite
+        while len(self._composites) > self.cache_size:
+            self._composites.popitem(last=False)
+        return composite
+
+    def get_status(self) -> Dict:
+        return {
+            'daily': {
+                symbol: sorted(day.isoformat() for day in days) for symbol, days in self._daily.items()
+            },
+            'cached_composites': len(self._composites),
+            'cache_hits': self.hits,
+            'cache_misses': self.misses
+        }
+
+
+# Global daily profile store
+daily_profile_store = DailyProfileStore(
+    cache_size=settings.composite_profile_cache_size,
+    value_area_percent=settings.volume_profile_value_area_percent
+)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     """Application settings"""
@@ -10,7 +10,68 @@ class Settings(BaseSettings):
     
     # Evaluation
     evaluation_interval_minutes: int = 3
+    symbols: List[str] = ["NIFTY", "BANKNIFTY"]
+    timeframes: List[str] = ["5m", "15m"]  # Priority order - later ones are shed first
+    scoring_cycle_budget_seconds: float = 60.0
+    scoring_misfire_grace_seconds: int = 30
+    score_detail_level: str = "lean"  # "lean" (scores + features) or "full" (detail dicts)
+    score_emit_epsilon: float = 0.05  # Store/broadcast only when the score moves more than this...
+    score_emit_heartbeat_seconds: int = 300  # ...the bias flips, or this much time has passed
     
+    # Scoring rules (threshold tables, hot-reloaded)
+    scoring_rules_file: Optional[str] = None  # Defaults to app/data/scoring_rules.json
+    scoring_rules_check_seconds: float = 5.0
+    
+    # Sharding (symbol ownership across replicas)
+    sharding_enabled: bool = False
+    replica_id: Optional[str] = None  # Defaults to hostname
+    shard_heartbeat_seconds: int = 10
+    shard_lease_seconds: int = 30
+    shard_virtual_nodes: int = 64
+    
+    # Leader election (one scheduler per deployment across workers)
+    leader_election_enabled: bool = True
+    leader_lease_seconds: int = 15
+    
+    # Index internals (rolling cross-index statistics)
+    internals_benchmark: str = "NIFTY"
+    internals_benchmark_peer: str = "BANKNIFTY"  # Paired with the benchmark itself
+    internals_window_bars: int = 30
+    internals_max_lag_bars: int = 3
+
+    # Constituent breadth (minute snapshots from market-data-realtime)
+    breadth_enabled: bool = True
+    breadth_constituents_file: Optional[str] = None  # Defaults to app/data/index_constituents.json
+    breadth_max_age_seconds: int = 180  # Older snapshots are not scored
+
+    # Futures OI (near-month futures in market snapshots)
+    futures_oi_window_minutes: int = 15
+    futures_oi_min_change_pct: float = 0.1  # Smaller OI moves count as neutral
+    futures_oi_max_age_seconds: int = 180
+
+    # Support/resistance levels (swing pivots, prior day, opening range, profile)
+    levels_tick_size: float = 0.05
+    levels_merge_ticks: int = 20  # Levels closer than this many ticks are merged
+    levels_pivot_bars: int = 2
+    levels_opening_range_minutes: int = 15
+
+    # Session volume profile (fixed tick-size bins, anchored at the session)
+    volume_profile_tick_size: float = 0.05
+    volume_profile_bin_ticks: int = 20  # Ticks per price bin
+    volume_profile_value_area_percent: float = 0.70
+    composite_profile_sessions: int = 5  # Finished sessions in the default composite
+    composite_profile_cache_size: int = 32
+
+    # Market profile (TPO letters on the volume profile's price grid)
+    tpo_period_minutes: int = 30
+    tpo_initial_balance_periods: int = 2
+
+    # Trade gate profiles (per X-Client-Id) and rules (hot-reloaded)
+    gate_profiles_max: int = 10000
+    gate_profiles_refresh_seconds: float = 2.0  # Version check against the stored profiles
+    gate_rules_file: Optional[str] = None  # Defaults to app/data/gate_rules.json
+    gate_rules_check_seconds: float = 5.0
+
     # Scoring Thresholds
     conservative_setup_threshold: float = 8.0
     conservative_no_trade_threshold: float = 4.0
@@ -23,6 +84,12 @@ class Settings(BaseSettings):
     market_start_time: str = "09:15"
     market_end_time: str = "15:30"
     market_timezone: str = "Asia/Kolkata"
+    market_calendar_file: Optional[str] = None  # Defaults to app/data/nse_calendar.json
+    time_risk_file: Optional[str] = None  # Defaults to app/data/time_risk_windows.json
+    pre_open_warmup_minutes: int = 15
+    
+    # Backtesting
+    backtest_data_dir: str = "data/backtest"  # <dir>/<SYMBOL>/<YYYY-MM-DD>.csv (1m bars, IST)
     
     # AI Service
     ai_reasoning_service_url: Optional[str] = "http://localhost:8002"
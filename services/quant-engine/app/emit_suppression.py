@@ -0,0 +1,118 @@
+"""
+Score Emit Suppression
+Tracks the last stored/broadcast score per (symbol, timeframe) and lets a
+new evaluation through only when it is worth publishing: the score moved
+by more than epsilon, the market bias flipped, the scoring rules changed,
+or the heartbeat interval elapsed. Quiet sessions then produce a trickle
+of snapshots and socket updates instead of one per run.
+"""
+from typing import Dict, Optional, Tuple
+import logging
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmittedState:
+    """Last published score for one key"""
+
+    __slots__ = ('score', 'bias', 'rules_version', 'emitted_at')
+
+    def __init__(self, score: float, bias: str, rules_version: Optional[str], emitted_at: float):
+        self.score = score
+        self.bias = bias
+        self.rules_version = rules_version
+        self.emitted_at = emitted_at
+
+
+class EmitSuppressor:
+    """
+    Change-threshold filter for score storage and broadcast
+
+    Changes are measured against the last *emitted* score, so a slow drift
+    is published once it adds up to more than epsilon.
+    """
+
+    def __init__(self, epsilon: float = 0.05, heartbeat_seconds: float = 300.0):
+        """
+        Args:
+            epsilon: Minimum absolute setup-score change worth emitting
+            heartbeat_seconds: Emit at least this often even if nothing changed
+        """
+        self.epsilon = epsilon
+        self.heartbeat_seconds = heartbeat_seconds
+        self.state: Dict[str, EmittedState] = {}
+        self.emitted = 0
+        self.suppressed = 0
+        self.reasons: Dict[str, int] = {}
+
+    def check(
+        self,
+        key: str,
+        score: float,
+        bias: str,
+        rules_version: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Decide whether a new score should be stored and broadcast
+
+        Args:
+            key: '<symbol>:<timeframe>'
+            score: New setup score
+            bias: New market bias
+            rules_version: Scoring rules version the score was computed with
+            now: Monotonic timestamp (defaults to time.monotonic())
+
+        Returns:
+            Tuple of (emit, reason); reason is None when suppressed
+        """
+        now = time.monotonic() if now is None else now
+        last = self.state.get(key)
+
+        if last is None:
+            reason = 'first'
+        elif bias != last.bias:
+            reason = 'bias_flip'
+        elif abs(score - last.score) > self.epsilon:
+            reason = 'score_change'
+        elif rules_version != last.rules_version:
+            reason = 'rules_change'
+        elif now - last.emitted_at >= self.heartbeat_seconds:
+            reason = 'heartbeat'
+        else:
+            self.suppressed += 1
+            return False, None
+
+        self.state[key] = EmittedState(score, bias, rules_version, now)
+        self.emitted += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        return True, reason
+
+    def reset(self, key: Optional[str] = None) -> None:
+        """Forget the last emitted state (all keys if none given)"""
+        if key is None:
+            self.state.clear()
+        else:
+            self.state.pop(key, None)
+
+    def get_metrics(self) -> Dict:
+        total = self.emitted + self.suppressed
+        return {
+            'epsilon': self.epsilon,
+            'heartbeat_seconds': self.heartbeat_seconds,
+            'emitted': self.emitted,
+            'suppressed': self.suppressed,
+            'suppression_rate': round(self.suppressed / total, 4) if total else 0.0,
+            'emit_reasons': dict(self.reasons),
+            'tracked_keys': len(self.state)
+        }
+
+
+# Global emit suppressor
+emit_suppressor = EmitSuppressor(
+    epsilon=settings.score_emit_epsilon,
+    heartbeat_seconds=settings.score_emit_heartbeat_seconds
+)
@@ -0,0 +1,249 @@
+"""
+Futures OI Features
+Rolling open-interest change and price/OI quadrant (long buildup, short
+buildup, short covering, long unwinding) for the near-month index futures,
+maintained incrementally from the minute snapshots market-data-realtime
+stores with a `futures` subdocument. Each update is O(1); the state can be
+driven from a recorded snapshot file instead of MongoDB.
+"""
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import argparse
+import json
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (price rising, OI rising) -> quadrant
+QUADRANTS = {
+    (True, True): 'long_buildup',
+    (False, True): 'short_buildup',
+    (True, False): 'short_covering',
+    (False, False): 'long_unwinding'
+}
+QUADRANT_BIAS = {
+    'long_buildup': 'BULLISH',
+    'short_covering': 'BULLISH',
+    'short_buildup': 'BEARISH',
+    'long_unwinding': 'BEARISH',
+    'neutral': 'NEUTRAL'
+}
+
+
+class FuturesOITracker:
+    """
+    Rolling price/OI change for one futures contract
+
+    Keeps the snapshots of the last `window_minutes`; the change is
+    measured from the oldest one still inside the window. A contract
+    change (rollover) resets everything; a new session only resets the
+    window, so the session OI change is measured from the last OI of the
+    previous session.
+    """
+
+    def __init__(self, window_minutes: int = 15, min_oi_change_pct: float = 0.1):
+        """
+        Args:
+            window_minutes: Lookback of the rolling change
+            min_oi_change_pct: Smaller OI moves are classified as 'neutral'
+        """
+        self.window_seconds = window_minutes * 60
+        self.min_oi_change_pct = min_oi_change_pct
+        self.ticker: Optional[str] = None
+        self.expiry: Optional[str] = None
+        self.previous_session_oi: Optional[float] = None
+        self._reset_session()
+
+    def _reset_session(self) -> None:
+        self.points = deque()  # (timestamp, price, oi)
+        self.last_time: Optional[datetime] = None
+        self.session_open_oi: Optional[float] = None
+
+    def update(
+        self,
+        timestamp: datetime,
+        price: float,
+        oi: float,
+        ticker: Optional[str] = None,
+        expiry: Optional[str] = None,
+        previous_day_oi: Optional[float] = None
+    ) -> bool:
+        """
+        Ingest one futures snapshot
+
+        Returns:
+            False if the snapshot is not newer than the last one or invalid
+        """
+        if not price or not oi or price <= 0 or oi <= 0:
+            return False
+        if ticker is not None and ticker != self.ticker:
+            if self.ticker is not None:
+                logger.info(f"Futures contract changed: {self.ticker} -> {ticker}")
+            self.ticker, self.expiry = ticker, expiry
+            self.previous_session_oi = None
+            self._reset_session()
+
+        if self.last_time is not None:
+            if timestamp <= self.last_time:
+                return False
+            if timestamp.date() != self.last_time.date():
+                self.previous_session_oi = self.points[-1][2]
+                self._reset_session()
+
+        if self.session_open_oi is None:
+            self.session_open_oi = oi
+            if previous_day_oi and self.previous_session_oi is None:
+                self.previous_session_oi = float(previous_day_oi)
+        self.last_time = timestamp
+        self.points.append((timestamp, float(price), float(oi)))
+
+        # Keep one point at or before the window start as the reference
+        while len(self.points) > 2 and (timestamp - self.points[1][0]).total_seconds() >= self.window_seconds:
+            self.points.popleft()
+        return True
+
+    def snapshot(self) -> Optional[Dict]:
+        """
+        Rolling and session OI features
+
+        Returns:
+            Dict with price/oi change over the window, quadrant and its
+            bias, session OI change, or None with fewer than two snapshots
+        """
+        if len(self.points) < 2:
+            return None
+        start_time, start_price, start_oi = self.points[0]
+        end_time, price, oi = self.points[-1]
+
+        price_change_pct = (price / start_price - 1) * 100
+        oi_change_pct = (oi / start_oi - 1) * 100
+        if abs(oi_change_pct) < self.min_oi_change_pct or price == start_price:
+            quadrant = 'neutral'
+        else:
+            quadrant = QUADRANTS[(price > start_price, oi > start_oi)]
+
+        reference = self.previous_session_oi or self.session_open_oi
+        return {
+            'ticker': self.ticker,
+            'expiry': self.expiry,
+            'price': price,
+            'oi': oi,
+            'window_minutes': round((end_time - start_time).total_seconds() / 60, 1),
+            'price_change_pct': round(price_change_pct, 4),
+            'oi_change': oi - start_oi,
+            'oi_change_pct': round(oi_change_pct, 4),
+            'quadrant': quadrant,
+            'bias': QUADRANT_BIAS[quadrant],
+            'session_oi_change_pct': round((oi / reference - 1) * 100, 4) if reference else None,
+            'as_of': end_time.isoformat()
+        }
+
+
+class FuturesOIEngine:
+    """Futures OI trackers for every index, fed from market snapshots"""
+
+    def __init__(self, window_minutes: int = 15, min_oi_change_pct: float = 0.1):
+        self.window_minutes = window_minutes
+        self.min_oi_change_pct = min_oi_change_pct
+        self.trackers: Dict[str, FuturesOITracker] = {}
+
+    def tracker(self, symbol: str) -> FuturesOITracker:
+        if symbol not in self.trackers:
+            self.trackers[symbol] = FuturesOITracker(self.window_minutes, self.min_oi_change_pct)
+        return self.trackers[symbol]
+
+    def last_time(self, symbol: str) -> Optional[datetime]:
+        tracker = self.trackers.get(symbol)
+        return tracker.last_time if tracker else None
+
+    def ingest(self, snapshot: Dict) -> bool:
+        """
+        Ingest one market snapshot document ({'symbol', 'timestamp', 'futures': {...}})
+
+        Returns:
+            True if the futures data was new and valid
+        """
+        future = snapshot.get('futures')
+        if not future:
+            return False
+        timestamp = snapshot['timestamp']
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        return self.tracker(snapshot['symbol']).update(
+            timestamp,
+            future.get('ltp'),
+            future.get('oi'),
+            ticker=future.get('ticker'),
+            expiry=future.get('expiry'),
+            previous_day_oi=future.get('prevOi')
+        )
+
+    def replay(self, snapshots: Iterable[Dict]) -> List[Dict]:
+        """
+        Feed recorded snapshots in order
+
+        Returns:
+            Feature snapshot after each ingested record (with its symbol)
+        """
+        timeline = []
+        for snapshot in snapshots:
+            if self.ingest(snapshot):
+                features = self.tracker(snapshot['symbol']).snapshot()
+                if features is not None:
+                    timeline.append({'symbol': snapshot['symbol'], **features})
+        return timeline
+
+    def snapshot(self, symbol: str) -> Optional[Dict]:
+        tracker = self.trackers.get(symbol)
+        return tracker.snapshot() if tracker else None
+
+    def get_status(self) -> Dict:
+        return {symbol: tracker.snapshot() for symbol, tracker in self.trackers.items()}
+
+
+def load_recorded_snapshots(path: str) -> List[Dict]:
+    """Read market snapshots (one JSON document per line, e.g. a mongoexport) sorted by time"""
+    snapshots = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            doc = json.loads(line)
+            timestamp = doc['timestamp']
+            if isinstance(timestamp, dict):  # mongoexport extended JSON
+                timestamp = timestamp['$date']
+            doc['timestamp'] = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).replace(tzinfo=None)
+            snapshots.append(doc)
+    snapshots.sort(key=lambda doc: doc['timestamp'])
+    return snapshots
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded market snapshots through the futures OI tracker")
+    parser.add_argument('snapshots', help="JSONL market snapshots with a 'futures' subdocument")
+    parser.add_argument('--symbol', help="Only show this symbol")
+    parser.add_argument('--window', type=int, default=settings.futures_oi_window_minutes)
+    args = parser.parse_args(argv)
+
+    engine = FuturesOIEngine(args.window, settings.futures_oi_min_change_pct)
+    for row in engine.replay(load_recorded_snapshots(args.snapshots)):
+        if args.symbol and row['symbol'] != args.symbol:
+            continue
+        print(
+            f"{row['as_of']}  {row['symbol']:<10} {row['ticker'] or '':<20} "
+            f"price {row['price_change_pct']:+.3f}%  OI {row['oi_change_pct']:+.3f}%  {row['quadrant']}"
+        )
+
+
+# Global futures OI engine
+futures_oi_engine = FuturesOIEngine(
+    window_minutes=settings.futures_oi_window_minutes,
+    min_oi_change_pct=settings.futures_oi_min_change_pct
+)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Declarative Trade Gate Rules
+The trade gate's rules (condition, risk modes, block or warn, message
+template) loaded from a JSON rules file and compiled once into closures.
+A single decision runs the rules in order with short-circuiting
+conditions and can return a trace of what fired; a series of decisions
+(every bar of a backtest, or many gate profiles against one snapshot)
+runs each rule once over NumPy arrays. The file is re-read when its
+modification time changes, and every loaded rule set carries a version id.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import operator
+import os
+import time
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(__file__), 'data', 'gate_rules.json')
+
+# Decision inputs a condition can test
+FIELDS = ('setup_score', 'no_trade_score', 'volatility_regime', 'time_category', 'fake_breakout_risk', 'pcr')
+
+# Gate parameters a condition or action can refer to (see TradingGate.gate_params)
+PARAMS = (
+    'risk_mode', 'setup_threshold', 'no_trade_threshold', 'allowed_volatility_regimes',
+    'block_opening_noise', 'block_chop_hour'
+)
+
+RISK_MODES = ('CONSERVATIVE', 'BALANCED', 'AGGRESSIVE')
+
+# Stand-in values the message templates are trial-formatted with at load time
+_SAMPLE_VALUES = {
+    'setup_score': 0.0, 'no_trade_score': 0.0, 'volatility_regime': 'NORMAL',
+    'time_category': 'PRIME_TIME', 'fake_breakout_risk': False, 'pcr': 1.0,
+    'risk_mode': 'BALANCED', 'setup_threshold': 0.0, 'no_trade_threshold': 0.0,
+    'allowed_volatility_regimes': ('NORMAL',), 'block_opening_noise': False, 'block_chop_hour': False
+}
+
+SKIP, WARN, BLOCK = 0, 1, 2
+ACTIONS = {'skip': SKIP, 'warn': WARN, 'block': BLOCK}
+ACTION_NAMES = {code: name for name, code in ACTIONS.items()}
+
+_COMPARISONS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne
+}
+
+ScalarCondition = Callable[[Dict, Dict], bool]
+SeriesCondition = Callable[[Dict, Dict, int], np.ndarray]
+
+
+def _truthy(values) -> np.ndarray:
+    """Elementwise bool() of a scalar or array (None and NaN are false)"""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind in 'iuf':
+        return (values != 0) & ~np.isnan(values)
+    return np.asarray(np.frompyfunc(bool, 1, 1)(values), dtype=bool)
+
+
+def _as_float(values) -> np.ndarray:
+    """Numeric operand with None as NaN (NaN fails every comparison)"""
+    return np.asarray(values if values is not None else np.nan, dtype=np.float64)
+
+
+def _compile_condition(node: Dict, rule_id: str) -> Tuple[ScalarCondition, SeriesCondition]:
+    """(scalar, series) evaluators of one condition node"""
+    for combinator in ('all', 'any'):
+        if combinator in node:
+            children = [_compile_condition(child, rule_id) for child in node[combinator]]
+            if not children:
+                raise ValueError(f"{rule_id}: empty '{combinator}'")
+            scalars = [child[0] for child in children]
+            series = [child[1] for child in children]
+            stop = combinator == 'any'
+
+            def scalar(fields, params, scalars=scalars, check=all if combinator == 'all' else any):
+                return check(child(fields, params) for child in scalars)
+
+            def vector(fields, params, n, series=series, stop=stop):
+                mask = series[0](fields, params, n)
+                for child in series[1:]:
+                    # Short-circuit once no row can change
+                    if mask.all() if stop else not mask.any():
+                        break
+                    mask = (mask | child(fields, params, n)) if stop else (mask & child(fields, params, n))
+                return mask
+
+            return scalar, vector
+
+    field, op = node.get('field'), node.get('op')
+    if field not in FIELDS:
+        raise ValueError(f"{rule_id}: unknown field {field!r}")
+
+    if op == 'present':
+        return (
+            lambda fields, params: bool(fields[field]),
+            lambda fields, params, n: np.broadcast_to(_truthy(fields[field]), (n,))
+        )
+
+    if 'param' in node:
+        param = node['param']
+        if param not in PARAMS:
+            raise ValueError(f"{rule_id}: unknown param {param!r}")
+        operand = lambda params: params[param]
+    elif 'value' in node:
+        value = node['value']
+        operand = lambda params: value
+    else:
+        raise ValueError(f"{rule_id}: condition on {field} needs a 'value' or a 'param'")
+
+    if op in _COMPARISONS:
+        compare = _COMPARISONS[op]
+        numeric = op not in ('==', '!=')
+
+        def scalar(fields, params):
+            left, right = fields[field], operand(params)
+            if numeric and (left is None or right is None):
+                return False
+            return bool(compare(left, right))
+
+        def vector(fields, params, n):
+            left, right = fields[field], operand(params)
+            if numeric:
+                with np.errstate(invalid='ignore'):
+                    result = compare(_as_float(left), _as_float(right))
+            else:
+                result = compare(np.asarray(left, dtype=object), right)
+            return np.broadcast_to(np.asarray(result, dtype=bool), (n,))
+
+        return scalar, vector
+
+    if op in ('in', 'not_in'):
+        negate = op == 'not_in'
+
+        def scalar(fields, params):
+            return (fields[field] in operand(params)) != negate
+
+        def vector(fields, params, n):
+            left, right = np.broadcast_to(np.asarray(fields[field], dtype=object), (n,)), operand(params)
+            if isinstance(right, np.ndarray):  # One collection per row
+                result = np.fromiter((l in r for l, r in zip(left, right)), dtype=bool, count=n)
+            else:
+                result = np.zeros(n, dtype=bool)
+                for item in right:
+                    result |= left == item
+            return ~result if negate else result
+
+        return scalar, vector
+
+    raise ValueError(f"{rule_id}: unknown operator {op!r}")
+
+
+def _action_code(name: str, rule_id: str) -> int:
+    if name not in ACTIONS:
+        raise ValueError(f"{rule_id}: unknown action {name!r}")
+    return ACTIONS[name]
+
+
+def _compile_action(
+    spec, modes: Optional[List[str]], rule_id: str
+) -> Tuple[Callable[[Dict], int], Callable[[Dict, int], np.ndarray], set]:
+    """
+    (scalar, series) resolvers of a rule's action code for the gate params,
+    and the set of codes they can return
+    """
+    if isinstance(spec, str):
+        code = _action_code(spec, rule_id)
+        possible = {code}
+        scalar = lambda params: code
+        vector = lambda params, n: np.full(n, code, dtype=np.int8)
+    elif 'if' in spec:
+        param = spec['if']
+        if param not in PARAMS:
+            raise ValueError(f"{rule_id}: unknown param {param!r}")
+        then, otherwise = _action_code(spec['then'], rule_id), _action_code(spec['else'], rule_id)
+        possible = {then, otherwise}
+        scalar = lambda params: then if params[param] else otherwise
+        vector = lambda params, n: np.where(
+            np.broadcast_to(_truthy(params[param]), (n,)), then, otherwise
+        ).astype(np.int8)
+    else:
+        unknown = set(spec) - set(RISK_MODES) - {'default'}
+        if unknown:
+            raise ValueError(f"{rule_id}: unknown risk modes {sorted(unknown)}")
+        codes = {mode: _action_code(name, rule_id) for mode, name in spec.items() if mode != 'default'}
+        default = _action_code(spec.get('default', 'skip'), rule_id)
+        possible = set(codes.values()) | {default}
+        scalar = lambda params: codes.get(params['risk_mode'], default)
+
+        def vector(params, n):
+            mode = np.broadcast_to(np.asarray(params['risk_mode'], dtype=object), (n,))
+            result = np.full(n, default, dtype=np.int8)
+            for name, code in codes.items():
+                result[mode == name] = code
+            return result
+
+    if modes is None:
+        return scalar, vector, possible
+    unknown = set(modes) - set(RISK_MODES)
+    if unknown:
+        raise ValueError(f"{rule_id}: unknown risk modes {sorted(unknown)}")
+    modes = tuple(modes)
+
+    def scalar_in_modes(params, scalar=scalar):
+        return scalar(params) if params['risk_mode'] in modes else SKIP
+
+    def vector_in_modes(params, n, vector=vector):
+        mode = np.broadcast_to(np.asarray(params['risk_mode'], dtype=object), (n,))
+        applies = np.zeros(n, dtype=bool)
+        for name in modes:
+            applies |= mode == name
+        return np.where(applies, vector(params, n), SKIP).astype(np.int8)
+
+    return scalar_in_modes, vector_in_modes, possible | {SKIP}
+
+
+class GateRule:
+    """One compiled rule: condition, action per risk mode and message templates"""
+
+    def __init__(self, spec: Dict):
+        """
+        Args:
+            spec: {'id': .., 'when': condition, 'action': action,
+                   'message': template or {'block': .., 'warn': ..},
+                   'modes': optional list of risk modes the rule applies to}
+        """
+        self.id = spec['id']
+        self.condition, self.condition_series = _compile_condition(spec['when'], self.id)
+        self.action, self.action_series, possible = _compile_action(spec['action'], spec.get('modes'), self.id)
+        message = spec['message']
+        self.messages = message if isinstance(message, dict) else {'block': message, 'warn': message}
+        for name in self.messages:
+            _action_code(name, self.id)
+        self._check_messages(possible - {SKIP})
+        self.spec = spec
+
+    def _check_messages(self, codes: set) -> None:
+        """Every action the rule can take needs a template that formats over FIELDS and PARAMS"""
+        for code in sorted(codes):
+            name = ACTION_NAMES[code]
+            template = self.messages.get(name)
+            if not isinstance(template, str):
+                raise ValueError(f"{self.id}: no message for action {name!r}")
+            try:
+                template.format(**_SAMPLE_VALUES)
+            except (KeyError, ValueError, IndexError, TypeError, AttributeError) as e:
+                raise ValueError(f"{self.id}: bad {name} message {template!r}: {e!r}")
+
+    def message(self, code: int, fields: Dict, params: Dict) -> str:
+        return self.messages[ACTION_NAMES[code]].format(**fields, **params)
+
+
+class GateRules:
+    """
+    Rule set loaded from a JSON file, reloaded when the file changes
+
+    A file that fails to parse or compile is logged and ignored; the
+    previous rule set stays active. Without any rule set, evaluation
+    raises and the gate blocks.
+    """
+
+    def __init__(self, rules_file: Optional[str] = None, check_interval_seconds: float = 5.0):
+        """
+        Args:
+            rules_file: JSON rules file (defaults to app/data/gate_rules.json)
+            check_interval_seconds: Minimum time between modification-time checks
+        """
+        self.rules_file = rules_file or DEFAULT_RULES_FILE
+        self.check_interval_seconds = check_interval_seconds
+        self.rules: Optional[List[GateRule]] = None
+        self.version: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._load()
+
+    def _load(self) -> bool:
+        """Parse and compile the rules file and swap it in; returns True on success"""
+        try:
+            mtime = os.stat(self.rules_file).st_mtime
+            with open(self.rules_file, 'rb') as f:
+                data = json.loads(f.read())
+            rules = [GateRule(spec) for spec in data['rules']]
+            ids = [rule.id for rule in rules]
+            if len(set(ids)) != len(ids):
+                raise ValueError("rule ids must be unique")
+        except Exception as e:
+            logger.error(f"Error loading gate rules {self.rules_file}: {e}")
+            return False
+
+        canonical = json.dumps(data['rules'], sort_keys=True, separators=(',', ':'))
+        self.rules = rules
+        self.version = hashlib.sha1(canonical.encode()).hexdigest()[:12]
+        self.loaded_at = time.time()
+        self._mtime = mtime
+        logger.info(f"Loaded {len(rules)} gate rules (version {self.version})")
+        return True
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload the rules if the file changed since the last load
+
+        Checks at most once per check_interval_seconds unless forced.
+
+        Returns:
+            True if a new rule set was loaded
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval_seconds:
+            return False
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.rules_file).st_mtime
+        except OSError as e:
+            logger.warning(f"Gate rules file unavailable: {e}")
+            return False
+        if not force and mtime == self._mtime:
+            return False
+
+        previous = self.version
+        if self._load() and self.version != previous:
+            logger.info(f"Gate rules reloaded: {previous} -> {self.version}")
+            return True
+        return False
+
+    def _active(self) -> List[GateRule]:
+        if self.rules is None:
+            raise RuntimeError(f"No gate rules loaded from {self.rules_file}")
+        return self.rules
+
+    def evaluate(
+        self,
+        fields: Dict,
+        params: Dict,
+        first_block: bool = False,
+        trace: bool = False
+    ) -> Tuple[List[str], List[str], Optional[List[Dict]]]:
+        """
+        Run the rules in order for one decision
+
+        Args:
+            fields: Decision inputs (FIELDS)
+            params: Gate parameters (PARAMS)
+            first_block: Stop at the first blocking rule
+            trace: Record every rule evaluated
+
+        Returns:
+            Tuple of (blocking reasons, warnings, trace or None)
+        """
+        blocking_reasons, warnings = [], []
+        steps = [] if trace else None
+        for rule in self._active():
+            code = rule.action(params)
+            fired = code != SKIP and rule.condition(fields, params)
+            message = rule.message(code, fields, params) if fired else None
+            if trace:
+                steps.append({
+                    'rule': rule.id,
+                    'action': ACTION_NAMES[code],
+                    'fired': fired,
+                    'message': message
+                })
+            if fired:
+                (blocking_reasons if code == BLOCK else warnings).append(message)
+                if first_block and code == BLOCK:
+                    break
+        return blocking_reasons, warnings, steps
+
+    def evaluate_series(self, fields: Dict, params: Dict, n: int) -> Dict:
+        """
+        Run the rules once over n decisions
+
+        Fields and params may each be scalars (shared by every row) or
+        arrays of length n, e.g. a backtest's per-bar scores against one
+        gate, or one snapshot against many gates' parameters. Rules that
+        apply to no row skip their condition.
+
+        Returns:
+            Dictionary with 'blocked' and 'warned' bool arrays and the
+            'fired' bool array of every rule
+        """
+        blocked = np.zeros(n, dtype=bool)
+        warned = np.zeros(n, dtype=bool)
+        fired = {}
+        for rule in self._active():
+            codes = rule.action_series(params, n)
+            applies = codes != SKIP
+            if not applies.any():
+                fired[rule.id] = np.zeros(n, dtype=bool)
+                continue
+            mask = applies & rule.condition_series(fields, params, n)
+            fired[rule.id] = mask
+            blocked |= mask & (codes == BLOCK)
+            warned |= mask & (codes == WARN)
+        return {'blocked': blocked, 'warned': warned, 'fired': fired}
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': self.version,
+            'rules_file': self.rules_file,
+            'loaded_at': self.loaded_at,
+            'rules': [rule.spec for rule in self.rules or []]
+        }
+
+
+# Global rule set
+gate_rules = GateRules(
+    rules_file=settings.gate_rules_file,
+    check_interval_seconds=settings.gate_rules_check_seconds
+)
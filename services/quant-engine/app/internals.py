@@ -0,0 +1,289 @@
+"""
+Index Internals Engine
+Rolling correlation, relative strength and lead/lag between an index and
+its benchmark peer (NIFTY vs BANKNIFTY), updated incrementally from the
+shared bar buffers. Every completed bar costs O(max_lag) work regardless
+of the window length, and the result feeds the internals component of the
+setup score.
+"""
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import logging
+import math
+
+from app.bar_buffer import BarBuffer, bar_buffer
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RollingCorrelation:
+    """
+    Pearson correlation over the last `window` (x, y) pairs
+
+    Keeps running sums so a push is O(1); the sums are rebuilt from the
+    window every `window` pushes to stop floating-point drift.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.pairs = deque()
+        self.sx = self.sy = self.sxx = self.syy = self.sxy = 0.0
+        self._pushes = 0
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def push(self, x: float, y: float) -> None:
+        if len(self.pairs) == self.window:
+            ox, oy = self.pairs.popleft()
+            self.sx -= ox
+            self.sy -= oy
+            self.sxx -= ox * ox
+            self.syy -= oy * oy
+            self.sxy -= ox * oy
+        self.pairs.append((x, y))
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.syy += y * y
+        self.sxy += x * y
+
+        self._pushes += 1
+        if self._pushes >= self.window:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._pushes = 0
+        self.sx = sum(x for x, _ in self.pairs)
+        self.sy = sum(y for _, y in self.pairs)
+        self.sxx = sum(x * x for x, _ in self.pairs)
+        self.syy = sum(y * y for _, y in self.pairs)
+        self.sxy = sum(x * y for x, y in self.pairs)
+
+    def value(self, min_pairs: int = 5) -> Optional[float]:
+        """Correlation, or None with too few pairs or a flat series"""
+        n = len(self.pairs)
+        if n < min_pairs:
+            return None
+        var_x = self.sxx - self.sx * self.sx / n
+        var_y = self.syy - self.sy * self.sy / n
+        if var_x <= 1e-18 or var_y <= 1e-18:
+            return None
+        cov = self.sxy - self.sx * self.sy / n
+        return max(-1.0, min(1.0, cov / math.sqrt(var_x * var_y)))
+
+
+class PairInternals:
+    """
+    Incremental internals for one (benchmark, peer) pair on one timeframe
+
+    Bar returns of both legs feed a lag-0 correlation, one correlation per
+    lag in each direction (benchmark leading / peer leading) and a rolling
+    return spread. State resets at each new session so overnight gaps do
+    not enter the statistics.
+    """
+
+    def __init__(
+        self,
+        benchmark: str,
+        peer: str,
+        window: int = 30,
+        max_lag: int = 3,
+        lead_margin: float = 0.05
+    ):
+        """
+        Args:
+            benchmark: First leg (e.g. NIFTY)
+            peer: Second leg (e.g. BANKNIFTY)
+            window: Bars in the rolling window
+            max_lag: Largest lead/lag tested, in bars
+            lead_margin: How much a lagged correlation must beat the
+                lag-0 correlation before one leg is called the leader
+        """
+        self.benchmark = benchmark
+        self.peer = peer
+        self.window = window
+        self.max_lag = max_lag
+        self.lead_margin = lead_margin
+        self.reset()
+
+    def reset(self) -> None:
+        self.last_time: Optional[datetime] = None
+        self._prev: Optional[Tuple[float, float]] = None
+        self.correlation = RollingCorrelation(self.window)
+        # benchmark_leads[k-1]: corr(benchmark return at t-k, peer return at t)
+        self.benchmark_leads = [RollingCorrelation(self.window) for _ in range(self.max_lag)]
+        self.peer_leads = [RollingCorrelation(self.window) for _ in range(self.max_lag)]
+        self._benchmark_returns = deque(maxlen=self.max_lag)
+        self._peer_returns = deque(maxlen=self.max_lag)
+        self._spreads = deque()
+        self._spread_sum = 0.0
+
+    def update(self, timestamp: datetime, benchmark_close: float, peer_close: float) -> bool:
+        """
+        Ingest one completed, time-aligned bar of both legs
+
+        Returns:
+            False if the bar is not newer than the last one ingested
+        """
+        if self.last_time is not None:
+            if timestamp <= self.last_time:
+                return False
+            if timestamp.date() != self.last_time.date():
+                self.reset()
+        self.last_time = timestamp
+
+        if self._prev is not None and self._prev[0] > 0 and self._prev[1] > 0:
+            rb = benchmark_close / self._prev[0] - 1
+            rp = peer_close / self._prev[1] - 1
+            self.correlation.push(rb, rp)
+            for k in range(1, len(self._benchmark_returns) + 1):
+                self.benchmark_leads[k - 1].push(self._benchmark_returns[-k], rp)
+                self.peer_leads[k - 1].push(self._peer_returns[-k], rb)
+            self._benchmark_returns.append(rb)
+            self._peer_returns.append(rp)
+
+            spread = rb - rp
+            self._spreads.append(spread)
+            self._spread_sum += spread
+            if len(self._spreads) > self.window:
+                self._spread_sum -= self._spreads.popleft()
+
+        self._prev = (benchmark_close, peer_close)
+        return True
+
+    def snapshot(self) -> Optional[Dict]:
+        """Current statistics (None until the correlation is defined)"""
+        correlation = self.correlation.value()
+        if correlation is None:
+            return None
+
+        leader, lag, lead_correlation = None, 0, correlation
+        for name, series in ((self.benchmark, self.benchmark_leads), (self.peer, self.peer_leads)):
+            for k, rolling in enumerate(series, start=1):
+                value = rolling.value()
+                if value is not None and value > lead_correlation and value - correlation >= self.lead_margin:
+                    leader, lag, lead_correlation = name, k, value
+
+        return {
+            'benchmark': self.benchmark,
+            'peer': self.peer,
+            'correlation': round(correlation, 4),
+            'spread_pct': round(self._spread_sum * 100, 4),  # Benchmark minus peer return over the window
+            'leader': leader,
+            'lead_lag_bars': lag,
+            'lead_correlation': round(lead_correlation, 4),
+            'bars': len(self.correlation),
+            'as_of': self.last_time.isoformat() if self.last_time else None
+        }
+
+
+class IndexInternalsEngine:
+    """
+    Internals for every scored symbol, kept in sync with the bar buffers
+
+    Each symbol is paired with the benchmark index (the benchmark itself
+    is paired with `benchmark_peer`).
+    """
+
+    def __init__(
+        self,
+        benchmark: str = "NIFTY",
+        benchmark_peer: str = "BANKNIFTY",
+        window: int = 30,
+        max_lag: int = 3,
+        buffer: Optional[BarBuffer] = None
+    ):
+        self.benchmark = benchmark
+        self.benchmark_peer = benchmark_peer
+        self.window = window
+        self.max_lag = max_lag
+        self.buffer = buffer or bar_buffer
+        self.pairs: Dict[Tuple[str, str, str], PairInternals] = {}
+
+    def peer_of(self, symbol: str) -> str:
+        """The other leg of a symbol's pair"""
+        return self.benchmark_peer if symbol == self.benchmark else self.benchmark
+
+    def _pair(self, symbol: str, timeframe: str) -> PairInternals:
+        peer = symbol if symbol != self.benchmark else self.benchmark_peer
+        key = (self.benchmark, peer, timeframe)
+        if key not in self.pairs:
+            self.pairs[key] = PairInternals(self.benchmark, peer, self.window, self.max_lag)
+        return self.pairs[key]
+
+    def sync(self, symbol: str, timeframe: str) -> int:
+        """
+        Ingest completed bars buffered since the last sync
+
+        Bars are aligned on their open time; the newest bar of either leg
+        may still be forming and is left for the next sync.
+
+        Returns:
+            Number of bars ingested
+        """
+        pair = self._pair(symbol, timeframe)
+        first = self.buffer.get(pair.benchmark, timeframe)
+        second = self.buffer.get(pair.peer, timeframe)
+        if first is None or second is None or len(first) < 2 or len(second) < 2:
+            return 0
+
+        cutoff = min(first.index[-1], second.index[-1])
+        if pair.last_time is not None:
+            first = first.iloc[first.index.searchsorted(pair.last_time, side='right'):]
+            second = second.iloc[second.index.searchsorted(pair.last_time, side='right'):]
+        closes = first['close'].to_frame('benchmark').join(second['close'].rename('peer'), how='inner')
+        closes = closes[closes.index < cutoff]
+
+        ingested = 0
+        for timestamp, benchmark_close, peer_close in closes.itertuples():
+            ingested += pair.update(timestamp.to_pydatetime(), float(benchmark_close), float(peer_close))
+        return ingested
+
+    def snapshot(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        """
+        Internals from the symbol's point of view
+
+        Returns:
+            Dict with peer, correlation, relative_strength_pct (symbol minus
+            peer return over the window), leadership ('leading', 'lagging'
+            or 'in_sync') and lead_lag_bars, or None if not yet available
+        """
+        pair = self._pair(symbol, timeframe)
+        stats = pair.snapshot()
+        if stats is None:
+            return None
+
+        sign = 1 if symbol == pair.benchmark else -1
+        if stats['leader'] is None:
+            leadership = 'in_sync'
+        else:
+            leadership = 'leading' if stats['leader'] == symbol else 'lagging'
+
+        return {
+            'peer': pair.peer if symbol == pair.benchmark else pair.benchmark,
+            'correlation': stats['correlation'],
+            'relative_strength_pct': round(sign * stats['spread_pct'], 4),
+            'leadership': leadership,
+            'lead_lag_bars': stats['lead_lag_bars'],
+            'lead_correlation': stats['lead_correlation'],
+            'bars': stats['bars'],
+            'as_of': stats['as_of']
+        }
+
+    def get_status(self) -> Dict:
+        return {
+            f"{benchmark}/{peer}:{timeframe}": pair.snapshot()
+            for (benchmark, peer, timeframe), pair in self.pairs.items()
+        }
+
+
+# Global internals engine
+index_internals = IndexInternalsEngine(
+    benchmark=settings.internals_benchmark,
+    benchmark_peer=settings.internals_benchmark_peer,
+    window=settings.internals_window_bars,
+    max_lag=settings.internals_max_lag_bars
+)
@@ -0,0 +1,204 @@
+"""
+Scheduler Job Telemetry
+Per-cycle metrics for scheduled scoring: duration, per-stage breakdown,
+skipped/coalesced runs, lag behind the bar close and load shedding.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# The cycle being recorded in the current task (None for API-driven calls)
+_current_cycle: ContextVar[Optional['CycleMetrics']] = ContextVar('current_cycle', default=None)
+
+
+class CycleMetrics:
+    """Metrics for one scheduled scoring cycle"""
+
+    def __init__(self, budget_seconds: float):
+        self.started_at = datetime.utcnow()
+        self.budget_seconds = budget_seconds
+        self._start = time.perf_counter()
+        self.duration_seconds: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.evaluated: List[str] = []
+        self.failed: List[str] = []
+        self.shed: List[str] = []
+        self.suppressed: List[str] = []
+        self.max_bar_lag_seconds: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    @property
+    def over_budget(self) -> bool:
+        return self.elapsed > self.budget_seconds
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def record_bar_close(self, bar_close: datetime) -> None:
+        """Track how far behind the latest bar close this cycle is running"""
+        lag = (datetime.utcnow() - bar_close).total_seconds()
+        if self.max_bar_lag_seconds is None or lag > self.max_bar_lag_seconds:
+            self.max_bar_lag_seconds = lag
+
+    def finish(self) -> None:
+        self.duration_seconds = self.elapsed
+
+    def to_dict(self) -> Dict:
+        return {
+            'started_at': self.started_at.isoformat(),
+            'duration_seconds': round(self.duration_seconds or self.elapsed, 3),
+            'budget_seconds': self.budget_seconds,
+            'over_budget': (self.duration_seconds or self.elapsed) > self.budget_seconds,
+            'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            'evaluated': self.evaluated,
+            'failed': self.failed,
+            'shed': self.shed,
+            'suppressed': self.suppressed,
+            'bar_lag_seconds': round(self.max_bar_lag_seconds, 1) if self.max_bar_lag_seconds is not None else None
+        }
+
+
+class SchedulerTelemetry:
+    """
+    Scheduler telemetry and overrun bookkeeping
+
+    Keeps the last `history` cycles plus running counters. A cycle that
+    runs past its budget sheds low-priority timeframes for its remainder,
+    and the next cycle keeps shedding until the projected full-cycle
+    duration fits the budget again.
+    """
+
+    def __init__(self, budget_seconds: float = 60.0, history: int = 50):
+        """
+        Args:
+            budget_seconds: Target maximum duration of one cycle
+            history: Number of recent cycles kept for inspection
+        """
+        self.budget_seconds = budget_seconds
+        self.cycles = deque(maxlen=history)
+        self.total_cycles = 0
+        self.overruns = 0
+        self.skipped_runs = 0
+        self.coalesced_runs = 0
+        self.missed_runs = 0
+        self.last_run_time: Optional[datetime] = None  # Last fire time submitted or skipped
+        self.shed_evaluations = 0
+        self.shedding = False
+
+    @contextmanager
+    def cycle(self):
+        """Record one scheduled cycle; stages inside it are attributed to it"""
+        metrics = CycleMetrics(self.budget_seconds)
+        token = _current_cycle.set(metrics)
+        try:
+            yield metrics
+        finally:
+            _current_cycle.reset(token)
+            metrics.finish()
+            self._close_cycle(metrics)
+
+    def _close_cycle(self, metrics: CycleMetrics) -> None:
+        self.total_cycles += 1
+        self.shed_evaluations += len(metrics.shed)
+        if metrics.duration_seconds > self.budget_seconds:
+            self.overruns += 1
+            logger.warning(
+                f"Scoring cycle overran budget: {metrics.duration_seconds:.1f}s "
+                f"> {self.budget_seconds:.1f}s (shed {len(metrics.shed)})"
+            )
+
+        # Project what a full cycle would cost before restoring shed work
+        done = len(metrics.evaluated) + len(metrics.failed)
+        total = done + len(metrics.shed)
+        projected = metrics.duration_seconds * total / done if done else metrics.duration_seconds
+        self.shedding = projected > self.budget_seconds
+        self.cycles.append(metrics)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage of the current cycle (no-op outside a cycle)"""
+        metrics = _current_cycle.get()
+        if metrics is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.add_stage(name, time.perf_counter() - start)
+
+    def record_bar_close(self, bar_close: datetime) -> None:
+        """Report the close time of the bar being evaluated"""
+        metrics = _current_cycle.get()
+        if metrics is not None:
+            metrics.record_bar_close(bar_close)
+
+    def record_skipped(self) -> None:
+        """A run was dropped because the previous cycle was still running"""
+        self.skipped_runs += 1
+        logger.warning("Scoring cycle still running - skipping overlapping run")
+
+    def record_coalesced(self, count: int) -> None:
+        """Missed run times that were merged into a single run"""
+        self.coalesced_runs += count
+
+    def record_run_time(self, run_time: datetime, trigger) -> None:
+        """
+        Account a fire time the scheduler submitted or skipped
+
+        With coalescing the scheduler only reports the latest due fire time,
+        so the trigger's fire times between the previous one and this one
+        are counted here as coalesced.
+
+        Args:
+            run_time: Scheduled fire time of the run
+            trigger: The job's APScheduler trigger
+        """
+        previous, self.last_run_time = self.last_run_time, run_time
+        if previous is None or run_time <= previous:
+            return
+        count = 0
+        fire_time = trigger.get_next_fire_time(previous, previous)
+        while fire_time is not None and fire_time < run_time:
+            count += 1
+            fire_time = trigger.get_next_fire_time(fire_time, fire_time)
+        if count:
+            self.record_coalesced(count)
+            logger.warning(f"Coalesced {count} missed scoring run(s) into the run at {run_time}")
+
+    def record_missed(self) -> None:
+        """A run time was missed beyond the misfire grace period"""
+        self.missed_runs += 1
+
+    def get_metrics(self) -> Dict:
+        """Summary counters and recent cycle details"""
+        durations = [c.duration_seconds for c in self.cycles]
+        return {
+            'budget_seconds': self.budget_seconds,
+            'total_cycles': self.total_cycles,
+            'overruns': self.overruns,
+            'skipped_runs': self.skipped_runs,
+            'coalesced_runs': self.coalesced_runs,
+            'missed_runs': self.missed_runs,
+            'shed_evaluations': self.shed_evaluations,
+            'shedding': self.shedding,
+            'avg_duration_seconds': round(sum(durations) / len(durations), 3) if durations else None,
+            'max_duration_seconds': round(max(durations), 3) if durations else None,
+            'last_cycle': self.cycles[-1].to_dict() if self.cycles else None,
+            'recent_cycles': [c.to_dict() for c in list(self.cycles)[-10:]]
+        }
+
+
+# Global scheduler telemetry instance
+scheduler_telemetry = SchedulerTelemetry(budget_seconds=settings.scoring_cycle_budget_seconds)
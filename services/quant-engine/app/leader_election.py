@@ -0,0 +1,147 @@
+"""
+Leader election for scheduled jobs
+Ensures only one uvicorn/gunicorn worker per deployment runs the scheduler
+jobs, using a TTL lease document in MongoDB. Other workers serve reads only.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import logging
+import os
+import socket
+import uuid
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    """
+    Mongo lease based leader election
+
+    The leader renews `scheduler_leases/{lease_name}` every renew interval.
+    If it dies, the lease expires after `lease_seconds` and the next worker
+    to campaign takes over, so failover is bounded by
+    lease_seconds + renew_seconds.
+    """
+
+    def __init__(
+        self,
+        lease_name: str,
+        lease_seconds: int = 15,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            lease_name: Lease document id shared by all workers of a deployment
+            lease_seconds: Lease validity without renewal
+            enabled: When False this worker always acts as leader
+        """
+        self.lease_name = lease_name
+        self.lease_seconds = lease_seconds
+        self.enabled = enabled
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_expires_at: Optional[datetime] = None
+        self._indexes_ready = False
+
+    @property
+    def renew_seconds(self) -> int:
+        """How often to campaign/renew (a third of the lease)"""
+        return max(1, self.lease_seconds // 3)
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this worker currently holds a valid lease"""
+        if not self.enabled:
+            return True
+        # Stop acting as leader as soon as our own view of the lease lapses,
+        # even if renewals are failing because Mongo is unreachable
+        return self.lease_expires_at is not None and self.lease_expires_at > datetime.utcnow()
+
+    async def campaign(self, db) -> bool:
+        """
+        Acquire or renew the lease
+
+        Args:
+            db: Motor database handle
+
+        Returns:
+            True if this worker is the leader after the attempt
+        """
+        if not self.enabled:
+            return True
+
+        was_leader = self.is_leader
+        try:
+            if not self._indexes_ready:
+                await db.scheduler_leases.create_index('expires_at', expireAfterSeconds=0)
+                self._indexes_ready = True
+
+            now = datetime.utcnow()
+            expires_at = now + timedelta(seconds=self.lease_seconds)
+
+            doc = await db.scheduler_leases.find_one_and_update(
+                {
+                    '_id': self.lease_name,
+                    '$or': [
+                        {'holder': self.worker_id},
+                        {'expires_at': {'$lte': now}}
+                    ]
+                },
+                {
+                    '$set': {'holder': self.worker_id, 'expires_at': expires_at, 'renewed_at': now}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is not None and doc.get('holder') == self.worker_id:
+                self.lease_expires_at = expires_at
+            else:
+                self.lease_expires_at = None
+
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            self.lease_expires_at = None
+        except Exception as e:
+            logger.error(f"Leader election failed for {self.worker_id}: {e}")
+
+        if self.is_leader and not was_leader:
+            logger.info(f"Worker {self.worker_id} became scheduler leader")
+        elif was_leader and not self.is_leader:
+            logger.warning(f"Worker {self.worker_id} lost scheduler leadership")
+        return self.is_leader
+
+    async def resign(self, db) -> None:
+        """Release the lease so another worker can take over immediately"""
+        if not self.enabled or db is None or self.lease_expires_at is None:
+            return
+        try:
+            await db.scheduler_leases.delete_one(
+                {'_id': self.lease_name, 'holder': self.worker_id}
+            )
+            self.lease_expires_at = None
+            logger.info(f"Worker {self.worker_id} resigned scheduler leadership")
+        except Exception as e:
+            logger.error(f"Error resigning leadership: {e}")
+
+    def get_status(self) -> Dict:
+        """Leadership state for diagnostics"""
+        return {
+            'lease_name': self.lease_name,
+            'worker_id': self.worker_id,
+            'enabled': self.enabled,
+            'is_leader': self.is_leader,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'lease_seconds': self.lease_seconds
+        }
+
+
+# Global leader elector (one lease per deployment / replica)
+leader_elector = LeaderElector(
+    lease_name=f"scheduler:{settings.replica_id or socket.gethostname()}",
+    lease_seconds=settings.leader_lease_seconds,
+    enabled=settings.leader_election_enabled
+)
@@ -0,0 +1,403 @@
+"""
+Support/Resistance Level Index
+Swing pivots, prior-day high/low/close, opening range and volume-profile
+levels per symbol, kept in a price-sorted index so the nearest level above
+or below a price is a bisect (O(log n)). Bars are ingested one at a time;
+levels found during a session persist until the session ends, and levels
+closer than the merge tolerance are folded into one that remembers every
+source that produced it.
+"""
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from app.config import settings
+from app.market_calendar import IST, market_calendar
+from app.range_index import STRUCTURE_WINDOW, RangeIndex, range_index_for
+
+logger = logging.getLogger(__name__)
+
+PRIOR_DAY_KINDS = ('prior_day_high', 'prior_day_low', 'prior_day_close')
+OPENING_RANGE_KINDS = ('opening_range_high', 'opening_range_low')
+PROFILE_KINDS = ('poc', 'vah', 'val')
+SWING_KINDS = ('swing_high', 'swing_low')
+SESSION_KINDS = SWING_KINDS + OPENING_RANGE_KINDS + PROFILE_KINDS
+
+
+class LevelIndex:
+    """
+    Price-sorted support/resistance levels
+
+    `prices` and `levels` are parallel lists ordered by price. A new level
+    within `tolerance` of an existing one is merged into it (the existing
+    price is kept, the new source is added to its kinds).
+    """
+
+    def __init__(self, tolerance: float = 1.0):
+        """
+        Args:
+            tolerance: Levels closer than this (in points) are merged
+        """
+        self.tolerance = tolerance
+        self.prices: List[float] = []
+        self.levels: List[Dict] = []
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def add(self, price: float, kind: str, timestamp: Optional[datetime] = None) -> Dict:
+        """
+        Insert a level, or merge it into the nearest one within tolerance
+
+        Returns:
+            The level dict that now holds the source
+        """
+        price = float(price)
+        i = bisect_left(self.prices, price)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(self.prices)]
+        nearest = min(candidates, key=lambda j: abs(self.prices[j] - price), default=None)
+
+        if nearest is not None and abs(self.prices[nearest] - price) <= self.tolerance:
+            level = self.levels[nearest]
+            level['kinds'].add(kind)
+            level['touches'] += 1
+            if timestamp is not None:
+                level['last_seen'] = timestamp
+            return level
+
+        level = {'price': price, 'kinds': {kind}, 'touches': 1, 'first_seen': timestamp, 'last_seen': timestamp}
+        self.prices.insert(i, price)
+        self.levels.insert(i, level)
+        return level
+
+    def discard(self, kinds: Iterable[str]) -> None:
+        """Remove the given sources; levels left without a source are dropped"""
+        kinds = set(kinds)
+        kept_prices, kept_levels = [], []
+        for price, level in zip(self.prices, self.levels):
+            level['kinds'] -= kinds
+            if level['kinds']:
+                kept_prices.append(price)
+                kept_levels.append(level)
+        self.prices, self.levels = kept_prices, kept_levels
+
+    def above(self, price: float) -> Optional[Dict]:
+        """Nearest level at or above the price"""
+        i = bisect_left(self.prices, price)
+        return self.levels[i] if i < len(self.prices) else None
+
+    def below(self, price: float) -> Optional[Dict]:
+        """Nearest level at or below the price"""
+        i = bisect_right(self.prices, price)
+        return self.levels[i - 1] if i > 0 else None
+
+    def to_list(self) -> List[Dict]:
+        return [
+            {
+                'price': round(level['price'], 2),
+                'kinds': sorted(level['kinds']),
+                'touches': level['touches'],
+                'first_seen': level['first_seen'].isoformat() if level['first_seen'] else None,
+                'last_seen': level['last_seen'].isoformat() if level['last_seen'] else None
+            }
+            for level in self.levels
+        ]
+
+
+def sr_bounds(
+    price: float,
+    high_history: List[float],
+    low_history: List[float],
+    levels: Optional[LevelIndex] = None,
+    ranges: Optional[RangeIndex] = None,
+    window: int = STRUCTURE_WINDOW
+) -> Tuple[float, float, Optional[Dict], Optional[Dict]]:
+    """
+    Resistance and support around a price
+
+    The nearest indexed level on each side is used; a side without a level
+    (price beyond every known level) falls back to the `window`-bar high/low
+    from the range index (built from the histories if not given).
+
+    Returns:
+        Tuple of (resistance, support, resistance level, support level)
+    """
+    above = levels.above(price) if levels is not None else None
+    below = levels.below(price) if levels is not None else None
+    if above is None or below is None:
+        ranges = range_index_for(high_history, low_history, ranges)
+    resistance = above['price'] if above else ranges.high(window)
+    support = below['price'] if below else ranges.low(window)
+    return resistance, support, above, below
+
+
+class SessionLevels:
+    """
+    Incremental level detection for one symbol/timeframe
+
+    Swing pivots are fractal highs/lows confirmed `pivot_bars` bars later;
+    the opening range is the high/low of the first `opening_range_minutes`
+    after the calendar session open, and is skipped when the session's
+    first bar came after the open (e.g. after a mid-session restart). When
+    a new session starts, the finished session's high/low/close become the
+    prior-day levels and the session levels are cleared.
+    """
+
+    def __init__(
+        self,
+        tick_size: float = 0.05,
+        merge_ticks: int = 20,
+        pivot_bars: int = 2,
+        opening_range_minutes: int = 15,
+        bar_timezone=IST
+    ):
+        """
+        Args:
+            tick_size: Price tick of the instrument
+            merge_ticks: Levels within this many ticks are merged
+            pivot_bars: Bars on each side of a swing pivot
+            opening_range_minutes: Length of the opening range
+            bar_timezone: Zone of the naive bar timestamps (for the session open)
+        """
+        self.index = LevelIndex(tick_size * merge_ticks)
+        self.pivot_bars = pivot_bars
+        self.opening_range_minutes = opening_range_minutes
+        self.bar_timezone = bar_timezone
+        self.last_time: Optional[datetime] = None
+        self.session_day: Optional[date] = None
+        self.prior_day: Optional[Dict] = None
+        self._start_session(None)
+
+    def _start_session(self, day: Optional[date]) -> None:
+        self.session_day = day
+        self.session_high = self.session_low = self.session_close = None
+        self.session_start: Optional[datetime] = None
+        self.opening_range: Optional[List[float]] = None  # [high, low] while forming
+        self.opening_range_done = False
+        self.opening_range_seen = False  # The session's bars start at the open
+        self.pivot_window = deque(maxlen=2 * self.pivot_bars + 1)  # (timestamp, high, low)
+        self.index.discard(SESSION_KINDS)
+
+    def push(self, timestamp: datetime, high: float, low: float, close: float) -> bool:
+        """
+        Ingest one completed bar (timestamp is the bar open time)
+
+        Returns:
+            False if the bar is not newer than the last one ingested
+        """
+        if self.last_time is not None and timestamp <= self.last_time:
+            return False
+        high, low, close = float(high), float(low), float(close)
+
+        day = timestamp.date()
+        if day != self.session_day:
+            if self.session_close is not None:
+                self.set_prior_day(self.session_high, self.session_low, self.session_close, self.session_day)
+            self._start_session(day)
+        self.last_time = timestamp
+
+        self.session_high = high if self.session_high is None else max(self.session_high, high)
+        self.session_low = low if self.session_low is None else min(self.session_low, low)
+        self.session_close = close
+
+        # Opening range: bars opening within the first N minutes after the
+        # session open (the first bar when the calendar has no session)
+        if self.session_start is None:
+            self.session_start = market_calendar.session_open(day, self.bar_timezone) or timestamp
+            self.opening_range_seen = timestamp <= self.session_start
+        if not self.opening_range_done:
+            elapsed = (timestamp - self.session_start).total_seconds() / 60
+            if elapsed < self.opening_range_minutes:
+                if self.opening_range is None:
+                    self.opening_range = [high, low]
+                else:
+                    self.opening_range = [max(self.opening_range[0], high), min(self.opening_range[1], low)]
+            else:
+                self.opening_range_done = True
+                if self.opening_range_seen and self.opening_range is not None:
+                    self.index.add(self.opening_range[0], 'opening_range_high', self.session_start)
+                    self.index.add(self.opening_range[1], 'opening_range_low', self.session_start)
+
+        # Swing pivots: the middle bar of the window against its neighbours
+        self.pivot_window.append((timestamp, high, low))
+        if len(self.pivot_window) == self.pivot_window.maxlen:
+            bars = list(self.pivot_window)
+            k = self.pivot_bars
+            pivot_time, pivot_high, pivot_low = bars[k]
+            left, right = bars[:k], bars[k + 1:]
+            if pivot_high > max(b[1] for b in left) and pivot_high >= max(b[1] for b in right):
+                self.index.add(pivot_high, 'swing_high', pivot_time)
+            if pivot_low < min(b[2] for b in left) and pivot_low <= min(b[2] for b in right):
+                self.index.add(pivot_low, 'swing_low', pivot_time)
+        return True
+
+    def set_prior_day(self, high: float, low: float, close: float, day: Optional[date] = None) -> None:
+        """Replace the prior-day high/low/close levels"""
+        self.index.discard(PRIOR_DAY_KINDS)
+        for kind, price in zip(PRIOR_DAY_KINDS, (high, low, close)):
+            self.index.add(price, kind)
+        self.prior_day = {'date': day, 'high': float(high), 'low': float(low), 'close': float(close)}
+
+    def set_profile(self, profile: Optional[Dict]) -> None:
+        """Replace the volume-profile levels (POC, VAH, VAL) with a fresh profile"""
+        if not profile or profile.get('poc') is None:
+            return
+        self.index.discard(PROFILE_KINDS)
+        for kind in PROFILE_KINDS:
+            if profile.get(kind) is not None:
+                self.index.add(profile[kind], kind, self.last_time)
+
+    def snapshot(self, price: Optional[float] = None) -> Dict:
+        above = self.index.above(price) if price is not None else None
+        below = self.index.below(price) if price is not None else None
+        return {
+            'session': self.session_day.isoformat() if self.session_day else None,
+            'last_bar': self.last_time.isoformat() if self.last_time else None,
+            'prior_day': (
+                {**self.prior_day, 'date': self.prior_day['date'].isoformat() if self.prior_day['date'] else None}
+                if self.prior_day else None
+            ),
+            'price': price,
+            'resistance': round(above['price'], 2) if above else None,
+            'support': round(below['price'], 2) if below else None,
+            'levels': self.index.to_list()
+        }
+
+
+def level_bounds_series(
+    bars: pd.DataFrame,
+    window: int = STRUCTURE_WINDOW,
+    state: Optional[SessionLevels] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resistance/support after every bar of a series (see sr_bounds)
+
+    Args:
+        bars: DataFrame indexed by bar open time with high/low/close
+        window: Bars in the fallback high/low window
+        state: Levels carried over from earlier sessions (a fresh state
+            is used if omitted); the bars are pushed into it
+
+    Returns:
+        Tuple of (resistance, support) arrays
+    """
+    state = state if state is not None else SessionLevels()
+    high = bars['high'].astype(float).to_numpy()
+    low = bars['low'].astype(float).to_numpy()
+    close = bars['close'].astype(float).to_numpy()
+    resistance = np.empty(len(bars))
+    support = np.empty(len(bars))
+
+    window_high = pd.Series(high).rolling(window, min_periods=1).max().to_numpy()
+    window_low = pd.Series(low).rolling(window, min_periods=1).min().to_numpy()
+    for i, timestamp in enumerate(bars.index):
+        state.push(timestamp.to_pydatetime(), high[i], low[i], close[i])
+        above, below = state.index.above(close[i]), state.index.below(close[i])
+        resistance[i] = above['price'] if above else window_high[i]
+        support[i] = below['price'] if below else window_low[i]
+    return resistance, support
+
+
+class LevelEngine:
+    """Session levels for every symbol/timeframe, fed from the fetched bars"""
+
+    def __init__(
+        self,
+        tick_size: float = 0.05,
+        merge_ticks: int = 20,
+        pivot_bars: int = 2,
+        opening_range_minutes: int = 15,
+        bar_timezone=IST
+    ):
+        self.level_kwargs = dict(
+            tick_size=tick_size,
+            merge_ticks=merge_ticks,
+            pivot_bars=pivot_bars,
+            opening_range_minutes=opening_range_minutes,
+            bar_timezone=bar_timezone
+        )
+        self.states: Dict[Tuple[str, str], SessionLevels] = {}
+        self._prior_day_requested: Dict[Tuple[str, str], date] = {}
+
+    def state(self, symbol: str, timeframe: str) -> SessionLevels:
+        key = (symbol, timeframe)
+        if key not in self.states:
+            self.states[key] = SessionLevels(**self.level_kwargs)
+        return self.states[key]
+
+    def update(self, symbol: str, timeframe: str, bars: pd.DataFrame) -> LevelIndex:
+        """
+        Ingest the completed bars of a freshly fetched frame
+
+        The last row may still be forming and is left for the next update.
+        """
+        state = self.state(symbol, timeframe)
+        try:
+            completed = bars.iloc[:-1]
+            if state.last_time is not None:
+                completed = completed[completed.index > state.last_time]
+            for timestamp, high, low, close in zip(
+                completed.index, completed['high'], completed['low'], completed['close']
+            ):
+                state.push(timestamp.to_pydatetime(), high, low, close)
+        except Exception as e:
+            logger.error(f"Error updating levels for {symbol} {timeframe}: {e}")
+        return state.index
+
+    def index(self, symbol: str, timeframe: str) -> Optional[LevelIndex]:
+        state = self.states.get((symbol, timeframe))
+        return state.index if state is not None else None
+
+    def needs_prior_day(self, symbol: str, timeframe: str) -> Optional[date]:
+        """
+        Session date whose prior-day levels are missing (asked once per session)
+
+        Returns:
+            The current session date, or None if nothing is needed
+        """
+        key = (symbol, timeframe)
+        state = self.states.get(key)
+        if state is None or state.session_day is None:
+            return None
+        if state.prior_day is not None or self._prior_day_requested.get(key) == state.session_day:
+            return None
+        self._prior_day_requested[key] = state.session_day
+        return state.session_day
+
+    def set_prior_day(
+        self, symbol: str, timeframe: str, high: float, low: float, close: float, day: Optional[date] = None
+    ) -> None:
+        self.state(symbol, timeframe).set_prior_day(high, low, close, day)
+
+    def set_profile(self, symbol: str, timeframe: str, profile: Optional[Dict]) -> None:
+        self.state(symbol, timeframe).set_profile(profile)
+
+    def snapshot(self, symbol: str, timeframe: str, price: Optional[float] = None) -> Optional[Dict]:
+        state = self.states.get((symbol, timeframe))
+        return state.snapshot(price) if state is not None else None
+
+    def get_status(self) -> Dict:
+        return {
+            f"{symbol}:{timeframe}": {
+                'levels': len(state.index),
+                'session': state.session_day.isoformat() if state.session_day else None,
+                'last_bar': state.last_time.isoformat() if state.last_time else None
+            }
+            for (symbol, timeframe), state in self.states.items()
+        }
+
+
+# Global level engine (fed from snapshots, stamped in naive UTC)
+level_engine = LevelEngine(
+    tick_size=settings.levels_tick_size,
+    merge_ticks=settings.levels_merge_ticks,
+    pivot_bars=settings.levels_pivot_bars,
+    opening_range_minutes=settings.levels_opening_range_minutes,
+    bar_timezone=pytz.utc
+)
@@ -1,23 +1,42 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import datetime
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from datetime import date, datetime
+from typing import Dict, Literal, Optional
 import logging
+import time
 
 from app.service import indicator_service
 from app.models import (
     ScoreRequest, ScoreResponse, ScoreHistoryResponse, ScoreComponents,
     NoTradeScoreResponse, NoTradeComponents, VolumeProfileData, FakeBreakoutData,
-    EnhancedEvaluationResponse, RiskModeRequest, TradeDecisionResponse
+    EnhancedEvaluationResponse, RiskModeRequest, TradeDecisionResponse,
+    ReplayPoint, ScoreReplayResponse
 )
 from app.no_trade_scoring import NoTradeScorer
 from app.volume_profile import VolumeProfileCalculator, FakeBreakoutDetector
-from app.trading_gate import get_trading_gate, set_global_risk_mode
-from app.no_trade_scoring import NoTradeScorer
-from app.volume_profile import VolumeProfileCalculator, FakeBreakoutDetector
-from app.trading_gate import get_trading_gate, set_global_risk_mode, RiskMode
+from app.trading_gate import get_trading_gate, gate_profiles, RiskMode
+from app.gate_rules import gate_rules
 from app.socket_service import broadcast_setup_score_update, get_connected_clients_count
+from app.sharding import shard_coordinator
+from app.leader_election import leader_elector
+from app.market_calendar import market_calendar, IST
+from app.replay import score_replayer
+from app.scoring_rules import scoring_rules
+from app.internals import index_internals
+from app.breadth import breadth_engine
+from app.futures_oi import futures_oi_engine
+from app.time_risk import time_risk_table
+from app.levels import level_engine
+from app.range_index import range_engine
+from app.session_profile import session_profile_engine
+from app.tpo_profile import tpo_engine
+from app.bar_buffer import bar_buffer
+from app.job_telemetry import scheduler_telemetry
+from app.emit_suppression import emit_suppressor
+from app.config import settings
 
 # Configure logging
 logging.basicConfig(
@@ -31,37 +50,100 @@ scheduler = AsyncIOScheduler()
 
 async def scheduled_score_calculation():
     """
-    Scheduled task to calculate scores for NIFTY and BANKNIFTY every 3 minutes
+    Scheduled task to calculate scores every evaluation interval for the
+    symbols owned by this replica. Timeframes are evaluated in priority
+    order; low-priority ones are shed when the cycle runs over budget.
     """
+    if not leader_elector.is_leader:
+        return
+    
+    # No evaluation outside sessions (pre-open warm-up included)
+    if not market_calendar.is_active():
+        logger.debug("Market closed - skipping scheduled score calculation")
+        return
+    
     logger.info("Running scheduled score calculation...")
     
-    symbols = ["NIFTY", "BANKNIFTY"]
-    timeframes = ["5m", "15m"]
+    symbols = [symbol for symbol in settings.symbols if shard_coordinator.owns(symbol)]
+    timeframes = settings.timeframes
     
-    for symbol in symbols:
-        for timeframe in timeframes:
-            try:
-                result = await indicator_service.calculate_score_for_symbol(
-                    symbol=symbol,
-                    timeframe=timeframe
-                )
-                if result:
-                    logger.info(
-                        f"✓ {symbol} ({timeframe}): Score={result['setup_score']:.2f}, "
-                        f"Bias={result['market_bias']}"
-                    )
-                    # Broadcast real-time update
-                    await broadcast_setup_score_update(
+    if not symbols:
+        logger.info("No symbols owned by this replica - skipping")
+        return
+    
+    with scheduler_telemetry.cycle() as cycle:
+        shedding = scheduler_telemetry.shedding
+        for priority, timeframe in enumerate(timeframes):
+            for symbol in symbols:
+                key = f"{symbol}:{timeframe}"
+                
+                # The highest-priority timeframe is never shed
+                if priority > 0 and (shedding or cycle.over_budget):
+                    cycle.shed.append(key)
+                    continue
+                
+                try:
+                    result = await indicator_service.calculate_score_for_symbol(
                         symbol=symbol,
-                        timeframe=timeframe,
-                        score=result['setup_score'],
-                        components=result.get('components', {}),
-                        bias=result['market_bias']
+                        timeframe=timeframe
                     )
-                else:
-                    logger.warning(f"✗ Failed to calculate score for {symbol} ({timeframe})")
-            except Exception as e:
-                logger.error(f"Error in scheduled scoring for {symbol} ({timeframe}): {e}")
+                    if result:
+                        cycle.evaluated.append(key)
+                        logger.info(
+                            f"✓ {symbol} ({timeframe}): Score={result['setup_score']:.2f}, "
+                            f"Bias={result['market_bias']}"
+                        )
+                        # Broadcast real-time update (unchanged scores are not re-sent)
+                        if result.get('emitted', True):
+                            with scheduler_telemetry.stage('broadcast'):
+                                await broadcast_setup_score_update(
+                                    symbol=symbol,
+                                    timeframe=timeframe,
+                                    score=result['setup_score'],
+                                    components=indicator_service.shape_score_components(result, 'lean'),
+                                    bias=result['market_bias']
+                                )
+                        else:
+                            cycle.suppressed.append(key)
+                    else:
+                        cycle.failed.append(key)
+                        logger.warning(f"✗ Failed to calculate score for {symbol} ({timeframe})")
+                except Exception as e:
+                    cycle.failed.append(key)
+                    logger.error(f"Error in scheduled scoring for {symbol} ({timeframe}): {e}")
+        
+        if cycle.shed:
+            logger.warning(f"Shed low-priority evaluations: {cycle.shed}")
+
+def on_scheduler_event(event):
+    """Feed APScheduler overrun/misfire events and run times into telemetry"""
+    if event.job_id != 'score_calculation':
+        return
+    if event.code == EVENT_JOB_MISSED:
+        scheduler_telemetry.record_missed()
+        return
+    if event.code == EVENT_JOB_MAX_INSTANCES:
+        scheduler_telemetry.record_skipped()
+    # Coalescing leaves only the latest due fire time in the event; the
+    # skipped fire times before it are counted from the trigger
+    job = scheduler.get_job(event.job_id)
+    if job is not None:
+        scheduler_telemetry.record_run_time(event.scheduled_run_times[-1], job.trigger)
+
+async def scheduled_leader_election():
+    """
+    Campaign for / renew the scheduler lease. A worker that just became
+    leader joins the shard ring straight away instead of waiting a heartbeat.
+    """
+    was_leader = leader_elector.is_leader
+    is_leader = await leader_elector.campaign(indicator_service.db)
+    if is_leader and not was_leader and shard_coordinator.enabled:
+        await shard_coordinator.heartbeat(indicator_service.db)
+
+async def scheduled_shard_heartbeat():
+    """Shard membership heartbeat - only the leader worker joins the ring"""
+    if leader_elector.is_leader:
+        await shard_coordinator.heartbeat(indicator_service.db)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -71,22 +153,68 @@ async def lifespan(app: FastAPI):
     logger.info("Port: 8001")
     logger.info("========================================")
     
-    # Start scheduler for automatic score calculation (every 3 minutes)
+    await indicator_service.connect_db()
+    await gate_profiles.sync(indicator_service.db, force=True)
+    
+    # Every worker runs the scheduler, but only the lease holder does work
+    await scheduled_leader_election()
+    if leader_elector.enabled:
+        scheduler.add_job(
+            scheduled_leader_election,
+            'interval',
+            seconds=leader_elector.renew_seconds,
+            id='leader_election',
+            name='Scheduler Leader Election',
+            replace_existing=True
+        )
+        logger.info(
+            f"✓ Leader election enabled - worker {leader_elector.worker_id} "
+            f"({'leader' if leader_elector.is_leader else 'follower'})"
+        )
+    
+    # Join the shard ring before the first scoring run
+    if shard_coordinator.enabled:
+        scheduler.add_job(
+            scheduled_shard_heartbeat,
+            'interval',
+            seconds=settings.shard_heartbeat_seconds,
+            id='shard_heartbeat',
+            name='Shard Membership Heartbeat',
+            replace_existing=True
+        )
+        logger.info(f"✓ Sharding enabled - replica {shard_coordinator.replica_id}")
+    
+    # Start scheduler for automatic score calculation. A slow cycle is never
+    # overlapped: overlapping runs are skipped and missed ones coalesced.
     scheduler.add_job(
         scheduled_score_calculation,
         'interval',
-        minutes=3,
+        minutes=settings.evaluation_interval_minutes,
         id='score_calculation',
         name='Calculate Setup Scores',
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=settings.scoring_misfire_grace_seconds,
         replace_existing=True
     )
+    scheduler.add_listener(
+        on_scheduler_event,
+        EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED | EVENT_JOB_SUBMITTED
+    )
     scheduler.start()
-    logger.info("✓ Scheduler started - calculating scores every 3 minutes")
+    logger.info(
+        f"✓ Scheduler started - calculating scores every "
+        f"{settings.evaluation_interval_minutes} minutes"
+    )
     
     yield
     
     # Shutdown scheduler
     scheduler.shutdown()
+    if leader_elector.is_leader:
+        await shard_coordinator.release(indicator_service.db)
+    await leader_elector.resign(indicator_service.db)
+    await indicator_service.close_db()
     logger.info("Quant Engine Shutting Down...")
 
 app = FastAPI(
@@ -124,6 +252,112 @@ async def api_health():
     """API health check endpoint"""
     return await health()
 
+@app.get("/api/quant/scheduler/metrics")
+async def get_scheduler_metrics():
+    """Scoring cycle durations, stage breakdown, overruns, shedding and emit suppression"""
+    return {**scheduler_telemetry.get_metrics(), 'emit_suppression': emit_suppressor.get_metrics()}
+
+@app.get("/api/quant/market-status")
+async def get_market_status():
+    """Current session, holiday and next-session information"""
+    return market_calendar.get_status()
+
+@app.get("/api/quant/leader")
+async def get_leader_status():
+    """Whether this worker is the scheduler leader"""
+    return leader_elector.get_status()
+
+@app.get("/api/quant/shards")
+async def get_shard_status():
+    """Symbol ownership of this replica and the current ring membership"""
+    return shard_coordinator.get_status()
+
+@app.get("/api/quant/internals")
+async def get_internals_status():
+    """Cross-index internals per pair/timeframe and the shared bar buffers behind them"""
+    return {'pairs': index_internals.get_status(), 'buffers': bar_buffer.get_status()}
+
+@app.get("/api/quant/breadth/{index}")
+async def get_breadth(index: str):
+    """Constituent breadth (advance/decline, VWAP, EMA alignment, contribution) for an index"""
+    index = index.upper()
+    if not breadth_engine.tracks(index):
+        raise HTTPException(status_code=404, detail=f"No constituents configured for {index}")
+    await indicator_service.fetch_breadth(index)
+    return {'breadth': breadth_engine.snapshot(index), 'engine': breadth_engine.get_status()}
+
+@app.get("/api/quant/futures-oi")
+async def get_futures_oi_status():
+    """Rolling OI change and price/OI quadrant of each index's near-month future"""
+    for symbol in settings.symbols:
+        await indicator_service.fetch_futures_oi(symbol)
+    return futures_oi_engine.get_status()
+
+@app.get("/api/quant/time-risk")
+async def get_time_risk_windows(
+    mode: Optional[str] = None,
+    day: Optional[date] = None,
+    client_id: Optional[str] = Header(None, alias="X-Client-Id")
+):
+    """Minute-of-day time risk ranges for a risk mode (defaults to the client's) and date"""
+    await gate_profiles.sync(indicator_service.db)
+    mode = (mode or get_trading_gate(client_id).risk_mode.value).upper()
+    return time_risk_table.to_dict(mode, day)
+
+@app.get("/api/quant/levels/{symbol}")
+async def get_levels(symbol: str, timeframe: str = "5m"):
+    """Session support/resistance levels and the nearest ones around the latest close"""
+    df_ohlc = await indicator_service.fetch_ohlc_data(symbol, timeframe)
+    snapshot = level_engine.snapshot(
+        symbol, timeframe, float(df_ohlc['close'].iloc[-1]) if df_ohlc is not None else None
+    )
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No levels for {symbol} ({timeframe})")
+    return snapshot
+
+@app.get("/api/quant/volume-profile/{symbol}/composite")
+async def get_composite_volume_profile(
+    symbol: str,
+    sessions: Optional[int] = None,
+    end: Optional[date] = None,
+    distribution: bool = True
+):
+    """
+    Composite volume profile of finished sessions (sessions=1 is the prior
+    day), positioned against the latest buffered close
+    """
+    if sessions is not None and not 1 <= sessions <= 60:
+        raise HTTPException(status_code=400, detail="sessions must be between 1 and 60")
+    composite = await indicator_service.composite_volume_profile(symbol, sessions, end)
+    if composite is None:
+        raise HTTPException(status_code=404, detail=f"No daily profiles for {symbol}")
+    bars = bar_buffer.get(symbol, "5m")
+    current_price = float(bars['close'].iloc[-1]) if bars is not None and len(bars) else None
+    return composite.snapshot(current_price, distribution)
+
+@app.get("/api/quant/tpo/{symbol}")
+async def get_tpo_profile(symbol: str, letters: bool = False):
+    """Session market profile: POC and value area by time, initial balance, single prints"""
+    df_ohlc = await indicator_service.fetch_ohlc_data(symbol, "5m")
+    snapshot = tpo_engine.snapshot(
+        symbol, float(df_ohlc['close'].iloc[-1]) if df_ohlc is not None else None, letters
+    )
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No TPO profile for {symbol}")
+    return snapshot
+
+@app.get("/api/quant/gate-rules")
+async def get_gate_rules():
+    """Active trade gate rules and their version"""
+    gate_rules.refresh()
+    return gate_rules.to_dict()
+
+@app.get("/api/quant/scoring-rules")
+async def get_scoring_rules():
+    """Active scoring threshold tables and their version id"""
+    scoring_rules.refresh()
+    return scoring_rules.to_dict()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -189,7 +423,8 @@ async def evaluate_setup(request: ScoreRequest):
     try:
         result = await indicator_service.calculate_score_for_symbol(
             symbol=request.symbol,
-            timeframe=request.timeframe
+            timeframe=request.timeframe,
+            detail=request.detail
         )
         
         if not result:
@@ -198,14 +433,15 @@ async def evaluate_setup(request: ScoreRequest):
                 detail=f"Failed to calculate score for {request.symbol}"
             )
         
-        # Broadcast real-time update
-        await broadcast_setup_score_update(
-            symbol=result['symbol'],
-            timeframe=result['timeframe'],
-            score=result['setup_score'],
-            components=result.get('components', {}),
-            bias=result['market_bias']
-        )
+        # Broadcast real-time update (unchanged scores are not re-sent)
+        if result.get('emitted', True):
+            await broadcast_setup_score_update(
+                symbol=result['symbol'],
+                timeframe=result['timeframe'],
+                score=result['setup_score'],
+                components=indicator_service.shape_score_components(result, 'lean'),
+                bias=result['market_bias']
+            )
         
         # Convert to response model
         return ScoreResponse(
@@ -213,7 +449,7 @@ async def evaluate_setup(request: ScoreRequest):
             timeframe=result['timeframe'],
             timestamp=result['timestamp'],
             setup_score=result['setup_score'],
-            components=ScoreComponents(**result['components']),
+            components=ScoreComponents(**indicator_service.shape_score_components(result, request.detail)),
             market_bias=result['market_bias'],
             evaluation_time_seconds=result['evaluation_time_seconds']
         )
@@ -226,12 +462,16 @@ async def evaluate_setup(request: ScoreRequest):
 
 
 @app.get("/api/quant/score/{symbol}", response_model=ScoreResponse)
-async def get_latest_score(symbol: str, timeframe: str = "5m"):
+async def get_latest_score(
+    symbol: str,
+    timeframe: str = "5m",
+    detail: Literal["lean", "full"] = "lean"
+):
     """
     Get the latest calculated score for a symbol
     
     Returns the most recent score from the database. If no score exists,
-    triggers a new calculation.
+    triggers a new calculation. Pass detail=full for per-component details.
     """
     try:
         # First try to get latest from database
@@ -248,9 +488,18 @@ async def get_latest_score(symbol: str, timeframe: str = "5m"):
                 timeframe=latest['timeframe'],
                 timestamp=latest['timestamp'],
                 setup_score=latest['setup_score'],
-                components=ScoreComponents(**latest['components']),
+                components=ScoreComponents(**indicator_service.shape_score_components(latest, detail)),
                 market_bias=latest['market_bias'],
-                evaluation_time_seconds=latest['evaluation_time_seconds']
+                evaluation_time_seconds=latest['evaluation_time_seconds'],
+                replica_id=latest.get('replica_id')
+            )
+        
+        # Scores are shared through MongoDB - leave the calculation to the owner
+        if not shard_coordinator.owns(symbol):
+            raise HTTPException(
+                status_code=404,
+                detail=f"No score yet for {symbol}; owned by replica "
+                       f"{shard_coordinator.ring.owner(symbol)}"
             )
         
         # No score exists, calculate new one
@@ -271,7 +520,7 @@ async def get_latest_score(symbol: str, timeframe: str = "5m"):
             timeframe=result['timeframe'],
             timestamp=result['timestamp'],
             setup_score=result['setup_score'],
-            components=ScoreComponents(**result['components']),
+            components=ScoreComponents(**indicator_service.shape_score_components(result, detail)),
             market_bias=result['market_bias'],
             evaluation_time_seconds=result['evaluation_time_seconds']
         )
@@ -284,7 +533,12 @@ async def get_latest_score(symbol: str, timeframe: str = "5m"):
 
 
 @app.get("/api/quant/score/{symbol}/history", response_model=ScoreHistoryResponse)
-async def get_score_history(symbol: str, timeframe: str = "5m", limit: int = 20):
+async def get_score_history(
+    symbol: str,
+    timeframe: str = "5m",
+    limit: int = 20,
+    detail: Literal["lean", "full"] = "lean"
+):
     """
     Get historical scores for a symbol
     
@@ -305,9 +559,10 @@ async def get_score_history(symbol: str, timeframe: str = "5m", limit: int = 20)
                     timeframe=score['timeframe'],
                     timestamp=score['timestamp'],
                     setup_score=score['setup_score'],
-                    components=ScoreComponents(**score['components']),
+                    components=ScoreComponents(**indicator_service.shape_score_components(score, detail)),
                     market_bias=score['market_bias'],
-                    evaluation_time_seconds=score['evaluation_time_seconds']
+                    evaluation_time_seconds=score['evaluation_time_seconds'],
+                    replica_id=score.get('replica_id')
                 )
             )
         
@@ -323,6 +578,69 @@ async def get_score_history(symbol: str, timeframe: str = "5m", limit: int = 20)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/quant/score/{symbol}/replay", response_model=ScoreReplayResponse)
+async def replay_scores(
+    symbol: str,
+    date: Optional[str] = None,
+    timeframe: str = "5m",
+    higher_timeframe: Optional[str] = None
+):
+    """
+    Replay setup scores for every bar of a session
+    
+    Recomputes setup_score, market_bias and component scores bar by bar
+    (no lookahead) from the stored 1m snapshots. OI is not recorded
+    historically, so the OI component is unscored. `date` defaults to
+    today (IST); `higher_timeframe` (e.g. 15m) adds trend context.
+    """
+    try:
+        start_time = time.time()
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.now(IST).date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {date}")
+        
+        bars = await indicator_service.fetch_session_bars(symbol, day, timeframe)
+        if bars is None or bars.empty:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No bars for {symbol} on {day.isoformat()}"
+            )
+        
+        replayed = score_replayer.replay(
+            bars,
+            bar_minutes=int(timeframe.rstrip('m')),
+            higher_timeframe_minutes=int(higher_timeframe.rstrip('m')) if higher_timeframe else None,
+            levels=await indicator_service.replay_levels(symbol, day, timeframe)
+        )
+        
+        component_columns = [c for c in replayed.columns if c.endswith('_score') and c != 'setup_score']
+        points = [
+            ReplayPoint(
+                timestamp=timestamp,
+                setup_score=row['setup_score'],
+                market_bias=row['market_bias'],
+                components={c[:-len('_score')]: row[c] for c in component_columns}
+            )
+            for timestamp, row in zip(replayed.index.to_pydatetime(), replayed.to_dict('records'))
+        ]
+        
+        return ScoreReplayResponse(
+            symbol=symbol,
+            timeframe=timeframe,
+            date=day.isoformat(),
+            points=points,
+            count=len(points),
+            replay_time_seconds=round(time.time() - start_time, 3)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in replay_scores: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============================================================================
 # Phase 4: Advanced Filters and No-Trade Scoring Endpoints
 # ============================================================================
@@ -344,16 +662,19 @@ async def get_no_trade_score(symbol: str, timeframe: str = "5m"):
                 detail=f"Insufficient OHLC data for {symbol}"
             )
         
-        # Calculate indicators needed for no-trade scoring
-        indicators = await indicator_service.calculate_indicators(df_ohlc)
-        
         # Initialize no-trade scorer
         no_trade_scorer = NoTradeScorer()
         
         # Calculate no-trade score
         no_trade_result = no_trade_scorer.calculate_no_trade_score(
-            df_ohlc, 
-            indicators
+            symbol=symbol,
+            current_price=float(df_ohlc['close'].iloc[-1]),
+            price_history=df_ohlc['close'].tolist(),
+            high_history=df_ohlc['high'].tolist(),
+            low_history=df_ohlc['low'].tolist(),
+            volume_history=df_ohlc['volume'].tolist(),
+            levels=level_engine.index(symbol, timeframe),
+            ranges=range_engine.index(symbol, timeframe, df_ohlc.index[-1].to_pydatetime())
         )
         
         # Determine recommendation
@@ -363,16 +684,19 @@ async def get_no_trade_score(symbol: str, timeframe: str = "5m"):
         blocking_reasons = []
         components = no_trade_result['components']
         
+        def reason(name: str) -> str:
+            return components[name]['details'].get('interpretation', 'see details')
+        
         if components['time_risk']['score'] >= 7:
-            blocking_reasons.append(f"High time risk: {components['time_risk']['reason']}")
+            blocking_reasons.append(f"High time risk: {reason('time_risk')}")
         if components['chop_detection']['score'] >= 6:
-            blocking_reasons.append(f"Choppy market: {components['chop_detection']['reason']}")
+            blocking_reasons.append(f"Choppy market: {reason('chop_detection')}")
         if components['resistance_proximity']['score'] >= 7:
-            blocking_reasons.append(f"Near S/R: {components['resistance_proximity']['reason']}")
+            blocking_reasons.append(f"Near S/R: {reason('resistance_proximity')}")
         if components['volatility_compression']['score'] >= 7:
-            blocking_reasons.append(f"Volatility issue: {components['volatility_compression']['reason']}")
+            blocking_reasons.append(f"Volatility issue: {reason('volatility_compression')}")
         if components['consecutive_loss']['score'] >= 8:
-            blocking_reasons.append(f"Loss guard: {components['consecutive_loss']['reason']}")
+            blocking_reasons.append(f"Loss guard: {reason('consecutive_loss')}")
         
         return NoTradeScoreResponse(
             symbol=symbol,
@@ -418,20 +742,36 @@ async def get_enhanced_evaluation(symbol: str, timeframe: str = "5m"):
                 detail=f"No score data available for {symbol}"
             )
         
-        # Calculate indicators
-        indicators = await indicator_service.calculate_indicators(df_ohlc)
+        # Session volume profile (its POC/VAH/VAL join the S/R levels when the
+        # bars are fetched); the fetched window is profiled only before the
+        # session has any bars
+        volume_profile = session_profile_engine.snapshot(symbol, float(df_ohlc['close'].iloc[-1]))
+        if volume_profile is None:
+            volume_profile = VolumeProfileCalculator().calculate(df_ohlc)
+        composite = await indicator_service.composite_volume_profile(symbol)
+        composite_profile = (
+            composite.snapshot(float(df_ohlc['close'].iloc[-1]), distribution=False) if composite else None
+        )
+        ranges = range_engine.index(symbol, timeframe, df_ohlc.index[-1].to_pydatetime())
         
         # Calculate no-trade score
         no_trade_scorer = NoTradeScorer()
-        no_trade_result = no_trade_scorer.calculate_no_trade_score(df_ohlc, indicators)
-        
-        # Calculate volume profile
-        volume_calculator = VolumeProfileCalculator()
-        volume_profile = volume_calculator.calculate(df_ohlc)
+        no_trade_result = no_trade_scorer.calculate_no_trade_score(
+            symbol=symbol,
+            current_price=float(df_ohlc['close'].iloc[-1]),
+            price_history=df_ohlc['close'].tolist(),
+            high_history=df_ohlc['high'].tolist(),
+            low_history=df_ohlc['low'].tolist(),
+            volume_history=df_ohlc['volume'].tolist(),
+            levels=level_engine.index(symbol, timeframe),
+            ranges=ranges
+        )
         
         # Detect fake breakouts
         fake_breakout_detector = FakeBreakoutDetector()
-        fake_breakout = fake_breakout_detector.detect(df_ohlc, volume_profile)
+        fake_breakout = fake_breakout_detector.detect(
+            df_ohlc, volume_profile=volume_profile, ranges=ranges, composite_profile=composite_profile
+        )
         
         # Determine trade recommendation
         setup_score = score_result['setup_score']
@@ -461,9 +801,17 @@ async def get_enhanced_evaluation(symbol: str, timeframe: str = "5m"):
 
 
 @app.post("/api/quant/set-risk-mode")
-async def set_risk_mode(request: RiskModeRequest):
+async def set_risk_mode(
+    request: RiskModeRequest,
+    client_id: Optional[str] = Header(None, alias="X-Client-Id")
+):
     """
-    Set the global risk mode for trade gating
+    Set the risk mode for trade gating
+
+    With an X-Client-Id header the mode (and optional threshold overrides)
+    applies to that client's gate profile only; without one it sets the
+    global mode used by clients without a profile. Both are stored in
+    MongoDB so every worker serves the same gate.
     
     Modes:
     - CONSERVATIVE: Higher setup threshold (8), lower no-trade tolerance (4)
@@ -477,37 +825,33 @@ async def set_risk_mode(request: RiskModeRequest):
                 status_code=400,
                 detail=f"Invalid risk mode: {request.mode}. Must be CONSERVATIVE, BALANCED, or AGGRESSIVE"
             )
+        if client_id is None and (request.setup_threshold is not None or request.no_trade_threshold is not None):
+            raise HTTPException(
+                status_code=400,
+                detail="Threshold overrides need an X-Client-Id header"
+            )
         
-        # Set global risk mode
-        success = set_global_risk_mode(request.mode)
+        gate = await gate_profiles.save(
+            indicator_service.db, client_id, request.mode, request.setup_threshold, request.no_trade_threshold
+        )
         
-        if not success:
+        if gate is None:
             raise HTTPException(
                 status_code=400,
                 detail=f"Failed to set risk mode to {request.mode}"
             )
         
-        # Get trading gate to confirm
-        gate = get_trading_gate()
-        
-        # Get thresholds from TradeGateConfig for current risk mode
-        from app.trading_gate import TradeGateConfig, RiskMode as GateRiskMode
-        
-        mode_enum = GateRiskMode[request.mode]
-        min_setup = TradeGateConfig.SETUP_THRESHOLDS[mode_enum]
-        max_no_trade = TradeGateConfig.NO_TRADE_THRESHOLDS[mode_enum]
-        allow_opening = not TradeGateConfig.BLOCK_OPENING_NOISE[mode_enum]
-        allow_chop = not TradeGateConfig.BLOCK_CHOP_HOUR[mode_enum]
-        
+        mode_enum = gate.risk_mode
         return {
             "success": True,
             "message": f"Risk mode set to {request.mode}",
+            "client_id": client_id,
             "config": {
                 "mode": request.mode,
-                "min_setup_score": min_setup,
-                "max_no_trade_score": max_no_trade,
-                "allow_opening_range": allow_opening,
-                "allow_chop_hour": allow_chop
+                "min_setup_score": gate.config.SETUP_THRESHOLDS[mode_enum],
+                "max_no_trade_score": gate.config.NO_TRADE_THRESHOLDS[mode_enum],
+                "allow_opening_range": not gate.config.BLOCK_OPENING_NOISE[mode_enum],
+                "allow_chop_hour": not gate.config.BLOCK_CHOP_HOUR[mode_enum]
             }
         }
         
@@ -518,64 +862,109 @@ async def set_risk_mode(request: RiskModeRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/quant/gate-profiles")
+async def get_gate_profiles():
+    """Per-client gate profiles by risk mode"""
+    await gate_profiles.sync(indicator_service.db)
+    return gate_profiles.get_status()
+
+
+async def _trade_snapshot(symbol: str, timeframe: str) -> Dict:
+    """
+    Inputs of a trade decision shared by every risk mode: OHLC, setup
+    score, volume profiles, range index and fake breakout check
+    """
+    df_ohlc = await indicator_service.fetch_ohlc_data(symbol, timeframe)
+    if df_ohlc is None or len(df_ohlc) < 50:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Insufficient OHLC data for {symbol}"
+        )
+    
+    score_result = await indicator_service.calculate_score_for_symbol(
+        symbol=symbol,
+        timeframe=timeframe
+    )
+    if not score_result:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No score data available for {symbol}"
+        )
+    
+    # Session volume profile (its POC/VAH/VAL join the S/R levels when the
+    # bars are fetched); the fetched window is profiled only before the
+    # session has any bars
+    current_price = float(df_ohlc['close'].iloc[-1])
+    volume_profile = session_profile_engine.snapshot(symbol, current_price)
+    if volume_profile is None:
+        volume_profile = VolumeProfileCalculator().calculate(df_ohlc)
+    composite = await indicator_service.composite_volume_profile(symbol)
+    composite_profile = composite.snapshot(current_price, distribution=False) if composite else None
+    ranges = range_engine.index(symbol, timeframe, df_ohlc.index[-1].to_pydatetime())
+    
+    fake_breakout = FakeBreakoutDetector().detect(
+        df_ohlc, volume_profile=volume_profile, ranges=ranges, composite_profile=composite_profile
+    )
+    return {
+        'df': df_ohlc,
+        'current_price': current_price,
+        'setup_score': score_result['setup_score'],
+        'ranges': ranges,
+        'fake_breakout_risk': fake_breakout['is_fake_breakout']
+    }
+
+
+def _no_trade_for_mode(symbol: str, timeframe: str, snapshot: Dict, risk_mode: str) -> Dict:
+    """No-trade score and time category with the time windows of a risk mode"""
+    df_ohlc = snapshot['df']
+    no_trade_result = NoTradeScorer().calculate_no_trade_score(
+        symbol=symbol,
+        current_price=snapshot['current_price'],
+        price_history=df_ohlc['close'].tolist(),
+        high_history=df_ohlc['high'].tolist(),
+        low_history=df_ohlc['low'].tolist(),
+        volume_history=df_ohlc['volume'].tolist(),
+        risk_mode=risk_mode,
+        levels=level_engine.index(symbol, timeframe),
+        ranges=snapshot['ranges']
+    )
+    time_details = no_trade_result['components'].get('time_risk', {}).get('details', {})
+    return {
+        'no_trade_score': no_trade_result['no_trade_score'],
+        'time_category': time_details.get('category')
+    }
+
+
 @app.get("/api/quant/trade-decision/{symbol}", response_model=TradeDecisionResponse)
-async def get_trade_decision(symbol: str, timeframe: str = "5m"):
+async def get_trade_decision(
+    symbol: str,
+    timeframe: str = "5m",
+    trace: bool = False,
+    client_id: Optional[str] = Header(None, alias="X-Client-Id")
+):
     """
     Get the final trade gating decision for a symbol
     
     Applies all Phase 4 filters including setup score, no-trade score,
-    volatility regime, time filters, fake breakout detection, and OI divergence.
+    volatility regime, time filters, fake breakout detection, and OI divergence,
+    with the gate profile of the X-Client-Id client (the global gate without one).
+    With trace=true the response lists every gate rule evaluated.
     """
     try:
-        # Get latest OHLC data
-        df_ohlc = await indicator_service.fetch_ohlc_data(symbol, timeframe)
-        if df_ohlc is None or len(df_ohlc) < 50:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Insufficient OHLC data for {symbol}"
-            )
-        
-        # Get latest setup score
-        score_result = await indicator_service.calculate_score_for_symbol(
-            symbol=symbol,
-            timeframe=timeframe
-        )
-        
-        if not score_result:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No score data available for {symbol}"
-            )
-        
-        setup_score = score_result['setup_score']
-        
-        # Calculate indicators
-        indicators = await indicator_service.calculate_indicators(df_ohlc)
-        
-        # Calculate no-trade score
-        no_trade_scorer = NoTradeScorer()
-        no_trade_result = no_trade_scorer.calculate_no_trade_score(df_ohlc, indicators)
-        no_trade_score = no_trade_result['no_trade_score']
-        
-        # Calculate volume profile
-        volume_calculator = VolumeProfileCalculator()
-        volume_profile = volume_calculator.calculate(df_ohlc)
-        
-        # Detect fake breakouts
-        fake_breakout_detector = FakeBreakoutDetector()
-        fake_breakout = fake_breakout_detector.detect(df_ohlc, volume_profile)
-        
-        # Get trading gate
-        gate = get_trading_gate()
+        snapshot = await _trade_snapshot(symbol, timeframe)
+        await gate_profiles.sync(indicator_service.db)
+        gate = get_trading_gate(client_id)
+        no_trade = _no_trade_for_mode(symbol, timeframe, snapshot, gate.risk_mode.value)
         
         # Evaluate trade decision
         decision_result = gate.evaluate_trade_decision(
-            setup_score=setup_score,
-            no_trade_score=no_trade_score,
+            setup_score=snapshot['setup_score'],
+            no_trade_score=no_trade['no_trade_score'],
             volatility_regime=None,  # Extract from indicators if needed
-            time_category=None,  # Extract from no_trade_result if needed
-            fake_breakout_risk=fake_breakout['is_fake_breakout'],
-            oi_analysis=None  # Could fetch OI analysis if needed
+            time_category=no_trade['time_category'],
+            fake_breakout_risk=snapshot['fake_breakout_risk'],
+            oi_analysis=None,  # Could fetch OI analysis if needed
+            trace=trace
         )
         
         return TradeDecisionResponse(
@@ -584,11 +973,13 @@ async def get_trade_decision(symbol: str, timeframe: str = "5m"):
             trade_allowed=decision_result['trade_allowed'],
             decision=decision_result['decision'],
             confidence=decision_result['confidence'],
-            setup_score=setup_score,
-            no_trade_score=no_trade_score,
+            setup_score=snapshot['setup_score'],
+            no_trade_score=no_trade['no_trade_score'],
             current_risk_mode=decision_result['risk_mode'],
             blocking_reasons=decision_result['blocking_reasons'],
-            warnings=decision_result['warnings']
+            warnings=decision_result['warnings'],
+            rules_version=decision_result.get('rules_version'),
+            rule_trace=decision_result.get('rule_trace')
         )
         
     except HTTPException:
@@ -598,6 +989,55 @@ async def get_trade_decision(symbol: str, timeframe: str = "5m"):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/quant/trade-decision/{symbol}/profiles")
+async def get_trade_decisions_for_profiles(symbol: str, timeframe: str = "5m", details: bool = False):
+    """
+    Trade decisions of every client gate profile from one shared snapshot
+
+    The snapshot is built once, the no-trade score once per risk mode in
+    use, and each mode's profiles are evaluated in one vectorized pass.
+    """
+    try:
+        snapshot = await _trade_snapshot(symbol, timeframe)
+        decisions = {}
+        await gate_profiles.sync(indicator_service.db)
+        for mode, (clients, table) in gate_profiles.tables().items():
+            no_trade = _no_trade_for_mode(symbol, timeframe, snapshot, mode.value)
+            results = table.evaluate(
+                setup_score=snapshot['setup_score'],
+                no_trade_score=no_trade['no_trade_score'],
+                time_category=no_trade['time_category'],
+                fake_breakout_risk=snapshot['fake_breakout_risk'],
+                details=details
+            )
+            if details:
+                decisions.update(zip(clients, results))
+            else:
+                for client_id, allowed, confidence in zip(
+                    clients, results['trade_allowed'].tolist(), results['confidence'].tolist()
+                ):
+                    decisions[client_id] = {
+                        'risk_mode': mode.value,
+                        'trade_allowed': allowed,
+                        'confidence': round(confidence, 2)
+                    }
+        
+        return {
+            'symbol': symbol,
+            'timestamp': datetime.now(),
+            'setup_score': snapshot['setup_score'],
+            'fake_breakout_risk': snapshot['fake_breakout_risk'],
+            'profiles': len(decisions),
+            'decisions': decisions
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_trade_decisions_for_profiles: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
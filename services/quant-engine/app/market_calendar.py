@@ -0,0 +1,215 @@
+"""
+Exchange Calendar
+NSE trading sessions, holidays and special sessions with precomputed
+session boundaries, so schedulers and scorers can skip work while the
+market is closed.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional, Tuple
+import json
+import logging
+import os
+
+import pytz
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+DEFAULT_CALENDAR_FILE = os.path.join(os.path.dirname(__file__), 'data', 'nse_calendar.json')
+
+
+def _parse_time(value: str) -> time:
+    """Parse an 'HH:MM' string"""
+    hours, minutes = value.split(':')
+    return time(int(hours), int(minutes))
+
+
+class TradingSession:
+    """Open/close boundaries of one trading day (timezone-aware, IST)"""
+
+    __slots__ = ('day', 'open', 'close', 'name')
+
+    def __init__(self, day: date, open_at: datetime, close_at: datetime, name: str = 'REGULAR'):
+        self.day = day
+        self.open = open_at
+        self.close = close_at
+        self.name = name
+
+    def contains(self, timestamp: datetime) -> bool:
+        """Whether the timestamp falls inside [open, close)"""
+        return self.open <= timestamp < self.close
+
+    def to_dict(self) -> Dict:
+        return {
+            'date': self.day.isoformat(),
+            'open': self.open.isoformat(),
+            'close': self.close.isoformat(),
+            'name': self.name
+        }
+
+
+class ExchangeCalendar:
+    """
+    Exchange calendar with precomputed session boundaries
+
+    Regular sessions run Monday-Friday between the configured market start
+    and end times. Holidays remove a day; special sessions (Muhurat trading,
+    Saturday budget sessions) add or override one.
+    """
+
+    def __init__(
+        self,
+        calendar_file: Optional[str] = None,
+        market_start: str = "09:15",
+        market_end: str = "15:30",
+        warmup_minutes: int = 15,
+        precompute_days: int = 400
+    ):
+        """
+        Args:
+            calendar_file: JSON file with holidays and special sessions
+            market_start: Regular session open (HH:MM IST)
+            market_end: Regular session close (HH:MM IST)
+            warmup_minutes: Minutes before the open when pre-open warm-up starts
+            precompute_days: Days of session boundaries built up-front
+        """
+        self.market_start = _parse_time(market_start)
+        self.market_end = _parse_time(market_end)
+        self.warmup = timedelta(minutes=warmup_minutes)
+        self.holidays: Dict[date, str] = {}
+        self.special_sessions: Dict[date, Tuple[time, time, str]] = {}
+        self._sessions: Dict[date, Optional[TradingSession]] = {}
+
+        self._load(calendar_file or DEFAULT_CALENDAR_FILE)
+
+        start = datetime.now(IST).date() - timedelta(days=7)
+        for offset in range(precompute_days):
+            day = start + timedelta(days=offset)
+            self._sessions[day] = self._build_session(day)
+
+        if not any(day.year == start.year for day in self.holidays):
+            logger.warning(
+                f"Exchange calendar has no holidays for {start.year} - "
+                f"update {calendar_file or DEFAULT_CALENDAR_FILE}"
+            )
+
+    def _load(self, path: str) -> None:
+        """Load holidays and special sessions from the calendar file"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            for day, name in data.get('holidays', {}).items():
+                self.holidays[date.fromisoformat(day)] = name
+            for day, session in data.get('special_sessions', {}).items():
+                self.special_sessions[date.fromisoformat(day)] = (
+                    _parse_time(session['open']),
+                    _parse_time(session['close']),
+                    session.get('name', 'SPECIAL')
+                )
+            logger.info(
+                f"Loaded exchange calendar: {len(self.holidays)} holidays, "
+                f"{len(self.special_sessions)} special sessions"
+            )
+        except Exception as e:
+            logger.error(f"Error loading exchange calendar {path}: {e} - using weekdays only")
+
+    def _build_session(self, day: date) -> Optional[TradingSession]:
+        """Compute the session for a date (None if the market is shut)"""
+        if day in self.special_sessions:
+            open_time, close_time, name = self.special_sessions[day]
+        elif day.weekday() >= 5 or day in self.holidays:
+            return None
+        else:
+            open_time, close_time, name = self.market_start, self.market_end, 'REGULAR'
+
+        return TradingSession(
+            day,
+            IST.localize(datetime.combine(day, open_time)),
+            IST.localize(datetime.combine(day, close_time)),
+            name
+        )
+
+    @staticmethod
+    def _to_ist(timestamp: Optional[datetime]) -> datetime:
+        """Normalise a timestamp to IST (naive timestamps are taken as IST)"""
+        if timestamp is None:
+            return datetime.now(IST)
+        if timestamp.tzinfo is None:
+            return IST.localize(timestamp)
+        return timestamp.astimezone(IST)
+
+    def session_for(self, day: date) -> Optional[TradingSession]:
+        """Get the trading session for a date (None on holidays/weekends)"""
+        if day not in self._sessions:
+            self._sessions[day] = self._build_session(day)
+        return self._sessions[day]
+
+    def session_open(self, day: date, tz=IST) -> Optional[datetime]:
+        """
+        Session open as a naive time in `tz` (the clock bars are stamped in:
+        IST for archives, UTC for stored snapshots); None if the market is shut
+        """
+        session = self.session_for(day)
+        return session.open.astimezone(tz).replace(tzinfo=None) if session is not None else None
+    
+    def is_trading_day(self, day: date) -> bool:
+        return self.session_for(day) is not None
+
+    def is_open(self, timestamp: Optional[datetime] = None) -> bool:
+        """Whether the market is in session at the timestamp"""
+        timestamp = self._to_ist(timestamp)
+        session = self.session_for(timestamp.date())
+        return session is not None and session.contains(timestamp)
+
+    def is_active(self, timestamp: Optional[datetime] = None) -> bool:
+        """Whether work should run: in session or within the pre-open warm-up"""
+        timestamp = self._to_ist(timestamp)
+        session = self.session_for(timestamp.date())
+        return session is not None and session.open - self.warmup <= timestamp < session.close
+
+    def next_session(self, timestamp: Optional[datetime] = None) -> Optional[TradingSession]:
+        """The current session if still running, otherwise the next one"""
+        timestamp = self._to_ist(timestamp)
+        day = timestamp.date()
+        for offset in range(30):
+            session = self.session_for(day + timedelta(days=offset))
+            if session is not None and timestamp < session.close:
+                return session
+        return None
+
+    def seconds_until_active(self, timestamp: Optional[datetime] = None) -> float:
+        """Seconds until the next warm-up starts (0 if already active)"""
+        timestamp = self._to_ist(timestamp)
+        if self.is_active(timestamp):
+            return 0.0
+        session = self.next_session(timestamp)
+        if session is None:
+            return float('inf')
+        return max(0.0, (session.open - self.warmup - timestamp).total_seconds())
+
+    def get_status(self, timestamp: Optional[datetime] = None) -> Dict:
+        """Market status summary"""
+        timestamp = self._to_ist(timestamp)
+        session = self.session_for(timestamp.date())
+        upcoming = self.next_session(timestamp)
+        return {
+            'timestamp': timestamp.isoformat(),
+            'is_open': self.is_open(timestamp),
+            'is_active': self.is_active(timestamp),
+            'holiday': self.holidays.get(timestamp.date()) if session is None else None,
+            'session': session.to_dict() if session else None,
+            'next_session': upcoming.to_dict() if upcoming else None,
+            'warmup_minutes': int(self.warmup.total_seconds() // 60)
+        }
+
+
+# Global exchange calendar instance
+market_calendar = ExchangeCalendar(
+    calendar_file=settings.market_calendar_file,
+    market_start=settings.market_start_time,
+    market_end=settings.market_end_time,
+    warmup_minutes=settings.pre_open_warmup_minutes
+)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from typing import Optional, Literal, List, Dict
 from datetime import datetime
 from decimal import Decimal
@@ -62,6 +62,7 @@ class ScoreRequest(BaseModel):
     """Request model for setup score calculation"""
     symbol: str = Field(..., description="Symbol to score (NIFTY or BANKNIFTY)")
     timeframe: Literal["5m", "15m"] = Field("5m", description="Timeframe for scoring")
+    detail: Literal["lean", "full"] = Field("lean", description="Include per-component detail dicts")
 
 
 class ScoreComponents(BaseModel):
@@ -72,7 +73,11 @@ class ScoreComponents(BaseModel):
     momentum: Dict = Field(..., description="Momentum scoring details")
     internals: Dict = Field(..., description="Internals scoring details")
     volatility: Dict = Field(..., description="Volatility scoring details")
-    oi_confirmation: Dict = Field(..., description="OI confirmation scoring details")
+    oi_confirmation: Dict = Field(
+        ...,
+        validation_alias=AliasChoices('oi', 'oi_confirmation'),
+        description="OI confirmation scoring details"
+    )
 
 
 class ScoreResponse(BaseModel):
@@ -84,6 +89,7 @@ class ScoreResponse(BaseModel):
     components: ScoreComponents = Field(..., description="Breakdown of individual components")
     market_bias: str = Field(..., description="Overall market bias: BULLISH, BEARISH, or NEUTRAL")
     evaluation_time_seconds: float = Field(..., description="Time taken to evaluate")
+    replica_id: Optional[str] = Field(None, description="Quant-engine replica that produced the score")
 
 
 class ScoreHistoryResponse(BaseModel):
@@ -148,6 +154,8 @@ class EnhancedEvaluationResponse(BaseModel):
 class RiskModeRequest(BaseModel):
     """Request model for setting risk mode"""
     mode: Literal["CONSERVATIVE", "BALANCED", "AGGRESSIVE"] = Field(..., description="Risk mode to set")
+    setup_threshold: Optional[float] = Field(None, ge=0, le=10, description="Minimum setup score (client profiles only)")
+    no_trade_threshold: Optional[float] = Field(None, ge=0, le=10, description="Maximum no-trade score (client profiles only)")
 
 
 class TradeDecisionResponse(BaseModel):
@@ -162,3 +170,23 @@ class TradeDecisionResponse(BaseModel):
     current_risk_mode: str = Field(..., description="Current risk mode")
     blocking_reasons: List[str] = Field(..., description="Reasons blocking trade")
     warnings: List[str] = Field(..., description="Non-blocking warnings")
+    rules_version: Optional[str] = Field(None, description="Gate rule set version")
+    rule_trace: Optional[List[Dict]] = Field(None, description="Gate rules evaluated (with ?trace=true)")
+
+
+class ReplayPoint(BaseModel):
+    """Replayed score for one bar"""
+    timestamp: datetime
+    setup_score: float
+    market_bias: str
+    components: Dict[str, float] = Field(..., description="Per-component scores (0-10)")
+
+
+class ScoreReplayResponse(BaseModel):
+    """Response model for an intraday score replay"""
+    symbol: str
+    timeframe: str
+    date: str
+    points: List[ReplayPoint]
+    count: int
+    replay_time_seconds: float
@@ -5,14 +5,16 @@ Implements 5 components to identify conditions where trading should be avoided
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime, time
+from datetime import datetime
 import logging
-import pytz
 
-logger = logging.getLogger(__name__)
+from app.chop_state import RollingChopState
+from app.levels import LevelIndex, sr_bounds
+from app.range_index import RECENT_WINDOW, STRUCTURE_WINDOW, RangeIndex, range_index_for
+from app.time_risk import CATEGORIES, TimeRiskTable, time_risk_table
+from app.scoring_rules import scoring_rules
 
-# IST Timezone
-IST = pytz.timezone('Asia/Kolkata')
+logger = logging.getLogger(__name__)
 
 
 class TimeRiskScorer:
@@ -21,69 +23,37 @@ class TimeRiskScorer:
     Penalizes trading during high-risk time periods
     """
     
-    def __init__(self):
+    def __init__(self, table: Optional[TimeRiskTable] = None):
         self.weight = 0.30
+        self.table = table or time_risk_table
         
-    def score(self, timestamp: Optional[datetime] = None) -> Tuple[float, Dict]:
+    def score(
+        self,
+        timestamp: Optional[datetime] = None,
+        risk_mode: Optional[str] = None
+    ) -> Tuple[float, Dict]:
         """
         Calculate time risk score (0-10, higher = more risk)
         
         Args:
-            timestamp: Current time (defaults to now)
+            timestamp: Current time (defaults to now; naive = IST)
+            risk_mode: Risk mode whose time windows apply (default windows if None)
             
         Returns:
             Tuple of (score, details)
         """
         try:
-            if timestamp is None:
-                timestamp = datetime.now(IST)
-            elif timestamp.tzinfo is None:
-                timestamp = IST.localize(timestamp)
-            else:
-                timestamp = timestamp.astimezone(IST)
-            
-            current_time = timestamp.time()
-            details = {'current_time': timestamp.strftime('%H:%M:%S')}
-            
-            # Define time periods
-            market_open = time(9, 15)
-            noise_end = time(9, 30)
-            chop_start = time(11, 0)
-            chop_end = time(12, 30)
-            late_session = time(15, 0)
-            market_close = time(15, 30)
-            
-            # Opening noise (9:15-9:30) - HIGHEST RISK
-            if market_open <= current_time < noise_end:
-                score = 10.0
-                details['category'] = 'OPENING_NOISE'
-                details['interpretation'] = 'Extreme risk - Opening volatility'
-                
-            # Chop hour (11:00-12:30) - HIGH RISK
-            elif chop_start <= current_time < chop_end:
-                score = 7.0
-                details['category'] = 'CHOP_HOUR'
-                details['interpretation'] = 'High risk - Sideways movement likely'
-                
-            # Late session (3:00-3:30) - MODERATE RISK
-            elif late_session <= current_time < market_close:
-                score = 6.0
-                details['category'] = 'LATE_SESSION'
-                details['interpretation'] = 'Moderate risk - End of day volatility'
-                
-            # Prime trading time (9:30-11:00, 12:30-3:00) - LOW RISK
-            elif (noise_end <= current_time < chop_start) or (chop_end <= current_time < late_session):
-                score = 2.0
-                details['category'] = 'PRIME_TIME'
-                details['interpretation'] = 'Low risk - Ideal trading time'
-                
-            # Before open or after close - NO TRADING
-            else:
-                score = 10.0
-                details['category'] = 'MARKET_CLOSED'
-                details['interpretation'] = 'Market closed'
-            
-            details['score'] = round(score, 2)
+            # One lookup in the precomputed minute-of-day table; holidays,
+            # weekends and time outside the session are MARKET_CLOSED
+            code, timestamp = self.table.lookup(timestamp, risk_mode)
+            score = self.table.score(code)
+            
+            details = {
+                'current_time': timestamp.strftime('%H:%M:%S'),
+                'category': CATEGORIES[code],
+                'interpretation': self.table.interpretations[code],
+                'score': round(score, 2)
+            }
             return score, details
             
         except Exception as e:
@@ -105,7 +75,8 @@ class ChopDetector:
         price_history: List[float],
         high_history: List[float],
         low_history: List[float],
-        volume_history: Optional[List[float]] = None
+        volume_history: Optional[List[float]] = None,
+        ranges: Optional[RangeIndex] = None
     ) -> Tuple[float, Dict]:
         """
         Calculate chop score (0-10, higher = more choppy)
@@ -115,91 +86,111 @@ class ChopDetector:
             high_history: Recent highs
             low_history: Recent lows
             volume_history: Recent volumes (optional)
+            ranges: Range index ending at the latest bar (built from the
+                histories if not given)
             
         Returns:
             Tuple of (score, details)
         """
         try:
-            score = 0.0
-            details = {}
-            
-            if len(price_history) < 20:
+            if len(price_history) < STRUCTURE_WINDOW:
                 return 5.0, {"error": "Insufficient data", "chop_detected": True}
             
-            prices = np.array(price_history[-20:])
-            highs = np.array(high_history[-20:])
-            lows = np.array(low_history[-20:])
+            prices = np.array(price_history[-STRUCTURE_WINDOW:])
+            ranges = range_index_for(high_history, low_history, ranges)
             
-            # Component 1: Range compression (0-4 points)
-            recent_range = np.max(highs[-5:]) - np.min(lows[-5:])
-            overall_range = np.max(highs) - np.min(lows)
+            # Component 1: Range compression
+            recent_range = ranges.range(RECENT_WINDOW)
+            overall_range = ranges.range(STRUCTURE_WINDOW)
             
-            if overall_range > 0:
-                range_ratio = recent_range / overall_range
-                details['range_ratio'] = round(range_ratio, 3)
-                
-                if range_ratio < 0.3:  # Very narrow range
-                    score += 4.0
-                    details['range_status'] = 'very_compressed'
-                elif range_ratio < 0.5:
-                    score += 3.0
-                    details['range_status'] = 'compressed'
-                elif range_ratio < 0.7:
-                    score += 1.0
-                    details['range_status'] = 'normal'
-                else:
-                    score += 0.0
-                    details['range_status'] = 'expanding'
-            
-            # Component 2: Price oscillations (0-3 points)
+            # Component 2: Price oscillations
             price_changes = np.diff(prices)
             direction_changes = np.sum(np.diff(np.sign(price_changes)) != 0)
-            oscillation_ratio = direction_changes / len(price_changes) if len(price_changes) > 0 else 0
-            details['oscillation_ratio'] = round(oscillation_ratio, 3)
-            
-            if oscillation_ratio > 0.7:
-                score += 3.0
-                details['oscillation_status'] = 'high_chop'
-            elif oscillation_ratio > 0.5:
-                score += 2.0
-                details['oscillation_status'] = 'moderate_chop'
-            else:
-                score += 0.0
-                details['oscillation_status'] = 'trending'
             
-            # Component 3: Standard deviation (0-3 points)
+            # Component 3: Standard deviation
             std_dev = np.std(prices)
             mean_price = np.mean(prices)
-            cv = (std_dev / mean_price) * 100 if mean_price > 0 else 0  # Coefficient of variation
-            details['coefficient_variation'] = round(cv, 3)
-            
-            if cv < 0.3:  # Very low volatility = chop
-                score += 3.0
-                details['volatility_status'] = 'very_low'
-            elif cv < 0.5:
-                score += 2.0
-                details['volatility_status'] = 'low'
-            else:
-                score += 0.0
-                details['volatility_status'] = 'normal'
-            
-            # Normalize to 0-10
-            normalized_score = min(10.0, max(0.0, score))
-            details['score'] = round(normalized_score, 2)
-            
-            # Interpretation
-            if normalized_score >= 7:
-                details['interpretation'] = 'Strong chop detected - avoid trading'
-            elif normalized_score >= 5:
-                details['interpretation'] = 'Moderate chop - be cautious'
-            else:
-                details['interpretation'] = 'Trending conditions - safe to trade'
             
-            return normalized_score, details
+            metrics = {
+                'range_ratio': recent_range / overall_range if overall_range > 0 else None,
+                'oscillation_ratio': direction_changes / len(price_changes),
+                'coefficient_variation': (std_dev / mean_price) * 100 if mean_price > 0 else 0  # Coefficient of variation
+            }
+            if volume_history is not None and len(volume_history) >= STRUCTURE_WINDOW:
+                volumes = np.array(volume_history[-STRUCTURE_WINDOW:], dtype=float)
+                if volumes.sum() > 0:
+                    metrics['volume_ratio'] = volumes[-RECENT_WINDOW:].mean() / volumes.mean()
+            
+            return self.score_metrics(metrics)
             
         except Exception as e:
             logger.error(f"Error detecting chop: {e}", exc_info=True)
             return 5.0, {"error": str(e), "chop_detected": True}
+    
+    def score_state(self, state: RollingChopState) -> Tuple[float, Dict]:
+        """
+        Chop score from an incrementally maintained RollingChopState
+        
+        Same score as score() over the state's window, in O(1).
+        """
+        try:
+            metrics = state.metrics()
+            if metrics is None:
+                return 5.0, {"error": "Insufficient data", "chop_detected": True}
+            return self.score_metrics(metrics)
+            
+        except Exception as e:
+            logger.error(f"Error detecting chop: {e}", exc_info=True)
+            return 5.0, {"error": str(e), "chop_detected": True}
+    
+    def score_metrics(self, metrics: Dict) -> Tuple[float, Dict]:
+        """
+        Score chop statistics (range_ratio, oscillation_ratio,
+        coefficient_variation; choppiness_index, efficiency_ratio and
+        volume_ratio are reported when present)
+        """
+        score = 0.0
+        details = {}
+        
+        # Component 1: Range compression (0-4 points)
+        range_ratio = metrics.get('range_ratio')
+        if range_ratio is not None:
+            details['range_ratio'] = round(range_ratio, 3)
+            
+            range_bin = scoring_rules.table('chop.range_ratio').bin(range_ratio)
+            score += range_bin['value']
+            details['range_status'] = range_bin['label']
+        
+        # Component 2: Price oscillations (0-3 points)
+        oscillation_ratio = metrics['oscillation_ratio']
+        details['oscillation_ratio'] = round(oscillation_ratio, 3)
+        
+        oscillation_bin = scoring_rules.table('chop.oscillation_ratio').bin(oscillation_ratio)
+        score += oscillation_bin['value']
+        details['oscillation_status'] = oscillation_bin['label']
+        
+        # Component 3: Standard deviation (0-3 points)
+        cv = metrics['coefficient_variation']
+        details['coefficient_variation'] = round(cv, 3)
+        
+        # Very low volatility = chop
+        cv_bin = scoring_rules.table('chop.coefficient_variation').bin(cv)
+        score += cv_bin['value']
+        details['volatility_status'] = cv_bin['label']
+        
+        # Informational trend/chop gauges
+        for key in ('choppiness_index', 'efficiency_ratio', 'volume_ratio'):
+            if metrics.get(key) is not None:
+                details[key] = round(metrics[key], 3)
+        
+        # Normalize to 0-10
+        normalized_score = min(10.0, max(0.0, score))
+        details['score'] = round(normalized_score, 2)
+        
+        # Interpretation
+        details['interpretation'] = scoring_rules.table('chop.interpretation').bin(normalized_score)['label']
+        
+        return normalized_score, details
 
 
 class ResistanceProximityScorer:
@@ -215,7 +206,9 @@ class ResistanceProximityScorer:
         self,
         current_price: float,
         high_history: List[float],
-        low_history: List[float]
+        low_history: List[float],
+        levels: Optional[LevelIndex] = None,
+        ranges: Optional[RangeIndex] = None
     ) -> Tuple[float, Dict]:
         """
         Calculate resistance proximity score (0-10, higher = closer to levels)
@@ -224,26 +217,48 @@ class ResistanceProximityScorer:
             current_price: Current market price
             high_history: Recent highs
             low_history: Recent lows
+            levels: Session support/resistance levels; the 20-bar high/low
+                is used on a side without one
+            ranges: Range index ending at the latest bar (built from the
+                histories if not given)
             
         Returns:
             Tuple of (score, details)
         """
         try:
-            score = 0.0
             details = {}
             
-            if len(high_history) < 20 or len(low_history) < 20:
+            if len(high_history) < STRUCTURE_WINDOW or len(low_history) < STRUCTURE_WINDOW:
                 return 5.0, {"error": "Insufficient data"}
             
-            highs = np.array(high_history[-20:])
-            lows = np.array(low_history[-20:])
+            # Nearest level on each side (20-bar high/low without one)
+            resistance, support, resistance_level, support_level = sr_bounds(
+                current_price, high_history, low_history, levels, ranges
+            )
+            if resistance_level is not None:
+                details['resistance_kinds'] = sorted(resistance_level['kinds'])
+            if support_level is not None:
+                details['support_kinds'] = sorted(support_level['kinds'])
+            return self.score_bounds(current_price, resistance, support, details)
             
-            # Identify key resistance (max high)
-            resistance = np.max(highs)
+        except Exception as e:
+            logger.error(f"Error calculating resistance proximity: {e}", exc_info=True)
+            return 5.0, {"error": str(e)}
+    
+    def score_bounds(
+        self,
+        current_price: float,
+        resistance: float,
+        support: float,
+        details: Optional[Dict] = None
+    ) -> Tuple[float, Dict]:
+        """
+        Score proximity to already-located resistance and support
+        (used by batch callers that track the levels themselves)
+        """
+        try:
+            details = details if details is not None else {}
             details['resistance'] = round(resistance, 2)
-            
-            # Identify key support (min low)
-            support = np.min(lows)
             details['support'] = round(support, 2)
             
             # Calculate distance from resistance
@@ -266,22 +281,10 @@ class ResistanceProximityScorer:
             min_distance = min(resistance_distance_pct, support_distance_pct)
             details['min_distance_pct'] = round(min_distance, 3)
             
-            if min_distance < 0.5:  # Within 0.5%
-                score = 9.0
-                details['proximity_status'] = 'very_close'
-                details['interpretation'] = 'Extreme risk - At key level'
-            elif min_distance < 1.0:  # Within 1%
-                score = 7.0
-                details['proximity_status'] = 'close'
-                details['interpretation'] = 'High risk - Near key level'
-            elif min_distance < 1.5:  # Within 1.5%
-                score = 5.0
-                details['proximity_status'] = 'moderate'
-                details['interpretation'] = 'Moderate risk - Approaching level'
-            else:
-                score = 2.0
-                details['proximity_status'] = 'far'
-                details['interpretation'] = 'Low risk - Away from levels'
+            proximity_bin = scoring_rules.table('resistance.min_distance_pct').bin(min_distance)
+            score = proximity_bin['value']
+            details['proximity_status'] = proximity_bin['label']
+            details['interpretation'] = proximity_bin['interpretation']
             
             details['score'] = round(score, 2)
             return score, details
@@ -443,24 +446,46 @@ class NoTradeScorer:
         low_history: List[float],
         volatility_details: Optional[Dict] = None,
         timestamp: Optional[datetime] = None,
-        consecutive_losses: int = 0
+        consecutive_losses: int = 0,
+        volume_history: Optional[List[float]] = None,
+        chop_state: Optional[RollingChopState] = None,
+        risk_mode: Optional[str] = None,
+        levels: Optional[LevelIndex] = None,
+        ranges: Optional[RangeIndex] = None
     ) -> Dict:
         """
         Calculate complete no-trade score
         
+        Args:
+            volume_history: Recent volumes, aligned with price_history
+            chop_state: Incremental chop state kept by the caller; used
+                instead of re-reading the price lists when given
+            risk_mode: Risk mode whose time-of-day windows apply
+            levels: Session support/resistance levels for the proximity scorer
+            ranges: Range index ending at the latest bar, shared by the chop
+                and proximity scorers (built once from the histories if not given)
+        
         Returns:
             Dictionary with no_trade_score, components, and interpretation
         """
         try:
             start_time = datetime.now()
+            scoring_rules.refresh()
+            rules_version = scoring_rules.version
+            
+            if ranges is None and high_history:
+                ranges = RangeIndex(high_history, low_history)
             
             # Calculate individual scores
-            time_risk, time_details = self.time_risk_scorer.score(timestamp)
-            chop_score, chop_details = self.chop_detector.score(
-                price_history, high_history, low_history
-            )
+            time_risk, time_details = self.time_risk_scorer.score(timestamp, risk_mode)
+            if chop_state is not None:
+                chop_score, chop_details = self.chop_detector.score_state(chop_state)
+            else:
+                chop_score, chop_details = self.chop_detector.score(
+                    price_history, high_history, low_history, volume_history, ranges
+                )
             resistance_score, resistance_details = self.resistance_proximity_scorer.score(
-                current_price, high_history, low_history
+                current_price, high_history, low_history, levels, ranges
             )
             volatility_compression, vol_comp_details = self.volatility_compression_scorer.score(
                 volatility_details
@@ -531,6 +556,7 @@ class NoTradeScorer:
                 'components': components,
                 'interpretation': interpretation,
                 'risk_level': risk_level,
+                'rules_version': rules_version,
                 'evaluation_time_seconds': round(evaluation_time, 4)
             }
             
@@ -0,0 +1,614 @@
+"""
+Parameter Sweep
+Evaluates grids or random samples of SetupScorer/NoTradeScorer weights and
+TradeGateConfig thresholds over archived sessions, in parallel processes.
+
+Per-bar component scores are computed once (setup components through the
+replay/batch scorer, no-trade components through the real scorers) and
+written as .npy files that every worker memory-maps, so a configuration
+only costs the weighted sum, the gate and the trade simulation.
+
+Usage (from services/quant-engine):
+    python -m app.param_sweep --symbol NIFTY --random 500 --mode BALANCED
+    python -m app.param_sweep --symbol NIFTY --grid sweep.json --workers 8
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import partial
+from typing import Dict, List, Optional
+import argparse
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.backtest import BarArchive, BacktestEngine
+from app.batch_scoring import COMPONENTS, COL as REPLAY_COL, _py_round
+from app.replay import ScoreReplayer
+from app.chop_state import RollingChopState
+from app.levels import SessionLevels
+from app.time_risk import CATEGORIES as TIME_RISK_CATEGORIES, time_risk_table
+from app.scoring import SetupScorer, atr_metrics
+from app.scoring_rules import scoring_rules
+from app.no_trade_scoring import (
+    NoTradeScorer, ChopDetector, ResistanceProximityScorer,
+    VolatilityCompressionScorer, ConsecutiveLossGuard
+)
+from app.session_profile import SessionVolumeProfile
+from app.composite_profile import DailyProfile, DailyProfileStore
+from app.volume_profile import breakout_context, breakout_feature_series, detect_series
+from app.trading_gate import TradingGate, TradeGateConfig, RiskMode
+
+logger = logging.getLogger(__name__)
+
+NO_TRADE_COMPONENTS = (
+    'time_risk', 'chop_detection', 'resistance_proximity', 'volatility_compression', 'consecutive_loss'
+)
+
+REGIMES = ('NORMAL', 'COMPRESSION', 'EXPANSION', 'UNKNOWN')
+TIME_CATEGORIES = ('OPENING_NOISE', 'CHOP_HOUR', 'LATE_SESSION', 'PRIME_TIME', 'MARKET_CLOSED', 'UNKNOWN')
+
+# Per decision bar (one row per completed bar)
+FEATURE_COLUMNS = (
+    tuple(f'setup_{name}' for name in COMPONENTS)
+    + tuple(f'nt_{name}' for name in NO_TRADE_COMPONENTS[:-1])
+    + (
+        'bias',            # 1 BULLISH, -1 BEARISH, 0 NEUTRAL
+        'regime',          # index into REGIMES
+        'time_category',   # index into TIME_CATEGORIES
+        'fake_breakout',   # 1 if FakeBreakoutDetector flags risk
+        'atr',             # NaN when ATR is not available yet
+        'price',
+        'fill_minute',     # 1m row where an order placed at this bar fills (-1: none)
+        'session_end',     # last 1m row of the session
+    )
+)
+COL = {name: idx for idx, name in enumerate(FEATURE_COLUMNS)}
+
+# Per 1-minute bar
+MINUTE_COLUMNS = ('open', 'high', 'low', 'close')
+
+# Worker state (memory-mapped arrays, loaded once per process)
+_features: Optional[np.ndarray] = None
+_minutes: Optional[np.ndarray] = None
+
+
+# ============================================================================
+# Feature building (once per sweep)
+# ============================================================================
+
+def build_features(
+    archive: BarArchive,
+    symbol: str,
+    days: List,
+    timeframe: str = "5m",
+    fake_breakout: bool = True,
+    mode: Optional[str] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Compute per-bar component scores for every archived session
+
+    Args:
+        archive: Local bar archive
+        symbol: Symbol to load
+        days: Session dates
+        timeframe: Decision timeframe
+        fake_breakout: Label fake breakout risk (with volume profiles) for every bar
+        mode: Risk mode whose time risk windows score the bars (None for the default windows)
+
+    Returns:
+        Dict with 'features', 'minutes' and 'risk_mode' arrays
+    """
+    bar_minutes = int(timeframe.rstrip('m'))
+    replayer = ScoreReplayer()
+    chop_detector = ChopDetector()
+    proximity_scorer = ResistanceProximityScorer()
+    compression_scorer = VolatilityCompressionScorer()
+
+    # Carried across sessions so each day sees the prior day's levels
+    levels = SessionLevels(
+        tick_size=settings.levels_tick_size,
+        merge_ticks=settings.levels_merge_ticks,
+        pivot_bars=settings.levels_pivot_bars,
+        opening_range_minutes=settings.levels_opening_range_minutes
+    )
+
+    # Finished sessions, for the multi-session composite profile
+    daily_profiles = DailyProfileStore(
+        cache_size=settings.composite_profile_cache_size,
+        value_area_percent=settings.volume_profile_value_area_percent
+    )
+    profile_days = []
+
+    feature_rows = []
+    minute_blocks = []
+    offset = 0
+
+    for day in days:
+        try:
+            minutes = archive.load_bars(symbol, day)
+            oi_snapshots = archive.load_oi_snapshots(symbol, day)
+        except Exception as e:
+            logger.error(f"Skipping {symbol} {day}: {e}")
+            continue
+        if minutes.empty:
+            continue
+
+        bars = minutes.resample(f'{bar_minutes}min').agg({
+            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+        }).dropna()
+        replay_features = replayer.build_features(bars, oi_snapshots, bar_minutes, levels=levels)
+        scored = replayer.batch_scorer.score(replay_features)
+
+        # Last 1m row of each decision bar; orders fill on the row after it
+        groups = minutes.index.floor(f'{bar_minutes}min')
+        last_rows = pd.Series(np.arange(len(minutes)), index=groups).groupby(level=0).max()
+        session_end = offset + len(minutes) - 1
+
+        closes = bars['close'].tolist()
+        highs = bars['high'].tolist()
+        lows = bars['low'].tolist()
+        volumes = bars['volume'].tolist()
+        chop_state = RollingChopState()
+        session_profile = SessionVolumeProfile(
+            tick_size=settings.volume_profile_tick_size,
+            bin_ticks=settings.volume_profile_bin_ticks,
+            value_area_percent=settings.volume_profile_value_area_percent
+        )
+        profiled = 0  # 1m rows absorbed into the session profile
+        composite = daily_profiles.composite(symbol, profile_days[-settings.composite_profile_sessions:])
+        minute_highs = minutes['high'].tolist()
+        minute_lows = minutes['low'].tolist()
+        minute_volumes = minutes['volume'].tolist()
+        minute_times = minutes.index.to_pydatetime()
+        time_codes, time_scores = time_risk_table.lookup_series(
+            bars.index + pd.Timedelta(minutes=bar_minutes), mode
+        )
+        expansion = replay_features[:, REPLAY_COL['atr_expansion']]
+        # Regime labels from the same table VolatilityScorer classifies with
+        regime_table = scoring_rules.table('volatility.atr_expansion_pct')
+        regimes = np.array([b['label'] for b in regime_table.bins], dtype=object)[regime_table.indices(expansion)]
+        resistance = replay_features[:, REPLAY_COL['recent_high']]
+        support = replay_features[:, REPLAY_COL['recent_low']]
+        contexts = []  # OI/profile features per bar for the fake breakout labels
+        session_rows = []
+
+        for i, ts in enumerate(bars.index):
+            row = np.full(len(FEATURE_COLUMNS), np.nan)
+            for name in COMPONENTS:
+                row[COL[f'setup_{name}']] = scored[f'{name}_score'][i]
+            row[COL['bias']] = scored['bias_code'][i]
+
+            bar_close = ts.to_pydatetime() + timedelta(minutes=bar_minutes)
+            chop_state.push(highs[i], lows[i], closes[i], volumes[i])
+            chop_score, _ = chop_detector.score_state(chop_state)
+            if i >= 19:
+                proximity_score, _ = proximity_scorer.score_bounds(closes[i], resistance[i], support[i])
+            else:
+                proximity_score = 5.0  # Insufficient data, like ResistanceProximityScorer.score
+
+            # Same details VolatilityScorer hands to the compression scorer
+            if np.isnan(expansion[i]):
+                volatility_details = {'regime': 'UNKNOWN'}
+            else:
+                volatility_details = {'regime': regimes[i], 'atr_expansion_pct': round(expansion[i], 2)}
+            compression_score, _ = compression_scorer.score(volatility_details)
+
+            row[COL['nt_time_risk']] = round(float(time_scores[i]), 2)
+            row[COL['nt_chop_detection']] = round(chop_score, 2)
+            row[COL['nt_resistance_proximity']] = round(proximity_score, 2)
+            row[COL['nt_volatility_compression']] = round(compression_score, 2)
+            row[COL['regime']] = REGIMES.index(volatility_details['regime'])
+            row[COL['time_category']] = TIME_CATEGORIES.index(TIME_RISK_CATEGORIES[time_codes[i]])
+
+            if fake_breakout:
+                for m in range(profiled, int(last_rows.loc[ts]) + 1):
+                    session_profile.add_bar(minute_times[m], minute_highs[m], minute_lows[m], minute_volumes[m])
+                profiled = max(profiled, int(last_rows.loc[ts]) + 1)
+                contexts.append(breakout_context(
+                    _as_of(oi_snapshots, bar_close),
+                    session_profile.snapshot(closes[i]),
+                    composite.snapshot(closes[i], distribution=False) if composite else None
+                ))
+            row[COL['fake_breakout']] = 0.0
+
+            metrics = atr_metrics(bars.iloc[max(0, i - 40):i + 1])
+            row[COL['atr']] = metrics[0] if metrics else np.nan
+            row[COL['price']] = closes[i]
+            last = offset + int(last_rows.loc[ts])
+            row[COL['fill_minute']] = last + 1 if last < session_end else -1
+            row[COL['session_end']] = session_end
+            session_rows.append(row)
+
+        if fake_breakout:
+            # Label the whole session at once from its bar features
+            breakout_features = breakout_feature_series(bars, rsi=replay_features[:, REPLAY_COL['rsi']])
+            for name in contexts[0]:
+                breakout_features[name] = np.array([context[name] for context in contexts])
+            labels = detect_series(breakout_features)['is_fake_breakout']
+            for row, label in zip(session_rows, labels.tolist()):
+                row[COL['fake_breakout']] = float(label)
+        feature_rows.extend(session_rows)
+
+        if fake_breakout:
+            for m in range(profiled, len(minutes)):
+                session_profile.add_bar(minute_times[m], minute_highs[m], minute_lows[m], minute_volumes[m])
+            daily = DailyProfile.from_session(symbol, session_profile)
+            if daily is not None:
+                daily_profiles.add(daily)
+                profile_days.append(daily.day)
+
+        minute_blocks.append(minutes[list(MINUTE_COLUMNS)].to_numpy(dtype=np.float64))
+        offset += len(minutes)
+
+    if not feature_rows:
+        return {
+            'features': np.empty((0, len(FEATURE_COLUMNS))),
+            'minutes': np.empty((0, len(MINUTE_COLUMNS))),
+            'risk_mode': np.array(mode or '')
+        }
+    return {
+        'features': np.vstack(feature_rows),
+        'minutes': np.vstack(minute_blocks),
+        'risk_mode': np.array(mode or '')
+    }
+
+
+def _as_of(snapshots, timestamp):
+    latest = None
+    for ts, analysis in snapshots:
+        if ts > timestamp:
+            break
+        latest = analysis
+    return latest
+
+
+def save_features(arrays: Dict[str, np.ndarray], directory: str) -> None:
+    """Write feature arrays for workers to memory-map"""
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+
+
+# ============================================================================
+# Configurations
+# ============================================================================
+
+def baseline_config(mode: RiskMode) -> Dict:
+    """The hand-set constants currently in the code"""
+    return {
+        'mode': mode.value,
+        'setup_weights': dict(SetupScorer().weights),
+        'no_trade_weights': dict(NoTradeScorer().weights),
+        'setup_threshold': TradeGateConfig.SETUP_THRESHOLDS[mode],
+        'no_trade_threshold': TradeGateConfig.NO_TRADE_THRESHOLDS[mode]
+    }
+
+
+def _normalize(weights: Dict[str, float]) -> Dict[str, float]:
+    total = sum(weights.values())
+    return {k: round(v / total, 4) for k, v in weights.items()} if total > 0 else weights
+
+
+def grid_configs(spec: Dict, mode: RiskMode, normalize: bool = True) -> List[Dict]:
+    """
+    Cartesian product of a grid spec
+
+    Spec keys (all optional, missing ones keep the baseline):
+        setup_weights: {component: [values]}
+        no_trade_weights: {component: [values]}
+        setup_threshold: [values]
+        no_trade_threshold: [values]
+    """
+    base = baseline_config(mode)
+    axes = []
+    for group in ('setup_weights', 'no_trade_weights'):
+        for name, values in spec.get(group, {}).items():
+            axes.append(((group, name), values))
+    for key in ('setup_threshold', 'no_trade_threshold'):
+        if key in spec:
+            axes.append(((key, None), spec[key]))
+
+    configs = []
+    for combo in itertools.product(*[values for _, values in axes]):
+        config = json.loads(json.dumps(base))
+        for ((key, name), _), value in zip(axes, combo):
+            if name is None:
+                config[key] = value
+            else:
+                config[key][name] = value
+        if normalize:
+            config['setup_weights'] = _normalize(config['setup_weights'])
+            config['no_trade_weights'] = _normalize(config['no_trade_weights'])
+        configs.append(config)
+    return configs
+
+
+def random_configs(
+    count: int,
+    mode: RiskMode,
+    seed: int = 0,
+    concentration: float = 20.0,
+    setup_range=(5.0, 8.5),
+    no_trade_range=(3.0, 7.5)
+) -> List[Dict]:
+    """
+    Random configurations around the baseline
+
+    Weights are drawn from a Dirichlet centred on the current weights
+    (higher concentration = closer to baseline); thresholds are uniform.
+    """
+    rng = np.random.default_rng(seed)
+    base = baseline_config(mode)
+    configs = []
+    for _ in range(count):
+        config = {'mode': mode.value}
+        for group in ('setup_weights', 'no_trade_weights'):
+            names = list(base[group])
+            alpha = np.array([base[group][n] for n in names]) * concentration
+            draw = rng.dirichlet(alpha)
+            config[group] = {n: round(float(w), 4) for n, w in zip(names, draw)}
+        config['setup_threshold'] = round(float(rng.uniform(*setup_range)), 2)
+        config['no_trade_threshold'] = round(float(rng.uniform(*no_trade_range)), 2)
+        configs.append(config)
+    return configs
+
+
+# ============================================================================
+# Evaluation (workers)
+# ============================================================================
+
+def _init_worker(directory: str) -> None:
+    global _features, _minutes
+    logging.disable(logging.ERROR)
+    _features = np.load(os.path.join(directory, 'features.npy'), mmap_mode='r')
+    _minutes = np.load(os.path.join(directory, 'minutes.npy'), mmap_mode='r')
+
+
+def _weighted_total(features: np.ndarray, prefix: str, names, weights: Dict[str, float]) -> np.ndarray:
+    """Weighted sum with the scorers' rounding (component to 4dp, summed in order)"""
+    total = np.zeros(len(features))
+    for name in names:
+        total = total + _py_round(features[:, COL[f'{prefix}{name}']] * weights[name], 4)
+    return total
+
+
+def evaluate_config(
+    config: Dict,
+    stop_atr_multiple: float = 1.0,
+    target_r_multiple: float = 2.0,
+    max_hold_minutes: int = 60,
+    cost_points: float = 0.0
+) -> Dict:
+    """
+    Simulate one configuration over the shared feature arrays
+
+    Entries fill at the next 1m open after a decision bar; exits on stop,
+    target, time stop, bias flip or session end, like the backtester.
+    """
+    f, minutes = _features, _minutes
+    mode = RiskMode[config['mode']]
+
+    gate = TradingGate(mode, config['setup_threshold'], config['no_trade_threshold'])
+    loss_guard = ConsecutiveLossGuard()
+    loss_weight = config['no_trade_weights']['consecutive_loss']
+
+    setup = _py_round(_weighted_total(f, 'setup_', COMPONENTS, config['setup_weights']), 2)
+    no_trade_base = _weighted_total(f, 'nt_', NO_TRADE_COMPONENTS[:-1], config['no_trade_weights'])
+    bias = f[:, COL['bias']].astype(int)
+    fill = f[:, COL['fill_minute']].astype(int)
+    session_end = f[:, COL['session_end']].astype(int)
+    regimes = np.array(REGIMES, dtype=object)[f[:, COL['regime']].astype(int)]
+    time_categories = np.array(TIME_CATEGORIES, dtype=object)[f[:, COL['time_category']].astype(int)]
+    fake_breakouts = f[:, COL['fake_breakout']] != 0
+
+    # The gate over every bar at once, per consecutive-loss score (few levels)
+    allowed_by_loss_score = {}
+
+    def allowed_at(consecutive_losses: int) -> np.ndarray:
+        loss_score, _ = loss_guard.score(consecutive_losses)
+        if loss_score not in allowed_by_loss_score:
+            no_trade = _py_round(no_trade_base + round(loss_score * loss_weight, 4), 2)
+            allowed_by_loss_score[loss_score] = gate.evaluate_series(
+                setup, no_trade, regimes, time_categories, fake_breakouts
+            )['trade_allowed']
+        return allowed_by_loss_score[loss_score]
+
+    trades = []
+    consecutive_losses = 0
+    row = 0
+    n = len(f)
+    while row < n:
+        direction = bias[row]
+        if direction == 0 or fill[row] < 0:
+            row += 1
+            continue
+
+        if not allowed_at(consecutive_losses)[row]:
+            row += 1
+            continue
+
+        entry = fill[row]
+        entry_price = float(minutes[entry, 0])
+        atr = f[row, COL['atr']]
+        risk = atr * stop_atr_multiple if not np.isnan(atr) else f[row, COL['price']] * 0.002
+        stop = entry_price - direction * risk
+        target = entry_price + direction * risk * target_r_multiple
+
+        # Earliest exit: time stop / bias flip (at the next open) or session end
+        last = min(session_end[row], entry + max_hold_minutes)
+        exit_reason, exit_at = ('TIME', last) if last < session_end[row] else ('SESSION_END', last)
+        flip_row = row + 1
+        while flip_row < n and session_end[flip_row] == session_end[row] and fill[flip_row] >= 0 \
+                and fill[flip_row] <= exit_at:
+            if bias[flip_row] == -direction:
+                exit_reason, exit_at = 'BIAS_FLIP', fill[flip_row]
+                break
+            flip_row += 1
+
+        # Stop/target inside [entry, exit_at) - stop first within a bar
+        window = minutes[entry:exit_at + 1] if exit_reason == 'SESSION_END' else minutes[entry:exit_at]
+        if direction > 0:
+            stop_hits = np.flatnonzero(window[:, 2] <= stop)
+            target_hits = np.flatnonzero(window[:, 1] >= target)
+        else:
+            stop_hits = np.flatnonzero(window[:, 1] >= stop)
+            target_hits = np.flatnonzero(window[:, 2] <= target)
+        first_stop = stop_hits[0] if len(stop_hits) else len(window)
+        first_target = target_hits[0] if len(target_hits) else len(window)
+
+        if first_stop <= first_target and first_stop < len(window):
+            exit_price, exit_reason, exit_row = stop, 'STOP', entry + first_stop
+        elif first_target < len(window):
+            exit_price, exit_reason, exit_row = target, 'TARGET', entry + first_target
+        elif exit_reason == 'SESSION_END':
+            exit_price, exit_row = float(minutes[exit_at, 3]), exit_at
+        else:
+            exit_price, exit_row = float(minutes[exit_at, 0]), exit_at
+
+        pnl = (exit_price - entry_price) * direction - cost_points
+        trades.append({
+            'pnl_points': round(pnl, 2),
+            'r_multiple': round(pnl / risk, 3) if risk > 0 else 0.0,
+            'exit_reason': exit_reason
+        })
+        consecutive_losses = consecutive_losses + 1 if pnl < 0 else 0
+
+        # Resume with the first decision bar whose order would fill after the exit
+        row += 1
+        while row < n and 0 <= fill[row] <= exit_row:
+            row += 1
+
+    summary = BacktestEngine.summarize(trades)
+    summary.pop('exit_reasons')
+    return {'config': config, **summary}
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+def run_sweep(
+    configs: List[Dict],
+    feature_dir: str,
+    workers: Optional[int] = None,
+    **simulation
+) -> List[Dict]:
+    """Evaluate configurations in parallel over memory-mapped features"""
+    evaluate = partial(evaluate_config, **simulation)
+    chunksize = max(1, len(configs) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(feature_dir,)) as pool:
+        return list(pool.map(evaluate, configs, chunksize=chunksize))
+
+
+def rank_results(results: List[Dict], metric: str = 'expectancy_r', min_trades: int = 20) -> pd.DataFrame:
+    """Flatten results into a table ranked by `metric` (configs below min_trades last)"""
+    rows = []
+    for i, result in enumerate(results):
+        config = result['config']
+        row = {
+            'config_id': i,
+            'mode': config['mode'],
+            'setup_threshold': config['setup_threshold'],
+            'no_trade_threshold': config['no_trade_threshold']
+        }
+        row.update({f'w_{k}': v for k, v in config['setup_weights'].items()})
+        row.update({f'nt_w_{k}': v for k, v in config['no_trade_weights'].items()})
+        row.update({k: v for k, v in result.items() if k != 'config'})
+        rows.append(row)
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table['eligible'] = table['trades'] >= min_trades
+    table = table.sort_values(['eligible', metric], ascending=[False, False], na_position='last')
+    table.insert(0, 'rank', range(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sweep scoring weights and gate thresholds")
+    parser.add_argument('--data-dir', default=settings.backtest_data_dir)
+    parser.add_argument('--symbol', default='NIFTY')
+    parser.add_argument('--from', dest='start', type=lambda s: pd.Timestamp(s).date())
+    parser.add_argument('--to', dest='end', type=lambda s: pd.Timestamp(s).date())
+    parser.add_argument('--timeframe', default='5m')
+    parser.add_argument('--mode', default='BALANCED', choices=[m.value for m in RiskMode])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--grid', help="JSON grid spec (see grid_configs)")
+    source.add_argument('--random', type=int, help="Number of random configurations")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-normalize', action='store_true', help="Keep grid weights as given")
+    parser.add_argument('--no-fake-breakout', action='store_true', help="Skip per-bar fake breakout detection")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--metric', default='expectancy_r')
+    parser.add_argument('--min-trades', type=int, default=20)
+    parser.add_argument('--stop-atr', type=float, default=1.0)
+    parser.add_argument('--target-r', type=float, default=2.0)
+    parser.add_argument('--max-hold', type=int, default=60)
+    parser.add_argument('--cost', type=float, default=0.0)
+    parser.add_argument('--features-dir', help="Reuse/keep feature arrays in this directory")
+    parser.add_argument('--output', default='sweep_results.csv')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    mode = RiskMode[args.mode]
+    archive = BarArchive(args.data_dir)
+
+    if args.grid:
+        with open(args.grid) as f:
+            configs = grid_configs(json.load(f), mode, normalize=not args.no_normalize)
+    else:
+        configs = random_configs(args.random, mode, seed=args.seed)
+    configs.insert(0, baseline_config(mode))
+
+    feature_dir = args.features_dir or tempfile.mkdtemp(prefix='sweep_features_')
+    start = time.perf_counter()
+    if not os.path.exists(os.path.join(feature_dir, 'features.npy')):
+        days = archive.sessions(args.symbol, args.start, args.end)
+        if not days:
+            parser.error(f"No archived sessions for {args.symbol} in {args.data_dir}")
+        arrays = build_features(archive, args.symbol, days, args.timeframe, not args.no_fake_breakout, mode.value)
+        save_features(arrays, feature_dir)
+    else:
+        # Time risk and time category depend on the mode's windows
+        mode_file = os.path.join(feature_dir, 'risk_mode.npy')
+        built_for = str(np.load(mode_file)) if os.path.exists(mode_file) else ''
+        if built_for != mode.value:
+            parser.error(f"Features in {feature_dir} were built for mode {built_for or 'default'}, not {mode.value}")
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        results = run_sweep(
+            configs, feature_dir, args.workers,
+            stop_atr_multiple=args.stop_atr,
+            target_r_multiple=args.target_r,
+            max_hold_minutes=args.max_hold,
+            cost_points=args.cost
+        )
+    finally:
+        if not args.features_dir:
+            shutil.rmtree(feature_dir, ignore_errors=True)
+    sweep_seconds = time.perf_counter() - start
+
+    table = rank_results(results, args.metric, args.min_trades)
+    table.to_csv(args.output, index=False)
+
+    print(f"Features: {build_seconds:.1f}s")
+    print(f"Sweep: {len(configs)} configs in {sweep_seconds:.1f}s ({len(configs) / sweep_seconds:.1f} configs/s)")
+    columns = ['rank', 'config_id', 'setup_threshold', 'no_trade_threshold', 'trades', 'hit_rate',
+               'expectancy_points', 'expectancy_r', 'max_drawdown_points']
+    print(table[columns].head(10).to_string(index=False))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Range-Extreme Index
+Sparse tables of bar highs and lows answering "highest high / lowest low
+over any window" in O(1). Bars are appended (and the still-forming last bar
+replaced) in O(log n), so one index per symbol/timeframe is kept current
+from the fetched bars and shared by every scorer that needs window
+extremes, with the same window semantics everywhere.
+"""
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Window lengths (in bars, ending at the latest bar) used by the scorers
+STRUCTURE_WINDOW = 20
+RECENT_WINDOW = 5
+
+
+class SparseTable:
+    """
+    Idempotent range query (max or min) over an append-only sequence
+
+    rows[k][i] holds op(values[i:i + 2**k]); a query covers [start, stop)
+    with two overlapping power-of-two blocks.
+    """
+
+    def __init__(self, op: Callable[[float, float], float], np_op: Callable, values: Iterable[float] = ()):
+        self.op = op
+        self.np_op = np_op
+        self.rows: List[List[float]] = [[]]
+        self.extend(values)
+
+    def __len__(self) -> int:
+        return len(self.rows[0])
+
+    def extend(self, values: Iterable[float]) -> None:
+        values = np.asarray(list(values), dtype=np.float64)
+        if len(self) > 0 or len(values) == 0:
+            for value in values.tolist():
+                self.append(value)
+            return
+
+        # Bulk build: each level combines two halves of the one below
+        rows = [values]
+        half = 1
+        while 2 * half <= len(values):
+            previous = rows[-1]
+            rows.append(self.np_op(previous[:-half], previous[half:]))
+            half *= 2
+        self.rows = [row.tolist() for row in rows]
+
+    def append(self, value: float) -> None:
+        value = float(value)
+        self.rows[0].append(value)
+        n = len(self.rows[0])
+        k = 1
+        while (1 << k) <= n:
+            if k == len(self.rows):
+                self.rows.append([])
+            half = 1 << (k - 1)
+            i = n - (1 << k)
+            self.rows[k].append(self.op(self.rows[k - 1][i], self.rows[k - 1][i + half]))
+            k += 1
+
+    def set_last(self, value: float) -> None:
+        """Replace the last value (a bar that is still forming)"""
+        self.rows[0][-1] = float(value)
+        n = len(self.rows[0])
+        for k in range(1, len(self.rows)):
+            if (1 << k) > n:
+                break
+            half = 1 << (k - 1)
+            i = n - (1 << k)
+            self.rows[k][-1] = self.op(self.rows[k - 1][i], self.rows[k - 1][i + half])
+
+    def query(self, start: int, stop: int) -> float:
+        k = (stop - start).bit_length() - 1
+        row = self.rows[k]
+        return self.op(row[start], row[stop - (1 << k)])
+
+
+class RangeIndex:
+    """
+    Highest high / lowest low over any window of a bar series
+
+    Windows are counted in bars ending at the latest bar (or at `end`) and
+    are clipped to the bars available, so window=20 over 12 bars covers
+    all 12.
+    """
+
+    def __init__(self, highs: Iterable[float] = (), lows: Iterable[float] = ()):
+        self.highs = SparseTable(max, np.maximum, highs)
+        self.lows = SparseTable(min, np.minimum, lows)
+
+    def __len__(self) -> int:
+        return len(self.highs)
+
+    @classmethod
+    def from_bars(cls, bars: pd.DataFrame) -> 'RangeIndex':
+        return cls(bars['high'].to_numpy(), bars['low'].to_numpy())
+
+    def append(self, high: float, low: float) -> None:
+        self.highs.append(high)
+        self.lows.append(low)
+
+    def set_last(self, high: float, low: float) -> None:
+        self.highs.set_last(high)
+        self.lows.set_last(low)
+
+    def _bounds(self, window: int, end: Optional[int]) -> Tuple[int, int]:
+        stop = len(self) if end is None else int(end)
+        if stop <= 0:
+            raise ValueError("RangeIndex is empty")
+        return max(0, stop - int(window)), stop
+
+    def high(self, window: int = STRUCTURE_WINDOW, end: Optional[int] = None) -> float:
+        """Highest high of the `window` bars ending before `end` (default: latest)"""
+        return self.highs.query(*self._bounds(window, end))
+
+    def low(self, window: int = STRUCTURE_WINDOW, end: Optional[int] = None) -> float:
+        """Lowest low of the `window` bars ending before `end` (default: latest)"""
+        return self.lows.query(*self._bounds(window, end))
+
+    def range(self, window: int = STRUCTURE_WINDOW, end: Optional[int] = None) -> float:
+        return self.high(window, end) - self.low(window, end)
+
+
+def range_index_for(
+    high_history: List[float],
+    low_history: List[float],
+    ranges: Optional[RangeIndex] = None
+) -> RangeIndex:
+    """The caller's index (must end at the same bar as the histories) or one built from them"""
+    return ranges if ranges is not None else RangeIndex(high_history, low_history)
+
+
+class RangeEngine:
+    """Range index per symbol/timeframe, kept current from the fetched bars"""
+
+    def __init__(self, max_bars: int = 2000):
+        """
+        Args:
+            max_bars: Bars kept per index (older bars are dropped in bulk
+                once twice this many have accumulated)
+        """
+        self.max_bars = max_bars
+        self._indexes: Dict[Tuple[str, str], RangeIndex] = {}
+        self._times: Dict[Tuple[str, str], List[datetime]] = {}
+
+    def update(self, symbol: str, timeframe: str, bars: pd.DataFrame) -> Optional[RangeIndex]:
+        """
+        Bring the index up to date with a freshly fetched frame
+
+        New bars are appended and a re-fetched last bar (still forming when
+        last seen) is replaced, so the index ends at the frame's last bar.
+        """
+        key = (symbol, timeframe)
+        try:
+            if bars is None or len(bars) == 0:
+                return self._indexes.get(key)
+            times = self._times.get(key)
+            index = self._indexes.get(key)
+            frame_times = bars.index.to_pydatetime().tolist()
+
+            if index is None or frame_times[-1] < times[-1]:
+                tail = bars.iloc[-self.max_bars:]
+                self._indexes[key] = RangeIndex.from_bars(tail)
+                self._times[key] = frame_times[-self.max_bars:]
+                return self._indexes[key]
+
+            highs = bars['high'].to_numpy()
+            lows = bars['low'].to_numpy()
+            start = int(np.searchsorted(bars.index.to_numpy(), np.datetime64(times[-1]), side='left'))
+            if start < len(frame_times) and frame_times[start] == times[-1]:
+                index.set_last(highs[start], lows[start])
+                start += 1
+            for i in range(start, len(frame_times)):
+                index.append(highs[i], lows[i])
+                times.append(frame_times[i])
+
+            if len(index) > 2 * self.max_bars:
+                self._indexes[key] = RangeIndex(
+                    index.highs.rows[0][-self.max_bars:], index.lows.rows[0][-self.max_bars:]
+                )
+                self._times[key] = times[-self.max_bars:]
+            return self._indexes[key]
+        except Exception as e:
+            logger.error(f"Error updating range index for {symbol} {timeframe}: {e}")
+            self._indexes.pop(key, None)
+            self._times.pop(key, None)
+            return None
+
+    def index(self, symbol: str, timeframe: str, last_bar: Optional[datetime] = None) -> Optional[RangeIndex]:
+        """
+        The symbol's index; with `last_bar`, only if it ends at that bar
+        (so it lines up with a frame the caller fetched)
+        """
+        key = (symbol, timeframe)
+        if last_bar is not None and (key not in self._times or self._times[key][-1] != last_bar):
+            return None
+        return self._indexes.get(key)
+
+    def get_status(self) -> Dict:
+        return {
+            f"{symbol}:{timeframe}": {'bars': len(index), 'last_bar': self._times[(symbol, timeframe)][-1].isoformat()}
+            for (symbol, timeframe), index in self._indexes.items()
+        }
+
+
+# Global range engine
+range_engine = RangeEngine()
@@ -0,0 +1,272 @@
+"""
+Intraday Score Replay
+Reconstructs setup_score, market_bias and per-component scores for every
+bar of a session in one pass. Indicators are computed as rolling/expanding
+series, so the row for bar t only uses bars up to t (no lookahead), and
+feeds the vectorized BatchSetupScorer.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import logging
+
+from ta.momentum import RSIIndicator
+
+from app.batch_scoring import BatchSetupScorer, FEATURE_COLUMNS, COL, COMPONENTS
+from app.levels import SessionLevels, level_bounds_series
+
+logger = logging.getLogger(__name__)
+
+_OI_TREND_CODES = {'BULLISH': 1, 'BEARISH': -1, 'NEUTRAL': 0}
+
+
+def _ema(close: pd.Series, period: int) -> np.ndarray:
+    """EMA series; NaN until `period` bars exist (like calculate_ema)"""
+    values = close.ewm(span=period, adjust=False).mean().to_numpy().copy()
+    values[:period - 1] = np.nan
+    return values
+
+
+def _alignment(ema9: np.ndarray, ema20: np.ndarray, ema50: np.ndarray) -> np.ndarray:
+    """EMA alignment codes (NaN EMAs compare False, i.e. 'mixed')"""
+    return np.select(
+        [(ema9 > ema20) & (ema20 > ema50), (ema9 < ema20) & (ema20 < ema50)], [1.0, -1.0], 0.0
+    )
+
+
+def _slope_codes(windows: np.ndarray) -> np.ndarray:
+    """
+    detect_ema_slope over rows of 5 values: least-squares slope vs 0.01.
+    The closed form is used in bulk; rows close to the threshold are
+    re-fitted with np.polyfit so codes match the scalar path exactly.
+    """
+    x = np.arange(5) - 2.0
+    slope = windows @ x / 10.0
+    near = np.abs(np.abs(slope) - 0.01) < 1e-6
+    for i in np.flatnonzero(near):
+        slope[i] = np.polyfit(np.arange(5), windows[i], 1)[0]
+    return np.select([slope > 0.01, slope < -0.01], [1.0, -1.0], 0.0)
+
+
+class ScoreReplayer:
+    """
+    Replays a session of bars through the setup-score logic
+
+    Equivalent to calling SetupScorer.calculate_setup_score on every bar
+    prefix with the indicators IndicatorService.calculate_indicators would
+    produce for that prefix. By default no 15m EMA context is supplied,
+    matching the scheduler; pass higher_timeframe_minutes to score trend.
+    """
+
+    def __init__(self, batch_scorer: Optional[BatchSetupScorer] = None):
+        self.batch_scorer = batch_scorer or BatchSetupScorer()
+
+    def build_features(
+        self,
+        bars: pd.DataFrame,
+        oi_snapshots: Optional[List[Tuple[datetime, Dict]]] = None,
+        bar_minutes: int = 5,
+        higher_timeframe_minutes: Optional[int] = None,
+        levels: Optional[SessionLevels] = None
+    ) -> np.ndarray:
+        """
+        Build the (bars x FEATURE_COLUMNS) matrix without lookahead
+
+        Args:
+            bars: DataFrame indexed by bar open time with open/high/low/close/volume
+            oi_snapshots: Optional recorded (timestamp, oi_analysis) pairs
+            bar_minutes: Bar length, used to find each bar's close time
+            higher_timeframe_minutes: Score trend against this higher timeframe
+                (e.g. 15), built from the bars seen so far
+            levels: Support/resistance levels carried over from earlier
+                sessions (prior-day levels); the bars are pushed into it
+
+        Returns:
+            Feature matrix, one row per bar
+        """
+        n = len(bars)
+        f = np.full((n, len(FEATURE_COLUMNS)), np.nan)
+        close = bars['close'].astype(float)
+        high = bars['high'].astype(float).to_numpy()
+        low = bars['low'].astype(float).to_numpy()
+        volume = bars['volume'].astype(float).to_numpy()
+        c = close.to_numpy()
+        n_bars = np.arange(1, n + 1, dtype=float)
+
+        f[:, COL['price']] = c
+        f[:, COL['n_bars']] = n_bars
+        f[:, COL['last_close']] = c
+
+        # Trend: the scheduler has no 15m EMA context, so trend stays
+        # unscored unless a higher timeframe is requested
+        if higher_timeframe_minutes:
+            self._apply_trend(f, close, bars.index, higher_timeframe_minutes)
+        else:
+            f[:, COL['has_trend']] = 0.0
+
+        # VWAP over the bars seen so far
+        typical = (high + low + c) / 3
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.cumsum(typical * volume) / np.cumsum(volume)
+            distance_pct = (c - vwap) / vwap * 100
+        f[:, COL['has_vwap']] = np.where(np.isnan(vwap), 0.0, 1.0)
+        f[:, COL['vwap_value']] = vwap
+        f[:, COL['vwap_position']] = np.select(
+            [np.abs(distance_pct) < 0.05, c - vwap > 0], [0.0, 1.0], -1.0
+        )
+
+        # Structure: HH/LL over the last 5 bars, nearest S/R levels
+        hh_steps = np.concatenate([[0.0], (high[1:] > high[:-1]).astype(float)])
+        ll_steps = np.concatenate([[0.0], (low[1:] < low[:-1]).astype(float)])
+        f[:, COL['higher_highs']] = pd.Series(hh_steps).rolling(4, min_periods=1).sum().to_numpy()
+        f[:, COL['lower_lows']] = pd.Series(ll_steps).rolling(4, min_periods=1).sum().to_numpy()
+        f[:, COL['recent_high']], f[:, COL['recent_low']] = level_bounds_series(bars, state=levels)
+
+        # Momentum: RSI is recursive (causal); ROC against 5 bars back
+        f[:, COL['rsi']] = RSIIndicator(close=close.reset_index(drop=True), window=14).rsi().to_numpy()
+        price_5_ago = np.concatenate([np.full(min(5, n), c[0]), c[:-5]]) if n > 5 else np.full(n, c[0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f[:, COL['roc']] = np.where(price_5_ago > 0, (c - price_5_ago) / price_5_ago * 100, 0.0)
+
+        # Internals inputs are not recorded
+        f[:, COL['has_futures_oi']] = 0.0
+        f[:, COL['has_index_prices']] = 0.0
+
+        # Volatility: ATR(14) vs its 20-bar average, range vs 20-bar average
+        prev_close = np.concatenate([[np.nan], c[:-1]])
+        tr = pd.DataFrame({
+            'h_l': high - low,
+            'h_pc': np.abs(high - prev_close),
+            'l_pc': np.abs(low - prev_close)
+        }).max(axis=1)
+        atr = tr.rolling(window=14).mean()
+        atr_ma = atr.rolling(window=20).mean()
+        avg_range = pd.Series(high - low).rolling(window=20).mean().to_numpy()
+        atr, atr_ma = atr.to_numpy(), atr_ma.to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expansion = ((atr - atr_ma) / atr_ma) * 100
+            range_ratio = np.where(avg_range > 0, (high - low) / avg_range, 1.0)
+        valid = (n_bars >= 34) & ~np.isnan(atr) & ~np.isnan(atr_ma) & (atr_ma != 0)
+        f[:, COL['atr_expansion']] = np.where(valid, expansion, np.nan)
+        f[:, COL['range_ratio']] = range_ratio
+
+        # OI: latest recorded snapshot at or before each bar's close
+        f[:, COL['has_oi']] = 0.0
+        if oi_snapshots:
+            self._apply_oi_snapshots(f, bars.index, oi_snapshots, bar_minutes)
+
+        return f
+
+    @staticmethod
+    def _apply_trend(f: np.ndarray, close: pd.Series, index: pd.Index, higher_minutes: int) -> None:
+        """
+        EMA alignment/slope on the bar timeframe and on a higher timeframe.
+        At bar t the higher-timeframe series is the completed higher bars
+        plus the still-forming one closing at bar t, as a live resample
+        would see it.
+        """
+        c = close.to_numpy()
+        n = len(c)
+        f[:, COL['has_trend']] = 1.0
+
+        ema9, ema20, ema50 = _ema(close, 9), _ema(close, 20), _ema(close, 50)
+        f[:, COL['align_5m']] = _alignment(ema9, ema20, ema50)
+        f[:, COL['ema9_5m']] = ema9
+        slope = np.zeros(n)
+        if n >= 9:
+            windows = np.lib.stride_tricks.sliding_window_view(c, 5)
+            slope[8:] = _slope_codes(windows[4:])
+        f[:, COL['slope_5m']] = slope
+
+        # Higher timeframe: group bars, then extend completed-bar EMAs by the
+        # forming bar's latest close
+        groups = pd.DatetimeIndex(index).floor(f'{higher_minutes}min')
+        group_id = np.concatenate([[0], np.cumsum(groups[1:] != groups[:-1])])
+        last_in_group = np.append(group_id[1:] != group_id[:-1], True)
+        completed = c[last_in_group]
+        count = group_id + 1
+
+        higher_emas = []
+        for period in (9, 20, 50):
+            alpha = 2.0 / (period + 1)
+            done = pd.Series(completed).ewm(span=period, adjust=False).mean().to_numpy()
+            prev = np.concatenate([[np.nan], done])[group_id]
+            ema = np.where(group_id == 0, c, alpha * c + (1 - alpha) * prev)
+            higher_emas.append(np.where(count >= period, ema, np.nan))
+        f[:, COL['align_15m']] = _alignment(*higher_emas)
+
+        slope_15 = np.zeros(n)
+        rows = np.flatnonzero(count >= 9)
+        if len(rows):
+            padded = np.concatenate([np.full(4, np.nan), completed])
+            # Previous four completed higher closes, then the forming close
+            windows = np.column_stack(
+                [padded[group_id[rows] + j] for j in range(4)] + [c[rows]]
+            )
+            slope_15[rows] = _slope_codes(windows)
+        f[:, COL['slope_15m']] = slope_15
+
+    @staticmethod
+    def _apply_oi_snapshots(
+        f: np.ndarray,
+        index: pd.Index,
+        oi_snapshots: List[Tuple[datetime, Dict]],
+        bar_minutes: int
+    ) -> None:
+        snapshots = sorted(oi_snapshots, key=lambda item: item[0])
+        snap_times = pd.DatetimeIndex([item[0] for item in snapshots])
+        bar_close = pd.DatetimeIndex(index) + pd.Timedelta(minutes=bar_minutes)
+        positions = snap_times.searchsorted(bar_close, side='right') - 1
+
+        for row, pos in enumerate(positions):
+            if pos < 0:
+                continue
+            analysis = snapshots[pos][1]
+            if not analysis:
+                continue
+            f[row, COL['has_oi']] = 1.0
+            f[row, COL['pcr']] = analysis.get('pcr', 1.0)
+            f[row, COL['oi_trend']] = _OI_TREND_CODES.get(analysis.get('oiTrend', 'NEUTRAL'), 2)
+            f[row, COL['oi_bullish_score']] = analysis.get('bullishScore', 0)
+            f[row, COL['oi_bearish_score']] = analysis.get('bearishScore', 0)
+
+    def replay(
+        self,
+        bars: pd.DataFrame,
+        oi_snapshots: Optional[List[Tuple[datetime, Dict]]] = None,
+        bar_minutes: int = 5,
+        higher_timeframe_minutes: Optional[int] = None,
+        levels: Optional[SessionLevels] = None
+    ) -> pd.DataFrame:
+        """
+        Score every bar of a session
+
+        Args:
+            bars: DataFrame indexed by bar open time with OHLCV columns
+            oi_snapshots: Optional recorded (timestamp, oi_analysis) pairs
+            bar_minutes: Bar length in minutes
+            higher_timeframe_minutes: Optional higher timeframe for trend context
+            levels: Support/resistance levels carried over from earlier sessions
+
+        Returns:
+            DataFrame indexed like `bars` with setup_score, market_bias and
+            '<component>_score' columns
+        """
+        if bars is None or len(bars) == 0:
+            return pd.DataFrame()
+
+        features = self.build_features(bars, oi_snapshots, bar_minutes, higher_timeframe_minutes, levels)
+        result = self.batch_scorer.score(features)
+
+        columns = {
+            'setup_score': result['setup_score'],
+            'market_bias': result['market_bias'],
+        }
+        for name in COMPONENTS:
+            columns[f'{name}_score'] = result[f'{name}_score']
+        return pd.DataFrame(columns, index=bars.index)
+
+
+# Global replayer instance
+score_replayer = ScoreReplayer()
@@ -3,15 +3,58 @@ Scoring modules for Phase 2 - Basic Scoring Engine
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
 import logging
 from ta.momentum import RSIIndicator
 from ta.trend import SMAIndicator
 
+from app.levels import LevelIndex, sr_bounds
+from app.range_index import RECENT_WINDOW, RangeIndex
+from app.scoring_rules import scoring_rules
+
 logger = logging.getLogger(__name__)
 
 
+def latest_rsi(price_history: List[float], window: int = 14) -> float:
+    """RSI of the last bar (shared by MomentumScorer and batch features)"""
+    df = pd.DataFrame({'close': price_history})
+    rsi_indicator = RSIIndicator(close=df['close'], window=window)
+    return rsi_indicator.rsi().iloc[-1]
+
+
+def atr_metrics(df: pd.DataFrame, period: int = 14) -> Optional[Tuple[float, float, float]]:
+    """
+    ATR metrics of the last bar (shared by VolatilityScorer and batch features)
+    
+    Returns:
+        Tuple of (current_atr, avg_atr, range_ratio) or None if ATR is invalid
+    """
+    df = df.copy()
+    df['h_l'] = df['high'] - df['low']
+    df['h_pc'] = abs(df['high'] - df['close'].shift(1))
+    df['l_pc'] = abs(df['low'] - df['close'].shift(1))
+    df['tr'] = df[['h_l', 'h_pc', 'l_pc']].max(axis=1)
+    df['atr'] = df['tr'].rolling(window=period).mean()
+    
+    # Calculate 20-period average ATR
+    df['atr_ma'] = df['atr'].rolling(window=20).mean()
+    
+    # Get current values
+    current_atr = df['atr'].iloc[-1]
+    avg_atr = df['atr_ma'].iloc[-1]
+    
+    if pd.isna(current_atr) or pd.isna(avg_atr) or avg_atr == 0:
+        return None
+    
+    # Calculate current range vs 20-period average range
+    current_range = df['high'].iloc[-1] - df['low'].iloc[-1]
+    avg_range = (df['high'] - df['low']).rolling(window=20).mean().iloc[-1]
+    range_ratio = current_range / avg_range if avg_range > 0 else 1.0
+    
+    return current_atr, avg_atr, range_ratio
+
+
 class TrendScorer:
     """
     Trend Scoring Module (25% weight)
@@ -150,21 +193,9 @@ class VWAPScorer:
             
             # Component 1: Distance from VWAP (0-5 points)
             # Closer to VWAP is better for mean reversion
-            if distance_pct < 0.1:
-                score += 5.0
-                details['distance_score'] = 'optimal'
-            elif distance_pct < 0.3:
-                score += 4.0
-                details['distance_score'] = 'good'
-            elif distance_pct < 0.5:
-                score += 3.0
-                details['distance_score'] = 'moderate'
-            elif distance_pct < 1.0:
-                score += 2.0
-                details['distance_score'] = 'far'
-            else:
-                score += 1.0
-                details['distance_score'] = 'very_far'
+            distance_bin = scoring_rules.table('vwap.distance_pct').bin(distance_pct)
+            score += distance_bin['value']
+            details['distance_score'] = distance_bin['label']
             
             # Component 2: Position relative to VWAP (0-5 points)
             if position == 'above':
@@ -204,7 +235,9 @@ class StructureScorer:
         self,
         price_history: List[float],
         high_history: List[float],
-        low_history: List[float]
+        low_history: List[float],
+        levels: Optional[LevelIndex] = None,
+        ranges: Optional[RangeIndex] = None
     ) -> Tuple[float, Dict]:
         """
         Calculate market structure score (0-10)
@@ -213,6 +246,10 @@ class StructureScorer:
             price_history: Recent close prices
             high_history: Recent high prices
             low_history: Recent low prices
+            levels: Session support/resistance levels; the 20-bar high/low
+                is used on a side without one
+            ranges: Range index ending at the latest bar (built from the
+                histories if not given)
             
         Returns:
             Tuple of (score, details)
@@ -226,8 +263,8 @@ class StructureScorer:
                 return 5.0, {"error": "Insufficient data", "default": True}
             
             # Component 1: Higher Highs / Lower Lows (0-5 points)
-            recent_highs = high_history[-5:]
-            recent_lows = low_history[-5:]
+            recent_highs = high_history[-RECENT_WINDOW:]
+            recent_lows = low_history[-RECENT_WINDOW:]
             
             higher_highs = sum(1 for i in range(1, len(recent_highs)) if recent_highs[i] > recent_highs[i-1])
             lower_lows = sum(1 for i in range(1, len(recent_lows)) if recent_lows[i] < recent_lows[i-1])
@@ -247,8 +284,9 @@ class StructureScorer:
             
             # Component 2: Support/Resistance proximity (0-5 points)
             current_price = price_history[-1]
-            recent_high = max(high_history[-20:]) if len(high_history) >= 20 else max(high_history)
-            recent_low = min(low_history[-20:]) if len(low_history) >= 20 else min(low_history)
+            recent_high, recent_low, resistance, support = sr_bounds(
+                current_price, high_history, low_history, levels, ranges
+            )
             
             # Distance from recent high/low
             dist_from_high = ((recent_high - current_price) / recent_high * 100) if recent_high > 0 else 0
@@ -269,6 +307,10 @@ class StructureScorer:
             details['lower_lows'] = lower_lows
             details['dist_from_high'] = round(dist_from_high, 2)
             details['dist_from_low'] = round(dist_from_low, 2)
+            if resistance is not None:
+                details['resistance_kinds'] = sorted(resistance['kinds'])
+            if support is not None:
+                details['support_kinds'] = sorted(support['kinds'])
             
             # Normalize to 0-10
             normalized_score = min(10.0, max(0.0, score))
@@ -312,24 +354,13 @@ class MomentumScorer:
                 return 5.0, {"error": "Insufficient data", "default": True}
             
             # Calculate RSI
-            df = pd.DataFrame({'close': price_history})
-            rsi_indicator = RSIIndicator(close=df['close'], window=14)
-            rsi = rsi_indicator.rsi().iloc[-1]
+            rsi = latest_rsi(price_history)
             
             # Component 1: RSI value (0-5 points)
             # Reward RSI in trending zones
-            if 40 <= rsi <= 60:
-                score += 3.0
-                details['rsi_zone'] = 'neutral'
-            elif (30 <= rsi < 40) or (60 < rsi <= 70):
-                score += 5.0
-                details['rsi_zone'] = 'trending'
-            elif (20 <= rsi < 30) or (70 < rsi <= 80):
-                score += 4.0
-                details['rsi_zone'] = 'strong_trending'
-            else:
-                score += 2.0
-                details['rsi_zone'] = 'extreme'
+            rsi_bin = scoring_rules.table('momentum.rsi').bin(rsi)
+            score += rsi_bin['value']
+            details['rsi_zone'] = rsi_bin['label']
             
             # Component 2: Rate of change (0-5 points)
             current_price = price_history[-1]
@@ -338,15 +369,9 @@ class MomentumScorer:
             roc = ((current_price - price_5_ago) / price_5_ago * 100) if price_5_ago > 0 else 0
             
             # Reward positive momentum
-            if abs(roc) > 0.5:
-                score += 5.0
-                details['roc_strength'] = 'strong'
-            elif abs(roc) > 0.2:
-                score += 3.0
-                details['roc_strength'] = 'moderate'
-            else:
-                score += 1.0
-                details['roc_strength'] = 'weak'
+            roc_bin = scoring_rules.table('momentum.abs_roc').bin(abs(roc))
+            score += roc_bin['value']
+            details['roc_strength'] = roc_bin['label']
             
             details['rsi'] = round(float(rsi), 2)
             details['roc'] = round(roc, 4)
@@ -368,35 +393,66 @@ class InternalsScorer:
     Analyzes futures OI and index correlation
     """
     
+    LEADERSHIP_POINTS = {'leading': 3.0, 'in_sync': 2.0, 'lagging': 1.0}
+    # Fresh positions back a move; covering/unwinding moves are exits
+    FUTURES_QUADRANT_POINTS = {
+        'long_buildup': 3.0,
+        'short_buildup': 3.0,
+        'neutral': 2.5,
+        'short_covering': 2.0,
+        'long_unwinding': 2.0
+    }
+    
     def __init__(self):
         self.weight = 0.05
         
     def score(
         self,
         symbol: str,
-        futures_oi: Optional[float] = None,
+        futures_oi: Optional[Union[float, Dict]] = None,
         nifty_price: Optional[float] = None,
-        banknifty_price: Optional[float] = None
+        banknifty_price: Optional[float] = None,
+        internals: Optional[Dict] = None,
+        breadth: Optional[Dict] = None
     ) -> Tuple[float, Dict]:
         """
         Calculate market internals score (0-10)
         
         Args:
             symbol: Trading symbol
-            futures_oi: Futures open interest
+            futures_oi: Rolling futures OI features from FuturesOIEngine
+                (quadrant, oi_change_pct, ...), or a bare open interest value
             nifty_price: NIFTY current price
             banknifty_price: BANKNIFTY current price
+            internals: Rolling cross-index statistics from IndexInternalsEngine
+                (correlation, leadership, ...); replaces the price-presence check
+            breadth: Constituent breadth from BreadthEngine (advances/declines,
+                participation, ...); adjusts the score by how much of the
+                index weight moves with the index
             
         Returns:
             Tuple of (score, details)
         """
         try:
-            score = 5.0  # Default neutral score
-            details = {'status': 'basic_internals'}
+            if internals is not None:
+                score = 0.0
+                details = {'status': 'index_internals'}
+            else:
+                score = 5.0  # Default neutral score
+                details = {'status': 'basic_internals'}
             
             # Component 1: Futures OI (0-5 points)
-            if futures_oi is not None:
-                # Placeholder logic - requires historical OI for change calculation
+            if isinstance(futures_oi, dict):
+                quadrant = futures_oi.get('quadrant', 'neutral')
+                score += self.FUTURES_QUADRANT_POINTS.get(quadrant, 2.5)
+                details['futures_oi'] = futures_oi.get('oi')
+                details['oi_status'] = 'tracked'
+                details['futures_quadrant'] = quadrant
+                details['futures_bias'] = futures_oi.get('bias')
+                details['oi_change_pct'] = futures_oi.get('oi_change_pct')
+                details['futures_price_change_pct'] = futures_oi.get('price_change_pct')
+            elif futures_oi is not None:
+                # Bare OI value - no history to judge the change
                 score += 2.5
                 details['futures_oi'] = futures_oi
                 details['oi_status'] = 'available'
@@ -405,7 +461,21 @@ class InternalsScorer:
                 details['oi_status'] = 'unavailable'
             
             # Component 2: Index correlation (0-5 points)
-            if nifty_price is not None and banknifty_price is not None:
+            if internals is not None:
+                # Moving with the peer index confirms the move; leading it is best.
+                # A lead/lag relationship is judged by its lagged correlation.
+                coupling = internals.get('lead_correlation', internals['correlation'])
+                correlation_bin = scoring_rules.table('internals.correlation').bin(coupling)
+                score += correlation_bin['value']
+                score += self.LEADERSHIP_POINTS.get(internals.get('leadership'), 1.0)
+                details['index_correlation'] = correlation_bin['label']
+                details['correlation'] = internals['correlation']
+                details['lead_correlation'] = coupling
+                details['peer'] = internals.get('peer')
+                details['leadership'] = internals.get('leadership')
+                details['lead_lag_bars'] = internals.get('lead_lag_bars')
+                details['relative_strength_pct'] = internals.get('relative_strength_pct')
+            elif nifty_price is not None and banknifty_price is not None:
                 # Both indices available shows healthy market
                 score += 2.5
                 details['index_correlation'] = 'both_active'
@@ -415,6 +485,20 @@ class InternalsScorer:
                 score += 2.0
                 details['index_correlation'] = 'partial'
             
+            # Component 3: Constituent breadth (adjustment)
+            if breadth is not None and breadth.get('participation') is not None:
+                participation_bin = scoring_rules.table('internals.breadth_participation').bin(
+                    breadth['participation']
+                )
+                score += participation_bin['value']
+                details['breadth'] = participation_bin['label']
+                details['participation'] = breadth['participation']
+                details['advances'] = breadth.get('advances')
+                details['declines'] = breadth.get('declines')
+                details['pct_above_vwap'] = breadth.get('pct_above_vwap')
+                details['pct_bullish_alignment'] = breadth.get('pct_bullish_alignment')
+                details['weighted_move_pct'] = breadth.get('weighted_move_pct')
+            
             # Normalize to 0-10
             normalized_score = min(10.0, max(0.0, score))
             details['normalized_score'] = normalized_score
@@ -458,65 +542,32 @@ class VolatilityScorer:
                 logger.warning("Insufficient data for volatility scoring")
                 return 5.0, {"error": "Insufficient data", "regime": "UNKNOWN"}
             
-            # Calculate ATR (14-period)
-            df = df.copy()
-            df['h_l'] = df['high'] - df['low']
-            df['h_pc'] = abs(df['high'] - df['close'].shift(1))
-            df['l_pc'] = abs(df['low'] - df['close'].shift(1))
-            df['tr'] = df[['h_l', 'h_pc', 'l_pc']].max(axis=1)
-            df['atr'] = df['tr'].rolling(window=period).mean()
-            
-            # Calculate 20-period average ATR
-            df['atr_ma'] = df['atr'].rolling(window=20).mean()
+            # Calculate ATR (14-period) against its 20-period average
+            metrics = atr_metrics(df, period)
             
-            # Get current values
-            current_atr = df['atr'].iloc[-1]
-            avg_atr = df['atr_ma'].iloc[-1]
-            
-            if pd.isna(current_atr) or pd.isna(avg_atr) or avg_atr == 0:
+            if metrics is None:
                 return 5.0, {"error": "Invalid ATR calculation", "regime": "UNKNOWN"}
             
+            current_atr, avg_atr, range_ratio = metrics
+            
             # Calculate ATR expansion percentage
             atr_expansion = ((current_atr - avg_atr) / avg_atr) * 100
             details['atr'] = round(current_atr, 2)
             details['atr_avg'] = round(avg_atr, 2)
             details['atr_expansion_pct'] = round(atr_expansion, 2)
-            
-            # Calculate current range vs 20-period average range
-            current_range = df['high'].iloc[-1] - df['low'].iloc[-1]
-            avg_range = (df['high'] - df['low']).rolling(window=20).mean().iloc[-1]
-            range_ratio = current_range / avg_range if avg_range > 0 else 1.0
             details['range_ratio'] = round(range_ratio, 2)
             
             # Classify volatility regime and score
-            if atr_expansion < -20:  # Strong compression
-                score = 3.0
-                details['regime'] = 'COMPRESSION'
-                details['interpretation'] = 'Extreme compression - breakout likely but risky'
-            elif atr_expansion < -10:  # Moderate compression
-                score = 5.0
-                details['regime'] = 'COMPRESSION'
-                details['interpretation'] = 'Moderate compression'
-            elif atr_expansion < 10:  # Normal
-                score = 8.0
-                details['regime'] = 'NORMAL'
-                details['interpretation'] = 'Normal volatility - ideal for trading'
-            elif atr_expansion < 20:  # Moderate expansion
-                score = 7.0
-                details['regime'] = 'EXPANSION'
-                details['interpretation'] = 'Moderate expansion'
-            else:  # Strong expansion
-                score = 4.0
-                details['regime'] = 'EXPANSION'
-                details['interpretation'] = 'High volatility - risk increased'
+            regime_bin = scoring_rules.table('volatility.atr_expansion_pct').bin(atr_expansion)
+            score = regime_bin['value']
+            details['regime'] = regime_bin['label']
+            details['interpretation'] = regime_bin['interpretation']
             
             # Adjust score based on range ratio
-            if range_ratio > 1.5:
-                score -= 1.0
-                details['interpretation'] += ' | Wide range detected'
-            elif range_ratio < 0.5:
-                score -= 1.0
-                details['interpretation'] += ' | Narrow range detected'
+            range_bin = scoring_rules.table('volatility.range_ratio').bin(range_ratio)
+            score += range_bin['value']
+            if range_bin['label']:
+                details['interpretation'] += f" | {range_bin['label']}"
             
             # Normalize to 0-10
             normalized_score = min(10.0, max(0.0, score))
@@ -568,18 +619,9 @@ class OIConfirmationScorer:
             # Component 1: PCR Analysis (0-4 points)
             pcr = oi_analysis.get('pcr', 1.0)
             
-            if 1.2 <= pcr <= 1.8:
-                score += 4.0
-                details['pcr_signal'] = 'bullish'
-            elif 0.6 <= pcr <= 0.8:
-                score += 4.0
-                details['pcr_signal'] = 'bearish'
-            elif 0.9 <= pcr <= 1.1:
-                score += 2.0
-                details['pcr_signal'] = 'neutral'
-            else:
-                score += 1.0
-                details['pcr_signal'] = 'extreme'
+            pcr_bin = scoring_rules.table('oi.pcr').bin(pcr)
+            score += pcr_bin['value']
+            details['pcr_signal'] = pcr_bin['label']
             
             details['pcr'] = round(pcr, 3)
             
@@ -605,15 +647,9 @@ class OIConfirmationScorer:
             
             max_pattern_score = max(bullish_score, bearish_score)
             
-            if max_pattern_score >= 7.0:
-                score += 3.0
-                details['pattern_strength'] = 'strong'
-            elif max_pattern_score >= 5.0:
-                score += 2.0
-                details['pattern_strength'] = 'moderate'
-            else:
-                score += 1.0
-                details['pattern_strength'] = 'weak'
+            pattern_bin = scoring_rules.table('oi.pattern_strength').bin(max_pattern_score)
+            score += pattern_bin['value']
+            details['pattern_strength'] = pattern_bin['label']
             
             details['bullish_score'] = round(bullish_score, 2)
             details['bearish_score'] = round(bearish_score, 2)
@@ -666,10 +702,14 @@ class SetupScorer:
         high_history: List[float],
         low_history: List[float],
         df_ohlc: Optional[pd.DataFrame] = None,  # PHASE 4: For volatility calculation
-        futures_oi: Optional[float] = None,
+        futures_oi: Optional[Union[float, Dict]] = None,  # Futures OI features (app.futures_oi)
         nifty_price: Optional[float] = None,
         banknifty_price: Optional[float] = None,
-        oi_analysis: Optional[Dict] = None  # PHASE 3: OI Analysis from option chain
+        oi_analysis: Optional[Dict] = None,  # PHASE 3: OI Analysis from option chain
+        internals: Optional[Dict] = None,  # Cross-index statistics (app.internals)
+        breadth: Optional[Dict] = None,  # Constituent breadth (app.breadth)
+        levels: Optional[LevelIndex] = None,  # Session S/R levels (app.levels)
+        ranges: Optional[RangeIndex] = None  # Window extremes ending at the latest bar (app.range_index)
     ) -> Dict:
         """
         Calculate complete setup score
@@ -679,16 +719,18 @@ class SetupScorer:
         """
         try:
             start_time = datetime.now()
+            scoring_rules.refresh()
+            rules_version = scoring_rules.version
             
             # Calculate individual scores
             trend_score, trend_details = self.trend_scorer.score(ema_5m, ema_15m, price)
             vwap_score, vwap_details = self.vwap_scorer.score(price, vwap)
             structure_score, structure_details = self.structure_scorer.score(
-                price_history, high_history, low_history
+                price_history, high_history, low_history, levels, ranges
             )
             momentum_score, momentum_details = self.momentum_scorer.score(price_history)
             internals_score, internals_details = self.internals_scorer.score(
-                symbol, futures_oi, nifty_price, banknifty_price
+                symbol, futures_oi, nifty_price, banknifty_price, internals, breadth
             )
             
             # Determine preliminary market bias (for OI scorer)
@@ -766,6 +808,7 @@ class SetupScorer:
                 'setup_score': setup_score,
                 'components': components,
                 'market_bias': market_bias,
+                'rules_version': rules_version,
                 'evaluation_time_seconds': round(evaluation_time, 4)
             }
             
@@ -0,0 +1,186 @@
+"""
+Table-Driven Scoring Rules
+Threshold ladders used by the setup and no-trade scorers, loaded from a
+JSON rules file as breakpoint tables. Scalar scorers look a value up with
+bisect; batch scorers look whole arrays up with np.searchsorted. The file
+is re-read when its modification time changes, and every loaded rule set
+carries a version id that is stamped into stored scores.
+"""
+from bisect import bisect_right
+from typing import Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(__file__), 'data', 'scoring_rules.json')
+
+_OPERATORS = ('>=', '>')
+
+
+class BreakpointTable:
+    """
+    One threshold ladder: sorted breakpoints splitting the line into bins
+
+    A breakpoint is written as [">=", b] (values >= b fall in the next bin,
+    like an `x < b` ladder) or [">", b] (values > b fall in the next bin,
+    like an `x > b` ladder); a bare number means ">=". Strict breakpoints
+    are stored as the next float above b, so one bisect_right covers both.
+    NaN never passes a comparison and lands in `nan_bin` (the ladder's
+    else branch).
+    """
+
+    def __init__(self, name: str, spec: Dict):
+        """
+        Args:
+            name: Table name, e.g. 'momentum.rsi'
+            spec: {'breakpoints': [...], 'bins': [{'value': .., 'label': ..}, ...],
+                   'nan_bin': optional index (defaults to the last bin)}
+        """
+        self.name = name
+        edges = []
+        for breakpoint in spec['breakpoints']:
+            op, bound = ('>=', breakpoint) if isinstance(breakpoint, (int, float)) else breakpoint
+            if op not in _OPERATORS:
+                raise ValueError(f"{name}: unknown breakpoint operator {op!r}")
+            bound = float(bound)
+            edges.append(float(np.nextafter(bound, np.inf)) if op == '>' else bound)
+
+        if any(b <= a for a, b in zip(edges, edges[1:])):
+            raise ValueError(f"{name}: breakpoints must be strictly increasing")
+
+        self.bins: List[Dict] = [{**b, 'value': float(b['value'])} for b in spec['bins']]
+        if len(self.bins) != len(edges) + 1:
+            raise ValueError(f"{name}: expected {len(edges) + 1} bins, got {len(self.bins)}")
+
+        self.nan_bin = int(spec.get('nan_bin', len(self.bins) - 1))
+        self.breakpoints = list(spec['breakpoints'])
+        self.edges = edges
+        self._edges = np.array(edges, dtype=np.float64)
+        self.values = np.array([b['value'] for b in self.bins], dtype=np.float64)
+
+    def index(self, x: float) -> int:
+        """Bin index of a single value"""
+        if x != x:
+            return self.nan_bin
+        return bisect_right(self.edges, x)
+
+    def bin(self, x: float) -> Dict:
+        """Bin (value, label and any extra fields) of a single value"""
+        return self.bins[self.index(x)]
+
+    def value(self, x: float) -> float:
+        return self.values[self.index(x)].item()
+
+    def indices(self, x: np.ndarray) -> np.ndarray:
+        """Bin indices of an array of values"""
+        x = np.asarray(x, dtype=np.float64)
+        idx = np.searchsorted(self._edges, x, side='right')
+        return np.where(np.isnan(x), self.nan_bin, idx)
+
+    def lookup(self, x: np.ndarray) -> np.ndarray:
+        """Bin values of an array of values"""
+        return self.values[self.indices(x)]
+
+
+class ScoringRules:
+    """
+    Rule set loaded from a JSON file, reloaded when the file changes
+
+    A file that fails to parse or validate is logged and ignored; the
+    previous rule set stays active.
+    """
+
+    def __init__(self, rules_file: Optional[str] = None, check_interval_seconds: float = 5.0):
+        """
+        Args:
+            rules_file: JSON rules file (defaults to app/data/scoring_rules.json)
+            check_interval_seconds: Minimum time between modification-time checks
+        """
+        self.rules_file = rules_file or DEFAULT_RULES_FILE
+        self.check_interval_seconds = check_interval_seconds
+        self.tables: Dict[str, BreakpointTable] = {}
+        self.version: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._load()
+
+    def _load(self) -> bool:
+        """Parse the rules file and swap it in; returns True on success"""
+        try:
+            mtime = os.stat(self.rules_file).st_mtime
+            with open(self.rules_file, 'rb') as f:
+                raw = f.read()
+            data = json.loads(raw)
+            tables = {
+                name: BreakpointTable(name, spec)
+                for name, spec in data.get('tables', {}).items()
+            }
+        except Exception as e:
+            logger.error(f"Error loading scoring rules {self.rules_file}: {e}")
+            return False
+
+        canonical = json.dumps(data.get('tables', {}), sort_keys=True, separators=(',', ':'))
+        self.tables = tables
+        self.version = hashlib.sha1(canonical.encode()).hexdigest()[:12]
+        self.loaded_at = time.time()
+        self._mtime = mtime
+        logger.info(f"Loaded {len(tables)} scoring rule tables (version {self.version})")
+        return True
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload the rules if the file changed since the last load
+
+        Checks at most once per check_interval_seconds unless forced.
+
+        Returns:
+            True if a new rule set was loaded
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval_seconds:
+            return False
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.rules_file).st_mtime
+        except OSError as e:
+            logger.warning(f"Scoring rules file unavailable: {e}")
+            return False
+        if not force and mtime == self._mtime:
+            return False
+
+        previous = self.version
+        if self._load() and self.version != previous:
+            logger.info(f"Scoring rules reloaded: {previous} -> {self.version}")
+            return True
+        return False
+
+    def table(self, name: str) -> BreakpointTable:
+        return self.tables[name]
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': self.version,
+            'rules_file': self.rules_file,
+            'loaded_at': self.loaded_at,
+            'tables': {
+                name: {'breakpoints': table.breakpoints, 'bins': table.bins, 'nan_bin': table.nan_bin}
+                for name, table in self.tables.items()
+            }
+        }
+
+
+# Global rule set
+scoring_rules = ScoringRules(
+    rules_file=settings.scoring_rules_file,
+    check_interval_seconds=settings.scoring_rules_check_seconds
+)
@@ -1,15 +1,33 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Optional
 from decimal import Decimal
 import logging
 import aiohttp
 import time
 
+import numpy as np
+import pandas as pd
+import pytz
+
 from app.config import settings
 from app.indicators import IndicatorCalculator
 from app.models import IndicatorData, EMAData, VWAPData
 from app.scoring import SetupScorer
+from app.batch_scoring import BatchSetupScorer
+from app.sharding import shard_coordinator
+from app.job_telemetry import scheduler_telemetry
+from app.emit_suppression import emit_suppressor
+from app.bar_buffer import bar_buffer
+from app.internals import index_internals
+from app.breadth import breadth_engine
+from app.futures_oi import futures_oi_engine
+from app.levels import SessionLevels, level_engine
+from app.range_index import range_engine
+from app.session_profile import SessionVolumeProfile, session_profile_engine
+from app.tpo_profile import tpo_engine
+from app.composite_profile import CompositeProfile, DailyProfile, daily_profile_store
+from app.market_calendar import IST, market_calendar
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +41,14 @@ class IndicatorService:
         self.db_client = None
         self.db = None
         self.calculator = IndicatorCalculator()
+        self.batch_scorer = BatchSetupScorer()
+        self._profile_gaps = set()  # (symbol, day) sessions with no bars to profile
         
     async def connect_db(self):
         """Connect to MongoDB"""
         try:
-            self.db_client = AsyncIOMotorClient(settings.MONGODB_URI)
-            self.db = self.db_client[settings.MONGODB_DATABASE]
+            self.db_client = AsyncIOMotorClient(settings.mongodb_uri)
+            self.db = self.db_client[settings.mongodb_database]
             logger.info("Connected to MongoDB")
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
@@ -297,12 +317,232 @@ class IndicatorService:
                 logger.warning(f"Insufficient resampled data for {symbol}")
                 return None
             
+            bar_buffer.update(symbol, timeframe, resampled)
+            range_engine.update(symbol, timeframe, resampled)
+            level_engine.update(symbol, timeframe, resampled)
+            await self.ensure_prior_day_levels(symbol, timeframe)
+            minute_bars = self.calculator.resample_to_timeframe(data, "1min")
+            session_profile_engine.update(symbol, minute_bars)
+            tpo_engine.update(symbol, minute_bars)
+            await self.ensure_session_profile(symbol)
+            await self.store_finished_profiles()
+            # Session POC/VAH/VAL join the S/R levels the scorers read
+            level_engine.set_profile(symbol, timeframe, session_profile_engine.snapshot(symbol))
             return resampled
             
         except Exception as e:
             logger.error(f"Error fetching OHLC data for {symbol}: {e}")
             return None
     
+    async def fetch_session_bars(
+        self,
+        symbol: str,
+        day: date,
+        timeframe: str = "5m"
+    ):
+        """
+        Fetch one trading session of bars for score replay
+        
+        Args:
+            symbol: Symbol to fetch (NIFTY or BANKNIFTY)
+            day: Session date (IST)
+            timeframe: Timeframe (5m or 15m)
+            
+        Returns:
+            pandas DataFrame with OHLC data, empty if the day has no data
+        """
+        try:
+            session = market_calendar.session_for(day)
+            if session is None:
+                return pd.DataFrame()
+            
+            # Snapshots are stored with naive UTC timestamps
+            start = session.open.astimezone(pytz.utc).replace(tzinfo=None)
+            end = session.close.astimezone(pytz.utc).replace(tzinfo=None)
+            cursor = self.db.market_snapshots.find({
+                'symbol': symbol,
+                'timestamp': {'$gte': start, '$lt': end}
+            }).sort('timestamp', 1)
+            snapshots = await cursor.to_list(length=None)
+            
+            data = []
+            for snap in snapshots:
+                ohlc = snap.get('ohlc1m')
+                if ohlc:
+                    data.append({
+                        'timestamp': snap['timestamp'],
+                        'open': float(ohlc.get('open', 0)),
+                        'high': float(ohlc.get('high', 0)),
+                        'low': float(ohlc.get('low', 0)),
+                        'close': float(ohlc.get('close', 0)),
+                        'volume': int(ohlc.get('volume', 0))
+                    })
+            
+            if not data:
+                return pd.DataFrame()
+            return self.calculator.resample_to_timeframe(data, timeframe)
+            
+        except Exception as e:
+            logger.error(f"Error fetching session bars for {symbol} on {day}: {e}")
+            return pd.DataFrame()
+    
+    async def previous_session_bars(self, symbol: str, day: date, timeframe: str = "5m"):
+        """
+        Bars of the trading session before `day`
+        
+        Returns:
+            Tuple of (session date or None, DataFrame - empty without data)
+        """
+        previous = next(
+            (day - timedelta(days=offset) for offset in range(1, 15)
+             if market_calendar.is_trading_day(day - timedelta(days=offset))),
+            None
+        )
+        if previous is None:
+            return None, pd.DataFrame()
+        return previous, await self.fetch_session_bars(symbol, previous, timeframe)
+    
+    async def ensure_prior_day_levels(self, symbol: str, timeframe: str) -> None:
+        """
+        Seed the prior-day high/low/close levels from the previous session's
+        bars when the level engine has not seen that session (once per session)
+        """
+        day = level_engine.needs_prior_day(symbol, timeframe)
+        if day is None:
+            return
+        try:
+            previous, bars = await self.previous_session_bars(symbol, day, timeframe)
+            if previous is None:
+                return
+            if bars.empty:
+                logger.warning(f"No bars for {symbol} on {previous} - prior-day levels unavailable")
+                return
+            level_engine.set_prior_day(
+                symbol, timeframe,
+                float(bars['high'].max()), float(bars['low'].min()), float(bars['close'].iloc[-1]),
+                previous
+            )
+        except Exception as e:
+            logger.error(f"Error seeding prior-day levels for {symbol}: {e}")
+    
+    async def replay_levels(self, symbol: str, day: date, timeframe: str = "5m") -> SessionLevels:
+        """
+        Fresh levels for replaying a session, seeded with the prior-day
+        high/low/close the way live scoring seeds them
+        """
+        levels = SessionLevels(**level_engine.level_kwargs)
+        try:
+            previous, bars = await self.previous_session_bars(symbol, day, timeframe)
+            if not bars.empty:
+                levels.set_prior_day(
+                    float(bars['high'].max()), float(bars['low'].min()), float(bars['close'].iloc[-1]),
+                    previous
+                )
+            elif previous is not None:
+                logger.warning(f"No bars for {symbol} on {previous} - replaying without prior-day levels")
+        except Exception as e:
+            logger.error(f"Error seeding replay levels for {symbol}: {e}")
+        return levels
+    
+    async def ensure_session_profile(self, symbol: str) -> None:
+        """
+        Rebuild the session volume and TPO profiles from the whole session's
+        1-minute bars when it is first seen (fetched frames may start after
+        the open)
+        """
+        day = session_profile_engine.needs_backfill(symbol)
+        if day is None:
+            return
+        try:
+            bars = await self.fetch_session_bars(symbol, day, "1min")
+            if bars.empty:
+                return
+            session_profile_engine.rebuild(symbol, bars)
+            tpo_engine.rebuild(symbol, bars)
+        except Exception as e:
+            logger.error(f"Error backfilling session profile for {symbol}: {e}")
+    
+    async def store_daily_profile(self, profile: DailyProfile) -> None:
+        """Keep a finished session's profile in memory and persist its bins"""
+        daily_profile_store.add(profile)
+        try:
+            await self.db.daily_volume_profiles.replace_one(
+                {'symbol': profile.symbol, 'date': profile.day.isoformat()},
+                profile.to_document(),
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error storing daily profile for {profile.symbol} on {profile.day}: {e}")
+    
+    async def store_finished_profiles(self) -> None:
+        """Persist the session profiles retired since the last fetch"""
+        for symbol, profile in session_profile_engine.pop_finished():
+            daily = DailyProfile.from_session(symbol, profile)
+            if daily is not None:
+                await self.store_daily_profile(daily)
+    
+    async def load_daily_profiles(self, symbol: str, days: List[date]) -> None:
+        """
+        Make the daily profiles of `days` available in the store: from
+        MongoDB if persisted, otherwise built once from the session's bars
+        """
+        missing = [day for day in daily_profile_store.missing(symbol, days) if (symbol, day) not in self._profile_gaps]
+        if not missing:
+            return
+        try:
+            cursor = self.db.daily_volume_profiles.find({
+                'symbol': symbol,
+                'date': {'$in': [day.isoformat() for day in missing]}
+            })
+            for document in await cursor.to_list(length=None):
+                daily_profile_store.add(DailyProfile.from_document(document))
+        except Exception as e:
+            logger.error(f"Error loading daily profiles for {symbol}: {e}")
+        
+        for day in daily_profile_store.missing(symbol, missing):
+            bars = await self.fetch_session_bars(symbol, day, "1min")
+            if bars.empty:
+                self._profile_gaps.add((symbol, day))
+                continue
+            profile = SessionVolumeProfile(**session_profile_engine.profile_kwargs)
+            for timestamp, high, low, volume in zip(bars.index, bars['high'], bars['low'], bars['volume']):
+                profile.add_bar(timestamp.to_pydatetime(), high, low, volume)
+            daily = DailyProfile.from_session(symbol, profile)
+            if daily is not None:
+                await self.store_daily_profile(daily)
+    
+    async def composite_volume_profile(
+        self,
+        symbol: str,
+        sessions: Optional[int] = None,
+        end: Optional[date] = None
+    ) -> Optional[CompositeProfile]:
+        """
+        Composite profile of finished sessions
+        
+        Args:
+            symbol: Symbol to profile
+            sessions: Trading sessions merged (defaults to composite_profile_sessions)
+            end: Last session included (defaults to the one before today)
+            
+        Returns:
+            CompositeProfile, or None if none of the sessions has bars
+        """
+        sessions = sessions or settings.composite_profile_sessions
+        today = datetime.now(IST).date()
+        day = end if end is not None and end < today else today - timedelta(days=1)
+        
+        days = []
+        for _ in range(4 * sessions + 10):
+            if len(days) == sessions:
+                break
+            if market_calendar.is_trading_day(day):
+                days.append(day)
+            day -= timedelta(days=1)
+        
+        await self.load_daily_profiles(symbol, days)
+        return daily_profile_store.composite(symbol, days)
+    
     async def calculate_indicators(self, df_ohlc):
         """
         Calculate all indicators from OHLC DataFrame for Phase 4
@@ -313,6 +553,10 @@ class IndicatorService:
         Returns:
             Dict with calculated indicators
         """
+        return self.compute_indicators(df_ohlc)
+    
+    def compute_indicators(self, df_ohlc):
+        """Synchronous body of calculate_indicators (used by the backtester)"""
         try:
             # Calculate EMAs
             close_prices = df_ohlc['close'].tolist()
@@ -395,36 +639,135 @@ class IndicatorService:
             logger.error(f"Error fetching OI analysis for {symbol}: {e}")
             return None
     
+    async def fetch_internals(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        """
+        Rolling correlation / relative strength / lead-lag against the peer index
+        
+        The peer's bars come from the shared buffer; they are re-fetched only
+        when the buffer is behind this symbol's latest bar (e.g. when another
+        replica owns the peer).
+        """
+        try:
+            peer = index_internals.peer_of(symbol)
+            own_last = bar_buffer.last_bar_time(symbol, timeframe)
+            peer_last = bar_buffer.last_bar_time(peer, timeframe)
+            if peer_last is None or (own_last is not None and peer_last < own_last):
+                await self.fetch_ohlc_data(peer, timeframe, hours=4)
+            
+            index_internals.sync(symbol, timeframe)
+            return index_internals.snapshot(symbol, timeframe)
+            
+        except Exception as e:
+            logger.error(f"Error computing internals for {symbol}: {e}")
+            return None
+    
+    async def fetch_futures_oi(self, symbol: str) -> Optional[Dict]:
+        """
+        Rolling OI change and price/OI quadrant of the near-month future
+        
+        Market snapshots carrying a `futures` subdocument are replayed into
+        the tracker since the last one ingested; stale features are not
+        returned.
+        """
+        try:
+            now = datetime.utcnow()
+            since = futures_oi_engine.last_time(symbol) or now - timedelta(hours=8)
+            cursor = self.db.market_snapshots.find(
+                {'symbol': symbol, 'timestamp': {'$gt': since}, 'futures': {'$exists': True}},
+                {'_id': 0, 'symbol': 1, 'timestamp': 1, 'futures': 1}
+            ).sort('timestamp', 1)
+            futures_oi_engine.replay(await cursor.to_list(length=600))
+            
+            last = futures_oi_engine.last_time(symbol)
+            if last is None or (now - last).total_seconds() > settings.futures_oi_max_age_seconds:
+                return None
+            return futures_oi_engine.snapshot(symbol)
+            
+        except Exception as e:
+            logger.error(f"Error computing futures OI for {symbol}: {e}")
+            return None
+    
+    async def fetch_breadth(self, symbol: str) -> Optional[Dict]:
+        """
+        Constituent breadth for an index from the minute snapshots written
+        by market-data-realtime
+        
+        Every snapshot since the last one ingested is replayed into the
+        breadth engine (the EMAs need each minute); stale breadth is not
+        returned.
+        """
+        if not settings.breadth_enabled or not breadth_engine.tracks(symbol):
+            return None
+        
+        try:
+            now = datetime.utcnow()
+            since = breadth_engine.last_time or now - timedelta(hours=8)
+            cursor = self.db.constituent_snapshots.find(
+                {'timestamp': {'$gt': since}},
+                {'_id': 0, 'timestamp': 1, 'quotes': 1}
+            ).sort('timestamp', 1)
+            for doc in await cursor.to_list(length=600):
+                breadth_engine.update(doc['timestamp'], doc.get('quotes') or {})
+            
+            last = breadth_engine.last_time
+            if last is None or (now - last).total_seconds() > settings.breadth_max_age_seconds:
+                return None
+            return breadth_engine.snapshot(symbol)
+            
+        except Exception as e:
+            logger.error(f"Error computing breadth for {symbol}: {e}")
+            return None
+    
+    @staticmethod
+    def _latest_close(symbol: str, timeframe: str) -> Optional[float]:
+        bars = bar_buffer.get(symbol, timeframe)
+        return float(bars['close'].iloc[-1]) if bars is not None and len(bars) else None
+    
     async def calculate_score_for_symbol(
         self, 
         symbol: str, 
-        timeframe: str = "5m"
+        timeframe: str = "5m",
+        detail: Optional[str] = None
     ) -> Optional[Dict]:
         """
         Calculate setup score for a symbol using all scoring components
+        
+        Args:
+            symbol: Symbol to score
+            timeframe: Timeframe (5m or 15m)
+            detail: 'lean' returns numeric component scores plus the feature
+                row they came from; 'full' builds the per-component detail
+                dicts. Defaults to settings.score_detail_level.
         """
         start_time = time.time()
+        detail = detail or settings.score_detail_level
         
         try:
-            # Initialize scorer
-            scorer = SetupScorer()
-            
             # Fetch OHLC data for Phase 4
-            df_ohlc = await self.fetch_ohlc_data(symbol, timeframe, hours=4)
+            with scheduler_telemetry.stage('fetch_ohlc'):
+                df_ohlc = await self.fetch_ohlc_data(symbol, timeframe, hours=4)
             
             if df_ohlc is None or len(df_ohlc) < 50:
                 logger.error(f"Insufficient OHLC data for {symbol}")
                 return None
             
+            # Resampled bars are labelled by their open time
+            bar_minutes = int(timeframe.rstrip('m'))
+            scheduler_telemetry.record_bar_close(
+                df_ohlc.index[-1].to_pydatetime() + timedelta(minutes=bar_minutes)
+            )
+            
             # Calculate indicators
-            indicators = await self.calculate_indicators(df_ohlc)
+            with scheduler_telemetry.stage('indicators'):
+                indicators = await self.calculate_indicators(df_ohlc)
             
             if not indicators:
                 logger.error(f"Failed to calculate indicators for {symbol}")
                 return None
             
             # Fetch OI analysis from Phase 3 service (if available)
-            oi_analysis = await self.fetch_oi_analysis(symbol)
+            with scheduler_telemetry.stage('oi_fetch'):
+                oi_analysis = await self.fetch_oi_analysis(symbol)
             
             # Extract data for scorer
             current_price = float(df_ohlc['close'].iloc[-1])
@@ -439,14 +782,18 @@ class IndicatorService:
             # Get VWAP data
             vwap = indicators.get('vwap')
             
-            # Get futures OI (from market data if available)
-            futures_oi = None
-            nifty_price = None
-            banknifty_price = None
+            # Rolling futures OI features (from market snapshots if available)
+            with scheduler_telemetry.stage('futures_oi'):
+                futures_oi = await self.fetch_futures_oi(symbol)
             
-            # Calculate score
-            result = scorer.calculate_setup_score(
-                symbol=symbol,
+            # Cross-index internals from the shared bar buffers
+            with scheduler_telemetry.stage('internals'):
+                internals = await self.fetch_internals(symbol, timeframe)
+                breadth = await self.fetch_breadth(symbol)
+            nifty_price = self._latest_close('NIFTY', timeframe)
+            banknifty_price = self._latest_close('BANKNIFTY', timeframe)
+            
+            scorer_inputs = dict(
                 price=current_price,
                 ema_5m=ema_5m,
                 ema_15m=ema_15m,
@@ -458,17 +805,43 @@ class IndicatorService:
                 futures_oi=futures_oi,
                 nifty_price=nifty_price,
                 banknifty_price=banknifty_price,
-                oi_analysis=oi_analysis  # Phase 3: OI Analysis
+                oi_analysis=oi_analysis,  # Phase 3: OI Analysis
+                internals=internals,
+                breadth=breadth,
+                levels=level_engine.index(symbol, timeframe),
+                ranges=range_engine.index(symbol, timeframe, df_ohlc.index[-1].to_pydatetime())
             )
             
+            # Calculate score
+            with scheduler_telemetry.stage('scoring'):
+                if detail == 'full':
+                    result = SetupScorer().calculate_setup_score(symbol=symbol, **scorer_inputs)
+                else:
+                    # Lean: numeric scores only; details are rebuilt from the
+                    # stored feature row when someone asks for them
+                    features = BatchSetupScorer.build_feature_row(**scorer_inputs)
+                    result = self.batch_scorer.score_rows(features[None, :])[0]
+                    result['features'] = [None if np.isnan(v) else float(v) for v in features]
+            result['detail_level'] = detail
+            
             # Add timing information and metadata
             result['symbol'] = symbol
             result['timeframe'] = timeframe
             result['evaluation_time_seconds'] = round(time.time() - start_time, 3)
             result['timestamp'] = datetime.utcnow()
             
-            # Store in database
-            await self.store_score_data(result)
+            # Store only scores worth publishing; callers broadcast on 'emitted'
+            emit, reason = emit_suppressor.check(
+                f"{symbol}:{timeframe}",
+                result['setup_score'],
+                result['market_bias'],
+                result.get('rules_version')
+            )
+            result['emitted'] = emit
+            result['emit_reason'] = reason
+            if emit:
+                with scheduler_telemetry.stage('store'):
+                    await self.store_score_data(result)
             
             logger.info(
                 f"Calculated score for {symbol} ({timeframe}): "
@@ -486,7 +859,7 @@ class IndicatorService:
         Store calculated score in MongoDB
         """
         try:
-            if not self.db:
+            if self.db is None:
                 await self.connect_db()
             
             document = {
@@ -496,10 +869,16 @@ class IndicatorService:
                 'setup_score': score_data['setup_score'],
                 'market_bias': score_data['market_bias'],
                 'components': score_data['components'],
+                'detail_level': score_data.get('detail_level', 'full'),
+                'rules_version': score_data.get('rules_version'),
                 'evaluation_time_seconds': score_data['evaluation_time_seconds'],
+                'replica_id': shard_coordinator.replica_id,
                 'created_at': datetime.utcnow()
             }
             
+            if score_data.get('features') is not None:
+                document['features'] = score_data['features']
+            
             await self.db.scoring_snapshots.insert_one(document)
             logger.info(
                 f"Stored score for {score_data['symbol']} ({score_data['timeframe']}): "
@@ -519,7 +898,7 @@ class IndicatorService:
         Get historical scores for a symbol
         """
         try:
-            if not self.db:
+            if self.db is None:
                 await self.connect_db()
             
             cursor = self.db.scoring_snapshots.find(
@@ -537,6 +916,31 @@ class IndicatorService:
             logger.error(f"Error fetching score history: {e}")
             return []
 
+    def shape_score_components(self, score_doc: Dict, detail: str = "lean") -> Dict:
+        """
+        Components of a computed or stored score at the requested detail level
+        
+        Lean scores are expanded from their stored feature row for
+        detail='full'; full scores have their detail dicts dropped for 'lean'.
+        Scores stored before lean mode existed have no features and are
+        returned with whatever details they carry.
+        """
+        components = score_doc.get('components', {})
+        if detail == 'full':
+            if score_doc.get('features') is not None and components and not any(
+                'details' in component for component in components.values()
+            ):
+                try:
+                    return self.batch_scorer.explain(score_doc['features'], components)
+                except Exception as e:
+                    logger.error(f"Error expanding score details: {e}")
+            return components
+        
+        return {
+            name: {k: v for k, v in component.items() if k != 'details'}
+            for name, component in components.items()
+        }
+
 
 # Global service instance
 indicator_service = IndicatorService()
@@ -0,0 +1,339 @@
+"""
+Session Volume Profile
+Volume-at-price for the current session on a fixed price grid (a whole
+number of ticks per bin, anchored at price zero), so a bin always covers
+the same prices however far the session ranges. Each 1-minute bar is
+absorbed in O(bins it touches): the bin array grows when price extends,
+the POC only moves to a bin that just gained volume, and the value area
+is widened from where it stood. Reading POC/VAH/VAL is O(1).
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.volume_profile import interpret_position, value_area
+
+logger = logging.getLogger(__name__)
+
+# Spare bins added on the side a growing bin array extends
+GROWTH_BINS = 64
+
+
+def describe_profile(
+    poc: float,
+    vah: float,
+    val: float,
+    poc_volume: float,
+    value_area_volume: float,
+    total_volume: float,
+    distribution: Dict[str, float],
+    current_price: Optional[float] = None
+) -> Dict:
+    """
+    POC/VAH/VAL and where a price sits relative to them, in the same shape
+    as VolumeProfileCalculator.calculate
+
+    Args:
+        current_price: Price to position (defaults to the POC)
+    """
+    price = float(current_price) if current_price is not None else poc
+
+    if price > vah:
+        price_position = 'ABOVE_VALUE'
+    elif price < val:
+        price_position = 'BELOW_VALUE'
+    else:
+        price_position = 'IN_VALUE'
+    poc_distance_pct = abs((price - poc) / price) * 100 if price else 0.0
+
+    return {
+        'poc': poc,
+        'vah': vah,
+        'val': val,
+        'current_price': round(price, 2),
+        'price_position': price_position,
+        'poc_distance_pct': round(poc_distance_pct, 3),
+        'value_area_volume': round(value_area_volume, 2),
+        'value_area_pct': round((value_area_volume / total_volume) * 100, 2),
+        'total_volume': round(total_volume, 2),
+        'poc_volume': round(poc_volume, 2),
+        'volume_distribution': distribution,
+        'interpretation': interpret_position(price_position, poc_distance_pct)
+    }
+
+
+class SessionVolumeProfile:
+    """
+    Incremental volume profile of one session
+
+    Bin k covers [k * bin_size, (k + 1) * bin_size) and is reported at its
+    midpoint. A bar's volume is spread evenly over the bins its high-low
+    range touches; bars without volume (index snapshots carry none) count
+    as one unit, which makes the profile time-at-price.
+
+    The POC stays put on ties, and the value area is only re-expanded from
+    the POC when the POC moves; otherwise it is widened from its previous
+    extent until it covers the target share again, so the levels change
+    only when the volume actually says so.
+    """
+
+    def __init__(self, tick_size: float = 0.05, bin_ticks: int = 20, value_area_percent: float = 0.70):
+        """
+        Args:
+            tick_size: Instrument tick size
+            bin_ticks: Ticks per price bin
+            value_area_percent: Share of session volume inside the value area
+        """
+        self.bin_size = tick_size * bin_ticks
+        self.value_area_percent = value_area_percent
+        self.reset()
+
+    def reset(self, session_day: Optional[date] = None) -> None:
+        self.session_day = session_day
+        self.volumes = np.zeros(0, dtype=np.float64)
+        self.base = 0  # Absolute bin number of volumes[0]
+        self.lowest = self.highest = None  # Touched extent (array indices)
+        self.total_volume = 0.0
+        self.poc = None
+        self.va_lower = self.va_upper = None
+        self.va_volume = 0.0
+        self.bars = 0
+        self.first_time: Optional[datetime] = None
+        self.last_time: Optional[datetime] = None
+        self.session_high = self.session_low = None
+        self._distribution: Optional[Dict[str, float]] = None
+
+    def _bin(self, price: float) -> int:
+        return math.floor(price / self.bin_size + 1e-9)
+
+    def _price(self, index: int) -> float:
+        return round((self.base + index + 0.5) * self.bin_size, 2)
+
+    def _ensure_bins(self, first: int, last: int) -> None:
+        """Grow the bin array to cover absolute bins first..last"""
+        if len(self.volumes) == 0:
+            self.base = first - GROWTH_BINS
+            self.volumes = np.zeros(last - first + 1 + 2 * GROWTH_BINS, dtype=np.float64)
+            return
+        below = self.base - first
+        above = last - (self.base + len(self.volumes) - 1)
+        if below <= 0 and above <= 0:
+            return
+        pad_below = below + GROWTH_BINS if below > 0 else 0
+        pad_above = above + GROWTH_BINS if above > 0 else 0
+        self.volumes = np.concatenate([np.zeros(pad_below), self.volumes, np.zeros(pad_above)])
+        if pad_below:
+            self.base -= pad_below
+            self.lowest += pad_below
+            self.highest += pad_below
+            self.poc += pad_below
+            self.va_lower += pad_below
+            self.va_upper += pad_below
+
+    def add_bar(self, timestamp: datetime, high: float, low: float, volume: float) -> None:
+        """
+        Absorb one completed bar (a bar from a later date starts a new session)
+
+        Args:
+            timestamp: Bar time (the session is its date)
+            high: Bar high
+            low: Bar low
+            volume: Bar volume (<= 0 counts as one unit)
+        """
+        day = timestamp.date()
+        if day != self.session_day:
+            self.reset(day)
+
+        volume = float(volume) if volume and volume > 0 else 1.0
+        high, low = float(max(high, low)), float(min(high, low))
+        first, last = self._bin(low), self._bin(high)
+        self._ensure_bins(first, last)
+        lo, hi = first - self.base, last - self.base
+
+        share = volume / (hi - lo + 1)
+        self.volumes[lo:hi + 1] += share
+        self.total_volume += volume
+        self.bars += 1
+        self.first_time = self.first_time or timestamp
+        self.last_time = timestamp
+        self.session_high = high if self.session_high is None else max(self.session_high, high)
+        self.session_low = low if self.session_low is None else min(self.session_low, low)
+        self.lowest = lo if self.lowest is None else min(self.lowest, lo)
+        self.highest = hi if self.highest is None else max(self.highest, hi)
+        self._distribution = None
+
+        # Volume only grows, so the POC can only move to a bin this bar touched
+        touched = self.volumes[lo:hi + 1]
+        best = lo + int(np.argmax(touched))
+        target = self.total_volume * self.value_area_percent
+        if self.poc is None or self.volumes[best] > self.volumes[self.poc]:
+            self.poc = best
+            self.va_lower, self.va_upper, self.va_volume = value_area(
+                self.volumes[self.lowest:self.highest + 1], best - self.lowest, target
+            )
+            self.va_lower += self.lowest
+            self.va_upper += self.lowest
+            return
+
+        overlap = min(hi, self.va_upper) - max(lo, self.va_lower) + 1
+        if overlap > 0:
+            self.va_volume += share * overlap
+        self._widen_value_area(target)
+
+    def _widen_value_area(self, target: float) -> None:
+        """Continue the value-area expansion from its current extent"""
+        volumes = self.volumes
+        last = len(volumes) - 1
+        while self.va_volume < target:
+            lower_volume = volumes[self.va_lower - 1] if self.va_lower > 0 else 0.0
+            upper_volume = volumes[self.va_upper + 1] if self.va_upper < last else 0.0
+            if lower_volume == 0 and upper_volume == 0:
+                break
+            if lower_volume > upper_volume:
+                self.va_lower -= 1
+                self.va_volume += lower_volume
+            else:
+                self.va_upper += 1
+                self.va_volume += upper_volume
+
+    @property
+    def poc_price(self) -> Optional[float]:
+        return self._price(self.poc) if self.poc is not None else None
+
+    @property
+    def vah(self) -> Optional[float]:
+        return self._price(self.va_upper) if self.poc is not None else None
+
+    @property
+    def val(self) -> Optional[float]:
+        return self._price(self.va_lower) if self.poc is not None else None
+
+    def distribution(self) -> Dict[str, float]:
+        """Volume per touched bin, keyed by bin midpoint (rebuilt after a new bar only)"""
+        if self._distribution is None:
+            self._distribution = {}
+            if self.poc is not None:
+                volumes = self.volumes[self.lowest:self.highest + 1]
+                for offset in np.flatnonzero(volumes > 0).tolist():
+                    self._distribution[f"{self._price(self.lowest + offset):.2f}"] = round(float(volumes[offset]), 2)
+        return self._distribution
+
+    def snapshot(self, current_price: Optional[float] = None) -> Optional[Dict]:
+        """
+        Profile levels positioned against a price (see describe_profile)
+
+        Returns:
+            Profile dictionary, or None before the first bar
+        """
+        if self.poc is None:
+            return None
+        snapshot = describe_profile(
+            self.poc_price, self.vah, self.val, float(self.volumes[self.poc]),
+            self.va_volume, self.total_volume, self.distribution(), current_price
+        )
+        snapshot.update({
+            'session': self.session_day.isoformat(),
+            'bin_size': round(self.bin_size, 4),
+            'bars': self.bars,
+            'last_bar': self.last_time.isoformat()
+        })
+        return snapshot
+
+
+class SessionProfileEngine:
+    """Session volume profile per symbol, fed from the fetched 1-minute bars"""
+
+    def __init__(self, tick_size: float = 0.05, bin_ticks: int = 20, value_area_percent: float = 0.70):
+        self.profile_kwargs = dict(
+            tick_size=tick_size,
+            bin_ticks=bin_ticks,
+            value_area_percent=value_area_percent
+        )
+        self.profiles: Dict[str, SessionVolumeProfile] = {}
+        self._backfill_requested: Dict[str, date] = {}
+        self._finished: List[Tuple[str, SessionVolumeProfile]] = []
+
+    def profile(self, symbol: str) -> SessionVolumeProfile:
+        if symbol not in self.profiles:
+            self.profiles[symbol] = SessionVolumeProfile(**self.profile_kwargs)
+        return self.profiles[symbol]
+
+    def update(self, symbol: str, bars: pd.DataFrame) -> SessionVolumeProfile:
+        """
+        Absorb the completed 1-minute bars of a freshly fetched frame
+
+        The last row may still be forming and is left for the next update.
+        A bar from a later session retires the current profile (collected
+        with pop_finished) and starts a new one.
+        """
+        profile = self.profile(symbol)
+        try:
+            completed = bars.iloc[:-1]
+            if profile.last_time is not None:
+                completed = completed[completed.index > profile.last_time]
+            for timestamp, high, low, volume in zip(
+                completed.index, completed['high'], completed['low'], completed['volume']
+            ):
+                timestamp = timestamp.to_pydatetime()
+                if profile.session_day is not None and timestamp.date() != profile.session_day:
+                    self._finished.append((symbol, profile))
+                    profile = self.profiles[symbol] = SessionVolumeProfile(**self.profile_kwargs)
+                profile.add_bar(timestamp, high, low, volume)
+        except Exception as e:
+            logger.error(f"Error updating session profile for {symbol}: {e}")
+        return profile
+
+    def rebuild(self, symbol: str, bars: pd.DataFrame) -> SessionVolumeProfile:
+        """Replace the profile with one built from a whole session's 1-minute bars"""
+        self.profiles[symbol] = SessionVolumeProfile(**self.profile_kwargs)
+        return self.update(symbol, bars)
+
+    def pop_finished(self) -> List[Tuple[str, SessionVolumeProfile]]:
+        """(symbol, profile) of sessions retired since the last call"""
+        finished, self._finished = self._finished, []
+        return finished
+
+    def needs_backfill(self, symbol: str) -> Optional[date]:
+        """
+        Session date whose opening bars may be missing from the profile
+        (fetched frames only reach back a few hours; asked once per session)
+
+        Returns:
+            The current session date, or None if nothing is needed
+        """
+        profile = self.profiles.get(symbol)
+        if profile is None or profile.session_day is None:
+            return None
+        if self._backfill_requested.get(symbol) == profile.session_day:
+            return None
+        self._backfill_requested[symbol] = profile.session_day
+        return profile.session_day
+
+    def snapshot(self, symbol: str, current_price: Optional[float] = None) -> Optional[Dict]:
+        profile = self.profiles.get(symbol)
+        return profile.snapshot(current_price) if profile is not None else None
+
+    def get_status(self) -> Dict:
+        return {
+            symbol: {
+                'session': profile.session_day.isoformat() if profile.session_day else None,
+                'bars': profile.bars,
+                'bins': (profile.highest - profile.lowest + 1) if profile.poc is not None else 0,
+                'poc': profile.poc_price,
+                'last_bar': profile.last_time.isoformat() if profile.last_time else None
+            }
+            for symbol, profile in self.profiles.items()
+        }
+
+
+# Global session profile engine
+session_profile_engine = SessionProfileEngine(
+    tick_size=settings.volume_profile_tick_size,
+    bin_ticks=settings.volume_profile_bin_ticks,
+    value_area_percent=settings.volume_profile_value_area_percent
+)
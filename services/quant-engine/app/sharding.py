@@ -0,0 +1,228 @@
+"""
+Symbol sharding across quant-engine replicas
+Spreads symbol ownership over live replicas with a consistent hash ring.
+Membership and per-symbol leases are kept in MongoDB so a dead replica's
+symbols are picked up by the survivors within one heartbeat/lease cycle.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+import bisect
+import hashlib
+import logging
+import socket
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)"""
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class ConsistentHashRing:
+    """
+    Consistent hash ring with virtual nodes
+    Adding or removing a replica only moves the symbols adjacent to its nodes.
+    """
+
+    def __init__(self, virtual_nodes: int = 64):
+        """
+        Args:
+            virtual_nodes: Number of ring positions per member
+        """
+        self.virtual_nodes = virtual_nodes
+        self._keys: List[int] = []
+        self._owners: List[str] = []
+        self.members: List[str] = []
+
+    def rebuild(self, members: List[str]) -> None:
+        """Rebuild the ring for the given member ids"""
+        points = []
+        for member in members:
+            for vnode in range(self.virtual_nodes):
+                points.append((_hash(f"{member}#{vnode}"), member))
+        points.sort()
+        self._keys = [point[0] for point in points]
+        self._owners = [point[1] for point in points]
+        self.members = sorted(members)
+
+    def owner(self, key: str) -> Optional[str]:
+        """Get the member owning a key (None if the ring is empty)"""
+        if not self._keys:
+            return None
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[idx]
+
+
+class ShardCoordinator:
+    """
+    Replica membership and symbol lease coordinator
+
+    Each replica heartbeats a document in `quant_replicas`; every live
+    replica builds the same ring from that set and claims leases in
+    `symbol_leases` for the symbols the ring assigns to it. A lease is only
+    taken over once it has expired, so two replicas never evaluate the same
+    symbol at the same time while membership is changing.
+    """
+
+    def __init__(
+        self,
+        replica_id: Optional[str] = None,
+        symbols: Optional[List[str]] = None,
+        lease_seconds: int = 30,
+        virtual_nodes: int = 64,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            replica_id: Unique id of this replica (defaults to hostname)
+            symbols: Symbol universe to distribute
+            lease_seconds: Membership/lease validity without a heartbeat
+            virtual_nodes: Ring positions per replica
+            enabled: When False this replica owns every symbol
+        """
+        self.replica_id = replica_id or socket.gethostname()
+        self.symbols = list(symbols or [])
+        self.lease_seconds = lease_seconds
+        self.enabled = enabled
+        self.ring = ConsistentHashRing(virtual_nodes)
+        self.owned_symbols: Set[str] = set() if enabled else set(self.symbols)
+        self.last_heartbeat: Optional[datetime] = None
+        self._indexes_ready = False
+
+    async def _ensure_indexes(self, db) -> None:
+        """Create TTL indexes so stale membership/lease docs get cleaned up"""
+        if self._indexes_ready:
+            return
+        await db.quant_replicas.create_index('expires_at', expireAfterSeconds=0)
+        await db.symbol_leases.create_index('expires_at', expireAfterSeconds=0)
+        self._indexes_ready = True
+
+    async def heartbeat(self, db) -> Set[str]:
+        """
+        Refresh membership, rebuild the ring and renew/claim symbol leases
+
+        Args:
+            db: Motor database handle
+
+        Returns:
+            Set of symbols this replica currently owns
+        """
+        if not self.enabled:
+            return self.owned_symbols
+
+        try:
+            await self._ensure_indexes(db)
+            now = datetime.utcnow()
+            expires_at = now + timedelta(seconds=self.lease_seconds)
+
+            await db.quant_replicas.update_one(
+                {'_id': self.replica_id},
+                {
+                    '$set': {'heartbeat_at': now, 'expires_at': expires_at},
+                    '$setOnInsert': {'joined_at': now}
+                },
+                upsert=True
+            )
+
+            # TTL cleanup runs only once a minute, so filter on expiry here too
+            cursor = db.quant_replicas.find({'expires_at': {'$gt': now}}, {'_id': 1})
+            members = [doc['_id'] async for doc in cursor]
+            if self.replica_id not in members:
+                members.append(self.replica_id)
+
+            if sorted(members) != self.ring.members:
+                logger.info(f"Shard ring membership changed: {sorted(members)}")
+                self.ring.rebuild(members)
+
+            owned = set()
+            for symbol in self.symbols:
+                if self.ring.owner(symbol) != self.replica_id:
+                    await db.symbol_leases.delete_one(
+                        {'_id': symbol, 'owner': self.replica_id}
+                    )
+                    continue
+                if await self._claim_lease(db, symbol, now, expires_at):
+                    owned.add(symbol)
+
+            if owned != self.owned_symbols:
+                logger.info(f"Replica {self.replica_id} now owns: {sorted(owned)}")
+            self.owned_symbols = owned
+            self.last_heartbeat = now
+            return owned
+
+        except Exception as e:
+            # Without a fresh lease we must not keep evaluating: drop ownership
+            logger.error(f"Shard heartbeat failed for {self.replica_id}: {e}")
+            self.owned_symbols = set()
+            return self.owned_symbols
+
+    async def _claim_lease(
+        self,
+        db,
+        symbol: str,
+        now: datetime,
+        expires_at: datetime
+    ) -> bool:
+        """Renew our lease on a symbol or take it over once expired"""
+        try:
+            doc = await db.symbol_leases.find_one_and_update(
+                {
+                    '_id': symbol,
+                    '$or': [
+                        {'owner': self.replica_id},
+                        {'expires_at': {'$lte': now}}
+                    ]
+                },
+                {'$set': {'owner': self.replica_id, 'expires_at': expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return doc is not None and doc.get('owner') == self.replica_id
+        except DuplicateKeyError:
+            # Another replica still holds an unexpired lease
+            return False
+
+    async def release(self, db) -> None:
+        """Leave the ring and hand back leases (graceful shutdown)"""
+        if not self.enabled or db is None:
+            return
+        try:
+            await db.symbol_leases.delete_many({'owner': self.replica_id})
+            await db.quant_replicas.delete_one({'_id': self.replica_id})
+            self.owned_symbols = set()
+            logger.info(f"Replica {self.replica_id} released its shard leases")
+        except Exception as e:
+            logger.error(f"Error releasing shard leases: {e}")
+
+    def owns(self, symbol: str) -> bool:
+        """Whether this replica should evaluate the symbol"""
+        if not self.enabled:
+            return True
+        return symbol in self.owned_symbols
+
+    def get_status(self) -> Dict:
+        """Current shard assignment for diagnostics"""
+        return {
+            'replica_id': self.replica_id,
+            'enabled': self.enabled,
+            'members': self.ring.members,
+            'owned_symbols': sorted(self.owned_symbols),
+            'assignments': {symbol: self.ring.owner(symbol) for symbol in self.symbols},
+            'last_heartbeat': self.last_heartbeat.isoformat() if self.last_heartbeat else None
+        }
+
+
+# Global shard coordinator instance
+shard_coordinator = ShardCoordinator(
+    replica_id=settings.replica_id,
+    symbols=settings.symbols,
+    lease_seconds=settings.shard_lease_seconds,
+    virtual_nodes=settings.shard_virtual_nodes,
+    enabled=settings.sharding_enabled
+)
@@ -0,0 +1,220 @@
+"""
+Minute-of-Day Time Risk Table
+Category and score for each of the 1440 minutes of a day, per risk mode
+and session shape, built from the time-risk windows file and the exchange
+calendar. Scoring a timestamp is one array index; whole bar series are
+looked up with array indexing for backtests.
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.market_calendar import ExchangeCalendar, IST, market_calendar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_RISK_FILE = os.path.join(os.path.dirname(__file__), 'data', 'time_risk_windows.json')
+
+MINUTES_PER_DAY = 1440
+
+# Category codes stored in the table
+CATEGORIES = ('OPENING_NOISE', 'CHOP_HOUR', 'LATE_SESSION', 'PRIME_TIME', 'MARKET_CLOSED')
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+CLOSED = CATEGORY_CODES['MARKET_CLOSED']
+PRIME = CATEGORY_CODES['PRIME_TIME']
+
+_DEFAULT_CATEGORIES = {
+    'OPENING_NOISE': {'score': 10.0, 'interpretation': 'Extreme risk - Opening volatility'},
+    'CHOP_HOUR': {'score': 7.0, 'interpretation': 'High risk - Sideways movement likely'},
+    'LATE_SESSION': {'score': 6.0, 'interpretation': 'Moderate risk - End of day volatility'},
+    'PRIME_TIME': {'score': 2.0, 'interpretation': 'Low risk - Ideal trading time'},
+    'MARKET_CLOSED': {'score': 10.0, 'interpretation': 'Market closed'}
+}
+_DEFAULT_WINDOWS = [
+    {'category': 'OPENING_NOISE', 'after_open': 15},
+    {'category': 'CHOP_HOUR', 'start': '11:00', 'end': '12:30'},
+    {'category': 'LATE_SESSION', 'before_close': 30}
+]
+
+
+def _minute_of_day(value: str) -> int:
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class TimeRiskTable:
+    """
+    Precomputed minute-of-day time risk per (risk mode, session open, close)
+
+    Tables for the regular session are built at start-up for every mode;
+    special sessions (different open/close) get their own table the first
+    time they are seen.
+    """
+
+    def __init__(
+        self,
+        windows_file: Optional[str] = None,
+        calendar: Optional[ExchangeCalendar] = None
+    ):
+        """
+        Args:
+            windows_file: JSON time-risk windows (defaults to app/data/time_risk_windows.json)
+            calendar: Exchange calendar for session open/close and holidays
+        """
+        self.windows_file = windows_file or DEFAULT_TIME_RISK_FILE
+        self.calendar = calendar or market_calendar
+        self.categories: Dict[str, Dict] = dict(_DEFAULT_CATEGORIES)
+        self.windows: Dict[Optional[str], List[Dict]] = {None: list(_DEFAULT_WINDOWS)}
+        self._tables: Dict[Tuple[Optional[str], int, int], np.ndarray] = {}
+        self._load()
+
+        self.scores = np.array([self.categories[name]['score'] for name in CATEGORIES], dtype=np.float64)
+        self.interpretations = [self.categories[name]['interpretation'] for name in CATEGORIES]
+
+        regular = (
+            self.calendar.market_start.hour * 60 + self.calendar.market_start.minute,
+            self.calendar.market_end.hour * 60 + self.calendar.market_end.minute
+        )
+        for mode in self.windows:
+            self._table(mode, *regular)
+
+    def _load(self) -> None:
+        try:
+            with open(self.windows_file) as f:
+                data = json.load(f)
+            for name, spec in data.get('categories', {}).items():
+                if name not in CATEGORY_CODES:
+                    raise ValueError(f"unknown category {name!r}")
+                self.categories[name] = {'score': float(spec['score']), 'interpretation': spec['interpretation']}
+            self.windows[None] = data.get('windows', self.windows[None])
+            for mode, spec in data.get('modes', {}).items():
+                if spec.get('windows') is not None:
+                    self.windows[mode.upper()] = spec['windows']
+            for windows in self.windows.values():
+                for window in windows:
+                    if window['category'] not in CATEGORY_CODES:
+                        raise ValueError(f"unknown window category {window['category']!r}")
+            logger.info(f"Loaded time risk windows ({len(self.windows) - 1} mode overrides)")
+        except Exception as e:
+            logger.error(f"Error loading time risk windows {self.windows_file}: {e} - using defaults")
+            self.categories = dict(_DEFAULT_CATEGORIES)
+            self.windows = {None: list(_DEFAULT_WINDOWS)}
+
+    def _build(self, mode: Optional[str], open_minute: int, close_minute: int) -> np.ndarray:
+        """Category code per minute of the day for one session shape"""
+        table = np.full(MINUTES_PER_DAY, CLOSED, dtype=np.int8)
+        table[open_minute:close_minute] = PRIME
+
+        # Apply in reverse so the first listed window wins on overlaps
+        for window in reversed(self.windows.get(mode, self.windows[None])):
+            if 'after_open' in window:
+                start, end = open_minute, open_minute + int(window['after_open'])
+            elif 'before_close' in window:
+                start, end = close_minute - int(window['before_close']), close_minute
+            else:
+                start, end = _minute_of_day(window['start']), _minute_of_day(window['end'])
+            start, end = max(start, open_minute), min(end, close_minute)
+            if start < end:
+                table[start:end] = CATEGORY_CODES[window['category']]
+        return table
+
+    def _table(self, mode: Optional[str], open_minute: int, close_minute: int) -> np.ndarray:
+        mode = getattr(mode, 'value', mode)  # RiskMode or its name
+        mode = mode if mode in self.windows else None
+        key = (mode, open_minute, close_minute)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = self._build(mode, open_minute, close_minute)
+        return table
+
+    def table_for(self, day: date, mode: Optional[str] = None) -> Optional[np.ndarray]:
+        """Minute table for a date (None when the market is shut)"""
+        session = self.calendar.session_for(day)
+        if session is None:
+            return None
+        return self._table(
+            mode,
+            session.open.hour * 60 + session.open.minute,
+            session.close.hour * 60 + session.close.minute
+        )
+
+    def lookup(self, timestamp: Optional[datetime] = None, mode: Optional[str] = None) -> Tuple[int, datetime]:
+        """
+        Category code at a timestamp (naive timestamps are IST wall-clock time)
+
+        Returns:
+            Tuple of (category code, timestamp in IST wall-clock time)
+        """
+        if timestamp is None:
+            timestamp = datetime.now(IST)
+        elif timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(IST)
+
+        table = self.table_for(timestamp.date(), mode)
+        if table is None:
+            return CLOSED, timestamp
+        return int(table[timestamp.hour * 60 + timestamp.minute]), timestamp
+
+    def lookup_series(self, timestamps, mode: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Category codes and scores for a whole series of timestamps
+
+        Args:
+            timestamps: DatetimeIndex or array-like (naive = IST wall-clock time)
+            mode: Risk mode name (None for the default windows)
+
+        Returns:
+            Tuple of (category codes, scores) arrays
+        """
+        index = pd.DatetimeIndex(timestamps)
+        if index.tz is not None:
+            index = index.tz_convert(IST).tz_localize(None)
+
+        minutes = (index.hour * 60 + index.minute).to_numpy()
+        days = index.normalize()
+        codes = np.full(len(index), CLOSED, dtype=np.int8)
+
+        for day in days.unique():
+            table = self.table_for(day.date(), mode)
+            if table is None:
+                continue
+            mask = (days == day)
+            codes[mask] = table[minutes[mask]]
+        return codes, self.scores[codes]
+
+    def score(self, code: int) -> float:
+        return self.scores[code].item()
+
+    def to_dict(self, mode: Optional[str] = None, day: Optional[date] = None) -> Dict:
+        """Windows of one mode/day as start-end ranges per category"""
+        day = day or datetime.now(IST).date()
+        table = self.table_for(day, mode)
+        ranges = []
+        if table is not None:
+            change = np.flatnonzero(np.diff(table)) + 1
+            starts = np.concatenate([[0], change])
+            ends = np.concatenate([change, [MINUTES_PER_DAY]])
+            for start, end in zip(starts, ends):
+                ranges.append({
+                    'category': CATEGORIES[table[start]],
+                    'start': f"{start // 60:02d}:{start % 60:02d}",
+                    'end': f"{end // 60:02d}:{end % 60:02d}" if end < MINUTES_PER_DAY else "24:00",
+                    'score': self.score(table[start])
+                })
+        return {
+            'date': day.isoformat(),
+            'mode': mode,
+            'default_windows': mode not in self.windows,
+            'trading_day': table is not None,
+            'ranges': ranges
+        }
+
+
+# Global time risk table
+time_risk_table = TimeRiskTable(windows_file=settings.time_risk_file)
@@ -0,0 +1,351 @@
+"""
+Market Profile (TPO)
+Time-price opportunities of the current session on the same fixed price
+grid as the session volume profile. Each price bin keeps a bitmask of the
+periods (30-minute letters A, B, C, ... from the session open) that
+traded there and its TPO count, so a 1-minute bar costs one vectorized OR
+over the bins it touches. Initial balance, single prints and the POC and
+value area by time are read from these arrays.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+import math
+import string
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from app.config import settings
+from app.market_calendar import IST, market_calendar
+from app.session_profile import GROWTH_BINS
+from app.volume_profile import value_area
+
+logger = logging.getLogger(__name__)
+
+PERIOD_LETTERS = string.ascii_uppercase + string.ascii_lowercase
+MAX_PERIODS = 64  # One bit per period in a uint64 mask
+
+
+class TPOProfile:
+    """
+    Incremental TPO profile of one session
+
+    Bin k covers [k * bin_size, (k + 1) * bin_size) like SessionVolumeProfile.
+    Periods are counted from the calendar session open (the first bar when
+    the calendar has no session); bars before the open fold into the first
+    period and bars after the 64th period into the last one. A profile that
+    starts after the first period has no initial balance.
+    """
+
+    def __init__(
+        self,
+        tick_size: float = 0.05,
+        bin_ticks: int = 20,
+        period_minutes: int = 30,
+        initial_balance_periods: int = 2,
+        value_area_percent: float = 0.70,
+        bar_timezone=IST
+    ):
+        """
+        Args:
+            tick_size: Instrument tick size
+            bin_ticks: Ticks per price bin
+            period_minutes: Minutes per TPO period (letter)
+            initial_balance_periods: Opening periods forming the initial balance
+            value_area_percent: Share of TPOs inside the value area
+            bar_timezone: Zone of the naive bar timestamps (for the session open)
+        """
+        self.bin_size = tick_size * bin_ticks
+        self.period = timedelta(minutes=period_minutes)
+        self.period_minutes = period_minutes
+        self.initial_balance_periods = initial_balance_periods
+        self.value_area_percent = value_area_percent
+        self.bar_timezone = bar_timezone
+        self.reset()
+
+    def reset(self, session_day: Optional[date] = None) -> None:
+        self.session_day = session_day
+        self.masks = np.zeros(0, dtype=np.uint64)  # Periods that traded in each bin
+        self.counts = np.zeros(0, dtype=np.int32)  # TPOs per bin (set bits of the mask)
+        self.base = 0  # Absolute bin number of masks[0]
+        self.lowest = self.highest = None  # Touched extent (array indices)
+        self.open_time: Optional[datetime] = None
+        self.opening_seen = False  # The first period's bars were absorbed
+        self.last_time: Optional[datetime] = None
+        self.period_highs: List[float] = []
+        self.period_lows: List[float] = []
+        self.total_tpos = 0
+        self.poc = None
+        self.bars = 0
+        self._value_area: Optional[Tuple[int, int, float]] = None
+
+    def _bin(self, price: float) -> int:
+        return math.floor(price / self.bin_size + 1e-9)
+
+    def _price(self, index: int) -> float:
+        return round((self.base + index + 0.5) * self.bin_size, 2)
+
+    def _ensure_bins(self, first: int, last: int) -> None:
+        """Grow the bin arrays to cover absolute bins first..last"""
+        if len(self.masks) == 0:
+            self.base = first - GROWTH_BINS
+            size = last - first + 1 + 2 * GROWTH_BINS
+            self.masks = np.zeros(size, dtype=np.uint64)
+            self.counts = np.zeros(size, dtype=np.int32)
+            return
+        below = self.base - first
+        above = last - (self.base + len(self.masks) - 1)
+        if below <= 0 and above <= 0:
+            return
+        pad_below = below + GROWTH_BINS if below > 0 else 0
+        pad_above = above + GROWTH_BINS if above > 0 else 0
+        self.masks = np.concatenate([
+            np.zeros(pad_below, dtype=np.uint64), self.masks, np.zeros(pad_above, dtype=np.uint64)
+        ])
+        self.counts = np.concatenate([
+            np.zeros(pad_below, dtype=np.int32), self.counts, np.zeros(pad_above, dtype=np.int32)
+        ])
+        if pad_below:
+            self.base -= pad_below
+            self.lowest += pad_below
+            self.highest += pad_below
+            self.poc += pad_below
+
+    def add_bar(self, timestamp: datetime, high: float, low: float) -> None:
+        """
+        Absorb one completed bar (a bar from a later date starts a new session)
+
+        Args:
+            timestamp: Bar time (the session is its date)
+            high: Bar high
+            low: Bar low
+        """
+        day = timestamp.date()
+        if day != self.session_day:
+            self.reset(day)
+            self.open_time = market_calendar.session_open(day, self.bar_timezone) or timestamp
+
+        high, low = float(max(high, low)), float(min(high, low))
+        period = min(max(int((timestamp - self.open_time) / self.period), 0), MAX_PERIODS - 1)
+        if self.bars == 0:
+            self.opening_seen = period == 0
+        while len(self.period_highs) <= period:
+            self.period_highs.append(np.nan)
+            self.period_lows.append(np.nan)
+        self.period_highs[period] = high if np.isnan(self.period_highs[period]) else max(self.period_highs[period], high)
+        self.period_lows[period] = low if np.isnan(self.period_lows[period]) else min(self.period_lows[period], low)
+
+        first, last = self._bin(low), self._bin(high)
+        self._ensure_bins(first, last)
+        lo, hi = first - self.base, last - self.base
+
+        bit = np.uint64(1 << period)
+        masks = self.masks[lo:hi + 1]
+        new = (masks & bit) == 0
+        masks |= bit
+        self.counts[lo:hi + 1] += new
+        self.total_tpos += int(new.sum())
+        self.bars += 1
+        self.last_time = timestamp
+        self.lowest = lo if self.lowest is None else min(self.lowest, lo)
+        self.highest = hi if self.highest is None else max(self.highest, hi)
+        self._value_area = None
+
+        # Counts only grow, so the POC can only move to a bin this bar touched
+        best = lo + int(np.argmax(self.counts[lo:hi + 1]))
+        if self.poc is None or self.counts[best] > self.counts[self.poc]:
+            self.poc = best
+
+    @property
+    def current_period(self) -> int:
+        return len(self.period_highs) - 1
+
+    def value_area(self) -> Tuple[int, int, float]:
+        """(lowest bin, highest bin, TPOs inside) of the value area by time, cached per bar"""
+        if self._value_area is None:
+            lower, upper, inside = value_area(
+                self.counts[self.lowest:self.highest + 1].astype(np.float64),
+                self.poc - self.lowest,
+                self.total_tpos * self.value_area_percent
+            )
+            self._value_area = (lower + self.lowest, upper + self.lowest, inside)
+        return self._value_area
+
+    def initial_balance(self) -> Optional[Tuple[float, float]]:
+        """
+        (high, low) of the opening periods, None until they have completed
+        or when the profile started after the first period
+        """
+        if not self.opening_seen or len(self.period_highs) <= self.initial_balance_periods:
+            return None
+        periods = slice(0, self.initial_balance_periods)
+        return float(np.nanmax(self.period_highs[periods])), float(np.nanmin(self.period_lows[periods]))
+
+    def single_prints(self) -> List[Dict]:
+        """
+        Runs of bins printed by exactly one completed period (the forming
+        period's prints are not final yet)
+        """
+        if self.poc is None:
+            return []
+        masks = self.masks[self.lowest:self.highest + 1]
+        counts = self.counts[self.lowest:self.highest + 1]
+        single = (counts == 1) & ((masks & np.uint64(1 << self.current_period)) == 0)
+        edges = np.diff(np.concatenate([[0], single.astype(np.int8), [0]]))
+        runs = []
+        for start, stop in zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()):
+            period = int(masks[start]).bit_length() - 1
+            runs.append({
+                'low': round((self.base + self.lowest + start) * self.bin_size, 2),
+                'high': round((self.base + self.lowest + stop) * self.bin_size, 2),
+                'period': PERIOD_LETTERS[period]
+            })
+        return runs
+
+    def letters(self) -> Dict[str, str]:
+        """Period letters printed at each touched bin, keyed by bin midpoint"""
+        profile = {}
+        masks = self.masks[self.lowest:self.highest + 1].tolist()
+        for offset, mask in enumerate(masks):
+            if mask:
+                mask = int(mask)
+                profile[f"{self._price(self.lowest + offset):.2f}"] = ''.join(
+                    PERIOD_LETTERS[p] for p in range(mask.bit_length()) if mask >> p & 1
+                )
+        return profile
+
+    def snapshot(self, current_price: Optional[float] = None, letters: bool = False) -> Optional[Dict]:
+        """
+        POC and value area by time, initial balance and single prints
+
+        Args:
+            current_price: Price to position against the value area
+            letters: Include the letters printed at each price
+
+        Returns:
+            Profile dictionary, or None before the first bar
+        """
+        if self.poc is None:
+            return None
+        lower, upper, inside = self.value_area()
+        vah, val = self._price(upper), self._price(lower)
+        session_high = float(np.nanmax(self.period_highs))
+        session_low = float(np.nanmin(self.period_lows))
+
+        initial_balance = self.initial_balance()
+        ib = None
+        if initial_balance is not None:
+            ib_high, ib_low = initial_balance
+            above, below = session_high > ib_high, session_low < ib_low
+            ib = {
+                'high': round(ib_high, 2),
+                'low': round(ib_low, 2),
+                'range': round(ib_high - ib_low, 2),
+                'extension': 'BOTH' if above and below else 'UP' if above else 'DOWN' if below else 'NONE'
+            }
+
+        position = None
+        if current_price is not None:
+            position = 'ABOVE_VALUE' if current_price > vah else 'BELOW_VALUE' if current_price < val else 'IN_VALUE'
+
+        snapshot = {
+            'session': self.session_day.isoformat(),
+            'period_minutes': self.period_minutes,
+            'periods': len(self.period_highs),
+            'current_period': PERIOD_LETTERS[self.current_period],
+            'poc': self._price(self.poc),
+            'poc_tpos': int(self.counts[self.poc]),
+            'vah': vah,
+            'val': val,
+            'value_area_tpos': int(inside),
+            'total_tpos': self.total_tpos,
+            'price_position': position,
+            'initial_balance': ib,
+            'single_prints': self.single_prints(),
+            'session_high': round(session_high, 2),
+            'session_low': round(session_low, 2),
+            'bin_size': round(self.bin_size, 4),
+            'bars': self.bars,
+            'last_bar': self.last_time.isoformat()
+        }
+        if letters:
+            snapshot['letters'] = self.letters()
+        return snapshot
+
+
+class TPOEngine:
+    """TPO profile per symbol, fed from the fetched 1-minute bars"""
+
+    def __init__(
+        self,
+        tick_size: float = 0.05,
+        bin_ticks: int = 20,
+        period_minutes: int = 30,
+        initial_balance_periods: int = 2,
+        value_area_percent: float = 0.70,
+        bar_timezone=IST
+    ):
+        self.profile_kwargs = dict(
+            tick_size=tick_size,
+            bin_ticks=bin_ticks,
+            period_minutes=period_minutes,
+            initial_balance_periods=initial_balance_periods,
+            value_area_percent=value_area_percent,
+            bar_timezone=bar_timezone
+        )
+        self.profiles: Dict[str, TPOProfile] = {}
+
+    def profile(self, symbol: str) -> TPOProfile:
+        if symbol not in self.profiles:
+            self.profiles[symbol] = TPOProfile(**self.profile_kwargs)
+        return self.profiles[symbol]
+
+    def update(self, symbol: str, bars: pd.DataFrame) -> TPOProfile:
+        """
+        Absorb the completed 1-minute bars of a freshly fetched frame
+
+        The last row may still be forming and is left for the next update.
+        """
+        profile = self.profile(symbol)
+        try:
+            completed = bars.iloc[:-1]
+            if profile.last_time is not None:
+                completed = completed[completed.index > profile.last_time]
+            for timestamp, high, low in zip(completed.index, completed['high'], completed['low']):
+                profile.add_bar(timestamp.to_pydatetime(), high, low)
+        except Exception as e:
+            logger.error(f"Error updating TPO profile for {symbol}: {e}")
+        return profile
+
+    def rebuild(self, symbol: str, bars: pd.DataFrame) -> TPOProfile:
+        """Replace the profile with one built from a whole session's 1-minute bars"""
+        self.profiles[symbol] = TPOProfile(**self.profile_kwargs)
+        return self.update(symbol, bars)
+
+    def snapshot(self, symbol: str, current_price: Optional[float] = None, letters: bool = False) -> Optional[Dict]:
+        profile = self.profiles.get(symbol)
+        return profile.snapshot(current_price, letters) if profile is not None else None
+
+    def get_status(self) -> Dict:
+        return {
+            symbol: {
+                'session': profile.session_day.isoformat() if profile.session_day else None,
+                'bars': profile.bars,
+                'periods': len(profile.period_highs),
+                'last_bar': profile.last_time.isoformat() if profile.last_time else None
+            }
+            for symbol, profile in self.profiles.items()
+        }
+
+
+# Global TPO engine (fed from fetched bars, stamped in naive UTC)
+tpo_engine = TPOEngine(
+    tick_size=settings.volume_profile_tick_size,
+    bin_ticks=settings.volume_profile_bin_ticks,
+    period_minutes=settings.tpo_period_minutes,
+    initial_balance_periods=settings.tpo_initial_balance_periods,
+    value_area_percent=settings.volume_profile_value_area_percent,
+    bar_timezone=pytz.utc
+)
@@ -1,10 +1,19 @@
 """
 Trading Gate Module for Phase 4
-Implements trade gating logic with multiple risk modes
+Implements trade gating logic with multiple risk modes; the rules
+themselves are declared in app/data/gate_rules.json (see app.gate_rules)
 """
-from typing import Dict, Optional
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from enum import Enum
 import logging
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.gate_rules import gate_rules
 
 logger = logging.getLogger(__name__)
 
@@ -62,13 +71,26 @@ class TradingGate:
     Determines if trading is allowed based on multiple criteria
     """
     
-    def __init__(self, risk_mode: RiskMode = RiskMode.BALANCED):
+    def __init__(
+        self,
+        risk_mode: RiskMode = RiskMode.BALANCED,
+        setup_threshold: Optional[float] = None,
+        no_trade_threshold: Optional[float] = None
+    ):
         """
         Args:
             risk_mode: Trading risk mode
+            setup_threshold: Minimum setup score for this gate (mode default if None)
+            no_trade_threshold: Maximum no-trade score for this gate (mode default if None)
         """
         self.risk_mode = risk_mode
         self.config = TradeGateConfig()
+        if setup_threshold is not None:
+            self.config.SETUP_THRESHOLDS = {**TradeGateConfig.SETUP_THRESHOLDS, risk_mode: float(setup_threshold)}
+        if no_trade_threshold is not None:
+            self.config.NO_TRADE_THRESHOLDS = {
+                **TradeGateConfig.NO_TRADE_THRESHOLDS, risk_mode: float(no_trade_threshold)
+            }
         
     def set_risk_mode(self, mode: str) -> bool:
         """
@@ -88,6 +110,18 @@ class TradingGate:
             logger.error(f"Invalid risk mode: {mode}")
             return False
     
+    def gate_params(self) -> Dict:
+        """Parameters the gate rules read for the current risk mode"""
+        mode = self.risk_mode
+        return {
+            'risk_mode': mode.value,
+            'setup_threshold': self.config.SETUP_THRESHOLDS[mode],
+            'no_trade_threshold': self.config.NO_TRADE_THRESHOLDS[mode],
+            'allowed_volatility_regimes': tuple(self.config.ALLOWED_VOLATILITY_REGIMES[mode]),
+            'block_opening_noise': self.config.BLOCK_OPENING_NOISE[mode],
+            'block_chop_hour': self.config.BLOCK_CHOP_HOUR[mode]
+        }
+    
     def evaluate_trade_decision(
         self,
         setup_score: float,
@@ -95,7 +129,8 @@ class TradingGate:
         volatility_regime: Optional[str] = None,
         time_category: Optional[str] = None,
         fake_breakout_risk: bool = False,
-        oi_analysis: Optional[Dict] = None
+        oi_analysis: Optional[Dict] = None,
+        trace: bool = False
     ) -> Dict:
         """
         Evaluate if trading is allowed
@@ -107,84 +142,25 @@ class TradingGate:
             time_category: Time of day category
             fake_breakout_risk: Whether fake breakout is detected
             oi_analysis: OI analysis data
+            trace: Include the rules evaluated ('rule_trace')
             
         Returns:
             Dictionary with trade_allowed status and detailed reasoning
         """
         try:
-            # Initialize decision
-            trade_allowed = True
-            blocking_reasons = []
-            warnings = []
-            
-            # Get thresholds for current risk mode
-            setup_threshold = self.config.SETUP_THRESHOLDS[self.risk_mode]
-            no_trade_threshold = self.config.NO_TRADE_THRESHOLDS[self.risk_mode]
-            
-            # Rule 1: Setup score must meet threshold
-            if setup_score < setup_threshold:
-                trade_allowed = False
-                blocking_reasons.append(
-                    f"Setup score {setup_score:.2f} below threshold {setup_threshold:.2f}"
-                )
-            
-            # Rule 2: No-trade score must be below threshold
-            if no_trade_score > no_trade_threshold:
-                trade_allowed = False
-                blocking_reasons.append(
-                    f"No-trade score {no_trade_score:.2f} above threshold {no_trade_threshold:.2f}"
-                )
-            
-            # Rule 3: Volatility regime check
-            if volatility_regime:
-                allowed_regimes = self.config.ALLOWED_VOLATILITY_REGIMES[self.risk_mode]
-                if volatility_regime not in allowed_regimes:
-                    if self.risk_mode == RiskMode.CONSERVATIVE:
-                        trade_allowed = False
-                        blocking_reasons.append(
-                            f"Volatility regime '{volatility_regime}' not allowed in CONSERVATIVE mode"
-                        )
-                    else:
-                        warnings.append(
-                            f"Volatility regime '{volatility_regime}' requires extra caution"
-                        )
-            
-            # Rule 4: Time-of-day filters
-            if time_category:
-                if time_category == 'OPENING_NOISE':
-                    if self.config.BLOCK_OPENING_NOISE[self.risk_mode]:
-                        trade_allowed = False
-                        blocking_reasons.append("Trading blocked during opening noise period")
-                    else:
-                        warnings.append("Opening period - high volatility expected")
-                
-                elif time_category == 'CHOP_HOUR':
-                    if self.config.BLOCK_CHOP_HOUR[self.risk_mode]:
-                        trade_allowed = False
-                        blocking_reasons.append("Trading blocked during chop hour")
-                    else:
-                        warnings.append("Chop hour - expect sideways movement")
-                
-                elif time_category == 'MARKET_CLOSED':
-                    trade_allowed = False
-                    blocking_reasons.append("Market is closed")
-            
-            # Rule 5: Fake breakout detection
-            if fake_breakout_risk:
-                if self.risk_mode == RiskMode.CONSERVATIVE:
-                    trade_allowed = False
-                    blocking_reasons.append("Fake breakout risk detected")
-                else:
-                    warnings.append("Potential fake breakout detected - be cautious")
+            gate_rules.refresh()
+            params = self.gate_params()
+            setup_threshold = params['setup_threshold']
+            no_trade_threshold = params['no_trade_threshold']
             
-            # Rule 6: OI divergence check (for Conservative mode)
-            if oi_analysis and self.risk_mode == RiskMode.CONSERVATIVE:
-                oi_trend = oi_analysis.get('oiTrend', 'NEUTRAL')
-                pcr = oi_analysis.get('pcr', 1.0)
-                
-                # Extreme PCR values
-                if pcr > 2.5 or pcr < 0.4:
-                    warnings.append(f"Extreme PCR value {pcr:.2f} - market uncertainty")
+            blocking_reasons, warnings, steps = gate_rules.evaluate(
+                decision_fields(
+                    setup_score, no_trade_score, volatility_regime, time_category, fake_breakout_risk, oi_analysis
+                ),
+                params,
+                trace=trace
+            )
+            trade_allowed = not blocking_reasons
             
             # Determine decision status
             if trade_allowed:
@@ -207,7 +183,7 @@ class TradingGate:
             else:
                 confidence = 0
             
-            return {
+            result = {
                 'trade_allowed': trade_allowed,
                 'decision': decision,
                 'status': status,
@@ -227,8 +203,12 @@ class TradingGate:
                 'warnings': warnings,
                 'volatility_regime': volatility_regime,
                 'time_category': time_category,
-                'fake_breakout_risk': fake_breakout_risk
+                'fake_breakout_risk': fake_breakout_risk,
+                'rules_version': gate_rules.version
             }
+            if trace:
+                result['rule_trace'] = steps
+            return result
             
         except Exception as e:
             logger.error(f"Error evaluating trade decision: {e}", exc_info=True)
@@ -244,6 +224,54 @@ class TradingGate:
                 'error': str(e)
             }
     
+    def evaluate_series(
+        self,
+        setup_score,
+        no_trade_score,
+        volatility_regime=None,
+        time_category=None,
+        fake_breakout_risk=False,
+        pcr=None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Evaluate the gate over whole arrays of decisions (e.g. every bar of
+        a backtest) in one pass per rule
+
+        Args:
+            setup_score: Setup scores
+            no_trade_score: No-trade scores
+            volatility_regime: Regime per decision (or one shared value)
+            time_category: Time category per decision (or one shared value)
+            fake_breakout_risk: Fake breakout flag per decision (or one shared value)
+            pcr: PCR per decision (NaN/None without OI analysis)
+
+        Returns:
+            Dictionary of arrays: 'trade_allowed', 'caution' (allowed with
+            warnings), 'confidence' (unrounded) and 'fired' per rule
+        """
+        gate_rules.refresh()
+        params = self.gate_params()
+        setup_score = np.asarray(setup_score, dtype=np.float64)
+        no_trade_score = np.asarray(no_trade_score, dtype=np.float64)
+        n = max(setup_score.size, no_trade_score.size)
+        fields = {
+            'setup_score': setup_score,
+            'no_trade_score': no_trade_score,
+            'volatility_regime': volatility_regime,
+            'time_category': time_category,
+            'fake_breakout_risk': fake_breakout_risk,
+            'pcr': pcr
+        }
+        outcome = gate_rules.evaluate_series(fields, params, n)
+        trade_allowed = ~outcome['blocked']
+        margin = (setup_score - params['setup_threshold']) + (params['no_trade_threshold'] - no_trade_score)
+        return {
+            'trade_allowed': trade_allowed,
+            'caution': trade_allowed & outcome['warned'],
+            'confidence': np.where(trade_allowed, np.minimum(100, np.maximum(0, margin * 10)), 0),
+            'fired': outcome['fired']
+        }
+    
     def get_risk_mode_info(self) -> Dict:
         """
         Get information about current risk mode
@@ -292,13 +320,347 @@ class TradingGate:
         }
 
 
+def decision_fields(
+    setup_score: float,
+    no_trade_score: float,
+    volatility_regime: Optional[str] = None,
+    time_category: Optional[str] = None,
+    fake_breakout_risk: bool = False,
+    oi_analysis: Optional[Dict] = None
+) -> Dict:
+    """Gate rule fields of one decision (PCR only with OI analysis)"""
+    return {
+        'setup_score': setup_score,
+        'no_trade_score': no_trade_score,
+        'volatility_regime': volatility_regime,
+        'time_category': time_category,
+        'fake_breakout_risk': fake_breakout_risk,
+        'pcr': oi_analysis.get('pcr', 1.0) if oi_analysis else None
+    }
+
+
+class GateTable:
+    """
+    Gate parameters of many TradingGates as columns, for evaluating one
+    score snapshot against all of them at once
+
+    Gates with identical parameters are evaluated once and share the
+    outcome, so the cost follows the number of distinct configurations.
+    """
+
+    def __init__(self, gates: Sequence[TradingGate]):
+        self.gates = list(gates)
+        configs: Dict[Tuple, int] = {}
+        representatives = []
+        config_of_gate = []
+        for gate in self.gates:
+            params = gate.gate_params()
+            key = tuple(params.values())
+            if key not in configs:
+                configs[key] = len(configs)
+                representatives.append(gate)
+            config_of_gate.append(configs[key])
+        self.representatives = representatives
+        self.config_of_gate = np.array(config_of_gate, dtype=np.int64)
+        self.params = [gate.gate_params() for gate in representatives]
+
+        # One column per parameter (collections as an object array of tuples)
+        self.columns = {}
+        for name in self.params[0] if self.params else ():
+            if name in ('risk_mode', 'allowed_volatility_regimes'):
+                column = np.empty(len(self.params), dtype=object)
+                column[:] = [params[name] for params in self.params]
+            else:
+                column = np.array([params[name] for params in self.params])
+            self.columns[name] = column
+
+    def __len__(self) -> int:
+        return len(self.gates)
+
+    def evaluate(
+        self,
+        setup_score: float,
+        no_trade_score: float,
+        volatility_regime: Optional[str] = None,
+        time_category: Optional[str] = None,
+        fake_breakout_risk: bool = False,
+        oi_analysis: Optional[Dict] = None,
+        details: bool = True
+    ) -> Union[List[Dict], Dict[str, np.ndarray]]:
+        """
+        Evaluate one score snapshot against every gate
+
+        Args:
+            setup_score: Setup score (0-10)
+            no_trade_score: No-trade score (0-10)
+            volatility_regime: Current volatility regime
+            time_category: Time of day category
+            fake_breakout_risk: Whether fake breakout is detected
+            oi_analysis: OI analysis data
+            details: Build the full decision dict per gate (as
+                TradingGate.evaluate_trade_decision returns, once per
+                distinct configuration); otherwise run the rules once over
+                the parameter columns and return 'trade_allowed' and
+                'confidence' arrays per gate
+
+        Returns:
+            Decision per gate, in gate order
+        """
+        if details:
+            outcomes = [
+                gate.evaluate_trade_decision(
+                    setup_score, no_trade_score, volatility_regime, time_category, fake_breakout_risk, oi_analysis
+                )
+                for gate in self.representatives
+            ]
+            return [
+                {**outcomes[c], 'blocking_reasons': list(outcomes[c]['blocking_reasons']),
+                 'warnings': list(outcomes[c]['warnings'])}
+                for c in self.config_of_gate.tolist()
+            ]
+
+        gate_rules.refresh()
+        k = len(self.params)
+        fields = decision_fields(
+            setup_score, no_trade_score, volatility_regime, time_category, fake_breakout_risk, oi_analysis
+        )
+        outcome = gate_rules.evaluate_series(fields, self.columns, k)
+        trade_allowed = ~outcome['blocked']
+        score_margin = setup_score - self.columns['setup_threshold']
+        no_trade_margin = self.columns['no_trade_threshold'] - no_trade_score
+        confidence = np.where(
+            trade_allowed, np.minimum(100, np.maximum(0, (score_margin + no_trade_margin) * 10)), 0
+        )
+        return {
+            'trade_allowed': trade_allowed[self.config_of_gate],
+            'confidence': confidence[self.config_of_gate]
+        }
+
+
+def evaluate_trade_decisions(gates: Sequence[TradingGate], **snapshot) -> List[Dict]:
+    """Evaluate one score snapshot against many gates (see GateTable.evaluate)"""
+    return GateTable(gates).evaluate(**snapshot)
+
+
+# Version and default mode of the stored gate profiles
+PROFILE_STATE_ID = 'gate_profiles'
+
+
+class GateProfiles:
+    """
+    Trading gates per client (keyed by the X-Client-Id header), each with
+    its own risk mode and thresholds
+
+    Clients without a profile use the default gate. Profiles and the
+    default mode are stored in MongoDB (`gate_profiles`, plus a version
+    counter in `gate_profile_state`) so every worker serves the same
+    gates: `save` writes through and bumps the version, `sync` re-reads
+    the version at most every `refresh_seconds` and reloads the profiles
+    when it moved. In memory the least recently used profiles are dropped
+    beyond `max_profiles` (a reload keeps the most recently updated).
+    """
+
+    def __init__(self, default: TradingGate, max_profiles: int = 10000, refresh_seconds: float = 2.0):
+        """
+        Args:
+            default: Gate of clients without a profile
+            max_profiles: Profiles kept in memory
+            refresh_seconds: Minimum time between version checks against the store
+        """
+        self.default = default
+        self.max_profiles = max_profiles
+        self.refresh_seconds = refresh_seconds
+        self.version: Optional[int] = None  # Stored version the cached profiles match
+        self._synced_at = 0.0
+        self._gates: 'OrderedDict[str, TradingGate]' = OrderedDict()
+        self._tables: Optional[Dict[RiskMode, Tuple[List[str], GateTable]]] = None
+
+    async def sync(self, db, force: bool = False) -> bool:
+        """
+        Pick up profile and default-mode changes made by other workers
+
+        The cached profiles stay in use when the store is unavailable.
+
+        Args:
+            db: Motor database handle
+            force: Check the version regardless of refresh_seconds
+
+        Returns:
+            True if the profiles were reloaded
+        """
+        if db is None:
+            return False
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.refresh_seconds:
+            return False
+        self._synced_at = now
+
+        try:
+            state = await db.gate_profile_state.find_one({'_id': PROFILE_STATE_ID}) or {}
+            default_mode = state.get('default_mode')
+            if default_mode and default_mode != self.default.risk_mode.value:
+                self.default.set_risk_mode(default_mode)
+            version = state.get('version', 0)
+            if version == self.version:
+                return False
+
+            docs = await db.gate_profiles.find().sort('updated_at', -1).limit(self.max_profiles).to_list(None)
+            gates: 'OrderedDict[str, TradingGate]' = OrderedDict()
+            for doc in reversed(docs):  # Least recently updated first, like the LRU order
+                try:
+                    risk_mode = RiskMode[doc['mode']]
+                except KeyError:
+                    logger.warning(f"Ignoring stored gate profile {doc['_id']} with mode {doc.get('mode')}")
+                    continue
+                gates[doc['_id']] = TradingGate(risk_mode, doc.get('setup_threshold'), doc.get('no_trade_threshold'))
+        except Exception as e:
+            logger.error(f"Error syncing gate profiles: {e}")
+            return False
+
+        self._gates = gates
+        self._tables = None
+        self.version = version
+        logger.info(f"Loaded {len(gates)} gate profiles (version {version})")
+        return True
+
+    async def save(
+        self,
+        db,
+        client_id: Optional[str],
+        mode: str,
+        setup_threshold: Optional[float] = None,
+        no_trade_threshold: Optional[float] = None
+    ) -> Optional[TradingGate]:
+        """
+        Set a client's profile (the default mode without a client id) and
+        store it for the other workers
+
+        Returns:
+            The client's gate, or None if the mode is invalid or the store failed
+        """
+        try:
+            risk_mode = RiskMode[mode.upper()]
+        except KeyError:
+            logger.error(f"Invalid risk mode: {mode}")
+            return None
+        if db is not None:
+            try:
+                state = {'updated_at': datetime.utcnow()}
+                if client_id is None:
+                    state['default_mode'] = risk_mode.value
+                else:
+                    await db.gate_profiles.update_one(
+                        {'_id': client_id},
+                        {'$set': {
+                            'mode': risk_mode.value,
+                            'setup_threshold': setup_threshold,
+                            'no_trade_threshold': no_trade_threshold,
+                            'updated_at': state['updated_at']
+                        }},
+                        upsert=True
+                    )
+                await db.gate_profile_state.update_one(
+                    {'_id': PROFILE_STATE_ID}, {'$set': state, '$inc': {'version': 1}}, upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Error storing gate profile for {client_id or 'default'}: {e}")
+                return None
+        return self.set(client_id, mode, setup_threshold, no_trade_threshold)
+
+    def get(self, client_id: Optional[str] = None) -> TradingGate:
+        """The client's gate (the default gate for unknown or missing clients)"""
+        if client_id is None:
+            return self.default
+        gate = self._gates.get(client_id)
+        if gate is None:
+            return self.default
+        self._gates.move_to_end(client_id)
+        return gate
+
+    def set(
+        self,
+        client_id: Optional[str],
+        mode: str,
+        setup_threshold: Optional[float] = None,
+        no_trade_threshold: Optional[float] = None
+    ) -> Optional[TradingGate]:
+        """
+        Set a client's risk mode and thresholds (the default gate's mode
+        without a client id)
+
+        Returns:
+            The client's gate, or None if the mode is invalid
+        """
+        try:
+            risk_mode = RiskMode[mode.upper()]
+        except KeyError:
+            logger.error(f"Invalid risk mode: {mode}")
+            return None
+        if client_id is None:
+            return self.default if self.default.set_risk_mode(mode) else None
+
+        gate = TradingGate(risk_mode, setup_threshold, no_trade_threshold)
+        self._gates[client_id] = gate
+        self._gates.move_to_end(client_id)
+        while len(self._gates) > self.max_profiles:
+            self._gates.popitem(last=False)
+        self._tables = None
+        logger.info(f"Risk mode for client {client_id} set to: {risk_mode.value}")
+        return gate
+
+    def remove(self, client_id: str) -> bool:
+        if self._gates.pop(client_id, None) is None:
+            return False
+        self._tables = None
+        return True
+
+    def clients(self) -> List[str]:
+        return list(self._gates)
+
+    def tables(self) -> Dict[RiskMode, Tuple[List[str], GateTable]]:
+        """
+        Client ids and gate columns per risk mode (rebuilt after changes)
+
+        Grouped by mode because the no-trade score and time category a
+        snapshot is evaluated with depend on the mode's time windows.
+        """
+        if self._tables is None:
+            groups: Dict[RiskMode, Tuple[List[str], List[TradingGate]]] = {}
+            for client_id, gate in self._gates.items():
+                clients, gates = groups.setdefault(gate.risk_mode, ([], []))
+                clients.append(client_id)
+                gates.append(gate)
+            self._tables = {mode: (clients, GateTable(gates)) for mode, (clients, gates) in groups.items()}
+        return self._tables
+
+    def get_status(self) -> Dict:
+        modes: Dict[str, int] = {}
+        for gate in self._gates.values():
+            modes[gate.risk_mode.value] = modes.get(gate.risk_mode.value, 0) + 1
+        return {
+            'default_mode': self.default.risk_mode.value,
+            'profiles': len(self._gates),
+            'stored_version': self.version,
+            'profiles_by_mode': modes,
+            'distinct_configs': sum(len(table.params) for _, table in self.tables().values()),
+            'rules_version': gate_rules.version
+        }
+
+
 # Global trading gate instance
 _trading_gate = TradingGate(risk_mode=RiskMode.BALANCED)
 
+# Per-client gates (falling back to the global one)
+gate_profiles = GateProfiles(
+    _trading_gate,
+    max_profiles=settings.gate_profiles_max,
+    refresh_seconds=settings.gate_profiles_refresh_seconds
+)
+
 
-def get_trading_gate() -> TradingGate:
-    """Get the global trading gate instance"""
-    return _trading_gate
+def get_trading_gate(client_id: Optional[str] = None) -> TradingGate:
+    """Get the client's trading gate (the global instance without a profile)"""
+    return gate_profiles.get(client_id)
 
 
 def set_global_risk_mode(mode: str) -> bool:
@@ -4,12 +4,108 @@ Calculates Point of Control (POC), Value Area High (VAH), and Value Area Low (VA
 """
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from ta.momentum import RSIIndicator
 from typing import Dict, Optional, Tuple
 import logging
 
+from app.range_index import RECENT_WINDOW, STRUCTURE_WINDOW, RangeIndex
+from app.scoring import latest_rsi
+
 logger = logging.getLogger(__name__)
 
 
+def distribute_volume(
+    lows: np.ndarray,
+    highs: np.ndarray,
+    volumes: np.ndarray,
+    price_low: float,
+    bin_size: float,
+    bins: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spread each bar's volume evenly across the price bins its high-low range touches
+
+    A bar's share is its volume over the number of bins it spans; shares
+    falling outside [0, bins) are dropped. Every (bar, bin) pair is laid out
+    in bar order and summed with one bincount, so each bin accumulates its
+    shares in the same order a per-bar loop would.
+
+    Returns:
+        Tuple of (volume per bin, bins touched by at least one bar)
+    """
+    low_bin = ((lows - price_low) / bin_size).astype(np.int64)
+    high_bin = ((highs - price_low) / bin_size).astype(np.int64)
+    share = volumes / np.maximum(1, high_bin - low_bin + 1)
+
+    # Clip the spans to the bin array (the share stays per spanned bin)
+    first = np.clip(low_bin, 0, bins)
+    spans = np.maximum(np.clip(high_bin + 1, 0, bins) - first, 0)
+
+    bar_of_pair = np.repeat(np.arange(len(spans)), spans)
+    offsets = np.arange(len(bar_of_pair)) - np.repeat(np.cumsum(spans) - spans, spans)
+    bin_of_pair = first[bar_of_pair] + offsets
+
+    volume_at_bin = np.bincount(bin_of_pair, weights=share[bar_of_pair], minlength=bins)
+    touched = np.bincount(bin_of_pair, minlength=bins) > 0
+    return volume_at_bin, touched
+
+
+def value_area(volumes: np.ndarray, poc_idx: int, target_volume: float) -> Tuple[int, int, float]:
+    """
+    Expand from the POC bin towards the side with more volume until the
+    target volume is covered
+
+    Returns:
+        Tuple of (lowest bin, highest bin, volume inside)
+    """
+    values = volumes.tolist()
+    last = len(values) - 1
+    accumulated = values[poc_idx]
+    lower = upper = poc_idx
+
+    while accumulated < target_volume:
+        lower_volume = values[lower - 1] if lower > 0 else 0
+        upper_volume = values[upper + 1] if upper < last else 0
+        if lower_volume == 0 and upper_volume == 0:
+            break
+        if lower_volume > upper_volume:
+            lower -= 1
+            accumulated += lower_volume
+        else:
+            upper += 1
+            accumulated += upper_volume
+    return lower, upper, accumulated
+
+
+def interpret_position(position: str, poc_distance: float) -> str:
+    """
+    Interpret price position relative to value area
+    
+    Args:
+        position: Price position (ABOVE_VALUE, IN_VALUE, BELOW_VALUE)
+        poc_distance: Distance from POC in percentage
+        
+    Returns:
+        Interpretation string
+    """
+    if position == 'ABOVE_VALUE':
+        if poc_distance > 2.0:
+            return 'Price well above value area - strong bullish'
+        else:
+            return 'Price slightly above value area - moderately bullish'
+    elif position == 'BELOW_VALUE':
+        if poc_distance > 2.0:
+            return 'Price well below value area - strong bearish'
+        else:
+            return 'Price slightly below value area - moderately bearish'
+    else:  # IN_VALUE
+        if poc_distance < 0.5:
+            return 'Price at Point of Control - balanced market'
+        else:
+            return 'Price in value area - neutral conditions'
+
+
 class VolumeProfileCalculator:
     """
     Volume Profile Calculator
@@ -47,9 +143,12 @@ class VolumeProfileCalculator:
                     'error': 'Insufficient data'
                 }
             
+            lows = df['low'].to_numpy(dtype=np.float64)
+            highs = df['high'].to_numpy(dtype=np.float64)
+            
             # Get price range
-            price_low = df['low'].min()
-            price_high = df['high'].max()
+            price_low = lows.min()
+            price_high = highs.max()
             
             if price_low >= price_high:
                 return {
@@ -60,100 +159,44 @@ class VolumeProfileCalculator:
                 }
             
             # Create price bins
-            price_range = price_high - price_low
-            bin_size = price_range / price_bins
-            
-            # Initialize volume at price levels
-            volume_at_price = {}
-            
-            # Distribute volume across price levels (TPO-style)
-            for idx, row in df.iterrows():
-                low = row['low']
-                high = row['high']
-                volume = row.get('volume', 1)  # Use 1 if volume not available
-                
-                # Find bins this candle touches
-                low_bin = int((low - price_low) / bin_size)
-                high_bin = int((high - price_low) / bin_size)
-                
-                # Distribute volume across touched bins
-                num_bins = max(1, high_bin - low_bin + 1)
-                volume_per_bin = volume / num_bins
-                
-                for bin_idx in range(low_bin, high_bin + 1):
-                    if 0 <= bin_idx < price_bins:
-                        price_level = price_low + (bin_idx * bin_size) + (bin_size / 2)
-                        price_level = round(price_level, 2)
-                        
-                        if price_level not in volume_at_price:
-                            volume_at_price[price_level] = 0
-                        volume_at_price[price_level] += volume_per_bin
-            
-            if not volume_at_price:
+            bin_size = (price_high - price_low) / price_bins
+            volumes = (
+                df['volume'].to_numpy(dtype=np.float64) if 'volume' in df.columns
+                else np.ones(len(df))  # Use 1 if volume not available
+            )
+            
+            # Spread each bar's volume evenly over the bins it touches
+            volume_at_bin, touched = distribute_volume(lows, highs, volumes, price_low, bin_size, price_bins)
+            
+            # Only touched bins take part, as price levels
+            bin_indices = np.flatnonzero(touched)
+            if len(bin_indices) == 0:
                 return {
                     'poc': None,
                     'vah': None,
                     'val': None,
                     'error': 'No volume data'
                 }
-            
-            # Sort by price
-            sorted_prices = sorted(volume_at_price.items())
+            prices = np.round(price_low + bin_indices * bin_size + bin_size / 2, 2)
+            bin_volumes = volume_at_bin[bin_indices]
             
             # Find Point of Control (price level with highest volume)
-            poc_price = max(volume_at_price.items(), key=lambda x: x[1])[0]
-            poc_volume = volume_at_price[poc_price]
-            
-            # Calculate total volume
-            total_volume = sum(volume_at_price.values())
+            poc_idx = int(np.argmax(bin_volumes))
+            poc_price = float(prices[poc_idx])
+            poc_volume = float(bin_volumes[poc_idx])
             
             # Find Value Area (70% of volume centered around POC)
-            target_volume = total_volume * self.value_area_percent
-            
-            # Start from POC and expand outward
-            poc_idx = None
-            for i, (price, vol) in enumerate(sorted_prices):
-                if price == poc_price:
-                    poc_idx = i
-                    break
-            
-            if poc_idx is None:
-                return {
-                    'poc': poc_price,
-                    'vah': None,
-                    'val': None,
-                    'error': 'POC index not found'
-                }
-            
-            # Expand value area
-            accumulated_volume = poc_volume
-            lower_idx = poc_idx
-            upper_idx = poc_idx
-            
-            while accumulated_volume < target_volume:
-                # Check which direction to expand
-                lower_volume = sorted_prices[lower_idx - 1][1] if lower_idx > 0 else 0
-                upper_volume = sorted_prices[upper_idx + 1][1] if upper_idx < len(sorted_prices) - 1 else 0
-                
-                if lower_volume == 0 and upper_volume == 0:
-                    break
-                
-                # Expand to direction with more volume
-                if lower_volume > upper_volume:
-                    if lower_idx > 0:
-                        lower_idx -= 1
-                        accumulated_volume += lower_volume
-                else:
-                    if upper_idx < len(sorted_prices) - 1:
-                        upper_idx += 1
-                        accumulated_volume += upper_volume
+            total_volume = float(bin_volumes.sum())
+            lower_idx, upper_idx, accumulated_volume = value_area(
+                bin_volumes, poc_idx, total_volume * self.value_area_percent
+            )
             
             # Value Area Low and High
-            val = sorted_prices[lower_idx][0]
-            vah = sorted_prices[upper_idx][0]
+            val = float(prices[lower_idx])
+            vah = float(prices[upper_idx])
             
             # Current price position
-            current_price = df['close'].iloc[-1]
+            current_price = float(df['close'].iloc[-1])
             
             if current_price > vah:
                 price_position = 'ABOVE_VALUE'
@@ -176,6 +219,9 @@ class VolumeProfileCalculator:
                 'value_area_pct': round((accumulated_volume / total_volume) * 100, 2),
                 'total_volume': round(total_volume, 2),
                 'poc_volume': round(poc_volume, 2),
+                'volume_distribution': {
+                    f"{price:.2f}": round(volume, 2) for price, volume in zip(prices.tolist(), bin_volumes.tolist())
+                },
                 'interpretation': self._interpret_position(price_position, poc_distance_pct)
             }
             
@@ -189,37 +235,193 @@ class VolumeProfileCalculator:
             }
     
     def _interpret_position(self, position: str, poc_distance: float) -> str:
-        """
-        Interpret price position relative to value area
-        
-        Args:
-            position: Price position (ABOVE_VALUE, IN_VALUE, BELOW_VALUE)
-            poc_distance: Distance from POC in percentage
-            
-        Returns:
-            Interpretation string
-        """
-        if position == 'ABOVE_VALUE':
-            if poc_distance > 2.0:
-                return 'Price well above value area - strong bullish'
-            else:
-                return 'Price slightly above value area - moderately bullish'
-        elif position == 'BELOW_VALUE':
-            if poc_distance > 2.0:
-                return 'Price well below value area - strong bearish'
-            else:
-                return 'Price slightly below value area - moderately bearish'
-        else:  # IN_VALUE
-            if poc_distance < 0.5:
-                return 'Price at Point of Control - balanced market'
-            else:
-                return 'Price in value area - neutral conditions'
+        return interpret_position(position, poc_distance)
+
+
+# Per-bar inputs of the fake breakout factors (scalars for one bar, arrays
+# for a session); everything is read, nothing is recomputed
+BREAKOUT_FEATURES = (
+    'n_bars',                  # Bars available (fewer than STRUCTURE_WINDOW: not assessed)
+    'price',
+    'recent_high',             # STRUCTURE_WINDOW-bar high
+    'recent_low',              # STRUCTURE_WINDOW-bar low
+    'rsi',                     # RSI(14), NaN if unknown
+    'recent_volume',           # Mean volume of the last RECENT_WINDOW bars (NaN without volume)
+    'avg_volume',              # Mean volume of the last STRUCTURE_WINDOW bars
+    'has_oi',                  # 1 if an OI analysis is present
+    'oi_trend',                # 1 CALL_HEAVY, -1 PUT_HEAVY, 0 anything else
+    'pcr',
+    'profile_position',        # 1 above value, -1 below, 0 in value, NaN without a profile
+    'profile_poc_distance',    # poc_distance_pct of that profile
+    'composite_position',      # Same for the multi-session composite profile
+    'composite_poc_distance',
+)
+
+# (reason, weight) per factor, in the order they are reported
+BREAKOUT_FACTORS = (
+    ('Breakout without OI confirmation', 3.0),
+    ('Breakdown without OI confirmation', 3.0),
+    ('Extreme PCR suggests trap', 2.0),
+    ('Weak volume on breakout', 2.0),
+    ('Bearish RSI divergence', 2.0),
+    ('Bullish RSI divergence', 2.0),
+    ('Price too far from value area', 2.0),
+    ('Price too far from composite value area', 2.0),
+)
+FAKE_BREAKOUT_THRESHOLD = 5.0
+
+_OI_TREND_CODES = {'CALL_HEAVY': 1, 'PUT_HEAVY': -1}
+_POSITION_CODES = {'ABOVE_VALUE': 1, 'BELOW_VALUE': -1, 'IN_VALUE': 0}
+
+
+def _profile_context(profile: Optional[Dict]) -> Tuple[float, float]:
+    """(position code, POC distance) of a positioned profile, NaN without one"""
+    if not profile or not profile.get('poc'):
+        return np.nan, np.nan
+    return (
+        float(_POSITION_CODES.get(profile.get('price_position', 'IN_VALUE'), 0)),
+        float(profile.get('poc_distance_pct', 0))
+    )
+
+
+def breakout_context(
+    oi_analysis: Optional[Dict] = None,
+    volume_profile: Optional[Dict] = None,
+    composite_profile: Optional[Dict] = None
+) -> Dict[str, float]:
+    """OI and profile features of one bar"""
+    profile_position, profile_distance = _profile_context(volume_profile)
+    composite_position, composite_distance = _profile_context(composite_profile)
+    return {
+        'has_oi': 1.0 if oi_analysis else 0.0,
+        'oi_trend': float(_OI_TREND_CODES.get(oi_analysis.get('oiTrend', 'NEUTRAL'), 0)) if oi_analysis else 0.0,
+        'pcr': float(oi_analysis.get('pcr', 1.0)) if oi_analysis else 1.0,
+        'profile_position': profile_position,
+        'profile_poc_distance': profile_distance,
+        'composite_position': composite_position,
+        'composite_poc_distance': composite_distance
+    }
+
+
+def breakout_features(
+    df: pd.DataFrame,
+    ranges: Optional[RangeIndex] = None,
+    rsi: Optional[float] = None
+) -> Dict[str, float]:
+    """
+    Bar features of the last row of `df` (read-only)
+
+    Args:
+        df: DataFrame with OHLC (and optionally volume) data
+        ranges: Range index ending at the last row of `df` (built from `df`
+            if not given)
+        rsi: RSI(14) of the last bar if already known
+    """
+    n_bars = len(df)
+    if ranges is None:
+        ranges = RangeIndex.from_bars(df)
+    if rsi is None:
+        rsi = latest_rsi(df['close'].tolist()) if n_bars >= 14 else np.nan
+    has_volume = 'volume' in df.columns
+    return {
+        'n_bars': float(n_bars),
+        'price': float(df['close'].iloc[-1]),
+        'recent_high': ranges.high(STRUCTURE_WINDOW),
+        'recent_low': ranges.low(STRUCTURE_WINDOW),
+        'rsi': float(rsi),
+        'recent_volume': float(df['volume'].iloc[-RECENT_WINDOW:].mean()) if has_volume else np.nan,
+        'avg_volume': float(df['volume'].iloc[-STRUCTURE_WINDOW:].mean()) if has_volume else np.nan
+    }
+
+
+def breakout_feature_series(
+    bars: pd.DataFrame,
+    rsi: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Bar features of every row of a session, each as of that bar (read-only)
+
+    Args:
+        bars: DataFrame with OHLC (and optionally volume) data
+        rsi: RSI(14) per bar if already known (e.g. the replay features)
+    """
+    n = len(bars)
+    close = bars['close'].to_numpy(dtype=np.float64)
+    if rsi is None:
+        rsi = RSIIndicator(close=bars['close'].reset_index(drop=True), window=14).rsi().to_numpy()
+
+    features = {
+        'n_bars': np.arange(1, n + 1, dtype=np.float64),
+        'price': close,
+        'recent_high': bars['high'].rolling(STRUCTURE_WINDOW, min_periods=1).max().to_numpy(),
+        'recent_low': bars['low'].rolling(STRUCTURE_WINDOW, min_periods=1).min().to_numpy(),
+        'rsi': np.asarray(rsi, dtype=np.float64),
+        'recent_volume': np.full(n, np.nan),
+        'avg_volume': np.full(n, np.nan)
+    }
+    if 'volume' in bars.columns:
+        volume = bars['volume'].to_numpy(dtype=np.float64)
+        for name, window in (('recent_volume', RECENT_WINDOW), ('avg_volume', STRUCTURE_WINDOW)):
+            if n >= window:
+                features[name][window - 1:] = sliding_window_view(volume, window).mean(axis=1)
+    return features
+
+
+def detect_series(features: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Fake breakout risk for every row of a feature set
+
+    Args:
+        features: BREAKOUT_FEATURES as equal-length arrays (context features
+            may be omitted and count as absent)
+
+    Returns:
+        Dict with 'factors' (rows x BREAKOUT_FACTORS booleans), 'risk_score'
+        and 'is_fake_breakout' arrays
+    """
+    price = np.asarray(features['price'], dtype=np.float64)
+    n = len(price)
+
+    def column(name: str, default: float) -> np.ndarray:
+        value = features.get(name)
+        return np.full(n, default) if value is None else np.asarray(value, dtype=np.float64)
+
+    assessed = column('n_bars', 0) >= STRUCTURE_WINDOW
+    at_high = price >= column('recent_high', np.nan) * 0.999
+    at_low = price <= column('recent_low', np.nan) * 1.001
+    has_oi = column('has_oi', 0) > 0
+    oi_trend = column('oi_trend', 0)
+    pcr = column('pcr', 1.0)
+    rsi = column('rsi', np.nan)
+    has_rsi = column('n_bars', 0) >= 14
+
+    def far_from_value(position: np.ndarray, distance: np.ndarray) -> np.ndarray:
+        return ~np.isnan(position) & (position != 0) & (distance > 3.0)
+
+    factors = np.column_stack([
+        has_oi & at_high & (oi_trend == -1),
+        has_oi & at_low & (oi_trend == 1),
+        has_oi & ((pcr > 2.0) | (pcr < 0.5)),
+        column('recent_volume', np.nan) < column('avg_volume', np.nan) * 0.7,
+        has_rsi & at_high & (rsi < 65),
+        has_rsi & at_low & (rsi > 35),
+        far_from_value(column('profile_position', np.nan), column('profile_poc_distance', np.nan)),
+        far_from_value(column('composite_position', np.nan), column('composite_poc_distance', np.nan)),
+    ]) & assessed[:, None]
+
+    risk_score = factors.astype(np.float64) @ np.array([weight for _, weight in BREAKOUT_FACTORS])
+    return {
+        'factors': factors,
+        'risk_score': risk_score,
+        'is_fake_breakout': risk_score >= FAKE_BREAKOUT_THRESHOLD
+    }
 
 
 class FakeBreakoutDetector:
     """
     Fake Breakout Detector
-    Identifies potential false breakouts
+    Identifies potential false breakouts from precomputed, read-only
+    features (see BREAKOUT_FEATURES); detect_series labels a whole session
     """
     
     def __init__(self):
@@ -227,112 +429,69 @@ class FakeBreakoutDetector:
         
     def detect(
         self,
-        df: pd.DataFrame,
+        df: Optional[pd.DataFrame] = None,
         oi_analysis: Optional[Dict] = None,
-        volume_profile: Optional[Dict] = None
+        volume_profile: Optional[Dict] = None,
+        ranges: Optional[RangeIndex] = None,
+        composite_profile: Optional[Dict] = None,
+        features: Optional[Dict[str, float]] = None
     ) -> Dict:
         """
         Detect potential fake breakout conditions
         
         Args:
-            df: DataFrame with OHLC data
+            df: DataFrame with OHLC data (not modified; only read when
+                `features` is not given)
             oi_analysis: OI analysis from option chain
             volume_profile: Volume profile data
+            ranges: Range index ending at the last row of `df` (built from
+                `df` if not given)
+            composite_profile: Multi-session profile positioned against the
+                current price (CompositeProfile.snapshot)
+            features: Bar features of the latest bar (breakout_features)
             
         Returns:
             Dictionary with fake breakout risk assessment
         """
         try:
-            risk_score = 0.0
-            risk_factors = []
-            
-            if df is None or len(df) < 20:
+            if features is None:
+                if df is None or len(df) < STRUCTURE_WINDOW:
+                    return {
+                        'is_fake_breakout': False,
+                        'risk_score': 0.0,
+                        'reasons': [],
+                        'error': 'Insufficient data'
+                    }
+                features = breakout_features(df, ranges)
+            elif features['n_bars'] < STRUCTURE_WINDOW:
                 return {
-                    'fake_breakout_risk': False,
+                    'is_fake_breakout': False,
                     'risk_score': 0.0,
-                    'risk_factors': [],
+                    'reasons': [],
                     'error': 'Insufficient data'
                 }
             
-            current_price = df['close'].iloc[-1]
-            recent_high = df['high'].iloc[-20:].max()
-            recent_low = df['low'].iloc[-20:].max()
-            
-            # Factor 1: Breakout without OI confirmation
-            if oi_analysis:
-                oi_trend = oi_analysis.get('oiTrend', 'NEUTRAL')
-                pcr = oi_analysis.get('pcr', 1.0)
-                
-                # Price breaking high but bearish OI
-                if current_price >= recent_high * 0.999 and oi_trend == 'PUT_HEAVY':
-                    risk_score += 3.0
-                    risk_factors.append('Breakout without OI confirmation')
-                
-                # Price breaking low but bullish OI
-                if current_price <= recent_low * 1.001 and oi_trend == 'CALL_HEAVY':
-                    risk_score += 3.0
-                    risk_factors.append('Breakdown without OI confirmation')
-                
-                # Extreme PCR divergence
-                if pcr > 2.0 or pcr < 0.5:
-                    risk_score += 2.0
-                    risk_factors.append('Extreme PCR suggests trap')
-            
-            # Factor 2: Volume analysis
-            if 'volume' in df.columns:
-                recent_volume = df['volume'].iloc[-5:].mean()
-                avg_volume = df['volume'].iloc[-20:].mean()
-                
-                # Breakout with declining volume
-                if recent_volume < avg_volume * 0.7:
-                    risk_score += 2.0
-                    risk_factors.append('Weak volume on breakout')
-            
-            # Factor 3: RSI divergence
-            if len(df) >= 14:
-                from ta.momentum import RSIIndicator
-                rsi_indicator = RSIIndicator(df['close'], window=14)
-                df['rsi'] = rsi_indicator.rsi()
-                
-                current_rsi = df['rsi'].iloc[-1]
-                
-                # Price making new high but RSI not confirming
-                if current_price >= recent_high * 0.999 and current_rsi < 65:
-                    risk_score += 2.0
-                    risk_factors.append('Bearish RSI divergence')
-                
-                # Price making new low but RSI not confirming
-                if current_price <= recent_low * 1.001 and current_rsi > 35:
-                    risk_score += 2.0
-                    risk_factors.append('Bullish RSI divergence')
-            
-            # Factor 4: Volume profile divergence
-            if volume_profile and volume_profile.get('poc'):
-                poc = volume_profile['poc']
-                price_position = volume_profile.get('price_position', 'IN_VALUE')
-                
-                # Breakout too far from value area
-                if price_position in ['ABOVE_VALUE', 'BELOW_VALUE']:
-                    poc_distance = volume_profile.get('poc_distance_pct', 0)
-                    if poc_distance > 3.0:
-                        risk_score += 2.0
-                        risk_factors.append('Price too far from value area')
-            
-            # Determine overall risk
-            fake_breakout_risk = risk_score >= 5.0
+            row = {name: [value] for name, value in features.items()}
+            row.update({
+                name: [value] for name, value in breakout_context(oi_analysis, volume_profile, composite_profile).items()
+            })
+            result = detect_series(row)
+            is_fake_breakout = bool(result['is_fake_breakout'][0])
             
             return {
-                'fake_breakout_risk': fake_breakout_risk,
-                'risk_score': round(risk_score, 2),
-                'risk_factors': risk_factors,
-                'interpretation': 'High fake breakout risk' if fake_breakout_risk else 'Low fake breakout risk'
+                'is_fake_breakout': is_fake_breakout,
+                'risk_score': round(float(result['risk_score'][0]), 2),
+                'reasons': [
+                    reason for (reason, _), hit in zip(BREAKOUT_FACTORS, result['factors'][0].tolist()) if hit
+                ],
+                'interpretation': 'High fake breakout risk' if is_fake_breakout else 'Low fake breakout risk'
             }
             
         except Exception as e:
             logger.error(f"Error detecting fake breakout: {e}", exc_info=True)
             return {
-                'fake_breakout_risk': False,
+                'is_fake_breakout': False,
                 'risk_score': 0.0,
-                'risk_factors': [],
+                'reasons': [],
                 'error': str(e)
             }
@@ -0,0 +1 @@
+# Quant Engine benchmarks - run with `python -m benchmarks.<name>` from services/quant-engine
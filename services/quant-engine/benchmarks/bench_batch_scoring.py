@@ -0,0 +1,124 @@
+"""
+Batch SetupScorer benchmark
+Checks parity with the scalar SetupScorer on synthetic inputs, then
+measures batch throughput for F&O-universe sized feature matrices.
+
+Usage (from services/quant-engine):
+    python -m benchmarks.bench_batch_scoring
+"""
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.batch_scoring import BatchSetupScorer, COMPONENTS
+from app.scoring import SetupScorer
+
+logging.disable(logging.WARNING)
+
+ALIGNMENTS = ['bullish', 'bearish', 'mixed']
+SLOPES = ['bullish', 'bearish', 'neutral']
+POSITIONS = ['above', 'below', 'at']
+OI_TRENDS = ['BULLISH', 'BEARISH', 'NEUTRAL', 'CALL_HEAVY']
+QUADRANTS = ['long_buildup', 'short_buildup', 'short_covering', 'long_unwinding', 'neutral']
+LEADERSHIP = ['leading', 'in_sync', 'lagging']
+
+
+def random_inputs(rng: np.random.Generator) -> dict:
+    """Synthetic inputs covering the scorer's branches"""
+    n = int(rng.choice([8, 12, 30, 60]))
+    close = 20000 + np.cumsum(rng.normal(0, rng.choice([5, 20, 60]), n))
+    high = close + rng.uniform(0, 40, n)
+    low = close - rng.uniform(0, 40, n)
+    df = pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close,
+                       'volume': rng.integers(1, 1000, n)})
+    price = float(close[-1])
+
+    ema_5m = {'alignment': str(rng.choice(ALIGNMENTS)), 'slope': str(rng.choice(SLOPES)),
+              'ema9': float(price + rng.choice([-10, 0, 10]))}
+    ema_15m = None if rng.random() < 0.3 else {
+        'alignment': str(rng.choice(ALIGNMENTS)), 'slope': str(rng.choice(SLOPES))}
+    vwap = None if rng.random() < 0.1 else {
+        'value': price * (1 + rng.uniform(-0.015, 0.015)), 'position': str(rng.choice(POSITIONS)), 'distance': 0}
+    oi = None if rng.random() < 0.3 else {
+        'pcr': float(rng.uniform(0.4, 2.2)), 'oiTrend': str(rng.choice(OI_TRENDS)),
+        'bullishScore': float(rng.uniform(0, 10)), 'bearishScore': float(rng.uniform(0, 10))}
+    internals = None if rng.random() < 0.4 else {
+        'correlation': float(rng.choice([0.2, 0.5, 0.8, rng.uniform(-1, 1)])),
+        'lead_correlation': float(rng.uniform(0, 1)), 'leadership': str(rng.choice(LEADERSHIP))}
+    breadth = None if rng.random() < 0.4 else {
+        'participation': None if rng.random() < 0.1 else float(rng.choice([0.4, 0.6, 0.8, rng.uniform(0, 1)])),
+        'advances': 30, 'declines': 20}
+
+    return dict(price=price, ema_5m=ema_5m, ema_15m=ema_15m, vwap=vwap,
+                price_history=close.tolist(), high_history=high.tolist(), low_history=low.tolist(),
+                df_ohlc=df, oi_analysis=oi,
+                futures_oi=rng.choice([None, 1e6, {'oi': 1e6, 'quadrant': str(rng.choice(QUADRANTS))}]),
+                nifty_price=None if rng.random() < 0.5 else 24000.0,
+                banknifty_price=51000.0,
+                internals=internals, breadth=breadth)
+
+
+def check_parity(samples: int = 500, seed: int = 7) -> int:
+    """Compare batch results with the scalar path; returns mismatch count"""
+    rng = np.random.default_rng(seed)
+    scalar = SetupScorer()
+    batch = BatchSetupScorer()
+
+    inputs = [random_inputs(rng) for _ in range(samples)]
+    features = np.vstack([batch.build_feature_row(**kw) for kw in inputs])
+    result = batch.score(features)
+
+    mismatches = 0
+    for i, kw in enumerate(inputs):
+        expected = scalar.calculate_setup_score(symbol='TEST', **kw)
+        ok = expected['setup_score'] == result['setup_score'][i]
+        ok &= expected['market_bias'] == result['market_bias'][i]
+        for name in COMPONENTS:
+            ok &= expected['components'][name]['score'] == result[f'{name}_score'][i]
+            ok &= expected['components'][name]['weighted'] == result[f'{name}_weighted'][i]
+        mismatches += not ok
+    return mismatches
+
+
+def bench_throughput(rows: int, repeats: int = 20, seed: int = 11) -> float:
+    """Rows scored per second for a random feature matrix"""
+    rng = np.random.default_rng(seed)
+    batch = BatchSetupScorer()
+    base = np.vstack([batch.build_feature_row(**random_inputs(rng)) for _ in range(64)])
+    features = base[rng.integers(0, len(base), rows)]
+
+    batch.score(features)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        batch.score(features)
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"  {rows:>7} rows: {elapsed * 1000:8.3f} ms/batch  ({rows / elapsed:,.0f} rows/s)")
+    return elapsed
+
+
+def bench_scalar(rows: int = 200, seed: int = 11) -> float:
+    """Scalar SetupScorer time for the same number of rows (for comparison)"""
+    rng = np.random.default_rng(seed)
+    scalar = SetupScorer()
+    inputs = [random_inputs(rng) for _ in range(rows)]
+    start = time.perf_counter()
+    for kw in inputs:
+        scalar.calculate_setup_score(symbol='TEST', **kw)
+    elapsed = time.perf_counter() - start
+    print(f"  scalar {rows} rows: {elapsed * 1000:8.1f} ms  ({rows / elapsed:,.0f} rows/s)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    print("Parity with SetupScorer.calculate_setup_score:")
+    mismatches = check_parity()
+    print(f"  {mismatches} mismatches")
+
+    print("Batch throughput (features precomputed):")
+    for rows in (200, 2_000, 20_000, 200_000):
+        bench_throughput(rows)
+
+    print("Scalar reference:")
+    bench_scalar()
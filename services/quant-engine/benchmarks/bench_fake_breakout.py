@@ -0,0 +1,139 @@
+"""
+Fake breakout benchmark
+Checks FakeBreakoutDetector.detect and detect_series against the previous
+DataFrame-based detector (kept below as the reference) on every bar prefix
+of random sessions with random OI and profile context, confirms the input
+frame is left untouched, then times labelling a session per bar against
+one detect_series call.
+
+Usage (from services/quant-engine):
+    python -m benchmarks.bench_fake_breakout
+"""
+import logging
+import time
+
+import numpy as np
+from ta.momentum import RSIIndicator
+
+from app.volume_profile import (
+    FakeBreakoutDetector, breakout_context, breakout_feature_series, detect_series
+)
+from benchmarks.bench_volume_profile import synthetic_bars
+
+logging.disable(logging.CRITICAL)
+
+
+def reference_detect(df, oi_analysis=None, volume_profile=None):
+    """The previous detector (adds an 'rsi' column to the frame it is given)"""
+    risk_score = 0.0
+    risk_factors = []
+    if df is None or len(df) < 20:
+        return {'fake_breakout_risk': False, 'risk_score': 0.0, 'risk_factors': []}
+
+    current_price = df['close'].iloc[-1]
+    recent_high = df['high'].iloc[-20:].max()
+    recent_low = df['low'].iloc[-20:].min()
+    if oi_analysis:
+        oi_trend = oi_analysis.get('oiTrend', 'NEUTRAL')
+        pcr = oi_analysis.get('pcr', 1.0)
+        if current_price >= recent_high * 0.999 and oi_trend == 'PUT_HEAVY':
+            risk_score += 3.0
+            risk_factors.append('Breakout without OI confirmation')
+        if current_price <= recent_low * 1.001 and oi_trend == 'CALL_HEAVY':
+            risk_score += 3.0
+            risk_factors.append('Breakdown without OI confirmation')
+        if pcr > 2.0 or pcr < 0.5:
+            risk_score += 2.0
+            risk_factors.append('Extreme PCR suggests trap')
+    if 'volume' in df.columns:
+        if df['volume'].iloc[-5:].mean() < df['volume'].iloc[-20:].mean() * 0.7:
+            risk_score += 2.0
+            risk_factors.append('Weak volume on breakout')
+    if len(df) >= 14:
+        df['rsi'] = RSIIndicator(df['close'], window=14).rsi()
+        current_rsi = df['rsi'].iloc[-1]
+        if current_price >= recent_high * 0.999 and current_rsi < 65:
+            risk_score += 2.0
+            risk_factors.append('Bearish RSI divergence')
+        if current_price <= recent_low * 1.001 and current_rsi > 35:
+            risk_score += 2.0
+            risk_factors.append('Bullish RSI divergence')
+    if volume_profile and volume_profile.get('poc'):
+        if volume_profile.get('price_position', 'IN_VALUE') in ['ABOVE_VALUE', 'BELOW_VALUE']:
+            if volume_profile.get('poc_distance_pct', 0) > 3.0:
+                risk_score += 2.0
+                risk_factors.append('Price too far from value area')
+    return {'fake_breakout_risk': risk_score >= 5.0, 'risk_score': round(risk_score, 2), 'risk_factors': risk_factors}
+
+
+def random_context(rng, n):
+    """Per-bar OI analysis and profile (or None), drawn to hit every factor"""
+    oi = [None if rng.random() < 0.3 else {
+        'oiTrend': str(rng.choice(['PUT_HEAVY', 'CALL_HEAVY', 'NEUTRAL'])),
+        'pcr': float(rng.choice([0.4, 0.9, 1.3, 2.4]))
+    } for _ in range(n)]
+    profiles = [None if rng.random() < 0.3 else {
+        'poc': 22000.0,
+        'price_position': str(rng.choice(['ABOVE_VALUE', 'BELOW_VALUE', 'IN_VALUE'])),
+        'poc_distance_pct': float(rng.choice([0.5, 2.9, 3.0, 3.5]))
+    } for _ in range(n)]
+    return oi, profiles
+
+
+def check_parity(sessions: int = 30) -> int:
+    detector = FakeBreakoutDetector()
+    rng = np.random.default_rng(11)
+    mismatches = 0
+    for seed in range(sessions):
+        bars = synthetic_bars(75, seed)
+        bars['volume'] = bars['volume'] * rng.choice([0.2, 1.0], len(bars))  # Volume dry-ups
+        oi, profiles = random_context(rng, len(bars))
+        before = bars.copy()
+
+        features = breakout_feature_series(bars)
+        for name in ('has_oi', 'oi_trend', 'pcr', 'profile_position', 'profile_poc_distance'):
+            features[name] = np.array([breakout_context(o, p)[name] for o, p in zip(oi, profiles)])
+        series = detect_series(features)
+
+        for i in range(len(bars)):
+            expected = reference_detect(bars.iloc[:i + 1].copy(), oi[i], profiles[i])
+            actual = detector.detect(bars.iloc[:i + 1], oi[i], profiles[i])
+            ok = actual['is_fake_breakout'] == expected['fake_breakout_risk']
+            ok &= actual['risk_score'] == expected['risk_score']
+            ok &= actual['reasons'] == expected['risk_factors']
+            ok &= bool(series['is_fake_breakout'][i]) == expected['fake_breakout_risk']
+            ok &= float(series['risk_score'][i]) == expected['risk_score']
+            if not ok:
+                mismatches += 1
+        if not bars.equals(before):
+            mismatches += 1
+    return mismatches
+
+
+def bench(n: int) -> None:
+    bars = synthetic_bars(n, seed=n)
+    oi, profiles = random_context(np.random.default_rng(n), n)
+
+    start = time.perf_counter()
+    for i in range(n):
+        reference_detect(bars.iloc[:i + 1].copy(), oi[i], profiles[i])
+    per_bar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    features = breakout_feature_series(bars)
+    for name in ('has_oi', 'oi_trend', 'pcr', 'profile_position', 'profile_poc_distance'):
+        features[name] = np.array([breakout_context(o, p)[name] for o, p in zip(oi, profiles)])
+    detect_series(features)
+    series = time.perf_counter() - start
+
+    print(f"  {n:>5} bars: per-bar detector {per_bar * 1e3:8.1f} ms   "
+          f"detect_series {series * 1e3:6.2f} ms   ({per_bar / series:6.0f}x)")
+
+
+if __name__ == "__main__":
+    print("Parity with the DataFrame detector (scalar and series), frame untouched:")
+    print(f"  {check_parity()} mismatches")
+
+    print("Labelling a session:")
+    for n in (75, 375, 1_500):
+        bench(n)
@@ -0,0 +1,105 @@
+"""
+Gate profile benchmark
+Checks GateTable.evaluate against TradingGate.evaluate_trade_decision on
+every gate for random score snapshots (every mode, random threshold
+overrides, regimes, time categories, fake breakouts and PCR extremes),
+then times evaluating one snapshot for many client profiles against a
+loop over their gates.
+
+Usage (from services/quant-engine):
+    python -m benchmarks.bench_gate_profiles
+"""
+import logging
+import time
+
+import numpy as np
+
+from app.trading_gate import GateProfiles, GateTable, RiskMode, TradingGate
+
+logging.disable(logging.CRITICAL)
+
+REGIMES = [None, 'NORMAL', 'COMPRESSION', 'EXPANSION']
+TIME_CATEGORIES = [None, 'OPENING_NOISE', 'CHOP_HOUR', 'MARKET_CLOSED', 'MIDDAY']
+
+
+def random_gates(rng, n: int):
+    gates = []
+    for _ in range(n):
+        mode = list(RiskMode)[rng.integers(3)]
+        setup = None if rng.random() < 0.4 else float(rng.choice([5.5, 6.0, 7.25, 8.0, 9]))
+        no_trade = None if rng.random() < 0.4 else float(rng.choice([3.0, 4.5, 6.0, 7.0]))
+        gates.append(TradingGate(mode, setup, no_trade))
+    return gates
+
+
+def random_snapshot(rng) -> dict:
+    return {
+        'setup_score': float(rng.choice([rng.uniform(0, 10), 7.0, 8.0, 10.0])),
+        'no_trade_score': float(rng.choice([rng.uniform(0, 10), 4.0, 6.0, 0.0])),
+        'volatility_regime': REGIMES[rng.integers(len(REGIMES))],
+        'time_category': TIME_CATEGORIES[rng.integers(len(TIME_CATEGORIES))],
+        'fake_breakout_risk': bool(rng.random() < 0.3),
+        'oi_analysis': None if rng.random() < 0.5 else {'pcr': float(rng.choice([0.3, 1.0, 2.7]))}
+    }
+
+
+def check_parity(cases: int = 300) -> int:
+    rng = np.random.default_rng(5)
+    mismatches = 0
+    for _ in range(cases):
+        gates = random_gates(rng, 40)
+        table = GateTable(gates)
+        snapshot = random_snapshot(rng)
+        expected = [gate.evaluate_trade_decision(**snapshot) for gate in gates]
+        actual = table.evaluate(**snapshot)
+        arrays = table.evaluate(**snapshot, details=False)
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            ok = e == a and repr(e) == repr(a)
+            ok &= bool(arrays['trade_allowed'][i]) == e['trade_allowed']
+            ok &= round(float(arrays['confidence'][i]), 2) == e['confidence']
+            if not ok:
+                mismatches += 1
+    return mismatches
+
+
+def bench(profiles: int, repeats: int = 20) -> None:
+    rng = np.random.default_rng(profiles)
+    registry = GateProfiles(TradingGate(), max_profiles=profiles)
+    for i, gate in enumerate(random_gates(rng, profiles)):
+        registry.set(f"client-{i}", gate.risk_mode.value,
+                     gate.config.SETUP_THRESHOLDS[gate.risk_mode],
+                     gate.config.NO_TRADE_THRESHOLDS[gate.risk_mode])
+    gates = [registry.get(client_id) for client_id in registry.clients()]
+    snapshot = random_snapshot(rng)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        [gate.evaluate_trade_decision(**snapshot) for gate in gates]
+    loop = (time.perf_counter() - start) / repeats
+
+    registry.tables()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for _, table in registry.tables().values():
+            table.evaluate(**snapshot)
+    batch = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for _, table in registry.tables().values():
+            table.evaluate(**snapshot, details=False)
+    arrays = (time.perf_counter() - start) / repeats
+
+    configs = registry.get_status()['distinct_configs']
+    print(f"  {profiles:>6} profiles ({configs:>2} configs): loop {loop * 1e3:8.2f} ms   "
+          f"batch {batch * 1e3:7.2f} ms ({loop / batch:5.1f}x)   "
+          f"decisions only {arrays * 1e3:6.3f} ms ({loop / arrays:6.0f}x)")
+
+
+if __name__ == "__main__":
+    print("Parity with TradingGate.evaluate_trade_decision:")
+    print(f"  {check_parity()} mismatches")
+
+    print("One snapshot for every client profile:")
+    for profiles in (100, 1_000, 10_000):
+        bench(profiles)
@@ -0,0 +1,142 @@
+"""
+Gate rules benchmark
+Checks the rule-driven TradingGate against the previous hard-coded six
+rules (kept below as the reference) on random decisions for every mode
+and threshold override, checks evaluate_series and the first-block
+short-circuit against the scalar decisions and their rule traces, then
+times gating months of bars one decision at a time against one series
+pass.
+
+Usage (from services/quant-engine):
+    python -m benchmarks.bench_gate_rules
+"""
+import logging
+import time
+
+import numpy as np
+
+from app.gate_rules import gate_rules
+from app.trading_gate import RiskMode, TradingGate, decision_fields
+
+logging.disable(logging.CRITICAL)
+
+REGIMES = [None, 'NORMAL', 'COMPRESSION', 'EXPANSION']
+TIME_CATEGORIES = [None, 'OPENING_NOISE', 'CHOP_HOUR', 'MARKET_CLOSED', 'PRIME_TIME']
+
+
+def reference_decision(gate: TradingGate, setup_score, no_trade_score, volatility_regime=None,
+                       time_category=None, fake_breakout_risk=False, oi_analysis=None):
+    """The previous hard-coded rules: (trade_allowed, blocking_reasons, warnings)"""
+    mode, config = gate.risk_mode, gate.config
+    conservative = mode == RiskMode.CONSERVATIVE
+    blocking, warnings = [], []
+    setup_threshold = config.SETUP_THRESHOLDS[mode]
+    no_trade_threshold = config.NO_TRADE_THRESHOLDS[mode]
+    if setup_score < setup_threshold:
+        blocking.append(f"Setup score {setup_score:.2f} below threshold {setup_threshold:.2f}")
+    if no_trade_score > no_trade_threshold:
+        blocking.append(f"No-trade score {no_trade_score:.2f} above threshold {no_trade_threshold:.2f}")
+    if volatility_regime and volatility_regime not in config.ALLOWED_VOLATILITY_REGIMES[mode]:
+        if conservative:
+            blocking.append(f"Volatility regime '{volatility_regime}' not allowed in CONSERVATIVE mode")
+        else:
+            warnings.append(f"Volatility regime '{volatility_regime}' requires extra caution")
+    if time_category == 'OPENING_NOISE':
+        if config.BLOCK_OPENING_NOISE[mode]:
+            blocking.append("Trading blocked during opening noise period")
+        else:
+            warnings.append("Opening period - high volatility expected")
+    elif time_category == 'CHOP_HOUR':
+        if config.BLOCK_CHOP_HOUR[mode]:
+            blocking.append("Trading blocked during chop hour")
+        else:
+            warnings.append("Chop hour - expect sideways movement")
+    elif time_category == 'MARKET_CLOSED':
+        blocking.append("Market is closed")
+    if fake_breakout_risk:
+        if conservative:
+            blocking.append("Fake breakout risk detected")
+        else:
+            warnings.append("Potential fake breakout detected - be cautious")
+    if oi_analysis and conservative:
+        pcr = oi_analysis.get('pcr', 1.0)
+        if pcr > 2.5 or pcr < 0.4:
+            warnings.append(f"Extreme PCR value {pcr:.2f} - market uncertainty")
+    return not blocking, blocking, warnings
+
+
+def random_decisions(rng, n: int) -> dict:
+    pcr = rng.choice([np.nan, 0.3, 1.0, 2.7], n)
+    return {
+        'setup_score': np.round(rng.uniform(0, 10, n), 2),
+        'no_trade_score': np.round(rng.uniform(0, 10, n), 2),
+        'volatility_regime': np.array(REGIMES, dtype=object)[rng.integers(len(REGIMES), size=n)],
+        'time_category': np.array(TIME_CATEGORIES, dtype=object)[rng.integers(len(TIME_CATEGORIES), size=n)],
+        'fake_breakout_risk': rng.random(n) < 0.3,
+        'pcr': pcr
+    }
+
+
+def scalar_args(decisions: dict, i: int) -> dict:
+    pcr = decisions['pcr'][i]
+    return {
+        'setup_score': float(decisions['setup_score'][i]),
+        'no_trade_score': float(decisions['no_trade_score'][i]),
+        'volatility_regime': decisions['volatility_regime'][i],
+        'time_category': decisions['time_category'][i],
+        'fake_breakout_risk': bool(decisions['fake_breakout_risk'][i]),
+        'oi_analysis': None if np.isnan(pcr) else {'pcr': float(pcr)}
+    }
+
+
+def check_parity(n: int = 3_000) -> int:
+    rng = np.random.default_rng(3)
+    mismatches = 0
+    for mode in RiskMode:
+        for setup, no_trade in ((None, None), (5.5, 7.5), (9.0, 3.0)):
+            gate = TradingGate(mode, setup, no_trade)
+            decisions = random_decisions(rng, n)
+            series = gate.evaluate_series(**decisions)
+            for i in range(n):
+                args = scalar_args(decisions, i)
+                result = gate.evaluate_trade_decision(**args, trace=True)
+                allowed, blocking, warnings = reference_decision(gate, **args)
+                ok = (result['trade_allowed'], result['blocking_reasons'], result['warnings']) == \
+                    (allowed, blocking, warnings)
+                ok &= bool(series['trade_allowed'][i]) == allowed
+                ok &= bool(series['caution'][i]) == (result['decision'] == 'TRADE_ALLOWED_WITH_CAUTION')
+                ok &= round(float(series['confidence'][i]), 2) == result['confidence']
+                ok &= all(bool(series['fired'][step['rule']][i]) == step['fired'] for step in result['rule_trace'])
+
+                first, _, _ = gate_rules.evaluate(decision_fields(**args), gate.gate_params(), first_block=True)
+                ok &= len(first) == min(1, len(blocking)) and first == blocking[:1]
+                if not ok:
+                    mismatches += 1
+    return mismatches
+
+
+def bench(n: int) -> None:
+    gate = TradingGate(RiskMode.BALANCED)
+    decisions = random_decisions(np.random.default_rng(n), n)
+    rows = [scalar_args(decisions, i) for i in range(n)]
+
+    start = time.perf_counter()
+    for args in rows:
+        gate.evaluate_trade_decision(**args)
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    gate.evaluate_series(**decisions)
+    series = time.perf_counter() - start
+
+    print(f"  {n:>7} bars: per-decision {loop * 1e3:8.1f} ms   series {series * 1e3:6.2f} ms   "
+          f"({loop / series:5.0f}x)")
+
+
+if __name__ == "__main__":
+    print("Parity with the hard-coded rules (decisions, series, traces, first block):")
+    print(f"  {check_parity()} mismatches")
+
+    print("Gating a backtest (5m bars; ~19k per year):")
+    for n in (1_500, 19_000, 100_000):
+        bench(n)
@@ -0,0 +1,153 @@
+"""
+Intraday score replay benchmark
+Checks the one-pass replay against SetupScorer.calculate_setup_score run on
+every bar prefix (the bar-by-bar reconstruction it replaces), then times a
+full NIFTY session.
+
+Usage (from services/quant-engine):
+    python -m benchmarks.bench_replay
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.batch_scoring import COMPONENTS
+from app.replay import ScoreReplayer
+from app.scoring import SetupScorer
+from app.service import IndicatorService
+
+logging.disable(logging.CRITICAL)
+
+SESSION_MINUTES = 375  # 09:15 - 15:30
+
+
+def synthetic_session(seed: int, minutes: int = SESSION_MINUTES, day: str = "2025-03-03") -> pd.DataFrame:
+    """Random-walk 1m bars for one session"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(f"{day} 09:15", periods=minutes, freq="1min")
+    close = 22000 + np.cumsum(rng.normal(0, rng.choice([2, 6, 15]), minutes))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) + rng.uniform(0, 8, minutes)
+    low = np.minimum(open_, close) - rng.uniform(0, 8, minutes)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                         'volume': rng.integers(1_000, 50_000, minutes)}, index=index)
+
+
+def resample(bars: pd.DataFrame, minutes: int) -> pd.DataFrame:
+    return bars.resample(f"{minutes}min").agg({
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+    }).dropna()
+
+
+def oi_snapshots(bars: pd.DataFrame, seed: int):
+    """Option-chain analyses recorded every 3 minutes"""
+    rng = np.random.default_rng(seed)
+    times = bars.index[::3] + timedelta(seconds=30)
+    return [(t.to_pydatetime(), {
+        'pcr': float(rng.uniform(0.5, 1.8)),
+        'oiTrend': str(rng.choice(['BULLISH', 'BEARISH', 'NEUTRAL'])),
+        'bullishScore': float(rng.uniform(0, 10)),
+        'bearishScore': float(rng.uniform(0, 10))
+    }) for t in times]
+
+
+def check_parity(seeds=range(5), bar_minutes: int = 5, higher_timeframe_minutes=None) -> int:
+    """
+    Compare replay rows with per-prefix scalar scoring; returns mismatches.
+    With a higher timeframe, the reference resamples each prefix for ema_15m.
+    """
+    service = IndicatorService()
+    scorer = SetupScorer()
+    replayer = ScoreReplayer()
+    mismatches = 0
+
+    for seed in seeds:
+        bars = resample(synthetic_session(seed), bar_minutes)
+        snapshots = oi_snapshots(synthetic_session(seed), seed)
+        replayed = replayer.replay(bars, snapshots, bar_minutes, higher_timeframe_minutes)
+
+        for t in range(len(bars)):
+            prefix = bars.iloc[:t + 1]
+            indicators = asyncio.run(service.calculate_indicators(prefix))
+            bar_close = prefix.index[-1].to_pydatetime() + timedelta(minutes=bar_minutes)
+            recorded = [a for ts, a in snapshots if ts <= bar_close]
+            ema_15m = None
+            if higher_timeframe_minutes:
+                higher = resample(prefix, higher_timeframe_minutes)
+                ema_15m = asyncio.run(service.calculate_indicators(higher)).get('ema')
+
+            expected = scorer.calculate_setup_score(
+                symbol='NIFTY',
+                price=float(prefix['close'].iloc[-1]),
+                ema_5m=indicators.get('ema'),
+                ema_15m=ema_15m,
+                vwap=indicators.get('vwap'),
+                price_history=prefix['close'].tolist(),
+                high_history=prefix['high'].tolist(),
+                low_history=prefix['low'].tolist(),
+                df_ohlc=prefix,
+                oi_analysis=recorded[-1] if recorded else None
+            )
+            row = replayed.iloc[t]
+            ok = expected['setup_score'] == row['setup_score']
+            ok &= expected['market_bias'] == row['market_bias']
+            for name in COMPONENTS:
+                ok &= expected['components'][name]['score'] == row[f'{name}_score']
+            if not ok:
+                mismatches += 1
+    return mismatches
+
+
+def bench_session(bar_minutes: int, repeats: int = 20, seed: int = 3) -> float:
+    """Seconds to replay one full session"""
+    bars = synthetic_session(seed)
+    if bar_minutes > 1:
+        bars = resample(bars, bar_minutes)
+    snapshots = oi_snapshots(synthetic_session(seed), seed)
+    replayer = ScoreReplayer()
+
+    replayer.replay(bars, snapshots, bar_minutes)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        replayer.replay(bars, snapshots, bar_minutes, higher_timeframe_minutes=15)
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"  {bar_minutes}m session ({len(bars)} bars): {elapsed * 1000:8.2f} ms")
+    return elapsed
+
+
+def bench_bar_by_bar(bar_minutes: int = 5, seed: int = 3) -> float:
+    """Per-prefix scalar reconstruction of the same session (for comparison)"""
+    service = IndicatorService()
+    scorer = SetupScorer()
+    bars = resample(synthetic_session(seed), bar_minutes)
+
+    start = time.perf_counter()
+    for t in range(len(bars)):
+        prefix = bars.iloc[:t + 1]
+        indicators = asyncio.run(service.calculate_indicators(prefix))
+        scorer.calculate_setup_score(
+            symbol='NIFTY', price=float(prefix['close'].iloc[-1]),
+            ema_5m=indicators.get('ema'), ema_15m=None, vwap=indicators.get('vwap'),
+            price_history=prefix['close'].tolist(), high_history=prefix['high'].tolist(),
+            low_history=prefix['low'].tolist(), df_ohlc=prefix
+        )
+    elapsed = time.perf_counter() - start
+    print(f"  bar-by-bar {bar_minutes}m session ({len(bars)} bars): {elapsed * 1000:8.1f} ms")
+    return elapsed
+
+
+if __name__ == "__main__":
+    print("Parity with per-prefix SetupScorer.calculate_setup_score:")
+    print(f"  live (no 15m context): {check_parity()} mismatches")
+    print(f"  15m trend context:     {check_parity(higher_timeframe_minutes=15)} mismatches")
+
+    print("Replay (one pass, 15m trend context):")
+    for minutes in (1, 5, 15):
+        bench_session(minutes)
+
+    print("Bar-by-bar reference:")
+    bench_bar_by_bar()
@@ -0,0 +1,170 @@
+"""
+Session volume profile benchmark
+Checks the incremental SessionVolumeProfile against a from-scratch build on
+the same fixed grid after every bar (bin volumes, POC volume, value area
+coverage), then times absorbing a session bar by bar against re-profiling
+the fetched window on every bar, and counts how often the POC moves.
+Composites of daily profiles are checked against the raw bars of the same
+sessions and timed cold, cached and against reprocessing the bars.
+
+Usage (from services/quant-engine):
+    python -m benchmarks.bench_session_profile
+"""
+import logging
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.composite_profile import DailyProfile, DailyProfileStore
+from app.session_profile import SessionVolumeProfile
+from app.volume_profile import VolumeProfileCalculator
+from benchmarks.bench_volume_profile import synthetic_bars
+
+logging.disable(logging.CRITICAL)
+
+
+def scratch_bins(df, bin_size: float) -> dict:
+    """Volume per absolute bin, rebuilt from every bar"""
+    bins = {}
+    for high, low, volume in zip(df['high'], df['low'], df['volume']):
+        first = math.floor(low / bin_size + 1e-9)
+        last = math.floor(high / bin_size + 1e-9)
+        share = float(volume) / (last - first + 1)
+        for k in range(first, last + 1):
+            bins[k] = bins.get(k, 0.0) + share
+    return bins
+
+
+def check_parity(sessions: int = 40) -> int:
+    """Bin volumes and POC volume must match; the value area must cover its target"""
+    mismatches = 0
+    for seed in range(sessions):
+        df = synthetic_bars(375, seed)
+        profile = SessionVolumeProfile()
+        for step, (ts, row) in enumerate(df.iterrows(), start=1):
+            profile.add_bar(ts.to_pydatetime(), row['high'], row['low'], row['volume'])
+            if step % 25 and step != len(df):
+                continue
+            expected = scratch_bins(df.iloc[:step], profile.bin_size)
+            actual = {
+                profile.base + i: v for i, v in enumerate(profile.volumes.tolist()) if v > 0
+            }
+            ok = expected.keys() == actual.keys()
+            ok &= all(np.isclose(expected[k], actual[k], rtol=1e-9) for k in expected)
+            ok &= np.isclose(profile.volumes[profile.poc], max(expected.values()), rtol=1e-9)
+            inside = sum(v for k, v in expected.items()
+                         if profile.base + profile.va_lower <= k <= profile.base + profile.va_upper)
+            ok &= np.isclose(inside, profile.va_volume, rtol=1e-9)
+            ok &= profile.va_volume >= profile.total_volume * profile.value_area_percent - 1e-6
+            if not ok:
+                mismatches += 1
+    return mismatches
+
+
+def bench(n: int, window: int = 240) -> None:
+    df = synthetic_bars(n, seed=n)
+    rows = [(ts.to_pydatetime(), h, l, v) for ts, h, l, v in zip(df.index, df['high'], df['low'], df['volume'])]
+
+    start = time.perf_counter()
+    profile = SessionVolumeProfile()
+    session_pocs = []
+    for ts, high, low, volume in rows:
+        profile.add_bar(ts, high, low, volume)
+        session_pocs.append(profile.poc_price)
+    incremental = (time.perf_counter() - start) / n
+
+    calculator = VolumeProfileCalculator()
+    step = max(1, n // 100)
+    start = time.perf_counter()
+    window_pocs = []
+    for i in range(10, n, step):
+        window_pocs.append(calculator.calculate(df.iloc[max(0, i + 1 - window):i + 1])['poc'])
+    rebuild = (time.perf_counter() - start) / len(window_pocs)
+
+    session_moves = sum(a != b for a, b in zip(session_pocs[::step], session_pocs[step::step]))
+    window_moves = sum(a != b for a, b in zip(window_pocs, window_pocs[1:]))
+    print(f"  {n:>6} bars: incremental {incremental * 1e6:7.1f} us/bar   "
+          f"window rebuild {rebuild * 1e3:7.3f} ms/bar   ({rebuild / incremental:6.0f}x)   "
+          f"POC moves {session_moves} vs {window_moves} (sampled)")
+
+
+def daily_profiles(days: int, seed: int = 0):
+    """One DailyProfile per synthetic 375-bar session, plus the raw bars"""
+    frames, profiles = [], []
+    for d in range(days):
+        df = synthetic_bars(375, seed + d)
+        df.index = df.index + pd.Timedelta(days=d)
+        profile = SessionVolumeProfile()
+        for ts, high, low, volume in zip(df.index, df['high'], df['low'], df['volume']):
+            profile.add_bar(ts.to_pydatetime(), high, low, volume)
+        frames.append(df)
+        profiles.append(DailyProfile.from_session('NIFTY', profile))
+    return frames, profiles
+
+
+def check_composite_parity(cases: int = 20) -> int:
+    """Merged daily arrays must equal the bins of all the sessions' bars"""
+    mismatches = 0
+    for seed in range(cases):
+        frames, profiles = daily_profiles(5, seed * 10)
+        store = DailyProfileStore()
+        for profile in profiles:
+            store.add(profile)
+        composite = store.composite('NIFTY', [p.day for p in profiles])
+        expected = scratch_bins(pd.concat(frames), composite.bin_size)
+        actual = {composite.base + i: v for i, v in enumerate(composite.volumes.tolist()) if v > 0}
+        ok = expected.keys() == actual.keys()
+        ok &= all(np.isclose(expected[k], actual[k], rtol=1e-9) for k in expected)
+        ok &= np.isclose(composite.volumes[composite.poc], max(expected.values()), rtol=1e-9)
+        if not ok:
+            mismatches += 1
+    return mismatches
+
+
+def bench_composite(days: int, repeats: int = 50) -> None:
+    frames, profiles = daily_profiles(days)
+    day_list = [p.day for p in profiles]
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        store = DailyProfileStore()
+        for profile in profiles:
+            store.add(profile)
+        store.composite('NIFTY', day_list).snapshot(22000.0, distribution=False)
+    cold = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats * 20):
+        store.composite('NIFTY', day_list).snapshot(22000.0, distribution=False)
+    cached = (time.perf_counter() - start) / (repeats * 20)
+
+    # Every raw bar into one profile (stamped with one date so it never resets)
+    bars = pd.concat(frames)
+    stamp = bars.index[0].to_pydatetime()
+    start = time.perf_counter()
+    for _ in range(max(1, repeats // 10)):
+        profile = SessionVolumeProfile()
+        for high, low, volume in zip(bars['high'], bars['low'], bars['volume']):
+            profile.add_bar(stamp, high, low, volume)
+    raw = (time.perf_counter() - start) / max(1, repeats // 10)
+
+    print(f"  {days:>3} sessions: merge {cold * 1e3:7.3f} ms   cached {cached * 1e6:7.1f} us   "
+          f"raw bars {raw * 1e3:8.2f} ms   ({raw / cached:7.0f}x cached)")
+
+
+if __name__ == "__main__":
+    print("Parity with a from-scratch build on the same grid:")
+    print(f"  {check_parity()} mismatches")
+
+    print("Per-bar update cost (window rebuild = 240-bar window, 50 bins):")
+    for n in (375, 1_500, 7_500):
+        bench(n)
+
+    print("Composite parity with the sessions' raw bars:")
+    print(f"  {check_composite_parity()} mismatches")
+
+    print("Composite profile (merge of daily arrays vs re-profiling raw bars):")
+    for days in (1, 5, 20):
+        bench_composite(days)
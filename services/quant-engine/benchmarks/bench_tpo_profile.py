@@ -0,0 +1,152 @@
+"""
+TPO profile benchmark
+Checks the bitmask TPOProfile against a set-of-letters-per-price reference
+built from the whole session (TPO counts, POC, value area, initial
+balance, single prints; periods from the calendar session open, including
+sessions joined late), then times the per-minute update and a full
+minute for a universe of symbols.
+
+Usage (from services/quant-engine):
+    python -m benchmarks.bench_tpo_profile
+"""
+import logging
+import math
+import time
+
+from app.market_calendar import market_calendar
+from app.tpo_profile import PERIOD_LETTERS, TPOProfile
+from benchmarks.bench_volume_profile import synthetic_bars
+
+logging.disable(logging.CRITICAL)
+
+
+def reference_value_area(counts: dict, poc: int, percent: float = 0.70) -> tuple:
+    """Expand from the POC bin towards the side with more TPOs (absolute bins)"""
+    target = sum(counts.values()) * percent
+    lower = upper = poc
+    inside = counts[poc]
+    while inside < target:
+        below, above = counts.get(lower - 1, 0), counts.get(upper + 1, 0)
+        if below == 0 and above == 0:
+            break
+        if below > above:
+            lower -= 1
+            inside += below
+        else:
+            upper += 1
+            inside += above
+    return lower, upper
+
+
+def reference_tpo(df, bin_size: float, period_minutes: int = 30, ib_periods: int = 2) -> dict:
+    """Letters per absolute bin, rebuilt from every bar"""
+    open_time = market_calendar.session_open(df.index[0].date())
+    letters, highs, lows = {}, {}, {}
+    for ts, high, low in zip(df.index, df['high'], df['low']):
+        period = max(int((ts - open_time).total_seconds() // (period_minutes * 60)), 0)
+        highs[period] = max(highs.get(period, high), high)
+        lows[period] = min(lows.get(period, low), low)
+        for k in range(math.floor(low / bin_size + 1e-9), math.floor(high / bin_size + 1e-9) + 1):
+            letters.setdefault(k, set()).add(period)
+
+    current = max(highs)
+    singles = sorted(k for k, periods in letters.items() if len(periods) == 1 and current not in periods)
+    runs = []
+    for k in singles:
+        if runs and runs[-1][1] == k:
+            runs[-1][1] = k + 1
+        else:
+            runs.append([k, k + 1])
+    ib = None
+    if 0 in highs and current >= ib_periods:
+        ib = (max(highs[p] for p in range(ib_periods)), min(lows[p] for p in range(ib_periods)))
+    counts = {k: len(periods) for k, periods in letters.items()}
+    return {
+        'counts': counts,
+        'pocs': {k for k, count in counts.items() if count == max(counts.values())},
+        'ib': ib,
+        'single_prints': [(round(a * bin_size, 2), round(b * bin_size, 2)) for a, b in runs]
+    }
+
+
+def check_parity(sessions: int = 30) -> int:
+    mismatches = 0
+    for seed in range(sessions):
+        df = synthetic_bars(375, seed)
+        if seed % 3 == 2:
+            df = df.iloc[50:]  # Joined late: no first period, no initial balance
+        profile = TPOProfile()
+        for step, (ts, high, low) in enumerate(zip(df.index, df['high'], df['low']), start=1):
+            profile.add_bar(ts.to_pydatetime(), high, low)
+            if step % 45 and step != len(df):
+                continue
+            expected = reference_tpo(df.iloc[:step], profile.bin_size)
+            actual = {profile.base + i: int(c) for i, c in enumerate(profile.counts.tolist()) if c}
+            snapshot = profile.snapshot(letters=True)
+            ok = actual == expected['counts']
+            ok &= sum(len(v) for v in snapshot['letters'].values()) == sum(expected['counts'].values())
+
+            # Tied POCs are kept in order of arrival; the value area expands from that bin
+            poc = math.floor(snapshot['poc'] / profile.bin_size)
+            ok &= poc in expected['pocs'] and snapshot['poc_tpos'] == expected['counts'][poc]
+            if ok:
+                lower, upper = reference_value_area(expected['counts'], poc)
+                ok &= (snapshot['val'], snapshot['vah']) == (round((lower + 0.5) * profile.bin_size, 2),
+                                                             round((upper + 0.5) * profile.bin_size, 2))
+
+            ib = snapshot['initial_balance']
+            ok &= (ib is None) == (expected['ib'] is None)
+            if ib is not None and expected['ib'] is not None:
+                ok &= (ib['high'], ib['low']) == (round(expected['ib'][0], 2), round(expected['ib'][1], 2))
+            ok &= [(run['low'], run['high']) for run in snapshot['single_prints']] == expected['single_prints']
+            ok &= all(run['period'] in PERIOD_LETTERS for run in snapshot['single_prints'])
+            if not ok:
+                mismatches += 1
+    return mismatches
+
+
+def bench_update(n: int = 375) -> None:
+    df = synthetic_bars(n, seed=7)
+    rows = list(zip(df.index.to_pydatetime(), df['high'].tolist(), df['low'].tolist()))
+    start = time.perf_counter()
+    repeats = 20
+    for _ in range(repeats):
+        profile = TPOProfile()
+        for ts, high, low in rows:
+            profile.add_bar(ts, high, low)
+    per_bar = (time.perf_counter() - start) / (repeats * n)
+
+    start = time.perf_counter()
+    for _ in range(200):
+        profile._value_area = None
+        profile.snapshot(22000.0)
+    snapshot = (time.perf_counter() - start) / 200
+    print(f"  update {per_bar * 1e6:6.1f} us/bar   snapshot {snapshot * 1e6:7.1f} us")
+
+
+def bench_universe(symbols: int, minutes: int = 375) -> None:
+    """One bar per symbol per minute, the way the scheduler would feed them"""
+    streams = []
+    for s in range(symbols):
+        df = synthetic_bars(minutes, seed=s)
+        streams.append(list(zip(df.index.to_pydatetime(), df['high'].tolist(), df['low'].tolist())))
+    profiles = [TPOProfile() for _ in range(symbols)]
+
+    start = time.perf_counter()
+    for minute in range(minutes):
+        for profile, stream in zip(profiles, streams):
+            profile.add_bar(*stream[minute])
+    per_minute = (time.perf_counter() - start) / minutes
+    print(f"  {symbols:>5} symbols: {per_minute * 1e3:7.2f} ms per minute for the universe")
+
+
+if __name__ == "__main__":
+    print("Parity with the letters-per-price reference:")
+    print(f"  {check_parity()} mismatches")
+
+    print("Per-symbol cost:")
+    bench_update()
+
+    print("Universe update (one 1m bar per symbol):")
+    for symbols in (50, 200, 500):
+        bench_universe(symbols)
@@ -0,0 +1,121 @@
+"""
+Volume profile benchmark
+Checks the vectorized VolumeProfileCalculator against the row-by-row
+calculation it replaces (kept below as the reference), then times both at
+100, 1k and 10k bars.
+
+Usage (from services/quant-engine):
+    python -m benchmarks.bench_volume_profile
+"""
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.volume_profile import VolumeProfileCalculator
+
+logging.disable(logging.CRITICAL)
+
+
+def synthetic_bars(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 22000 + np.cumsum(rng.normal(0, rng.choice([2, 6, 15]), n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) + rng.uniform(0, 8, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 8, n)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                         'volume': rng.integers(1_000, 50_000, n)},
+                        index=pd.date_range("2025-03-03 09:15", periods=n, freq="1min"))
+
+
+def reference_profile(df: pd.DataFrame, price_bins: int = 50, value_area_percent: float = 0.70) -> dict:
+    """The previous iterrows/dict implementation (POC, VAH, VAL, value-area volume)"""
+    price_low = df['low'].min()
+    price_high = df['high'].max()
+    bin_size = (price_high - price_low) / price_bins
+
+    volume_at_price = {}
+    for _, row in df.iterrows():
+        low_bin = int((row['low'] - price_low) / bin_size)
+        high_bin = int((row['high'] - price_low) / bin_size)
+        volume_per_bin = row.get('volume', 1) / max(1, high_bin - low_bin + 1)
+        for bin_idx in range(low_bin, high_bin + 1):
+            if 0 <= bin_idx < price_bins:
+                price_level = round(price_low + (bin_idx * bin_size) + (bin_size / 2), 2)
+                volume_at_price[price_level] = volume_at_price.get(price_level, 0) + volume_per_bin
+
+    sorted_prices = sorted(volume_at_price.items())
+    poc_price = max(volume_at_price.items(), key=lambda x: x[1])[0]
+    poc_idx = [price for price, _ in sorted_prices].index(poc_price)
+    total_volume = sum(volume_at_price.values())
+    target_volume = total_volume * value_area_percent
+
+    accumulated_volume = volume_at_price[poc_price]
+    lower_idx = upper_idx = poc_idx
+    while accumulated_volume < target_volume:
+        lower_volume = sorted_prices[lower_idx - 1][1] if lower_idx > 0 else 0
+        upper_volume = sorted_prices[upper_idx + 1][1] if upper_idx < len(sorted_prices) - 1 else 0
+        if lower_volume == 0 and upper_volume == 0:
+            break
+        if lower_volume > upper_volume:
+            lower_idx -= 1
+            accumulated_volume += lower_volume
+        else:
+            upper_idx += 1
+            accumulated_volume += upper_volume
+
+    return {
+        'poc': round(poc_price, 2),
+        'vah': round(sorted_prices[upper_idx][0], 2),
+        'val': round(sorted_prices[lower_idx][0], 2),
+        'value_area_volume': accumulated_volume,
+        'total_volume': total_volume
+    }
+
+
+def check_parity(cases: int = 300) -> int:
+    """Compare POC/VAH/VAL (exact) and volumes (relative 1e-9) on random frames"""
+    calculator = VolumeProfileCalculator()
+    rng = np.random.default_rng(42)
+    mismatches = 0
+    for seed in range(cases):
+        df = synthetic_bars(int(rng.choice([10, 25, 75, 375])), seed)
+        bins = int(rng.choice([20, 50, 100]))
+        expected = reference_profile(df, bins)
+        actual = calculator.calculate(df, bins)
+        ok = all(expected[key] == actual[key] for key in ('poc', 'vah', 'val'))
+        ok &= np.isclose(expected['total_volume'], actual['total_volume'], rtol=1e-9, atol=0.01)
+        ok &= np.isclose(expected['value_area_volume'], actual['value_area_volume'], rtol=1e-9, atol=0.01)
+        if not ok:
+            mismatches += 1
+    return mismatches
+
+
+def bench(n: int, repeats: int) -> None:
+    df = synthetic_bars(n, seed=n)
+    calculator = VolumeProfileCalculator()
+    calculator.calculate(df)  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        calculator.calculate(df)
+    vectorized = (time.perf_counter() - start) / repeats
+
+    reference_repeats = max(1, repeats // 20)
+    start = time.perf_counter()
+    for _ in range(reference_repeats):
+        reference_profile(df)
+    reference = (time.perf_counter() - start) / reference_repeats
+
+    print(f"  {n:>6} bars: vectorized {vectorized * 1000:8.3f} ms   "
+          f"row loop {reference * 1000:9.2f} ms   ({reference / vectorized:6.1f}x)")
+
+
+if __name__ == "__main__":
+    print("Parity with the row-by-row profile:")
+    print(f"  {check_parity()} mismatches")
+
+    print("Profile time per call (50 bins):")
+    for n, repeats in ((100, 200), (1_000, 100), (10_000, 40)):
+        bench(n, repeats)